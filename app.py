@@ -8,10 +8,19 @@ from routes.api_config_routes import api_config_bp
 from routes.search_routes import search_bp
 from routes.hot_resource_routes import resources_bp
 from routes.auth_routes import auth_bp
+from routes.metrics_routes import metrics_bp
+from routes.trace_routes import trace_bp
+from routes.job_routes import job_bp
 from configs.app_config import SECRET_KEY
+from src.services.health_service import start_health_scheduler
+from src.services.job_queue import JOB_QUEUE
+from src.services.link_check_service import start_link_check_scheduler
+from src.services.prewarm_service import start_prewarm_scheduler
+from src.services.reshare_service import start_reshare_scheduler
+from utils.json_utils import FastJSONProvider
 
 app = Flask(__name__)
-
+app.json = FastJSONProvider(app)
 
 app.secret_key = SECRET_KEY
 
@@ -20,6 +29,24 @@ app.register_blueprint(auth_bp)
 app.register_blueprint(api_config_bp)
 app.register_blueprint(search_bp)
 app.register_blueprint(resources_bp)
+app.register_blueprint(metrics_bp)
+app.register_blueprint(trace_bp)
+app.register_blueprint(job_bp)
+
+# 后台健康检查（多 worker 时由文件锁选出一个进程执行）
+start_health_scheduler()
+
+# 低峰时段预热热门关键词的搜索缓存（同样由文件锁选出一个进程执行）
+start_prewarm_scheduler()
+
+# 定时检查资源库分享链接是否有效（同样由文件锁选出一个进程执行）
+start_link_check_scheduler()
+
+# 定时重新分享未替换的资源（默认关闭，由文件锁选出一个进程执行）
+start_reshare_scheduler()
+
+# 后台任务线程（转存 / 删除分享），启动时接手上次未完成的任务
+JOB_QUEUE.start()
 
 # 上下文处理器，将登录状态传递给所有模板
 @app.context_processor
@@ -0,0 +1,122 @@
+"""
+分享链接巡检的本地验证与吞吐基准：起一个模拟夸克 / 百度分享接口的 HTTP 服务，
+逐个检查各类链接的判定结果（有效 / 失效 / 无法判断），再端到端运行一轮 run_link_check（数据库读写替换为内存桩），
+输出每秒检查数（受 LINK_CHECK_RATE_PER_HOST 每主机限速影响）。
+
+模拟的分享 ID 前缀决定返回内容：
+    夸克 sharepage/token: alive* 返回 stoken，gone* 返回 41006，busy* 返回 429，broken* 返回 502
+    百度分享页: pwd* 跳转 /share/init（有效），error* 跳转错误页，dead* 返回失效提示页，open* 返回正常分享页
+
+用法（在项目根目录执行）:
+    python -m benchmarks.bench_link_check [--rows 40] [--rate 20]
+"""
+import argparse
+import json
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+
+BAIDU_ALIVE_PAGE = '<script>locals.mset({"shareid":1001,"fs_id":3003,"server_filename":"demo.mp4"})</script>'
+BAIDU_DEAD_PAGE = "<div>啊哦，你来晚了，分享的文件已经被取消了，可以给分享者留言</div>"
+
+CASES = [
+    ("https://pan.quark.cn/s/alive001", "alive"),
+    ("https://pan.quark.cn/s/gone002?pwd=ab12", "dead"),
+    ("https://pan.quark.cn/s/busy003", "unknown"),
+    ("https://pan.quark.cn/s/broken004", "unknown"),
+    ("https://pan.baidu.com/s/1pwdAbc005?pwd=abcd", "alive"),
+    ("https://pan.baidu.com/s/1openDef006", "alive"),
+    ("https://pan.baidu.com/s/1errorGhi007", "dead"),
+    ("https://pan.baidu.com/s/1deadJkl008", "dead"),
+    ("magnet:?xt=urn:btih:0123456789abcdef", "unknown"),
+]
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def _send(self, status, body=b"", content_type="text/html", headers=None):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length") or 0)) or b"{}")
+        pwd_id = body.get("pwd_id", "")
+        if urlsplit(self.path).path != "/1/clouddrive/share/sharepage/token":
+            return self._send(404)
+        if pwd_id.startswith("busy"):
+            return self._send(429)
+        if pwd_id.startswith("broken"):
+            return self._send(502)
+        if pwd_id.startswith("alive"):
+            reply = {"status": 200, "code": 0, "data": {"stoken": "st"}}
+        else:
+            reply = {"status": 404, "code": 41006, "message": "分享已取消", "data": None}
+        self._send(200, json.dumps(reply).encode(), "application/json")
+
+    def do_GET(self):
+        surl = urlsplit(self.path).path.split("/s/1", 1)[-1]
+        if surl.startswith("pwd"):
+            return self._send(302, headers={"Location": f"/share/init?surl={surl}"})
+        if surl.startswith("error"):
+            return self._send(302, headers={"Location": "/error/404.html"})
+        page = BAIDU_DEAD_PAGE if surl.startswith("dead") else BAIDU_ALIVE_PAGE
+        self._send(200, page.encode())
+
+    def log_message(self, *args):
+        pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=40, help="端到端巡检的资源条数（按上面的用例循环生成）")
+    parser.add_argument("--rate", type=float, default=20, help="每个探测主机的限速（次/秒），0 为不限")
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    port = server.server_address[1]
+
+    # 探测地址与限速在导入时读取：夸克和百度指向同一个模拟服务的不同主机名，分别限速
+    os.environ["LINK_CHECK_QUARK_API"] = f"http://127.0.0.1:{port}"
+    os.environ["LINK_CHECK_BAIDU_BASE"] = f"http://localhost:{port}"
+    os.environ["LINK_CHECK_RATE_PER_HOST"] = str(args.rate)
+    from src.services import link_check_service
+
+    failures = 0
+    for share_url, expected in CASES:
+        result = link_check_service.check_link(share_url)
+        failures += result != expected
+        print(f"{'OK ' if result == expected else 'ERR'} {result:<8} (期望 {expected:<7}) {share_url}")
+
+    rows = [{"id": i + 1, "share_link": CASES[i % len(CASES)][0]} for i in range(args.rows)]
+    written = []
+    link_check_service.get_resources_to_check = lambda limit, recheck_hours: rows[:limit]
+    link_check_service.batch_update_link_status = lambda results: written.extend(results) or True
+
+    start = time.perf_counter()
+    summary = link_check_service.run_link_check(force=True, limit=len(rows))
+    elapsed = time.perf_counter() - start
+    expected_status = {"alive": True, "dead": False, "unknown": None}
+    mismatched = [
+        resource_id for resource_id, alive in written
+        if alive is not expected_status[CASES[(resource_id - 1) % len(CASES)][1]]
+    ]
+    failures += len(mismatched) + (len(written) != len(rows))
+    print(f"run_link_check: {summary}，写回 {len(written)} 条，不一致 {len(mismatched)} 条，"
+          f"耗时 {elapsed:.2f}s，{len(rows) / elapsed:.1f} 条/秒（每主机限速 {args.rate}/s）")
+
+    server.shutdown()
+    raise SystemExit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
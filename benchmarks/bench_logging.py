@@ -0,0 +1,82 @@
+"""
+日志开销基准：对比关闭日志、同步写文件、队列异步写文件三种模式下单次搜索的 p50 / p99 耗时。
+
+每次"搜索"对若干个 API 配置并发执行 process_config；上游请求替换为固定耗时的桩函数，
+因此差值主要来自日志格式化、文件写入与轮转、handler 锁竞争。
+
+用法（在项目根目录执行）:
+    python -m benchmarks.bench_logging [--searches 300] [--apis 10] [--concurrency 8]
+"""
+import argparse
+import concurrent.futures
+import logging
+import os
+import sys
+import tempfile
+import time
+
+from configs.logging_setup import setup_logging
+from src.services import search_service
+
+FAKE_ITEMS = [[f"凡人修仙传 第{i}集 4K 高清", f"https://pan.quark.cn/s/{i:012x}"] for i in range(30)]
+
+
+def fake_fetch_and_extract(url, method, request_data, jmespath_query, timeout=10, max_bytes=None, max_items=None):
+    time.sleep(0.002)
+    return FAKE_ITEMS
+
+
+def one_search(configs):
+    start = time.perf_counter()
+    for config in configs:
+        search_service.process_config(config, "凡人修仙传")
+    return time.perf_counter() - start
+
+
+def percentile(values, pct):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+
+def run_mode(name, args, configs):
+    durations = []
+    with concurrent.futures.ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+        for duration in executor.map(lambda _: one_search(configs), range(args.searches)):
+            durations.append(duration * 1000)
+    print(f"{name:<20} p50 {percentile(durations, 50):>8.2f} ms   p99 {percentile(durations, 99):>8.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--searches", type=int, default=300, help="搜索次数")
+    parser.add_argument("--apis", type=int, default=10, help="每次搜索的 API 数量")
+    parser.add_argument("--concurrency", type=int, default=8, help="并发搜索数")
+    args = parser.parse_args()
+
+    search_service.fetch_and_extract = fake_fetch_and_extract
+    configs = [
+        {"name": f"api-{i}", "url": f"http://upstream-{i}.local/search", "method": "GET", "request": {}, "response": "data[*]"}
+        for i in range(args.apis)
+    ]
+
+    # 控制台输出会淹没结果，基准期间把 StreamHandler 指向空设备
+    real_stderr = sys.stderr
+    sys.stderr = open(os.devnull, "w")
+    with tempfile.TemporaryDirectory() as tmp:
+        log_file = os.path.join(tmp, "bench.log")
+        modes = [
+            ("日志关闭", dict(level=logging.CRITICAL, queued=False)),
+            ("同步写文件", dict(level=logging.INFO, queued=False)),
+            ("队列异步写文件", dict(level=logging.INFO, queued=True)),
+            ("队列 + 10% 采样", dict(level=logging.INFO, queued=True, sample_rate=0.1)),
+        ]
+        for name, options in modes:
+            setup_logging(log_file, **options)
+            run_mode(name, args, configs)
+        setup_logging(log_file, level=logging.CRITICAL, queued=False)
+    sys.stderr.close()
+    sys.stderr = real_stderr
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+"""
+网盘转存吞吐基准：对比"每次操作新建客户端"（旧实现）、ClientRegistry 复用客户端、以及 store_many 批量转存的每分钟转存次数。
+
+本地起一个模拟夸克 / 百度接口的 HTTP 服务，每个新连接额外等待 --handshake-ms 以模拟 TLS 握手，
+每个请求等待 --latency-ms 以模拟接口耗时；客户端的 https 请求经适配器改写到该服务。
+旧实现：夸克每个请求都是新连接（模块级 requests 调用），百度每次操作新建 Session 并重新获取 bdstoken。
+
+用法（在项目根目录执行）:
+    python -m benchmarks.bench_netdisk_clients [--transfers 30] [--handshake-ms 40] [--latency-ms 15]
+"""
+import argparse
+import json
+import os
+import socket
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+
+from requests.adapters import HTTPAdapter
+
+# 只比较客户端复用的效果，关闭转存写操作的限速
+os.environ.setdefault("NETDISK_BATCH_RATE_PER_SEC", "0")
+
+
+from src.clients.baidu_client import Baidu
+from src.clients.client_registry import ClientRegistry
+from src.clients.quark_client import Quark
+
+COOKIE = "x" * 400
+
+BAIDU_SHARE_PAGE = '"shareid":1001,"share_uk":"2002","fs_id":3003,"server_filename":"demo.mp4",'
+
+RESPONSES = {
+    "/1/clouddrive/share/sharepage/token": {"data": {"stoken": "st"}},
+    "/1/clouddrive/share/sharepage/detail": {"data": {"list": [
+        {"file_name": "demo.mp4", "file_type": 1, "fid": "f0", "pdir_fid": "0", "share_fid_token": "ft"}]}},
+    "/1/clouddrive/share/sharepage/save": {"data": {"task_id": "save"}},
+    "/1/clouddrive/task": {"data": {"status": 2, "save_as": {"save_as_top_fids": ["f1"]}, "share_id": "sid"}},
+    "/1/clouddrive/share": {"data": {"task_id": "share"}},
+    "/1/clouddrive/share/password": {"data": {"share_url": "https://pan.quark.cn/s/new"}},
+    "/api/gettemplatevariable": {"errno": 0, "result": {"bdstoken": "tok"}},
+    "/share/verify": {"errno": 0},
+    "/share/transfer": {"errno": 0},
+    "/api/list": {"errno": 0, "list": [{"server_filename": "demo.mp4", "fs_id": 4004}]},
+    "/share/set": {"errno": 0, "shorturl": "https://pan.baidu.com/s/1new"},
+}
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    handshake_seconds = 0.0
+    latency_seconds = 0.0
+    connections = 0
+
+    def setup(self):
+        super().setup()
+        # 响应头与响应体分两次写出，关闭 Nagle 以免与客户端的延迟确认叠加出额外 40ms
+        self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        type(self).connections += 1
+        time.sleep(self.handshake_seconds)
+
+    def _reply(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        if length:
+            self.rfile.read(length)
+        time.sleep(self.latency_seconds)
+        path = urlsplit(self.path).path
+        if path.startswith("/s/1"):
+            body, content_type = BAIDU_SHARE_PAGE.encode(), "text/html"
+        else:
+            body, content_type = json.dumps(RESPONSES.get(path, {})).encode(), "application/json"
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    do_GET = do_POST = _reply
+
+    def log_message(self, *args):
+        pass
+
+
+class LocalAdapter(HTTPAdapter):
+    """把请求改写到本地模拟服务（保留路径与查询串）"""
+
+    def __init__(self, base_url, **kwargs):
+        self.base_url = base_url
+        super().__init__(**kwargs)
+
+    def send(self, request, **kwargs):
+        parts = urlsplit(request.url)
+        request.url = self.base_url + parts.path + ("?" + parts.query if parts.query else "")
+        return super().send(request, **kwargs)
+
+
+def redirect(client, base_url, close_each_request=False):
+    adapter = LocalAdapter(base_url, pool_maxsize=10)
+    client.session.mount("https://", adapter)
+    client.session.mount("http://", adapter)
+    if close_each_request:
+        client.session.headers["Connection"] = "close"
+    return client
+
+
+def run(label, make_client, share_url, transfers):
+    StubHandler.connections = 0
+    start = time.perf_counter()
+    ok = 0
+    for _ in range(transfers):
+        client = make_client()
+        file_id, _, new_link = client.store(share_url)
+        ok += bool(file_id and new_link)
+    elapsed = time.perf_counter() - start
+    print(f"{label:<24} {transfers / elapsed * 60:>8.0f} 次/分钟  "
+          f"{elapsed / transfers * 1000:>7.1f} ms/次  新连接 {StubHandler.connections:>4}  成功 {ok}/{transfers}")
+
+
+def run_batch(label, client, share_urls):
+    StubHandler.connections = 0
+    start = time.perf_counter()
+    results = client.store_many(share_urls)
+    elapsed = time.perf_counter() - start
+    ok = sum(bool(file_id and link) for file_id, _, link in results.values())
+    transfers = len(share_urls)
+    print(f"{label:<24} {transfers / elapsed * 60:>8.0f} 次/分钟  "
+          f"{elapsed / transfers * 1000:>7.1f} ms/次  新连接 {StubHandler.connections:>4}  成功 {ok}/{transfers}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--transfers", type=int, default=30, help="每种模式的转存次数")
+    parser.add_argument("--handshake-ms", type=float, default=40, help="模拟每个新连接的握手耗时")
+    parser.add_argument("--latency-ms", type=float, default=15, help="模拟每个接口请求的耗时")
+    args = parser.parse_args()
+
+    StubHandler.handshake_seconds = args.handshake_ms / 1000
+    StubHandler.latency_seconds = args.latency_ms / 1000
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+
+    print(f"模拟握手 {args.handshake_ms}ms，接口耗时 {args.latency_ms}ms，每种模式 {args.transfers} 次转存")
+    registry = ClientRegistry()
+    cases = [
+        ("夸克网盘", Quark, "https://pan.quark.cn/s/abcdef{:06d}", True),
+        ("百度网盘", Baidu, "https://pan.baidu.com/s/1abc{:06d}?pwd=ab12", False),
+    ]
+    for name, client_class, url_pattern, closes in cases:
+        share_url = url_pattern.format(0)
+        run(f"{name} 旧: 每次新建", lambda: redirect(client_class(COOKIE), base_url, closes), share_url, args.transfers)
+        warm = redirect(registry.get(client_class, COOKIE), base_url)
+        run(f"{name} 新: 复用实例", lambda: registry.get(client_class, COOKIE), share_url, args.transfers)
+        assert registry.get(client_class, COOKIE) is warm
+        run_batch(f"{name} 新: 批量转存", warm, [url_pattern.format(i) for i in range(args.transfers)])
+
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
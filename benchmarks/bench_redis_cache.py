@@ -0,0 +1,220 @@
+"""
+RedisCache 协议校验与吞吐基准：本地起一个只实现 AUTH / SELECT / GET / SET [NX] [PX|EX] / DEL 的 RESP 桩服务，
+不依赖真实 Redis 即可验证最小客户端的行为：
+    - 读写删、SET NX 租约（已持有 / 过期后可重新获取）
+    - 密码与库号（redis://:密码@host:port/库号）
+    - 服务端断开连接后自动重连
+    - 服务不可用时 get 返回 None、add 返回 None（调用方据此放行）
+    - 搜索结果经二进制编码写入再读出保持不变（含 netdisk_name 为 None 的结果）
+最后用多个线程压测 GET / SET 的吞吐。任何一项不符时以非零状态退出。
+
+用法（在项目根目录执行）:
+    python -m benchmarks.bench_redis_cache [--ops 20000] [--threads 8] [--latency-ms 0]
+"""
+import argparse
+import socketserver
+import sys
+import threading
+import time
+
+from src.services.search_cache import decode_results, encode_results
+from src.services.search_result import SearchResult
+from utils.cache_utils import RedisCache
+
+PASSWORD = "secret"
+
+
+class RespStore:
+    """桩服务的数据：每个库一个 dict，值为 (数据, 过期时间)"""
+
+    def __init__(self) -> None:
+        self.dbs = {}
+        self.lock = threading.Lock()
+
+    def get(self, db, key):
+        entry = self.dbs.setdefault(db, {}).get(key)
+        if entry is None or (entry[1] is not None and entry[1] <= time.monotonic()):
+            return None
+        return entry[0]
+
+
+class RespHandler(socketserver.StreamRequestHandler):
+    store: RespStore = None
+    latency_seconds = 0.0
+
+    def _read_command(self):
+        line = self.rfile.readline()
+        if not line:
+            return None
+        if not line.startswith(b"*"):
+            raise ValueError(f"不支持的请求: {line!r}")
+        args = []
+        for _ in range(int(line[1:-2])):
+            length = int(self.rfile.readline()[1:-2])
+            args.append(self.rfile.read(length + 2)[:-2])
+        return args
+
+    def handle(self):
+        db, authed = 0, False
+        while True:
+            args = self._read_command()
+            if args is None:
+                return
+            if self.latency_seconds:
+                time.sleep(self.latency_seconds)
+            name = args[0].upper()
+            store = self.store
+            with store.lock:
+                if name == b"AUTH":
+                    authed = args[1].decode() == PASSWORD
+                    reply = b"+OK\r\n" if authed else b"-WRONGPASS invalid password\r\n"
+                elif not authed:
+                    reply = b"-NOAUTH Authentication required.\r\n"
+                elif name == b"SELECT":
+                    db = int(args[1])
+                    reply = b"+OK\r\n"
+                elif name == b"GET":
+                    value = store.get(db, args[1])
+                    reply = b"$-1\r\n" if value is None else b"$%d\r\n%s\r\n" % (len(value), value)
+                elif name == b"SET":
+                    key, value, options = args[1], args[2], [a.upper() for a in args[3:]]
+                    expires = None
+                    if b"PX" in options:
+                        expires = time.monotonic() + int(options[options.index(b"PX") + 1]) / 1000
+                    elif b"EX" in options:
+                        expires = time.monotonic() + int(options[options.index(b"EX") + 1])
+                    if b"NX" in options and store.get(db, key) is not None:
+                        reply = b"$-1\r\n"
+                    else:
+                        store.dbs.setdefault(db, {})[key] = (value, expires)
+                        reply = b"+OK\r\n"
+                elif name == b"DEL":
+                    removed = store.dbs.setdefault(db, {}).pop(args[1], None) is not None
+                    reply = b":%d\r\n" % removed
+                else:
+                    reply = b"-ERR unknown command '%s'\r\n" % name
+            self.wfile.write(reply)
+
+
+class RespServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, address):
+        super().__init__(address, RespHandler)
+        self.clients = set()
+
+    def process_request(self, request, client_address):
+        self.clients.add(request)
+        super().process_request(request, client_address)
+
+    def drop_clients(self) -> None:
+        """模拟服务端重启 / 空闲超时：断开所有已建立的连接"""
+        for sock in list(self.clients):
+            try:
+                sock.shutdown(2)
+            except OSError:
+                pass
+        self.clients.clear()
+
+
+def check(failures, label, actual, expected):
+    ok = actual == expected
+    if not ok:
+        failures.append(label)
+    shown = repr(actual)
+    shown = shown if len(shown) <= 80 else shown[:77] + "..."
+    print(f"{'OK  ' if ok else 'FAIL'} {label}: {shown}" + ("" if ok else f"（期望 {expected!r}）"))
+
+
+def run_checks(server, url, failures):
+    cache = RedisCache(url)
+    check(failures, "GET 不存在的键", cache.get("missing"), None)
+    cache.set("k", b"v" * 300, 60)
+    check(failures, "SET 后 GET", cache.get("k"), b"v" * 300)
+    cache.delete("k")
+    check(failures, "DEL 后 GET", cache.get("k"), None)
+
+    check(failures, "add 空闲租约", cache.add("lease", b"1", 60), True)
+    check(failures, "add 已持有的租约", cache.add("lease", b"1", 60), False)
+    cache.delete("lease")
+    check(failures, "释放后重新 add", cache.add("lease", b"1", 0.05), True)
+    time.sleep(0.1)
+    check(failures, "租约过期后 add", cache.add("lease", b"1", 60), True)
+
+    other_db = RedisCache(url.rsplit("/", 1)[0] + "/3")
+    check(failures, "不同库号互不可见", other_db.get("lease"), None)
+    check(failures, "错误密码时 get 返回 None", RedisCache(url.replace(PASSWORD, "wrong")).get("lease"), None)
+
+    results = [
+        SearchResult("hot", "凡人修仙传 第1集", "https://pan.quark.cn/s/abc", "夸克网盘"),
+        SearchResult("other", "庆余年 全集", "https://pan.baidu.com/s/1xyz?pwd=ab12", "百度网盘"),
+        SearchResult("other", "未识别网盘的资源", "magnet:?xt=urn:btih:0123", None),
+        SearchResult("other", "", "https://www.alipan.com/s/q1", ""),
+    ]
+    cache.set("search", encode_results(results * 20), 60)
+    decoded, _ = decode_results(cache.get("search"))
+    check(failures, "搜索结果往返（含 None 与空串）", decoded, results * 20)
+
+    server.drop_clients()
+    time.sleep(0.05)
+    check(failures, "服务端断开后自动重连", cache.get("search") is not None, True)
+    return cache
+
+
+def run_throughput(cache, ops, threads):
+    payload = b"x" * 2048
+    per_thread = max(1, ops // threads)
+
+    def worker(index):
+        for i in range(per_thread):
+            key = f"bench:{index}:{i % 64}"
+            if i % 4 == 0:
+                cache.set(key, payload, 60)
+            else:
+                cache.get(key)
+
+    workers = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+    start = time.perf_counter()
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    total = per_thread * threads
+    print(f"吞吐: {threads} 线程 {total} 次操作（25% SET / 75% GET，值 2KB），"
+          f"{total / elapsed:,.0f} 次/秒，平均 {elapsed / per_thread * 1e6:.0f} µs/次")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--ops", type=int, default=20000, help="吞吐测试的总操作数")
+    parser.add_argument("--threads", type=int, default=8, help="吞吐测试的线程数（每个线程一条连接）")
+    parser.add_argument("--latency-ms", type=float, default=0, help="模拟每条命令的服务端耗时")
+    args = parser.parse_args()
+
+    RespHandler.store = RespStore()
+    server = RespServer(("127.0.0.1", 0))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    port = server.server_address[1]
+    url = f"redis://:{PASSWORD}@127.0.0.1:{port}/2"
+
+    failures = []
+    cache = run_checks(server, url, failures)
+    RespHandler.latency_seconds = args.latency_ms / 1000
+    run_throughput(cache, args.ops, args.threads)
+
+    server.shutdown()
+    server.server_close()
+    server.drop_clients()
+    time.sleep(0.05)
+    check(failures, "服务不可用时 get", cache.get("search"), None)
+    check(failures, "服务不可用时 add（放行）", cache.add("lease2", b"1", 60), None)
+
+    if failures:
+        print(f"{len(failures)} 项不符: {failures}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
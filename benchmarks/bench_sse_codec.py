@@ -0,0 +1,62 @@
+"""
+SSE 事件序列化基准：对比每个事件的字节数与 CPU 耗时。
+
+用法（在项目根目录执行）:
+    python -m benchmarks.bench_sse_codec [--events 2000] [--results 20]
+"""
+import argparse
+import json
+import random
+import time
+
+from src.services.search_result import SearchResult
+from utils import json_utils
+
+SAMPLE_TITLES = ["凡人修仙传 第{}集 4K 高清", "庆余年 第二季 全{}集", "短剧合集 霸道总裁 {} 部", "Python 编程入门 第{}版"]
+SAMPLE_LINKS = [
+    ("https://pan.quark.cn/s/{:012x}", "夸克网盘"),
+    ("https://pan.baidu.com/s/1{:022x}?pwd=ab12", "百度网盘"),
+    ("https://www.alipan.com/s/{:011x}", "阿里云盘"),
+]
+
+
+def build_results(count):
+    rows = []
+    for i in range(count):
+        link, netdisk = random.choice(SAMPLE_LINKS)
+        title = random.choice(SAMPLE_TITLES).format(i + 1)
+        rows.append(SearchResult("other", title, link.format(random.getrandbits(48)), netdisk))
+    return rows
+
+
+def measure(name, encode, events):
+    total_bytes = 0
+    start = time.process_time()
+    for event in events:
+        total_bytes += len(encode(event))
+    cpu = time.process_time() - start
+    n = len(events)
+    print(f"{name:<28} {total_bytes / n:>10.1f} B/event {cpu / n * 1e6:>10.2f} µs/event")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--events", type=int, default=2000, help="事件数量")
+    parser.add_argument("--results", type=int, default=20, help="每个事件包含的结果条数")
+    args = parser.parse_args()
+
+    records = [{"type": "update", "results": build_results(args.results)} for _ in range(args.events)]
+    legacy = [{"type": "update", "results": [list(r) for r in e["results"]]} for e in records]
+
+    print(f"JSON 后端: {json_utils.get_backend()}，事件数: {args.events}，每事件结果数: {args.results}")
+    measure("旧实现 list + json.dumps", lambda e: json.dumps(e).encode("utf-8"), legacy)
+    measure(
+        "标准库紧凑输出",
+        lambda e: json.dumps(e, ensure_ascii=False, separators=(",", ":")).encode("utf-8"),
+        records,
+    )
+    measure("SearchResult + json_utils", json_utils.dumps_bytes, records)
+
+
+if __name__ == "__main__":
+    main()
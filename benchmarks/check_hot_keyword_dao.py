@@ -0,0 +1,88 @@
+"""
+热门关键词写库校验：不连数据库，用 mysql-connector 的真实游标（连接替换为记录语句的桩）执行 add_keyword_hits，
+确认 executemany 的多行 INSERT 改写能成功，且每个关键词及其次数都出现在最终发给服务端的语句里。
+随后经 HotKeywordTracker 的 record / maybe_flush 走一遍完整的写回路径。任何一项不符时以非零状态退出。
+
+用法（在项目根目录执行）:
+    python -m benchmarks.check_hot_keyword_dao
+"""
+import sys
+from contextlib import contextmanager
+
+from mysql.connector.connection import MySQLConnection
+from mysql.connector.conversion import MySQLConverter
+from mysql.connector.cursor import MySQLCursor
+
+from src.db import hot_keyword_dao
+from src.services.hot_keywords import HotKeywordTracker
+
+
+class StubConnection(MySQLConnection):
+    """
+    不连服务端的连接：游标的参数转义、executemany 多行改写都走 mysql-connector 的真实实现，
+    最终发给服务端的语句记录在 statements 中。
+    """
+
+    def __init__(self) -> None:
+        super().__init__()
+        self._sql_mode = "STRICT_TRANS_TABLES"
+        self.converter = MySQLConverter("utf8mb4", True)
+        self.statements = []
+
+    def cmd_query(self, query, *args, **kwargs):
+        self.statements.append(query.decode("utf-8") if isinstance(query, bytes) else query)
+        return {"affected_rows": 1, "insert_id": 0, "warning_count": 0, "server_status": 0,
+                "field_count": 0, "info_msg": ""}
+
+
+def stub_db_cursor(connections):
+    @contextmanager
+    def db_cursor(dictionary=False):
+        connection = StubConnection()
+        connections.append(connection)
+        yield MySQLCursor(connection)   # connection.cursor() 要求已连接
+
+    return db_cursor
+
+
+def check(failures, label, ok, detail=""):
+    if not ok:
+        failures.append(label)
+    print(f"{'OK  ' if ok else 'FAIL'} {label}" + (f": {detail}" if detail else ""))
+
+
+def main():
+    failures = []
+    connections = []
+    hot_keyword_dao.db_cursor = stub_db_cursor(connections)
+
+    rows = [("凡人修仙传", 12.0), ("庆余年 第二季", 3.5), ("it's \"quoted\"", 1.0)]
+    stored = hot_keyword_dao.add_keyword_hits(rows, 86400)
+    check(failures, "add_keyword_hits 返回 True", stored is True, repr(stored))
+    statements = [s for connection in connections for s in connection.statements]
+    check(failures, "改写为一条多行 INSERT", len(statements) == 1, f"{len(statements)} 条语句")
+    statement = statements[0] if statements else ""
+    check(failures, "语句中没有残留的 %s 占位符", "%s" not in statement)
+    check(failures, "半衰期以字面量写入 ON DUPLICATE KEY UPDATE", "/ 86400.0)" in statement)
+    for keyword, hits in rows:
+        escaped = keyword.replace("'", "\\'").replace('"', '\\"')
+        check(failures, f"包含关键词 {keyword!r} 及次数 {hits}", f"('{escaped}', {hits}, NOW())" in statement)
+
+    check(failures, "半衰期为 0 时拒绝写入", hot_keyword_dao.add_keyword_hits(rows, 0) is False)
+
+    connections.clear()
+    tracker = HotKeywordTracker(capacity=8, flush_seconds=0)
+    for keyword in ["斗罗大陆"] * 5 + ["雪中悍刀行"] * 2:
+        tracker.record(keyword)
+    tracker.maybe_flush(force=True)
+    statement = "".join(s for connection in connections for s in connection.statements)
+    check(failures, "Tracker 写回包含全部关键词",
+          "('斗罗大陆', 5, NOW())" in statement and "('雪中悍刀行', 2, NOW())" in statement, statement[:120])
+
+    if failures:
+        print(f"{len(failures)} 项不符: {failures}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
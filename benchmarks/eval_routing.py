@@ -0,0 +1,130 @@
+"""
+上游路由离线评估：按时间顺序回放"全量请求"的搜索记录，模拟 KeywordRouter 的分批请求，
+统计每次搜索的上游请求数与召回率（路由后仍能拿到的结果占全量结果的比例）。
+
+数据来源（二选一）:
+  1. 线上记录：设置 ROUTING_LOG_FILE 后每次搜索都会追加一行，评估只使用 full=true 的记录
+  2. 主动采集：对关键词列表逐个请求全部启用的上游
+       python -m benchmarks.eval_routing --collect keywords.txt --out logs/routing_eval.jsonl
+
+用法（在项目根目录执行）:
+    python -m benchmarks.eval_routing --data logs/routing_eval.jsonl [--warmup 50]
+"""
+import argparse
+import concurrent.futures
+import json
+
+from configs.app_config import ROUTING_MIN_RESULTS
+from src.services.keyword_router import KeywordRouter, MemoryRouteStore, keyword_features
+
+
+def load_records(path):
+    records = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                record = json.loads(line)
+                if record.get("full"):
+                    record["outcomes"] = {int(k): v for k, v in record["outcomes"].items()}
+                    records.append(record)
+    return records
+
+
+def evaluate(records, warmup, min_results, explore_rate):
+    router = KeywordRouter(MemoryRouteStore(), explore_rate=explore_rate)
+    stats = {"searches": 0, "full_calls": 0, "routed_calls": 0, "full_results": 0, "routed_results": 0,
+             "searches_with_results": 0, "searches_hit": 0, "second_wave": 0}
+
+    for index, record in enumerate(records):
+        outcomes = record["outcomes"]
+        configs = [{"id": api_id} for api_id in outcomes]
+        features = keyword_features(record["keyword"], record.get("types", ()))
+        first, rest = router.route(configs, features)
+
+        called = [c["id"] for c in first]
+        found = record.get("db_count", 0) + sum(outcomes[i] for i in called)
+        if rest and found < min_results:
+            called += [c["id"] for c in rest]
+            second = True
+        else:
+            second = False
+
+        # 与线上一致：只有实际请求过的上游会得到反馈
+        router.record(features, {api_id: outcomes[api_id] for api_id in called})
+
+        if index < warmup:
+            continue
+        total = sum(outcomes.values())
+        routed = sum(outcomes[i] for i in called)
+        stats["searches"] += 1
+        stats["full_calls"] += len(outcomes)
+        stats["routed_calls"] += len(called)
+        stats["full_results"] += total
+        stats["routed_results"] += routed
+        stats["second_wave"] += second
+        if total > 0:
+            stats["searches_with_results"] += 1
+            stats["searches_hit"] += routed > 0
+    return stats
+
+
+def collect(keyword_file, out_path, concurrency):
+    """对每个关键词请求全部启用的上游，写出与 ROUTING_LOG_FILE 相同格式的记录"""
+    from src.services.search_service import (
+        process_config, read_all_api_configs_from_db, replace_keyword_in_config, search_in_database,
+    )
+
+    configs = [c for c in read_all_api_configs_from_db() if c.get("status") and c.get("is_enabled")]
+    with open(keyword_file, encoding="utf-8") as f:
+        keywords = [line.strip() for line in f if line.strip()]
+
+    with open(out_path, "a", encoding="utf-8") as out, \
+            concurrent.futures.ThreadPoolExecutor(max_workers=concurrency) as executor:
+        for keyword in keywords:
+            db_results, db_types = search_in_database(keyword, with_types=True)
+            search_configs = replace_keyword_in_config(configs, "[[keyword]]", keyword)
+            futures = {executor.submit(process_config, c, keyword): c["id"] for c in search_configs}
+            outcomes = {futures[f]: len(f.result() or ()) for f in concurrent.futures.as_completed(futures)}
+            record = {"keyword": keyword, "types": sorted(db_types), "db_count": len(db_results),
+                      "outcomes": {str(k): v for k, v in outcomes.items()}, "full": True}
+            out.write(json.dumps(record, ensure_ascii=False) + "\n")
+            print(f"{keyword}: {sum(outcomes.values())} 条，{sum(1 for v in outcomes.values() if v)} 个上游有结果")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--data", help="评估数据 (JSONL)")
+    parser.add_argument("--warmup", type=int, default=0, help="前 N 条只用于学习，不计入统计")
+    parser.add_argument("--min-results", type=int, default=ROUTING_MIN_RESULTS, help="首批结果少于该值时请求其余上游")
+    parser.add_argument("--explore-rate", type=float, default=0.0, help="评估时的探索概率（默认 0，结果可复现）")
+    parser.add_argument("--collect", help="关键词列表文件，每行一个；指定后采集数据而不是评估")
+    parser.add_argument("--out", default="logs/routing_eval.jsonl", help="采集输出文件")
+    parser.add_argument("--concurrency", type=int, default=8, help="采集时的并发数")
+    args = parser.parse_args()
+
+    if args.collect:
+        collect(args.collect, args.out, args.concurrency)
+        return
+    if not args.data:
+        parser.error("请指定 --data 或 --collect")
+
+    records = load_records(args.data)
+    stats = evaluate(records, args.warmup, args.min_results, args.explore_rate)
+    n = stats["searches"]
+    if n == 0:
+        print("没有可评估的记录（需要 full=true 的记录，且数量大于 --warmup）")
+        return
+
+    print(f"评估搜索数: {n}（全量记录 {len(records)} 条，预热 {args.warmup} 条）")
+    print(f"平均上游请求数: 全量 {stats['full_calls'] / n:.2f} → 路由 {stats['routed_calls'] / n:.2f} "
+          f"(减少 {(1 - stats['routed_calls'] / max(stats['full_calls'], 1)) * 100:.1f}%)")
+    print(f"结果召回率: {stats['routed_results'] / max(stats['full_results'], 1) * 100:.1f}% "
+          f"({stats['routed_results']}/{stats['full_results']})")
+    print(f"有结果搜索的命中率: {stats['searches_hit'] / max(stats['searches_with_results'], 1) * 100:.1f}% "
+          f"({stats['searches_hit']}/{stats['searches_with_results']})")
+    print(f"触发第二批请求: {stats['second_wave'] / n * 100:.1f}%")
+
+
+if __name__ == "__main__":
+    main()
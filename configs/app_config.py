@@ -24,6 +24,189 @@ ADMIN_PASSWORD = os.getenv('ADMIN_PASSWORD')
 # JWT密钥
 SECRET_KEY = os.getenv('SECRET_KEY')
 
+# JSON 编解码后端：auto（优先 orjson）、orjson、json
+JSON_CODEC = os.getenv('JSON_CODEC', 'auto').lower()
+
+# 上游搜索 API 响应读取限制（单个 API 可在 api_config 中单独覆盖）
+UPSTREAM_STREAM_FETCH = os.getenv('UPSTREAM_STREAM_FETCH', 'true').lower() == 'true'  # 流式解析 data[*] 类规则
+UPSTREAM_MAX_BODY_KB = int(os.getenv('UPSTREAM_MAX_BODY_KB', 2048))                 # 解压后响应体上限 (KB)
+UPSTREAM_MAX_ITEMS = int(os.getenv('UPSTREAM_MAX_ITEMS', 500))                      # 单个 API 最多提取条数
+UPSTREAM_MAX_DECOMPRESS_RATIO = int(os.getenv('UPSTREAM_MAX_DECOMPRESS_RATIO', 100))  # 解压比上限
+
+# 请求耗时埋点（Server-Timing 响应头 / SSE end 事件中的耗时明细）
+TIMING_ENABLED = os.getenv('TIMING_ENABLED', 'true').lower() == 'true'
+
+# /metrics 访问令牌，为空则不校验（建议仅在内网暴露）
+METRICS_TOKEN = os.getenv('METRICS_TOKEN', '')
+
+# 搜索链路追踪：头部采样按比例保留，尾部采样保留耗时超过阈值的请求，导出为 JSONL
+TRACE_ENABLED = os.getenv('TRACE_ENABLED', 'true').lower() == 'true'
+TRACE_SAMPLE_RATE = float(os.getenv('TRACE_SAMPLE_RATE', 0.0))      # 头部采样比例 0~1
+TRACE_SLOW_SECONDS = float(os.getenv('TRACE_SLOW_SECONDS', 3.0))    # 尾部采样：总耗时超过该值必定导出
+TRACE_EXPORT_FILE = os.getenv('TRACE_EXPORT_FILE', os.path.join(current_dir, '..', 'logs', 'traces.jsonl'))
+TRACE_EXPORT_MAX_MB = int(os.getenv('TRACE_EXPORT_MAX_MB', 50))     # 超过后轮转为 traces.jsonl.1
+
+# 日志：异步队列写入（后台线程落盘），以及按 API 的 INFO 日志采样/限流
+LOG_QUEUE_ENABLED = os.getenv('LOG_QUEUE_ENABLED', 'true').lower() == 'true'
+LOG_SAMPLE_RATE = float(os.getenv('LOG_SAMPLE_RATE', 1.0))          # 每个 API 结果日志的保留概率 0~1
+LOG_MAX_PER_MINUTE = int(os.getenv('LOG_MAX_PER_MINUTE', 0))        # 每个 API 每分钟最多输出条数，0 为不限
+
+# 一键测试所有 API：并发数和单个请求超时（秒）
+API_TEST_CONCURRENCY = int(os.getenv('API_TEST_CONCURRENCY', 10))
+API_TEST_TIMEOUT = float(os.getenv('API_TEST_TIMEOUT', 5))
+
+# 后台健康检查：定时用探测关键词请求每个 API，EWMA 平滑耗时与成功率，连续失败自动禁用、恢复后自动启用
+HEALTH_CHECK_ENABLED = os.getenv('HEALTH_CHECK_ENABLED', 'true').lower() == 'true'
+HEALTH_CHECK_INTERVAL = int(os.getenv('HEALTH_CHECK_INTERVAL', 300))        # 检查间隔（秒）
+HEALTH_CHECK_JITTER = int(os.getenv('HEALTH_CHECK_JITTER', 60))             # 间隔随机抖动（秒）
+HEALTH_CHECK_KEYWORD = os.getenv('HEALTH_CHECK_KEYWORD', '凡人修仙传')       # 探测关键词
+HEALTH_CHECK_CONCURRENCY = int(os.getenv('HEALTH_CHECK_CONCURRENCY', 5))
+HEALTH_EWMA_ALPHA = float(os.getenv('HEALTH_EWMA_ALPHA', 0.3))              # EWMA 平滑系数，越大越偏向最新一次
+HEALTH_DISABLE_AFTER_FAILURES = int(os.getenv('HEALTH_DISABLE_AFTER_FAILURES', 3))
+HEALTH_ENABLE_AFTER_SUCCESSES = int(os.getenv('HEALTH_ENABLE_AFTER_SUCCESSES', 2))
+HEALTH_LOCK_FILE = os.getenv('HEALTH_LOCK_FILE', os.path.join(current_dir, '..', 'logs', 'health_scheduler.lock'))
+
+# 上游评分：按实际搜索流量统计保留条数、错误率、耗时、去重后独有链接占比，决定提交顺序与是否跳过
+SEARCH_MAX_WORKERS = int(os.getenv('SEARCH_MAX_WORKERS', 5))                    # 单次搜索并发请求的上游数量
+UPSTREAM_SCORE_ALPHA = float(os.getenv('UPSTREAM_SCORE_ALPHA', 0.2))            # 评分统计的 EWMA 平滑系数
+UPSTREAM_SCORE_FLUSH_SECONDS = int(os.getenv('UPSTREAM_SCORE_FLUSH_SECONDS', 60))  # 评分写回数据库的最小间隔
+UPSTREAM_SKIP_BELOW_SCORE = float(os.getenv('UPSTREAM_SKIP_BELOW_SCORE', 0))    # 低于该评分的上游跳过，0 为不跳过
+UPSTREAM_SKIP_MIN_SAMPLES = int(os.getenv('UPSTREAM_SKIP_MIN_SAMPLES', 20))     # 样本数达到后才允许跳过
+UPSTREAM_SKIP_EXPLORE_RATE = float(os.getenv('UPSTREAM_SKIP_EXPLORE_RATE', 0.1))  # 被跳过的上游仍以该概率请求，以便恢复
+UPSTREAM_LOW_SCORE_RATIO = float(os.getenv('UPSTREAM_LOW_SCORE_RATIO', 0.25))     # 评分低于已知评分中位数的该倍数视为低分上游，0 为不区分
+UPSTREAM_LOW_SCORE_SLOTS = int(os.getenv('UPSTREAM_LOW_SCORE_SLOTS', 1))          # 单次搜索中低分上游最多同时占用的并发槽位
+
+# 按关键词路由上游：根据历史命中先请求可能有结果的上游，首批结果不足时再请求其余上游
+ROUTING_ENABLED = os.getenv('ROUTING_ENABLED', 'true').lower() == 'true'
+ROUTING_MIN_HIT_PROB = float(os.getenv('ROUTING_MIN_HIT_PROB', 0.2))     # 预测命中率不低于该值的上游进入首批
+ROUTING_MIN_FIRST_WAVE = int(os.getenv('ROUTING_MIN_FIRST_WAVE', 3))     # 首批至少请求的上游数
+ROUTING_MIN_RESULTS = int(os.getenv('ROUTING_MIN_RESULTS', 5))           # 首批结果少于该值时请求其余上游
+ROUTING_MIN_EVIDENCE = float(os.getenv('ROUTING_MIN_EVIDENCE', 3))       # 样本不足的上游视为未知，总是进入首批
+ROUTING_EXPLORE_RATE = float(os.getenv('ROUTING_EXPLORE_RATE', 0.05))    # 其余上游随机进入首批的概率，保证持续学习
+ROUTING_FLUSH_SECONDS = int(os.getenv('ROUTING_FLUSH_SECONDS', 30))      # 路由统计增量写回数据库的最小间隔
+ROUTING_LOG_FILE = os.getenv('ROUTING_LOG_FILE', '')                     # 记录每次搜索各上游结果数的 JSONL，供离线评估
+
+# 上游请求限流（令牌桶）：local 为进程内共享；sqlite 通过本地 SQLite 文件让所有 gunicorn worker 共享同一额度
+RATE_LIMIT_BACKEND = os.getenv('RATE_LIMIT_BACKEND', 'local').lower()
+RATE_LIMIT_SQLITE_PATH = os.getenv('RATE_LIMIT_SQLITE_PATH', os.path.join(current_dir, '..', 'logs', 'rate_limit.db'))
+RATE_LIMIT_DEFAULT_PER_SEC = float(os.getenv('RATE_LIMIT_DEFAULT_PER_SEC', 0))   # 未单独配置的 API 的默认速率，0 为不限
+RATE_LIMIT_DEFAULT_BURST = int(os.getenv('RATE_LIMIT_DEFAULT_BURST', 5))
+RATE_LIMIT_ON_DENY = os.getenv('RATE_LIMIT_ON_DENY', 'wait').lower()             # wait: 排队等待；skip: 本次搜索跳过该 API
+RATE_LIMIT_MAX_WAIT = float(os.getenv('RATE_LIMIT_MAX_WAIT', 2.0))               # 排队等待的最长时间（秒），超时则跳过
+
+# 搜索结果与 API 配置快照缓存：sqlite 为本机所有 worker 共享的本地文件，redis 为 Redis 协议服务，none 为关闭
+CACHE_BACKEND = os.getenv('CACHE_BACKEND', 'sqlite').lower()
+CACHE_SQLITE_PATH = os.getenv('CACHE_SQLITE_PATH', os.path.join(current_dir, '..', 'logs', 'search_cache.db'))
+CACHE_MAX_MB = int(os.getenv('CACHE_MAX_MB', 256))                     # sqlite 缓存总大小上限，超过按 LRU 淘汰
+CACHE_REDIS_URL = os.getenv('CACHE_REDIS_URL', 'redis://127.0.0.1:6379/0')
+SEARCH_CACHE_TTL = int(os.getenv('SEARCH_CACHE_TTL', 600))             # 关键词搜索结果的新鲜期（秒）
+SEARCH_CACHE_STALE_SECONDS = int(os.getenv('SEARCH_CACHE_STALE_SECONDS', 86400))  # 过了新鲜期后仍可先推送旧结果的时长，之后硬过期；0 关闭
+SEARCH_CACHE_REFRESH_LEASE = int(os.getenv('SEARCH_CACHE_REFRESH_LEASE', 30))     # 同一关键词的后台刷新租约（秒），避免多个请求同时刷新
+CONFIG_CACHE_TTL = int(os.getenv('CONFIG_CACHE_TTL', 30))              # API 配置快照缓存时间（秒）
+
+# 热门关键词统计与缓存预热：各 worker 用 Space-Saving 统计关键词频次，按半衰期衰减后汇总到数据库；
+# 持锁进程在低峰时段预先搜索前 N 个关键词写入缓存，预热请求最多占用每个上游限流额度的 PREWARM_BUDGET_SHARE
+HOT_KEYWORD_CAPACITY = int(os.getenv('HOT_KEYWORD_CAPACITY', 1000))         # 每个 worker 跟踪的关键词数上限
+HOT_KEYWORD_FLUSH_SECONDS = int(os.getenv('HOT_KEYWORD_FLUSH_SECONDS', 60))
+HOT_KEYWORD_HALF_LIFE_HOURS = float(os.getenv('HOT_KEYWORD_HALF_LIFE_HOURS', 24))
+PREWARM_ENABLED = os.getenv('PREWARM_ENABLED', 'true').lower() == 'true'
+PREWARM_HOURS = os.getenv('PREWARM_HOURS', '3-7')                           # 低峰时段（本地时间，小时区间，可跨零点如 22-6）
+PREWARM_INTERVAL = int(os.getenv('PREWARM_INTERVAL', 900))                   # 预热任务检查间隔（秒）
+PREWARM_TOP_N = int(os.getenv('PREWARM_TOP_N', 50))
+PREWARM_BUDGET_SHARE = float(os.getenv('PREWARM_BUDGET_SHARE', 0.2))        # 预热可占用的上游限流额度比例
+PREWARM_ASSUMED_RATE = float(os.getenv('PREWARM_ASSUMED_RATE', 1.0))        # 未配置限流的上游按此速率（次/秒）计算额度
+PREWARM_MAX_WAIT = float(os.getenv('PREWARM_MAX_WAIT', 10))                 # 预热请求排队等待额度的最长时间（秒）
+PREWARM_LOCK_FILE = os.getenv('PREWARM_LOCK_FILE', os.path.join(current_dir, '..', 'logs', 'prewarm_scheduler.lock'))
+
+# 搜索分析：请求线程只写入内存环形缓冲区，后台线程每 ANALYTICS_FLUSH_SECONDS 秒或攒够 ANALYTICS_BATCH_ROWS 条批量写库；
+# 缓冲区满（数据库慢或不可用）时丢弃新事件并计数，不阻塞搜索请求
+ANALYTICS_ENABLED = os.getenv('ANALYTICS_ENABLED', 'true').lower() == 'true'
+ANALYTICS_BUFFER_SIZE = int(os.getenv('ANALYTICS_BUFFER_SIZE', 10000))
+ANALYTICS_FLUSH_SECONDS = float(os.getenv('ANALYTICS_FLUSH_SECONDS', 5))
+ANALYTICS_BATCH_ROWS = int(os.getenv('ANALYTICS_BATCH_ROWS', 500))
+
+# 网盘客户端：按 (网盘, Cookie 版本) 复用客户端实例与连接池；百度 bdstoken 缓存时间（秒）
+NETDISK_BDSTOKEN_TTL = int(os.getenv('NETDISK_BDSTOKEN_TTL', 3600))
+NETDISK_POOL_MAXSIZE = int(os.getenv('NETDISK_POOL_MAXSIZE', 10))           # 每个客户端到同一主机的最大保持连接数
+
+# 百度目录列表缓存：每个客户端按目录缓存 {文件名: fs_id}，转存 / 删除后增量更新；列目录的分页大小与最多翻页数
+BAIDU_DIR_CACHE_TTL = float(os.getenv('BAIDU_DIR_CACHE_TTL', 600))
+BAIDU_LIST_PAGE_SIZE = int(os.getenv('BAIDU_LIST_PAGE_SIZE', 1000))
+BAIDU_LIST_MAX_PAGES = int(os.getenv('BAIDU_LIST_MAX_PAGES', 20))
+
+# 网盘多账号：cookie_config 中同一网盘可配置多个账号，每次操作按策略选账号（least_loaded / round_robin），
+# 被限流的账号冷却 NETDISK_ACCOUNT_COOLDOWN 秒，登录失效的账号停用；一次操作最多尝试 NETDISK_ACCOUNT_FAILOVER 个账号
+NETDISK_ACCOUNT_STRATEGY = os.getenv('NETDISK_ACCOUNT_STRATEGY', 'least_loaded')
+NETDISK_ACCOUNT_REFRESH_SECONDS = float(os.getenv('NETDISK_ACCOUNT_REFRESH_SECONDS', 30))   # 重新加载账号配置与健康状态的间隔
+NETDISK_ACCOUNT_COOLDOWN = float(os.getenv('NETDISK_ACCOUNT_COOLDOWN', 300))
+NETDISK_ACCOUNT_FAILOVER = int(os.getenv('NETDISK_ACCOUNT_FAILOVER', 3))
+
+# 夸克保存 / 分享任务轮询：首次查询前等待、退避起始间隔与上限（秒），以及总期限
+QUARK_TASK_POLL_FIRST = float(os.getenv('QUARK_TASK_POLL_FIRST', 0.2))
+QUARK_TASK_POLL_INITIAL = float(os.getenv('QUARK_TASK_POLL_INITIAL', 0.3))
+QUARK_TASK_POLL_MAX = float(os.getenv('QUARK_TASK_POLL_MAX', 3))
+QUARK_TASK_TIMEOUT = float(os.getenv('QUARK_TASK_TIMEOUT', 30))
+
+# 网盘转存：同一网盘的接口并发数、写操作（转存 / 创建分享）速率上限（次/秒，按网盘共享令牌桶），批量请求的链接数上限
+NETDISK_BATCH_CONCURRENCY = int(os.getenv('NETDISK_BATCH_CONCURRENCY', 4))
+NETDISK_BATCH_RATE_PER_SEC = float(os.getenv('NETDISK_BATCH_RATE_PER_SEC', 5))
+NETDISK_BATCH_MAX_ITEMS = int(os.getenv('NETDISK_BATCH_MAX_ITEMS', 50))
+# 批量删除资源：单次请求的资源数上限，以及每次网盘删除接口调用包含的文件数
+RESOURCE_BULK_DELETE_MAX = int(os.getenv('RESOURCE_BULK_DELETE_MAX', 500))
+NETDISK_DELETE_BATCH_SIZE = int(os.getenv('NETDISK_DELETE_BATCH_SIZE', 100))
+
+# 转存记录：同一源分享链接在 TRANSFER_MEMO_TTL 秒内复用之前的转存与分享结果；
+# 距上次确认超过 TRANSFER_MEMO_VERIFY_AFTER 秒时先探测我方分享是否仍有效，失效则重新转存
+TRANSFER_MEMO_ENABLED = os.getenv('TRANSFER_MEMO_ENABLED', 'true').lower() == 'true'
+TRANSFER_MEMO_TTL = int(os.getenv('TRANSFER_MEMO_TTL', 30 * 86400))
+TRANSFER_MEMO_VERIFY_AFTER = int(os.getenv('TRANSFER_MEMO_VERIFY_AFTER', 600))
+TRANSFER_MEMO_WAIT = float(os.getenv('TRANSFER_MEMO_WAIT', 60))             # 其他进程正在转存同一链接时的最长等待（秒）
+
+# 后台任务队列：转存 / 删除分享等网盘操作由后台线程执行，接口立即返回任务 ID；
+# 任务表存放在 SQLite（同机各 worker 共享，重启后继续执行未完成的任务），JOB_SQLITE_PATH 置空则只保存在本进程内存
+JOB_SQLITE_PATH = os.getenv('JOB_SQLITE_PATH', os.path.join(current_dir, '..', 'logs', 'jobs.db'))
+JOB_WORKERS = int(os.getenv('JOB_WORKERS', 4))                              # 每个进程的任务线程数
+JOB_CONCURRENCY_QUARK = int(os.getenv('JOB_CONCURRENCY_QUARK', 2))           # 每个进程同时执行的夸克网盘任务数
+JOB_CONCURRENCY_BAIDU = int(os.getenv('JOB_CONCURRENCY_BAIDU', 1))           # 百度转存依赖分享验证 Cookie，默认串行
+JOB_CONCURRENCY_DEFAULT = int(os.getenv('JOB_CONCURRENCY_DEFAULT', 2))       # 其他网盘 / 不涉及网盘的任务
+JOB_MAX_ATTEMPTS = int(os.getenv('JOB_MAX_ATTEMPTS', 3))
+JOB_RETRY_BASE = float(os.getenv('JOB_RETRY_BASE', 2))                      # 重试退避起始间隔（秒），之后每次翻倍
+JOB_RETRY_MAX = float(os.getenv('JOB_RETRY_MAX', 60))
+JOB_LEASE_SECONDS = int(os.getenv('JOB_LEASE_SECONDS', 300))                # 执行中任务的租约（执行期间每 1/3 租约续约），进程退出后超过租约由其他进程接手
+JOB_IDEMPOTENCY_TTL = int(os.getenv('JOB_IDEMPOTENCY_TTL', 3600))           # 相同幂等键在此时间内成功过则直接返回已有任务
+JOB_POLL_SECONDS = float(os.getenv('JOB_POLL_SECONDS', 1))
+JOB_RETENTION_HOURS = int(os.getenv('JOB_RETENTION_HOURS', 24))             # 已结束任务记录的保留时间
+
+# 分享链接有效性巡检：持锁进程每 LINK_CHECK_INTERVAL 秒取最久未检查的 LINK_CHECK_BATCH 条资源并发探测，
+# 每个探测主机按 LINK_CHECK_RATE_PER_HOST（次/秒）限速，检查结果超过 LINK_CHECK_RECHECK_HOURS 小时后重新检查；
+# 数据库搜索对失效资源的处理 SEARCH_DEAD_LINKS：exclude 不返回 / downrank 排在最后
+LINK_CHECK_ENABLED = os.getenv('LINK_CHECK_ENABLED', 'true').lower() == 'true'
+LINK_CHECK_INTERVAL = int(os.getenv('LINK_CHECK_INTERVAL', 600))
+LINK_CHECK_BATCH = int(os.getenv('LINK_CHECK_BATCH', 200))
+LINK_CHECK_CONCURRENCY = int(os.getenv('LINK_CHECK_CONCURRENCY', 8))
+LINK_CHECK_RATE_PER_HOST = float(os.getenv('LINK_CHECK_RATE_PER_HOST', 2))
+LINK_CHECK_TIMEOUT = float(os.getenv('LINK_CHECK_TIMEOUT', 10))
+LINK_CHECK_RECHECK_HOURS = int(os.getenv('LINK_CHECK_RECHECK_HOURS', 24))
+LINK_CHECK_LOCK_FILE = os.getenv('LINK_CHECK_LOCK_FILE', os.path.join(current_dir, '..', 'logs', 'link_check_scheduler.lock'))
+LINK_CHECK_QUARK_API = os.getenv('LINK_CHECK_QUARK_API', 'https://drive-pc.quark.cn')   # 探测地址，测试时可指向本地桩服务
+LINK_CHECK_BAIDU_BASE = os.getenv('LINK_CHECK_BAIDU_BASE', 'https://pan.baidu.com')
+SEARCH_DEAD_LINKS = os.getenv('SEARCH_DEAD_LINKS', 'exclude')
+
+# 未替换资源的后台重新分享：按 ID 键集分页读取 is_replaced = FALSE 的资源，RESHARE_CONCURRENCY 个线程转存，
+# 每个网盘按 RESHARE_RATE_PER_SEC（次/秒）限速；每页处理完批量写回分享链接并保存进度，重启后从进度处继续。
+# 默认关闭（会占用网盘账号的转存额度），也可通过管理接口手动触发
+RESHARE_ENABLED = os.getenv('RESHARE_ENABLED', 'false').lower() == 'true'
+RESHARE_INTERVAL = int(os.getenv('RESHARE_INTERVAL', 3600))
+RESHARE_MAX_ROWS = int(os.getenv('RESHARE_MAX_ROWS', 1000))                  # 每次运行最多处理的资源数
+RESHARE_PAGE_SIZE = int(os.getenv('RESHARE_PAGE_SIZE', 50))                  # 每页资源数，也是批量写回的条数
+RESHARE_CONCURRENCY = int(os.getenv('RESHARE_CONCURRENCY', 4))
+RESHARE_RATE_PER_SEC = float(os.getenv('RESHARE_RATE_PER_SEC', 1))
+# 转存失败的资源按指数退避推迟重试：第 n 次失败后 RESHARE_RETRY_BASE * 2^(n-1) 秒内不再处理，最长 RESHARE_RETRY_MAX 秒；
+# 不可重试的失败（如源链接已失效）直接推迟 RESHARE_RETRY_MAX 秒
+RESHARE_RETRY_BASE = int(os.getenv('RESHARE_RETRY_BASE', 3600))
+RESHARE_RETRY_MAX = int(os.getenv('RESHARE_RETRY_MAX', 7 * 86400))
+RESHARE_LOCK_FILE = os.getenv('RESHARE_LOCK_FILE', os.path.join(current_dir, '..', 'logs', 'reshare_scheduler.lock'))
+
 # 数据库配置，从环境变量获取
 db_config = {
     'user': os.getenv('DB_USER'),
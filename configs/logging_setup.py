@@ -1,22 +1,68 @@
+import atexit
 import logging
+import queue
 from pathlib import Path
-from logging.handlers import RotatingFileHandler
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
 
-def setup_logging(log_file: str = "logs/search_ucmao.log", level=logging.INFO):
+from configs.app_config import LOG_MAX_PER_MINUTE, LOG_QUEUE_ENABLED, LOG_SAMPLE_RATE
+from utils.log_utils import SampledLogFilter
+from utils.trace_utils import TraceIdLogFilter
+
+LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - [%(trace_id)s] %(message)s'
+
+_listener = None
+
+
+def _stop_listener():
+    global _listener
+    if _listener is not None:
+        _listener.stop()  # 写完队列中剩余的日志
+        _listener = None
+
+
+def setup_logging(log_file: str = "logs/search_ucmao.log", level=logging.INFO, queued: bool = LOG_QUEUE_ENABLED,
+                  sample_rate: float = LOG_SAMPLE_RATE, max_per_minute: int = LOG_MAX_PER_MINUTE):
+    global _listener
     log_path = Path(log_file)
     log_path.parent.mkdir(parents=True, exist_ok=True)
 
+    handlers = [
+        RotatingFileHandler(
+            str(log_path),
+            maxBytes=1024 * 1024,   # 1MB
+            backupCount=5,
+            encoding='utf-8'
+        ),
+        logging.StreamHandler()
+    ]
+    formatter = logging.Formatter(LOG_FORMAT)
+    for handler in handlers:
+        handler.setFormatter(formatter)
+
+    # trace_id 依赖调用线程的上下文，采样也应在入队前完成，因此这两个过滤器挂在调用方一侧的 handler 上
+    front_filters = [SampledLogFilter(sample_rate, max_per_minute), TraceIdLogFilter()]
+
+    _stop_listener()
+    if queued:
+        # 请求线程只做入队，文件轮转和写盘由 QueueListener 后台线程完成
+        log_queue = queue.SimpleQueue()
+        queue_handler = QueueHandler(log_queue)
+        queue_handler.setFormatter(logging.Formatter('%(message)s'))  # 入队时只合并 msg % args，完整格式由后台 handler 生成
+        front_handlers = [queue_handler]
+        _listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+        _listener.start()
+    else:
+        front_handlers = handlers
+
+    for handler in front_handlers:
+        for log_filter in front_filters:
+            handler.addFilter(log_filter)
+
     logging.basicConfig(
         level=level,
-        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-        handlers=[
-            RotatingFileHandler(
-                str(log_path),
-                maxBytes=1024 * 1024,   # 1MB
-                backupCount=5,
-                encoding='utf-8'
-            ),
-            logging.StreamHandler()
-        ],
+        handlers=front_handlers,
         force=True  # 👈 Python 3.8+ 支持，确保配置总是生效
     )
+
+
+atexit.register(_stop_listener)
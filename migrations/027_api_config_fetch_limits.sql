@@ -0,0 +1,6 @@
+-- 已有数据库升级：为 api_config 增加单个 API 的响应读取限制
+USE `ucmao_search`;
+
+ALTER TABLE `api_config`
+  ADD COLUMN `max_body_kb` int(11) DEFAULT NULL COMMENT '响应体大小上限(KB)，为空使用全局默认' AFTER `is_enabled`,
+  ADD COLUMN `max_items` int(11) DEFAULT NULL COMMENT '最多提取条数，为空使用全局默认' AFTER `max_body_kb`;
@@ -0,0 +1,7 @@
+-- 已有数据库升级：为 api_config 增加后台健康检查字段
+USE `ucmao_search`;
+
+ALTER TABLE `api_config`
+  ADD COLUMN `success_rate` float DEFAULT NULL COMMENT '健康检查成功率 (EWMA, 0~1)' AFTER `max_items`,
+  ADD COLUMN `last_probe_at` datetime DEFAULT NULL COMMENT '最近一次健康检查时间' AFTER `success_rate`,
+  ADD COLUMN `auto_disabled` tinyint(1) NOT NULL DEFAULT 0 COMMENT '是否为自动禁用 (恢复后自动启用)' AFTER `last_probe_at`;
@@ -0,0 +1,10 @@
+-- 已有数据库升级：为 api_config 增加基于实际搜索流量的上游评分统计
+USE `ucmao_search`;
+
+ALTER TABLE `api_config`
+  ADD COLUMN `avg_results` float DEFAULT NULL COMMENT '实际搜索中每次保留的结果数 (EWMA)' AFTER `auto_disabled`,
+  ADD COLUMN `error_rate` float DEFAULT NULL COMMENT '实际搜索中的失败率 (EWMA)' AFTER `avg_results`,
+  ADD COLUMN `avg_latency_ms` int(11) DEFAULT NULL COMMENT '实际搜索中的耗时 (EWMA, 毫秒)' AFTER `error_rate`,
+  ADD COLUMN `unique_ratio` float DEFAULT NULL COMMENT '去重后独有链接占比 (EWMA)' AFTER `avg_latency_ms`,
+  ADD COLUMN `score` float DEFAULT NULL COMMENT '上游评分：每秒带来的独有有效结果数' AFTER `unique_ratio`,
+  ADD COLUMN `score_samples` int(11) NOT NULL DEFAULT 0 COMMENT '评分样本数' AFTER `score`;
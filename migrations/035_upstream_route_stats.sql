@@ -0,0 +1,11 @@
+-- 已有数据库升级：新增按关键词特征统计上游命中情况的路由表
+USE `ucmao_search`;
+
+CREATE TABLE IF NOT EXISTS `upstream_route_stats` (
+  `feature` varchar(64) NOT NULL COMMENT '关键词特征 (g:字符二元组 / t:资源类型 / *:全局)',
+  `api_id` int(11) NOT NULL COMMENT 'api_config.id',
+  `queries` int(11) NOT NULL DEFAULT 0 COMMENT '带有该特征的搜索中请求该上游的次数',
+  `hits` int(11) NOT NULL DEFAULT 0 COMMENT '其中返回了保留结果的次数',
+  `updated_at` datetime DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP COMMENT '更新时间',
+  PRIMARY KEY (`feature`, `api_id`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci COMMENT='按关键词特征统计的上游命中情况';
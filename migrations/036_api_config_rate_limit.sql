@@ -0,0 +1,6 @@
+-- 已有数据库升级：为 api_config 增加单个 API 的请求限流配置
+USE `ucmao_search`;
+
+ALTER TABLE `api_config`
+  ADD COLUMN `rate_limit_per_sec` float DEFAULT NULL COMMENT '每秒请求数上限，为空使用全局默认' AFTER `max_items`,
+  ADD COLUMN `rate_limit_burst` int(11) DEFAULT NULL COMMENT '突发请求数上限（令牌桶容量），为空使用全局默认' AFTER `rate_limit_per_sec`;
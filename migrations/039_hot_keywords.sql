@@ -0,0 +1,9 @@
+-- 已有数据库升级：新增热门关键词统计表，用于低峰时段预热搜索缓存
+USE `ucmao_search`;
+
+CREATE TABLE IF NOT EXISTS `hot_keywords` (
+  `keyword` varchar(191) NOT NULL COMMENT '搜索关键词（已合并空白）',
+  `hits` double NOT NULL DEFAULT 0 COMMENT '按半衰期衰减后的搜索次数（截至 updated_at）',
+  `updated_at` datetime NOT NULL DEFAULT CURRENT_TIMESTAMP COMMENT '最近一次累加时间',
+  PRIMARY KEY (`keyword`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci COMMENT='热门搜索关键词（用于缓存预热）';
@@ -0,0 +1,18 @@
+-- 已有数据库升级：新增搜索分析明细表（由后台线程批量写入）
+USE `ucmao_search`;
+
+CREATE TABLE IF NOT EXISTS `search_analytics` (
+  `id` bigint(20) NOT NULL AUTO_INCREMENT COMMENT '主键',
+  `keyword` varchar(191) NOT NULL COMMENT '搜索关键词',
+  `searched_at` datetime(3) NOT NULL COMMENT '搜索开始时间',
+  `cache_status` varchar(16) NOT NULL COMMENT '上游结果缓存 (miss / fresh / stale / refresh)',
+  `completed` tinyint(1) NOT NULL DEFAULT 1 COMMENT '是否完整结束 (0=客户端中途断开)',
+  `db_results` int(11) NOT NULL DEFAULT 0 COMMENT '内部数据库结果数',
+  `upstream_results` int(11) NOT NULL DEFAULT 0 COMMENT '推送的上游结果数（去重后，含缓存）',
+  `upstream_calls` int(11) NOT NULL DEFAULT 0 COMMENT '实际请求的上游数',
+  `source_counts` text COMMENT '各上游返回的结果数 (JSON: {api 名称: 条数})',
+  `first_result_ms` int(11) DEFAULT NULL COMMENT '首条结果耗时 (毫秒)，无结果为 NULL',
+  `latency_ms` int(11) NOT NULL COMMENT '整个搜索流耗时 (毫秒)',
+  PRIMARY KEY (`id`),
+  KEY `idx_searched_at` (`searched_at`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci COMMENT='搜索分析明细（批量异步写入）';
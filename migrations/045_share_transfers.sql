@@ -0,0 +1,15 @@
+-- 已有数据库升级：新增转存记录表（同一源分享链接复用之前的转存与分享结果）
+USE `ucmao_search`;
+
+CREATE TABLE IF NOT EXISTS `share_transfers` (
+  `source_key` varchar(191) NOT NULL COMMENT '源分享链接规范化键 (网盘:分享 ID)',
+  `source_url` text NOT NULL COMMENT '最近一次转存使用的源分享链接',
+  `cloud_name` varchar(100) NOT NULL COMMENT '网盘名称',
+  `file_id` varchar(255) DEFAULT NULL COMMENT '转存后的文件 ID（百度为文件路径）',
+  `file_name` varchar(255) DEFAULT NULL COMMENT '转存后的文件名',
+  `share_link` text NOT NULL COMMENT '重新分享的链接',
+  `created_at` timestamp NOT NULL DEFAULT CURRENT_TIMESTAMP COMMENT '转存时间',
+  `verified_at` timestamp NOT NULL DEFAULT CURRENT_TIMESTAMP COMMENT '最近一次确认分享仍有效的时间',
+  PRIMARY KEY (`source_key`),
+  KEY `idx_share_link` (`share_link`(191))
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci COMMENT='转存记录（源分享链接 -> 我方文件与分享链接）';
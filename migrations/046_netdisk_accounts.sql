@@ -0,0 +1,35 @@
+-- 已有数据库升级：cookie_config 支持同一网盘配置多个账号（权重、每日额度、健康状态与用量统计），资源记录所属账号
+USE `ucmao_search`;
+
+ALTER TABLE `cookie_config`
+  DROP INDEX `uk_cloud_name`,
+  ADD COLUMN `account_name` varchar(100) NOT NULL DEFAULT 'default' COMMENT '账号名称（同一网盘内唯一）' AFTER `cloud_name`,
+  ADD COLUMN `weight` int(11) NOT NULL DEFAULT 1 COMMENT '分配权重' AFTER `cookie`,
+  ADD COLUMN `daily_quota` int(11) DEFAULT NULL COMMENT '每日转存次数上限，为空不限' AFTER `weight`,
+  ADD COLUMN `is_enabled` tinyint(1) NOT NULL DEFAULT 1 COMMENT '是否参与分配' AFTER `daily_quota`,
+  ADD COLUMN `status` varchar(16) NOT NULL DEFAULT 'ok' COMMENT '健康状态 (ok / rate_limited / expired)' AFTER `is_enabled`,
+  ADD COLUMN `cooldown_until` datetime DEFAULT NULL COMMENT '被限流后暂停分配至此时间' AFTER `status`,
+  ADD COLUMN `last_error` varchar(255) DEFAULT NULL COMMENT '最近一次失败原因' AFTER `cooldown_until`,
+  ADD COLUMN `quota_date` date DEFAULT NULL COMMENT 'transfers_today 对应的日期' AFTER `last_error`,
+  ADD COLUMN `transfers_today` int(11) NOT NULL DEFAULT 0 COMMENT '当日成功操作次数' AFTER `quota_date`,
+  ADD COLUMN `total_transfers` bigint(20) NOT NULL DEFAULT 0 COMMENT '累计成功操作次数' AFTER `transfers_today`,
+  ADD COLUMN `total_failures` bigint(20) NOT NULL DEFAULT 0 COMMENT '累计失败次数' AFTER `total_transfers`,
+  ADD COLUMN `last_used_at` datetime DEFAULT NULL COMMENT '最近一次使用时间' AFTER `total_failures`,
+  ADD UNIQUE KEY `uk_cloud_account` (`cloud_name`, `account_name`);
+
+ALTER TABLE `resources`
+  ADD COLUMN `account_id` int(11) DEFAULT NULL COMMENT '转存所用的网盘账号 (cookie_config.id)，删除文件时使用同一账号' AFTER `file_id`;
+
+ALTER TABLE `share_transfers`
+  ADD COLUMN `account_id` int(11) DEFAULT NULL COMMENT '转存所用的网盘账号 (cookie_config.id)' AFTER `cloud_name`;
+
+-- 回填已有记录的所属账号：升级前每个网盘只有一个账号（cookie_config 按 cloud_name 唯一），已有的文件都在它名下
+UPDATE `resources` r
+  JOIN `cookie_config` c ON c.`cloud_name` = r.`cloud_name`
+  SET r.`account_id` = c.`id`, r.`updated_at` = r.`updated_at`
+  WHERE r.`account_id` IS NULL AND r.`file_id` IS NOT NULL;
+
+UPDATE `share_transfers` t
+  JOIN `cookie_config` c ON c.`cloud_name` = t.`cloud_name`
+  SET t.`account_id` = c.`id`
+  WHERE t.`account_id` IS NULL;
@@ -0,0 +1,7 @@
+-- 已有数据库升级：资源分享链接有效性巡检结果（is_alive 为 NULL 表示尚未检查）
+USE `ucmao_search`;
+
+ALTER TABLE `resources`
+  ADD COLUMN `is_alive` BOOLEAN DEFAULT NULL COMMENT '分享链接是否有效 (NULL 未检查)' AFTER `is_replaced`,
+  ADD COLUMN `last_checked_at` timestamp NULL DEFAULT NULL COMMENT '最近一次有效性检查时间' AFTER `is_alive`,
+  ADD KEY `idx_last_checked_at` (`last_checked_at`);
@@ -0,0 +1,19 @@
+-- 已有数据库升级：新增后台流水线进度表（未替换资源的重新分享从上次处理到的资源 ID 继续），
+-- 以及重新分享失败次数 / 下次重试时间（失败的资源按退避时间跳过）
+USE `ucmao_search`;
+
+CREATE TABLE IF NOT EXISTS `pipeline_checkpoints` (
+  `name` varchar(64) NOT NULL COMMENT '流水线名称',
+  `last_id` int(11) NOT NULL DEFAULT 0 COMMENT '已处理到的资源 ID（按 ID 键集分页）',
+  `report` text DEFAULT NULL COMMENT '最近一次运行的吞吐统计 (JSON)',
+  `updated_at` timestamp NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+  PRIMARY KEY (`name`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci COMMENT='后台流水线进度（重启后从此处继续）';
+
+-- 按 ID 顺序读取未替换的资源
+ALTER TABLE `resources` ADD KEY `idx_is_replaced_id` (`is_replaced`, `id`);
+
+-- 重新分享失败的资源在退避时间内跳过，不必每轮都重新转存
+ALTER TABLE `resources`
+  ADD COLUMN `reshare_failures` int(11) NOT NULL DEFAULT 0 COMMENT '重新分享连续失败次数' AFTER `last_checked_at`,
+  ADD COLUMN `reshare_retry_at` timestamp NULL DEFAULT NULL COMMENT '重新分享失败后下次重试的时间 (NULL 不限)' AFTER `reshare_failures`;
@@ -1,6 +1,6 @@
 # routes/api_config_routes.py
 
-from flask import Blueprint, jsonify, request, render_template
+from flask import Blueprint, Response, jsonify, request, render_template
 
 import logging
 
@@ -17,7 +17,9 @@ from src.services.api_config_service import (
     update_config_with_keyword,
     test_single_api,
     test_all_apis_and_update_status,
+    iter_test_all_apis,
 )
+from utils import json_utils
 
 logger = logging.getLogger(__name__)
 
@@ -173,4 +175,16 @@ def test_all_apis():
     """测试所有API配置并更新其状态 (需要 JWT 验证)"""
     success, message = test_all_apis_and_update_status()
     status_code = 200 if success else 500
-    return jsonify({"message": message}), status_code
\ No newline at end of file
+    return jsonify({"message": message}), status_code
+
+
+@api_config_bp.route("/api/test-all/stream", methods=["GET"])
+@token_required
+def test_all_apis_stream():
+    """测试所有 API，以 SSE 逐个推送测试结果，结束后批量写回状态 (需要 JWT 验证)"""
+
+    def generate_events():
+        for event in iter_test_all_apis():
+            yield f"data: {json_utils.dumps(event)}\n\n"
+
+    return Response(generate_events(), mimetype="text/event-stream")
@@ -8,8 +8,19 @@ from src.services.hot_resource_service import (
     add_resource_and_share,
     update_resource_info,
     delete_resource_and_share,
+    delete_resources_and_shares,
 )
-from src.db.cookie_config_dao import get_cookie_by_cloud_name, save_cookie
+from configs.app_config import RESOURCE_BULK_DELETE_MAX
+from src.clients.client_registry import CLIENTS
+from src.db.cookie_config_dao import (
+    delete_account,
+    get_accounts,
+    get_cookie_by_cloud_name,
+    save_cookie,
+    update_account_settings,
+)
+from src.services.account_pool import ACCOUNTS
+from src.services.reshare_service import get_reshare_status, start_reshare_async
 
 logger = logging.getLogger(__name__)
 
@@ -53,11 +64,11 @@ def get_resource(resource_id):
 def add_resource():
     """添加新资源"""
     resource_data = request.get_json()
-    success, message, new_id = add_resource_and_share(resource_data)
+    success, message, data = add_resource_and_share(resource_data)
     if not success:
         status = 400 if "必填项" in message else 500 if "数据库" in message else 500
         return jsonify({"success": False, "message": message}), status
-    return jsonify({"success": True, "message": message, "id": new_id}), 201
+    return jsonify({"success": True, "message": message, **data}), 201
 
 
 @resources_bp.route("/api/resources/<int:resource_id>", methods=["PUT"])
@@ -76,11 +87,49 @@ def update_resource(resource_id):
 @token_required
 def delete_resource(resource_id):
     """删除资源"""
-    success, message = delete_resource_and_share(resource_id)
+    success, message, job_id = delete_resource_and_share(resource_id)
     if not success:
         status = 404 if message == "资源不存在" else 500
         return jsonify({"success": False, "message": message}), status
-    return jsonify({"success": True, "message": message})
+    return jsonify({"success": True, "message": message, "job_id": job_id})
+
+
+@resources_bp.route("/api/resources/bulk-delete", methods=["POST"])
+@token_required
+def bulk_delete_resources():
+    """批量删除资源，返回每个 ID 的删除结果（含网盘文件删除结果）"""
+    ids = (request.get_json() or {}).get("ids")
+    if not isinstance(ids, list) or not ids:
+        return jsonify({"success": False, "message": "缺少参数 ids"}), 400
+    if len(ids) > RESOURCE_BULK_DELETE_MAX:
+        return jsonify({"success": False, "message": f"单次最多删除 {RESOURCE_BULK_DELETE_MAX} 条"}), 400
+    if not all(isinstance(i, int) and not isinstance(i, bool) for i in ids):
+        return jsonify({"success": False, "message": "ids 必须为整数列表"}), 400
+
+    success, message, data = delete_resources_and_shares(ids)
+    if not success:
+        return jsonify({"success": False, "message": message}), 500
+    return jsonify({"success": True, "message": message, **data})
+
+
+@resources_bp.route("/api/resources/reshare", methods=["GET"])
+@token_required
+def reshare_status():
+    """后台重新分享的运行状态、进度与最近一次的吞吐统计"""
+    return jsonify({"success": True, "data": get_reshare_status()})
+
+
+@resources_bp.route("/api/resources/reshare", methods=["POST"])
+@token_required
+def start_reshare():
+    """立即在后台运行一轮重新分享（可指定本轮最多处理的资源数 max_rows）"""
+    max_rows = (request.get_json(silent=True) or {}).get("max_rows")
+    if max_rows is not None and (not isinstance(max_rows, int) or max_rows <= 0):
+        return jsonify({"success": False, "message": "max_rows 必须为正整数"}), 400
+    started = start_reshare_async(max_rows) if max_rows else start_reshare_async()
+    if not started:
+        return jsonify({"success": False, "message": "重新分享正在运行中，或由其他进程负责执行"}), 409
+    return jsonify({"success": True, "message": "重新分享已开始"}), 202
 
 
 @resources_bp.route("/cookie-config", methods=["GET"])
@@ -105,11 +154,85 @@ def save_cookie_config():
         success, message = save_cookie("百度网盘", baidu_cookie)
         if not success:
             return jsonify({"success": False, "message": message}), 500
+        CLIENTS.invalidate("百度网盘")
+        ACCOUNTS.invalidate("百度网盘")
     
     # 保存夸克网盘Cookie（如果提供）
     if quark_cookie:
         success, message = save_cookie("夸克网盘", quark_cookie)
         if not success:
             return jsonify({"success": False, "message": message}), 500
+        CLIENTS.invalidate("夸克网盘")
+        ACCOUNTS.invalidate("夸克网盘")
     
     return jsonify({"success": True, "message": "Cookie配置保存成功"})
+
+
+def _mask_cookie(cookie):
+    """账号列表中只展示 Cookie 首尾片段"""
+    if not cookie:
+        return ""
+    return cookie if len(cookie) <= 16 else f"{cookie[:8]}...{cookie[-8:]}"
+
+
+@resources_bp.route("/api/netdisk-accounts", methods=["GET"])
+@token_required
+def list_netdisk_accounts():
+    """获取网盘账号列表（含健康状态与当日用量），可按 cloud_name 过滤"""
+    accounts = get_accounts(request.args.get("cloud_name") or None)
+    for account in accounts:
+        account["cookie"] = _mask_cookie(account.get("cookie"))
+        if account.get("last_used_at"):
+            account["last_used_at"] = account["last_used_at"].strftime("%Y-%m-%d %H:%M:%S")
+    return jsonify({"success": True, "data": accounts})
+
+
+@resources_bp.route("/api/netdisk-accounts", methods=["POST"])
+@token_required
+def save_netdisk_account():
+    """新增网盘账号，同一网盘下账号名已存在时更新其 Cookie 并恢复为可用"""
+    data = request.get_json() or {}
+    cloud_name = data.get("cloud_name", "")
+    cookie = data.get("cookie", "")
+    if cloud_name not in ("百度网盘", "夸克网盘") or not cookie:
+        return jsonify({"success": False, "message": "cloud_name 和 cookie 为必填项"}), 400
+
+    success, message = save_cookie(cloud_name, cookie, data.get("account_name") or "default",
+                                   data.get("weight"), data.get("daily_quota"))
+    if not success:
+        return jsonify({"success": False, "message": message}), 500
+    CLIENTS.invalidate(cloud_name)
+    ACCOUNTS.invalidate(cloud_name)
+    return jsonify({"success": True, "message": message})
+
+
+@resources_bp.route("/api/netdisk-accounts/<int:account_id>", methods=["PUT"])
+@token_required
+def update_netdisk_account(account_id):
+    """修改网盘账号的权重、每日额度（null 表示不限）或启用状态"""
+    data = request.get_json() or {}
+    success, message = update_account_settings(
+        account_id,
+        weight=data.get("weight"),
+        daily_quota=data.get("daily_quota"),
+        is_enabled=data.get("is_enabled"),
+        clear_quota="daily_quota" in data and data["daily_quota"] is None,
+    )
+    if not success:
+        status = 404 if message == "账号不存在" else 400 if message == "没有需要更新的字段" else 500
+        return jsonify({"success": False, "message": message}), status
+    ACCOUNTS.invalidate()
+    return jsonify({"success": True, "message": message})
+
+
+@resources_bp.route("/api/netdisk-accounts/<int:account_id>", methods=["DELETE"])
+@token_required
+def delete_netdisk_account(account_id):
+    """删除网盘账号"""
+    success, message = delete_account(account_id)
+    if not success:
+        status = 404 if message == "账号不存在" else 500
+        return jsonify({"success": False, "message": message}), status
+    CLIENTS.invalidate()
+    ACCOUNTS.invalidate()
+    return jsonify({"success": True, "message": message})
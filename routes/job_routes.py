@@ -0,0 +1,33 @@
+# routes/job_routes.py
+
+from flask import Blueprint, Response, jsonify
+
+from src.services.job_queue import JOB_QUEUE
+from utils import json_utils
+
+job_bp = Blueprint("jobs", __name__)
+
+
+@job_bp.route("/jobs/<job_id>", methods=["GET"])
+def get_job(job_id):
+    """查询后台任务状态：queued / running / succeeded / failed，以及进度、尝试次数、结果或错误"""
+    job = JOB_QUEUE.get(job_id)
+    if job is None:
+        return jsonify({"success": False, "message": "任务不存在或已过期"}), 404
+    return jsonify({"success": True, "job": job})
+
+
+@job_bp.route("/jobs/<job_id>/events", methods=["GET"])
+def job_events(job_id):
+    """使用 SSE 推送任务进度，任务结束后关闭连接"""
+    if JOB_QUEUE.get(job_id) is None:
+        return jsonify({"success": False, "message": "任务不存在或已过期"}), 404
+
+    def generate_events():
+        for job in JOB_QUEUE.watch(job_id):
+            if job is None:
+                yield ": keep-alive\n\n"
+            else:
+                yield f"data: {json_utils.dumps(job)}\n\n"
+
+    return Response(generate_events(), mimetype="text/event-stream")
@@ -0,0 +1,35 @@
+# routes/metrics_routes.py
+
+import time
+
+from flask import Blueprint, Response, g, request
+
+from configs.app_config import METRICS_TOKEN
+from utils.metrics_utils import HTTP_REQUEST_SECONDS, render_metrics
+
+metrics_bp = Blueprint("metrics", __name__)
+
+
+@metrics_bp.before_app_request
+def _start_request_timer():
+    g._request_started = time.perf_counter()
+
+
+@metrics_bp.after_app_request
+def _observe_request_latency(response):
+    started = g.pop("_request_started", None)
+    if started is not None:
+        # 按路由模板统计，避免 /api/configs/<id> 等路径产生大量标签
+        route = request.url_rule.rule if request.url_rule else "unmatched"
+        HTTP_REQUEST_SECONDS.labels(route, request.method, str(response.status_code)).observe(
+            time.perf_counter() - started
+        )
+    return response
+
+
+@metrics_bp.route("/metrics", methods=["GET"])
+def metrics():
+    """Prometheus 文本格式指标；配置了 METRICS_TOKEN 时需携带 Bearer Token"""
+    if METRICS_TOKEN and request.headers.get("Authorization") != f"Bearer {METRICS_TOKEN}":
+        return Response("unauthorized\n", status=401, mimetype="text/plain")
+    return Response(render_metrics(), mimetype="text/plain; version=0.0.4; charset=utf-8")
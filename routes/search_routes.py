@@ -5,11 +5,16 @@ from flask import Blueprint, request, jsonify, Response
 import json
 import logging
 
-from src.pan_operator import create_share, del_share
+from configs.app_config import NETDISK_BATCH_MAX_ITEMS
+from src.pan_operator import create_share_batch
+from src.services.netdisk_jobs import submit_create_share, submit_delete_share
+from src.services.hot_keywords import HOT_KEYWORDS
 from src.services.search_service import (
     generate_search_stream_events,
     search_resources,
 )
+from utils.metrics_utils import ACTIVE_SSE_STREAMS
+from utils.timing_utils import start_timer
 
 logger = logging.getLogger(__name__)
 
@@ -26,10 +31,16 @@ def search_stream():
         return jsonify({"error": "请提供搜索关键词"}), 400
 
     logger.info(f"用户 SSE 搜索关键词: {keyword}")
+    HOT_KEYWORDS.record(keyword)
 
     def generate_events():
-        for payload in generate_search_stream_events(keyword):
-            yield f"data: {payload}\n\n"
+        ACTIVE_SSE_STREAMS.inc()
+        try:
+            for payload in generate_search_stream_events(keyword):
+                yield f"data: {payload}\n\n"
+        finally:
+            ACTIVE_SSE_STREAMS.dec()
+            HOT_KEYWORDS.maybe_flush()
 
     return Response(generate_events(), mimetype="text/event-stream")
 
@@ -45,46 +56,95 @@ def search_api():
     limit = request.args.get("limit", 100, type=int)
     sort = request.args.get("sort", "default")
 
-    success, message, results = search_resources(
-        name=name, cloud_name=cloud_name, resource_type=resource_type, limit=limit, sort=sort
-    )
+    timer = start_timer()
+    with timer.activate():
+        success, message, results = search_resources(
+            name=name, cloud_name=cloud_name, resource_type=resource_type, limit=limit, sort=sort
+        )
 
     if not success:
         status_code = 400 if "至少需要提供" in message else 500
-        return jsonify({"success": False, "message": message}), status_code
+        response = jsonify({"success": False, "message": message})
+        response.status_code = status_code
+    else:
+        response = jsonify({"success": True, "total": len(results), "results": results})
 
-    return jsonify({"success": True, "total": len(results), "results": results})
+    server_timing = timer.server_timing()
+    if server_timing:
+        response.headers["Server-Timing"] = server_timing
+    return response
+
+
+def _job_response(job):
+    """提交任务后的响应：202 + 任务 ID 与状态查询地址（幂等键命中时返回已有任务）"""
+    return jsonify({
+        "success": True,
+        "job_id": job["id"],
+        "status": job["status"],
+        "deduplicated": not job["created"],
+        "status_url": f"/jobs/{job['id']}",
+        "events_url": f"/jobs/{job['id']}/events",
+    }), 202
 
 
 @search_bp.route("/create_share", methods=["POST"])
 def create_share_route():
+    """提交转存任务，立即返回任务 ID；可通过 Idempotency-Key 请求头指定幂等键"""
     try:
         share_data = request.get_json()
         if not share_data:
             return jsonify({"error": "缺少参数"}), 400
-        result = create_share(share_data)
-        if result:
-            logger.info(f"分享创建成功: {share_data.get('title')}")
-            return jsonify({"message": '分享创建成功', "success": True}), 200
-            logger.warning(f"分享创建失败: {share_data.get('title')}")
-            return jsonify({"error": "分享创建失败"}), 500
+        job = submit_create_share(share_data, request.headers.get("Idempotency-Key"))
+        logger.info(f"已提交转存任务 {job['id']}: {share_data.get('title')}")
+        return _job_response(job)
     except Exception as e:
         logger.error(f"创建分享时发生未知错误: {str(e)}", exc_info=True)
         return jsonify({"error": f"发生未知错误: {str(e)}"}), 500
 
 
+@search_bp.route("/create_share/batch", methods=["POST"])
+def create_share_batch_route():
+    """
+    批量转存分享链接。
+    请求: {"items": [{"share_url": ..., "title": ..., ...}], "save_to_netdisk": {"quark": true, "baidu": true}}
+    返回每个链接的处理结果: {"results": {share_url: {"status": "transferred" / "skipped" / "failed", ...}}}
+    """
+    try:
+        data = request.get_json(silent=True) or {}
+        items = data.get("items")
+        if not isinstance(items, list) or not items:
+            return jsonify({"error": "缺少参数 items"}), 400
+        if len(items) > NETDISK_BATCH_MAX_ITEMS:
+            return jsonify({"error": f"单次最多 {NETDISK_BATCH_MAX_ITEMS} 条"}), 400
+        if not all(isinstance(item, dict) for item in items):
+            return jsonify({"error": "items 的每一项都需要是对象"}), 400
+        if not all(item.get("share_url") for item in items):
+            return jsonify({"error": "每一项都需要提供 share_url"}), 400
+        if not all(isinstance(flags, (dict, type(None)))
+                   for flags in [data.get("save_to_netdisk")] + [item.get("save_to_netdisk") for item in items]):
+            return jsonify({"error": "save_to_netdisk 需要是对象"}), 400
+
+        results = create_share_batch(items, data.get("save_to_netdisk"))
+        summary = {status: 0 for status in ("transferred", "skipped", "failed")}
+        for result in results.values():
+            summary[result["status"]] += 1
+        logger.info(f"批量转存: {summary}")
+        return jsonify({"success": True, "total": len(results), **summary, "results": results}), 200
+    except Exception as e:
+        logger.error(f"批量创建分享时发生未知错误: {str(e)}", exc_info=True)
+        return jsonify({"error": f"发生未知错误: {str(e)}"}), 500
+
+
 @search_bp.route("/del_share", methods=["POST"])
 def del_share_route():
+    """提交删除分享任务，立即返回任务 ID"""
     try:
         share_data = request.get_json()
         if not share_data:
             return jsonify({"error": "缺少参数"}), 400
-        result = del_share(share_data)
-        if result:
-            logger.info(f"分享删除成功: URL={share_data.get('share_url')}")
-            return jsonify({"message": "分享删除成功", "success": True}), 200
-            logger.warning(f"分享删除失败: URL={share_data.get('share_url')}")
-            return jsonify({"error": "分享删除失败"}), 500
+        job = submit_delete_share(share_data, request.headers.get("Idempotency-Key"))
+        logger.info(f"已提交删除任务 {job['id']}: URL={share_data.get('share_url')}")
+        return _job_response(job)
     except Exception as e:
         logger.error(f"删除分享时发生未知错误: {str(e)}", exc_info=True)
-        return jsonify({"error": f"发生未知错误: {str(e)}"}), 500
\ No newline at end of file
+        return jsonify({"error": f"发生未知错误: {str(e)}"}), 500
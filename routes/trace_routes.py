@@ -0,0 +1,29 @@
+# routes/trace_routes.py
+
+from flask import Blueprint, jsonify, render_template, request
+
+from utils.auth_utils import token_required
+from utils.trace_utils import load_slowest_traces
+
+trace_bp = Blueprint("trace", __name__)
+
+
+def _limit_arg(default: int = 20) -> int:
+    try:
+        return max(1, min(int(request.args.get("limit", default)), 200))
+    except ValueError:
+        return default
+
+
+@trace_bp.route("/traces", methods=["GET"])
+@token_required
+def traces_page():
+    """最慢搜索链路页面，展示每个上游 API 的瀑布图 (需要 JWT 验证)"""
+    return render_template("traces.html", traces=load_slowest_traces(_limit_arg()))
+
+
+@trace_bp.route("/api/traces", methods=["GET"])
+@token_required
+def get_traces():
+    """按耗时倒序返回已导出的链路 (需要 JWT 验证)"""
+    return jsonify(load_slowest_traces(_limit_arg()))
@@ -18,6 +18,19 @@ CREATE TABLE `api_config` (
   `status` tinyint(1) NOT NULL DEFAULT 0 COMMENT 'API 状态 (1=true, 0=false)',
   `response_time_ms` int(11) DEFAULT 0 COMMENT '最近一次测试响应时间（毫秒）',
   `is_enabled` tinyint(1) NOT NULL DEFAULT 1 COMMENT '启用状态：1为启用，0为禁用',
+  `max_body_kb` int(11) DEFAULT NULL COMMENT '响应体大小上限(KB)，为空使用全局默认',
+  `max_items` int(11) DEFAULT NULL COMMENT '最多提取条数，为空使用全局默认',
+  `rate_limit_per_sec` float DEFAULT NULL COMMENT '每秒请求数上限，为空使用全局默认',
+  `rate_limit_burst` int(11) DEFAULT NULL COMMENT '突发请求数上限（令牌桶容量），为空使用全局默认',
+  `success_rate` float DEFAULT NULL COMMENT '健康检查成功率 (EWMA, 0~1)',
+  `last_probe_at` datetime DEFAULT NULL COMMENT '最近一次健康检查时间',
+  `auto_disabled` tinyint(1) NOT NULL DEFAULT 0 COMMENT '是否为自动禁用 (恢复后自动启用)',
+  `avg_results` float DEFAULT NULL COMMENT '实际搜索中每次保留的结果数 (EWMA)',
+  `error_rate` float DEFAULT NULL COMMENT '实际搜索中的失败率 (EWMA)',
+  `avg_latency_ms` int(11) DEFAULT NULL COMMENT '实际搜索中的耗时 (EWMA, 毫秒)',
+  `unique_ratio` float DEFAULT NULL COMMENT '去重后独有链接占比 (EWMA)',
+  `score` float DEFAULT NULL COMMENT '上游评分：每秒带来的独有有效结果数',
+  `score_samples` int(11) NOT NULL DEFAULT 0 COMMENT '评分样本数',
   `created_at` datetime DEFAULT CURRENT_TIMESTAMP COMMENT '创建时间',
   `updated_at` datetime DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP COMMENT '更新时间',
   PRIMARY KEY (`id`),
@@ -31,19 +44,100 @@ DROP TABLE IF EXISTS `resources`;
 CREATE TABLE `resources` (
   `id` int(11) NOT NULL AUTO_INCREMENT,
   `file_id` varchar(255) DEFAULT NULL,
+  `account_id` int(11) DEFAULT NULL COMMENT '转存所用的网盘账号 (cookie_config.id)，删除文件时使用同一账号',
   `name` varchar(255) NOT NULL,
   `share_link` text NOT NULL,
   `cloud_name` varchar(100) NOT NULL,
   `type` varchar(50) DEFAULT NULL,
   `remarks` text DEFAULT NULL,
   `is_replaced` BOOLEAN DEFAULT FALSE,
+  `is_alive` BOOLEAN DEFAULT NULL COMMENT '分享链接是否有效 (NULL 未检查)',
+  `last_checked_at` timestamp NULL DEFAULT NULL COMMENT '最近一次有效性检查时间',
+  `reshare_failures` int(11) NOT NULL DEFAULT 0 COMMENT '重新分享连续失败次数',
+  `reshare_retry_at` timestamp NULL DEFAULT NULL COMMENT '重新分享失败后下次重试的时间 (NULL 不限)',
   `created_at` timestamp NOT NULL DEFAULT CURRENT_TIMESTAMP,
   `updated_at` timestamp NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
   PRIMARY KEY (`id`),
   UNIQUE KEY `uk_file_id` (`file_id`),
-  UNIQUE KEY `uk_share_link` (`share_link`(255))
+  UNIQUE KEY `uk_share_link` (`share_link`(255)),
+  KEY `idx_last_checked_at` (`last_checked_at`),
+  KEY `idx_is_replaced_id` (`is_replaced`, `id`)
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
 
+-- ----------------------------
+-- Table structure for `upstream_route_stats`
+-- ----------------------------
+DROP TABLE IF EXISTS `upstream_route_stats`;
+CREATE TABLE `upstream_route_stats` (
+  `feature` varchar(64) NOT NULL COMMENT '关键词特征 (g:字符二元组 / t:资源类型 / *:全局)',
+  `api_id` int(11) NOT NULL COMMENT 'api_config.id',
+  `queries` int(11) NOT NULL DEFAULT 0 COMMENT '带有该特征的搜索中请求该上游的次数',
+  `hits` int(11) NOT NULL DEFAULT 0 COMMENT '其中返回了保留结果的次数',
+  `updated_at` datetime DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP COMMENT '更新时间',
+  PRIMARY KEY (`feature`, `api_id`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci COMMENT='按关键词特征统计的上游命中情况';
+
+-- ----------------------------
+-- Table structure for `hot_keywords`
+-- ----------------------------
+DROP TABLE IF EXISTS `hot_keywords`;
+CREATE TABLE `hot_keywords` (
+  `keyword` varchar(191) NOT NULL COMMENT '搜索关键词（已合并空白）',
+  `hits` double NOT NULL DEFAULT 0 COMMENT '按半衰期衰减后的搜索次数（截至 updated_at）',
+  `updated_at` datetime NOT NULL DEFAULT CURRENT_TIMESTAMP COMMENT '最近一次累加时间',
+  PRIMARY KEY (`keyword`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci COMMENT='热门搜索关键词（用于缓存预热）';
+
+-- ----------------------------
+-- Table structure for `search_analytics`
+-- ----------------------------
+DROP TABLE IF EXISTS `search_analytics`;
+CREATE TABLE `search_analytics` (
+  `id` bigint(20) NOT NULL AUTO_INCREMENT COMMENT '主键',
+  `keyword` varchar(191) NOT NULL COMMENT '搜索关键词',
+  `searched_at` datetime(3) NOT NULL COMMENT '搜索开始时间',
+  `cache_status` varchar(16) NOT NULL COMMENT '上游结果缓存 (miss / fresh / stale / refresh)',
+  `completed` tinyint(1) NOT NULL DEFAULT 1 COMMENT '是否完整结束 (0=客户端中途断开)',
+  `db_results` int(11) NOT NULL DEFAULT 0 COMMENT '内部数据库结果数',
+  `upstream_results` int(11) NOT NULL DEFAULT 0 COMMENT '推送的上游结果数（去重后，含缓存）',
+  `upstream_calls` int(11) NOT NULL DEFAULT 0 COMMENT '实际请求的上游数',
+  `source_counts` text COMMENT '各上游返回的结果数 (JSON: {api 名称: 条数})',
+  `first_result_ms` int(11) DEFAULT NULL COMMENT '首条结果耗时 (毫秒)，无结果为 NULL',
+  `latency_ms` int(11) NOT NULL COMMENT '整个搜索流耗时 (毫秒)',
+  PRIMARY KEY (`id`),
+  KEY `idx_searched_at` (`searched_at`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci COMMENT='搜索分析明细（批量异步写入）';
+
+-- ----------------------------
+-- Table structure for `share_transfers`
+-- ----------------------------
+DROP TABLE IF EXISTS `share_transfers`;
+CREATE TABLE `share_transfers` (
+  `source_key` varchar(191) NOT NULL COMMENT '源分享链接规范化键 (网盘:分享 ID)',
+  `source_url` text NOT NULL COMMENT '最近一次转存使用的源分享链接',
+  `cloud_name` varchar(100) NOT NULL COMMENT '网盘名称',
+  `account_id` int(11) DEFAULT NULL COMMENT '转存所用的网盘账号 (cookie_config.id)',
+  `file_id` varchar(255) DEFAULT NULL COMMENT '转存后的文件 ID（百度为文件路径）',
+  `file_name` varchar(255) DEFAULT NULL COMMENT '转存后的文件名',
+  `share_link` text NOT NULL COMMENT '重新分享的链接',
+  `created_at` timestamp NOT NULL DEFAULT CURRENT_TIMESTAMP COMMENT '转存时间',
+  `verified_at` timestamp NOT NULL DEFAULT CURRENT_TIMESTAMP COMMENT '最近一次确认分享仍有效的时间',
+  PRIMARY KEY (`source_key`),
+  KEY `idx_share_link` (`share_link`(191))
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci COMMENT='转存记录（源分享链接 -> 我方文件与分享链接）';
+
+-- ----------------------------
+-- Table structure for `pipeline_checkpoints`
+-- ----------------------------
+DROP TABLE IF EXISTS `pipeline_checkpoints`;
+CREATE TABLE `pipeline_checkpoints` (
+  `name` varchar(64) NOT NULL COMMENT '流水线名称',
+  `last_id` int(11) NOT NULL DEFAULT 0 COMMENT '已处理到的资源 ID（按 ID 键集分页）',
+  `report` text DEFAULT NULL COMMENT '最近一次运行的吞吐统计 (JSON)',
+  `updated_at` timestamp NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+  PRIMARY KEY (`name`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci COMMENT='后台流水线进度（重启后从此处继续）';
+
 -- ----------------------------
 -- Test data for `api_config`
 -- ----------------------------
@@ -72,12 +166,24 @@ DROP TABLE IF EXISTS `cookie_config`;
 CREATE TABLE `cookie_config` (
   `id` int(11) NOT NULL AUTO_INCREMENT COMMENT '主键',
   `cloud_name` varchar(100) NOT NULL COMMENT '云盘名称',
+  `account_name` varchar(100) NOT NULL DEFAULT 'default' COMMENT '账号名称（同一网盘内唯一）',
   `cookie` text NOT NULL COMMENT 'Cookie内容',
+  `weight` int(11) NOT NULL DEFAULT 1 COMMENT '分配权重',
+  `daily_quota` int(11) DEFAULT NULL COMMENT '每日转存次数上限，为空不限',
+  `is_enabled` tinyint(1) NOT NULL DEFAULT 1 COMMENT '是否参与分配',
+  `status` varchar(16) NOT NULL DEFAULT 'ok' COMMENT '健康状态 (ok / rate_limited / expired)',
+  `cooldown_until` datetime DEFAULT NULL COMMENT '被限流后暂停分配至此时间',
+  `last_error` varchar(255) DEFAULT NULL COMMENT '最近一次失败原因',
+  `quota_date` date DEFAULT NULL COMMENT 'transfers_today 对应的日期',
+  `transfers_today` int(11) NOT NULL DEFAULT 0 COMMENT '当日成功操作次数',
+  `total_transfers` bigint(20) NOT NULL DEFAULT 0 COMMENT '累计成功操作次数',
+  `total_failures` bigint(20) NOT NULL DEFAULT 0 COMMENT '累计失败次数',
+  `last_used_at` datetime DEFAULT NULL COMMENT '最近一次使用时间',
   `created_at` timestamp NOT NULL DEFAULT CURRENT_TIMESTAMP COMMENT '创建时间',
   `updated_at` timestamp NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP COMMENT '更新时间',
   PRIMARY KEY (`id`),
-  UNIQUE KEY `uk_cloud_name` (`cloud_name`)
-) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci COMMENT='云盘Cookie配置表';
+  UNIQUE KEY `uk_cloud_account` (`cloud_name`, `account_name`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci COMMENT='云盘账号 (Cookie) 配置表，同一网盘可配置多个账号';
 
 -- ----------------------------
 -- Test data for `resources`
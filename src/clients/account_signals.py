@@ -0,0 +1,42 @@
+import time
+from typing import Iterable, Optional
+
+EXPIRED = "expired"
+RATE_LIMITED = "rate_limited"
+
+
+class AccountSignals:
+    """
+    客户端观测到的账号级故障（登录失效 / 被限流）及其时间。
+    网盘接口失败时账号池据此区分是账号的问题（换账号重试）还是分享链接本身的问题（直接失败）。
+    同一客户端被多个线程共享，这里只记录最近一次发生的时间，调用方用 since(操作开始时间) 判断。
+    """
+
+    def __init__(self, expired_markers: Iterable[bytes] = (), rate_limited_markers: Iterable[bytes] = ()) -> None:
+        self.expired_markers = tuple(expired_markers)
+        self.rate_limited_markers = tuple(rate_limited_markers)
+        self._seen = {EXPIRED: 0.0, RATE_LIMITED: 0.0}
+
+    def mark(self, kind: str) -> None:
+        self._seen[kind] = time.time()
+
+    def since(self, started_at: float) -> Optional[str]:
+        """started_at 之后出现过的账号级故障，登录失效优先"""
+        for kind in (EXPIRED, RATE_LIMITED):
+            if self._seen[kind] >= started_at:
+                return kind
+        return None
+
+    def response_hook(self, response, *args, **kwargs):
+        """requests Session 的响应钩子：按状态码和响应体特征识别账号级故障"""
+        if response.status_code == 401:
+            self.mark(EXPIRED)
+        elif response.status_code == 429:
+            self.mark(RATE_LIMITED)
+        elif self.expired_markers or self.rate_limited_markers:
+            body = response.content[:512]
+            if any(marker in body for marker in self.expired_markers):
+                self.mark(EXPIRED)
+            elif any(marker in body for marker in self.rate_limited_markers):
+                self.mark(RATE_LIMITED)
+        return response
@@ -4,10 +4,29 @@ import time
 import json
 import random
 import logging
-from typing import Tuple, List, Optional
+import threading
+from typing import Dict, List, Optional, Set, Tuple
+
+from requests.adapters import HTTPAdapter
+
+from configs.app_config import (
+    BAIDU_DIR_CACHE_TTL,
+    BAIDU_LIST_MAX_PAGES,
+    BAIDU_LIST_PAGE_SIZE,
+    NETDISK_BDSTOKEN_TTL,
+    NETDISK_POOL_MAXSIZE,
+)
+from .account_signals import EXPIRED, RATE_LIMITED, AccountSignals
+from .batch_utils import map_limited
+from .dir_cache import DirectoryCache, split_path
 
 logger = logging.getLogger(__name__)
 
+# 百度接口返回这些 errno 时视为登录态 / bdstoken 失效，刷新 bdstoken 后重试一次
+_AUTH_ERRNOS = {-6}
+# 需要验证码，通常是请求过于频繁
+_RATE_LIMIT_ERRNOS = {-62}
+
 
 class Baidu:
     """
@@ -24,8 +43,56 @@ class Baidu:
             'Cookie': cookie
         }
         self.session.headers.update(self.headers)
-        # 获取 bdstoken 用于后续操作（部分操作需要，部分不需要，预留）
-        self.bdstoken = self._get_bdstoken()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=NETDISK_POOL_MAXSIZE)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        # bdstoken 首次使用时获取，按 TTL 缓存，接口返回登录失效时刷新
+        self._bdstoken = ""
+        self._bdstoken_expires = 0.0
+        self._bdstoken_ttl = NETDISK_BDSTOKEN_TTL
+        self._bdstoken_lock = threading.Lock()
+        # 提取码验证结果保存在 Session 的 Cookie 中，同一实例的转存流程需串行执行
+        self._store_lock = threading.Lock()
+        self.signals = AccountSignals()
+        self.session.hooks["response"].append(self.signals.response_hook)
+        # 目录列表缓存 {文件名: fs_id}，查找已有文件的 fs_id 时避免反复列目录
+        self._dir_cache = DirectoryCache(BAIDU_DIR_CACHE_TTL)
+
+    @property
+    def bdstoken(self) -> str:
+        if time.monotonic() >= self._bdstoken_expires:
+            with self._bdstoken_lock:
+                if time.monotonic() >= self._bdstoken_expires:
+                    self._refresh_bdstoken()
+        return self._bdstoken
+
+    def _refresh_bdstoken(self) -> None:
+        token = self._get_bdstoken()
+        self._bdstoken = token
+        # 获取失败时 30 秒后再试，避免每个请求都去重新获取
+        self._bdstoken_expires = time.monotonic() + (self._bdstoken_ttl if token else 30)
+
+    def invalidate_bdstoken(self) -> None:
+        with self._bdstoken_lock:
+            self._bdstoken_expires = 0.0
+
+    def close(self) -> None:
+        self.session.close()
+
+    def _call(self, method: str, url: str, params: Optional[dict] = None, data: Optional[dict] = None) -> dict:
+        """发起请求并返回 JSON；登录态失效时刷新 bdstoken 重试一次"""
+        res = self.session.request(method, url, params=params, data=data)
+        js = res.json()
+        if js.get("errno") in _AUTH_ERRNOS and params is not None and "bdstoken" in params:
+            logger.warning(f"百度接口返回登录失效 (errno: {js.get('errno')})，刷新 bdstoken 后重试")
+            self.invalidate_bdstoken()
+            params = {**params, "bdstoken": self.bdstoken}
+            js = self.session.request(method, url, params=params, data=data).json()
+            if js.get("errno") in _AUTH_ERRNOS:
+                self.signals.mark(EXPIRED)
+        if js.get("errno") in _RATE_LIMIT_ERRNOS:
+            self.signals.mark(RATE_LIMITED)
+        return js
 
     def store(self, share_url: str, to_dir: str = '/') -> Tuple[Optional[str], Optional[str], Optional[str]]:
         """
@@ -34,24 +101,73 @@ class Baidu:
         :param to_dir: 转存目标目录，默认为根目录
         :return: (文件路径, 文件名, 新分享链接)
         """
+        return self.store_many([share_url], to_dir)[share_url]
+
+    def store_many(self, share_urls: List[str], to_dir: str = '/') -> Dict[str, Tuple[Optional[str], Optional[str], Optional[str]]]:
+        """
+        批量转存并重新分享。
+        转存需要先验证提取码（结果保存在 Session 的 Cookie 中），因此各链接的转存在同一实例上串行执行；
+        转存接口返回了新 fs_id 的直接使用，其余只列一次目标目录解析，再并发（受限速）创建分享。
+        :return: {分享链接: (文件路径, 文件名, 新分享链接)}；转存失败为 (None, None, None)，已转存但分享失败时新分享链接为 ""
+        """
+        share_urls = list(dict.fromkeys(share_urls))
+        results = {url: (None, None, None) for url in share_urls}
+        rate_key = "netdisk:百度网盘"
+
+        # 1. 逐个转存（解析链接 -> 验证提取码 -> 解析分享页 -> 转存）
+        with self._store_lock:
+            stored = map_limited(lambda url: self._transfer_share(url, to_dir), share_urls, rate_key, concurrency=1)
+        transferred = {url: item for url, item in zip(share_urls, stored) if item}
+        if not transferred:
+            return results
+
+        # 2. 百度转存后 fs_id 会变。转存接口通常直接返回新 fs_id（异步转存时没有），
+        #    缺失的到目标目录查询：新文件排在按时间倒序的前面，找齐即停止翻页，一次覆盖整批
+        fs_ids = {name: fs_id for name, fs_id in transferred.values() if fs_id}
+        missing = {name for name, fs_id in transferred.values() if not fs_id}
+        if missing:
+            fs_ids.update(self._get_file_ids_in_dir(to_dir, missing, refresh=True))
+
+        # 3. 创建新的分享链接
+        def share(url):
+            fs_id = fs_ids.get(transferred[url][0])
+            return self._create_share(fs_id) if fs_id else None
+
+        links = map_limited(share, list(transferred), rate_key)
+        for (url, (file_name, _)), link in zip(transferred.items(), links):
+            full_path = f"{to_dir.rstrip('/')}/{file_name}" if to_dir != '/' else f"/{file_name}"
+            if not fs_ids.get(file_name):
+                # 文件已存，但无法分享；仍返回路径以便后续清理
+                logger.error(f"无法获取转存后的文件ID: {full_path}")
+            elif not link:
+                logger.error(f"创建新分享失败: {full_path}")
+            # 注意：这里返回 full_path 作为 file_id，因为百度的删除接口通常需要路径
+            results[url] = (full_path, file_name, link or "")
+        return results
+
+    def _transfer_share(self, share_url: str, to_dir: str) -> Optional[Tuple[str, Optional[int]]]:
+        """
+        把分享中的（第一个）文件转存到 to_dir，返回 (转存后的文件名, 新 fs_id)，接口未返回 fs_id 时为 None；
+        失败返回 None。调用方需持有 _store_lock
+        """
         try:
             # 1. 解析链接和提取码
             surl, pwd = self._parse_share_url(share_url)
             if not surl:
                 logger.error(f"百度链接解析失败: {share_url}")
-                return None, None, None
+                return None
 
             # 2. 验证提取码 (如果有)
             if pwd:
                 if not self._verify_pwd(surl, pwd):
                     logger.error(f"百度提取码验证失败: {surl} {pwd}")
-                    return None, None, None
+                    return None
 
             # 3. 获取分享文件详情 (解析HTML)
             info = self._get_share_page_info(surl)
             if not info:
                 logger.error("无法获取百度分享页面详情")
-                return None, None, None
+                return None
 
             shareid, from_uk, fs_id_list, file_names = info
 
@@ -59,33 +175,33 @@ class Baidu:
             target_fs_id = fs_id_list[0]
             file_name = file_names[0]
 
-            # 4. 执行转存
-            if not self._transfer_file(shareid, from_uk, [target_fs_id], to_dir):
+            # 4. 执行转存（重名时接口会自动重命名，以接口返回的目标路径为准）
+            stored = self._transfer_file(shareid, from_uk, [target_fs_id], to_dir)
+            if stored is None:
                 logger.error(f"转存文件失败: {file_name}")
-                return None, None, None
-
-            # 5. 获取转存后的新文件信息 (为了获取新的 fs_id 用于分享)
-            # 百度转存后 fs_id 会变，且转存接口不直接返回新 fs_id，需要去目标目录查询
-            full_path = f"{to_dir.rstrip('/')}/{file_name}" if to_dir != '/' else f"/{file_name}"
-            new_fs_id = self._get_file_id_by_path(full_path)
-
-            if not new_fs_id:
-                logger.error(f"无法获取转存后的文件ID: {full_path}")
-                # 尝试用原始路径返回，虽然可能导致后续分享失败，但文件已存
-                return full_path, file_name, ""
-
-            # 6. 创建新的分享链接
-            new_share_link = self._create_share(new_fs_id)
-            if not new_share_link:
-                logger.error("创建新分享失败")
-                return full_path, file_name, ""
-
-            # 注意：这里返回 full_path 作为 file_id，因为百度的删除接口通常需要路径
-            return full_path, file_name, new_share_link
+                return None
+            for path, new_fs_id in stored.items():
+                target_dir, file_name = split_path(path)
+                self._dir_cache.add(target_dir, file_name, new_fs_id)
+                return file_name, new_fs_id
+            return file_name, None
 
         except Exception as e:
             logger.error(f"百度网盘 Store 操作异常: {e}")
-            return None, None, None
+            return None
+
+    def is_share_alive(self, share_url: str) -> bool:
+        """分享是否仍可访问：有提取码时验证提取码，否则解析分享页"""
+        surl, pwd = self._parse_share_url(share_url)
+        if not surl:
+            return False
+        # 验证提取码会改写 Session 中的分享 Cookie，与转存流程互斥
+        with self._store_lock:
+            try:
+                return self._verify_pwd(surl, pwd) if pwd else self._get_share_page_info(surl) is not None
+            except Exception as e:
+                logger.warning(f"检查百度分享有效性失败: {share_url} {e}")
+                return False
 
     def del_file(self, file_path_list: List[str]) -> bool:
         """
@@ -115,16 +231,17 @@ class Baidu:
 
         try:
             # 百度删除接口通常需要 POST 表单数据
-            res = self.session.post(url, params=params, data=payload)
-            data = res.json()
-
-            if data.get("errno") == 0:
-                # errno 0 表示删除请求已成功提交，即使是异步任务也视为成功
-                logger.info(f"文件删除请求提交成功 (Task ID: {data.get('taskid')})")
-                return True
-            # errno 2: 文件不存在，可能是重复删除，也可以视为成功
-            elif data.get("errno") == 2:
-                logger.warning(f"文件不存在 (errno: 2)，可能已被删除: {file_path_list}")
+            data = self._call("POST", url, params=params, data=payload)
+
+            if data.get("errno") in (0, 2):
+                if data.get("errno") == 0:
+                    # errno 0 表示删除请求已成功提交，即使是异步任务也视为成功
+                    logger.info(f"文件删除请求提交成功 (Task ID: {data.get('taskid')})")
+                else:
+                    # errno 2: 文件不存在，可能是重复删除，也可以视为成功
+                    logger.warning(f"文件不存在 (errno: 2)，可能已被删除: {file_path_list}")
+                for path in file_path_list:
+                    self._dir_cache.remove(*split_path(path))
                 return True
             else:
                 logger.error(f"文件删除请求失败, errno: {data.get('errno')}, 错误详情: {data}")
@@ -185,8 +302,7 @@ class Baidu:
         }
         data = {"pwd": pwd, "vcode": "", "vcode_str": ""}
         try:
-            res = self.session.post(url, params=params, data=data)
-            js = res.json()
+            js = self._call("POST", url, params=params, data=data)
             if js.get("errno") == 0:
                 return True
             logger.warning(f"验证码错误: {js}")
@@ -218,8 +334,8 @@ class Baidu:
             logger.error(f"解析页面异常: {e}")
             return None
 
-    def _transfer_file(self, shareid: str, from_uk: str, fs_id_list: list, to_path: str) -> bool:
-        """转存文件"""
+    def _transfer_file(self, shareid: str, from_uk: str, fs_id_list: list, to_path: str) -> Optional[Dict[str, int]]:
+        """转存文件，返回 {转存后的路径: 新 fs_id}（异步转存时接口不返回明细，为空字典）；失败返回 None"""
         url = "https://pan.baidu.com/share/transfer"
         params = {
             "shareid": shareid,
@@ -237,49 +353,77 @@ class Baidu:
             "path": to_path
         }
         try:
-            res = self.session.post(url, params=params, data=data)
-            js = res.json()
+            js = self._call("POST", url, params=params, data=data)
             if js.get("errno") == 0:
-                return True
+                # 同步完成时 extra.list 为 [{"from", "to", "from_fs_id", "to_fs_id"}, ...]
+                items = (js.get("extra") or {}).get("list") or []
+                return {item["to"]: item["to_fs_id"] for item in items if item.get("to") and item.get("to_fs_id")}
             logger.error(f"转存API返回错误: {js}")
-            return False
+            return None
         except Exception as e:
             logger.error(f"转存请求异常: {e}")
-            return False
+            return None
 
     def _get_file_id_by_path(self, path: str) -> Optional[int]:
-        """根据路径获取文件的 fs_id (用于转存后分享)"""
-        # 获取父目录和文件名
-        if path == '/': return None
-        if path.endswith('/'): path = path[:-1]
-
-        dir_path, filename = path.rsplit('/', 1)
-        if not dir_path: dir_path = '/'
+        """根据路径获取文件的 fs_id（优先使用目录列表缓存）"""
+        if path.rstrip('/') == '':
+            return None
+        dir_path, filename = split_path(path)
+        return self._get_file_ids_in_dir(dir_path, {filename}).get(filename)
 
+    def _get_file_ids_in_dir(self, dir_path: str, filenames: Set[str], refresh: bool = False) -> Dict[str, int]:
+        """
+        返回 {文件名: fs_id}（只包含 filenames 中找到的）。
+        先查目录列表缓存，缓存未命中或 refresh（查找刚转存的文件）时按修改时间倒序分页列目录，
+        找齐即停止；列出的条目写入缓存。
+        """
+        if not refresh:
+            found, complete = self._dir_cache.lookup(dir_path, filenames)
+            if complete or len(found) == len(filenames):
+                return found
+
+        files: Dict[str, int] = {}
+        complete = False
+        for page in range(1, BAIDU_LIST_MAX_PAGES + 1):
+            entries = self._list_dir_page(dir_path, page)
+            if entries is None:
+                break
+            for f in entries:
+                # 倒序列出，同名文件以最新的为准
+                files.setdefault(f.get("server_filename"), f.get("fs_id"))
+            if len(entries) < BAIDU_LIST_PAGE_SIZE:
+                complete = True
+                break
+            if filenames <= files.keys():
+                break
+        else:
+            logger.warning(f"目录 {dir_path} 超过 {BAIDU_LIST_MAX_PAGES} 页，未列完")
+
+        if files:
+            self._dir_cache.put(dir_path, files, complete)
+        return {name: files[name] for name in filenames if name in files}
+
+    def _list_dir_page(self, dir_path: str, page: int) -> Optional[List[dict]]:
+        """列目录的一页（按修改时间倒序），失败返回 None"""
         url = "https://pan.baidu.com/api/list"
         params = {
             "dir": dir_path,
             "bdstoken": self.bdstoken,
             "clienttype": 0,
             "web": 1,
-            "page": 1,
-            "num": 1000,  # 假设文件在前1000个
+            "page": page,
+            "num": BAIDU_LIST_PAGE_SIZE,
             "order": "time",
             "desc": 1
         }
         try:
-            res = self.session.get(url, params=params)
-            js = res.json()
+            js = self._call("GET", url, params=params)
             if js.get("errno") != 0:
+                logger.error(f"列目录失败: {dir_path} 第 {page} 页 errno: {js.get('errno')}")
                 return None
-
-            file_list = js.get("list", [])
-            for f in file_list:
-                if f.get("server_filename") == filename:
-                    return f.get("fs_id")
-            return None
+            return js.get("list", [])
         except Exception as e:
-            logger.error(f"查询文件ID异常: {e}")
+            logger.error(f"列目录异常: {e}")
             return None
 
     def _create_share(self, fs_id: int) -> Optional[str]:
@@ -304,8 +448,7 @@ class Baidu:
         data["pwd"] = pwd
 
         try:
-            res = self.session.post(url, params=params, data=data)
-            js = res.json()
+            js = self._call("POST", url, params=params, data=data)
             if js.get("errno") == 0:
                 short_link = js.get("shorturl")
                 # 组合成完整链接
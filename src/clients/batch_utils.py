@@ -0,0 +1,33 @@
+import concurrent.futures
+import logging
+from typing import Any, Callable, List, Sequence
+
+from configs.app_config import NETDISK_BATCH_CONCURRENCY, NETDISK_BATCH_RATE_PER_SEC
+from utils.rate_limit_utils import RATE_LIMITER
+
+logger = logging.getLogger(__name__)
+
+
+def map_limited(fn: Callable[[Any], Any], items: Sequence[Any], rate_key: str,
+                concurrency: int = NETDISK_BATCH_CONCURRENCY, rate: float = NETDISK_BATCH_RATE_PER_SEC,
+                max_wait: float = 60.0) -> List[Any]:
+    """
+    并发执行 fn(item)，按 rate_key 共享令牌桶限速（跨 worker 时取决于 RATE_LIMIT_BACKEND；rate=0 不限速），
+    结果与 items 顺序一致。
+    单项抛异常或等不到令牌时该项结果为 None，不影响其余项。
+    """
+
+    def call(item):
+        if rate > 0 and not RATE_LIMITER.acquire(rate_key, rate, max(1.0, rate), max_wait):
+            logger.warning(f"[{rate_key}] 等待限流超时，跳过: {item}")
+            return None
+        try:
+            return fn(item)
+        except Exception as e:
+            logger.error(f"[{rate_key}] 批量操作失败 ({item}): {e}")
+            return None
+
+    if len(items) <= 1 or concurrency <= 1:
+        return [call(item) for item in items]
+    with concurrent.futures.ThreadPoolExecutor(max_workers=min(concurrency, len(items))) as executor:
+        return list(executor.map(call, items))
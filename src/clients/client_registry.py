@@ -0,0 +1,65 @@
+import hashlib
+import logging
+import threading
+from typing import Any, Dict, Optional, Tuple, Type
+
+from .baidu_client import Baidu
+from .quark_client import Quark
+
+logger = logging.getLogger(__name__)
+
+NETDISK_CLIENTS: Dict[str, Type] = {
+    "夸克网盘": Quark,
+    "百度网盘": Baidu,
+}
+
+
+def cookie_version(cookie: str) -> str:
+    """Cookie 内容的摘要，Cookie 被更新后版本随之变化（多个 worker 无需互相通知）"""
+    return hashlib.sha1(cookie.encode("utf-8")).hexdigest()[:16]
+
+
+class ClientRegistry:
+    """
+    按 (客户端类, 账号, Cookie 版本) 缓存网盘客户端实例，跨请求复用其 Session 连接池和 bdstoken 等状态。
+    每个账号只保留当前 Cookie 版本的实例；Cookie 变化或被 invalidate 时旧实例关闭。
+    """
+
+    def __init__(self) -> None:
+        self._clients: Dict[Tuple[Type, Any], Tuple[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, client_class: Type, cookie: str, account: Any = None):
+        """account 为账号标识（多账号时传 cookie_config.id），不同账号各自一个实例"""
+        key = (client_class, account)
+        version = cookie_version(cookie)
+        with self._lock:
+            entry = self._clients.get(key)
+            if entry is not None and entry[0] == version:
+                return entry[1]
+            stale = entry[1] if entry is not None else None
+            client = client_class(cookie)
+            self._clients[key] = (version, client)
+
+        if stale is not None:
+            logger.info(f"[{client_class.__name__}] Cookie 已更新，替换网盘客户端实例")
+            stale.close()
+        return client
+
+    def invalidate(self, cloud_name: Optional[str] = None) -> None:
+        """丢弃指定网盘（默认全部）所有账号的客户端实例，保存 Cookie 后调用"""
+        classes = {NETDISK_CLIENTS[cloud_name]} if cloud_name in NETDISK_CLIENTS else set(NETDISK_CLIENTS.values())
+        with self._lock:
+            keys = [key for key in self._clients if key[0] in classes]
+            stale = [self._clients.pop(key)[1] for key in keys]
+        for client in stale:
+            client.close()
+
+
+CLIENTS = ClientRegistry()
+
+
+def get_client(cloud_name: str, cookie: str):
+    """按网盘名称获取复用的客户端实例，未知网盘返回 None"""
+    client_class = NETDISK_CLIENTS.get(cloud_name)
+    return CLIENTS.get(client_class, cookie) if client_class else None
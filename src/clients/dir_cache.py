@@ -0,0 +1,75 @@
+import threading
+import time
+from typing import Dict, Iterable, Optional, Tuple
+
+from utils.metrics_utils import record_cache_access
+
+
+def split_path(path: str) -> Tuple[str, str]:
+    """'/a/b.mp4' -> ('/a', 'b.mp4')，根目录下的文件 -> ('/', 'b.mp4')"""
+    dir_path, _, name = path.rstrip('/').rpartition('/')
+    return dir_path or '/', name
+
+
+class DirectoryCache:
+    """
+    网盘目录列表缓存：按目录保存 {文件名: fs_id}，超过 ttl 秒后失效。
+    complete 表示已列出目录的全部文件（可据此判断文件不存在），分页未列完时只作为已知条目使用。
+    转存 / 删除成功后调用 add / remove 增量更新已缓存的目录，未缓存的目录不做处理。
+    """
+
+    def __init__(self, ttl: float, name: str = "baidu_dir") -> None:
+        self.ttl = ttl
+        self.name = name
+        # 目录 -> (加载时间, {文件名: fs_id}, 是否完整)
+        self._dirs: Dict[str, Tuple[float, Dict[str, int], bool]] = {}
+        self._lock = threading.Lock()
+
+    def _entry(self, dir_path: str) -> Optional[Tuple[float, Dict[str, int], bool]]:
+        """在锁内调用：返回未过期的目录缓存"""
+        entry = self._dirs.get(dir_path)
+        if entry is not None and time.monotonic() - entry[0] > self.ttl:
+            del self._dirs[dir_path]
+            return None
+        return entry
+
+    def lookup(self, dir_path: str, names: Iterable[str]) -> Tuple[Dict[str, int], bool]:
+        """返回 ({文件名: fs_id}（只含已知的）, 目录缓存是否完整)"""
+        with self._lock:
+            entry = self._entry(dir_path)
+            if entry is None:
+                found, complete = {}, False
+            else:
+                found = {name: entry[1][name] for name in names if name in entry[1]}
+                complete = entry[2]
+        record_cache_access(self.name, bool(found))
+        return found, complete
+
+    def put(self, dir_path: str, files: Dict[str, int], complete: bool) -> None:
+        """写入一次列目录的结果：完整列表替换原有缓存，部分列表（只翻了前几页）合并到原有缓存"""
+        with self._lock:
+            entry = None if complete else self._entry(dir_path)
+            if entry is None:
+                self._dirs[dir_path] = (time.monotonic(), dict(files), complete)
+            else:
+                # 合并时沿用原有条目的加载时间，避免旧条目一直不过期
+                entry[1].update(files)
+
+    def add(self, dir_path: str, name: str, fs_id: int) -> None:
+        with self._lock:
+            entry = self._entry(dir_path)
+            if entry is not None:
+                entry[1][name] = fs_id
+
+    def remove(self, dir_path: str, name: str) -> None:
+        with self._lock:
+            entry = self._entry(dir_path)
+            if entry is not None:
+                entry[1].pop(name, None)
+
+    def invalidate(self, dir_path: Optional[str] = None) -> None:
+        with self._lock:
+            if dir_path is None:
+                self._dirs.clear()
+            else:
+                self._dirs.pop(dir_path, None)
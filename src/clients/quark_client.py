@@ -4,8 +4,23 @@ import time
 import random
 import logging
 
+from requests.adapters import HTTPAdapter
+
+from configs.app_config import (
+    NETDISK_POOL_MAXSIZE,
+    QUARK_TASK_POLL_FIRST,
+    QUARK_TASK_POLL_INITIAL,
+    QUARK_TASK_POLL_MAX,
+    QUARK_TASK_TIMEOUT,
+)
+from .account_signals import AccountSignals
+from .batch_utils import map_limited
+from .task_poller import poll_until_done
+
 logger = logging.getLogger(__name__)
 
+TASK_STATUS_FINISHED = 2  # 夸克异步任务 status：2 为已完成
+
 
 def ad_check(file_name):
     """
@@ -64,87 +79,101 @@ class Quark:
             'accept-encoding': 'gzip, deflate, br',
             'accept-language': 'zh-CN,zh;q=0.9',
             'cookie': cookie}
+        # 所有请求复用同一个 Session（连接保持），客户端实例由 ClientRegistry 跨请求复用
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=NETDISK_POOL_MAXSIZE)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        # 31001: 未登录（Cookie 失效）
+        self.signals = AccountSignals(expired_markers=(b'"code":31001',))
+        self.session.hooks["response"].append(self.signals.response_hook)
+
+    def close(self) -> None:
+        self.session.close()
 
     def store(self, url: str, to_pdir_fid: str = '0'):  # 添加 to_pdir_fid 参数，默认值为 "0"
-        pwd_id = get_id_from_url(url)
-        stoken = self.get_stoken(pwd_id)
-
-        if not stoken:
-            logger.error(f"获取stoken失败: {pwd_id}")
-            return None, None, None
-
-        detail = self.detail(pwd_id, stoken)
-
-        if not detail:
-            logger.error(f"获取分享详情失败: {pwd_id}")
-            return None, None, None
-
-        file_name = detail.get('title')
-        first_id = detail.get("fid")
-        share_fid_token = detail.get("share_fid_token")
-        file_type = detail.get("file_type")
-
-        if not all([first_id, share_fid_token]):
-            logger.error(f"分享详情缺少必要信息: fid={first_id}, share_fid_token={share_fid_token}")
-            return None, None, None
-
-        task = self.save_task_id(pwd_id, stoken, first_id, share_fid_token, to_pdir_fid)  # 传递 to_pdir_fid 参数
-
-        if not task:
-            logger.error("创建保存任务失败")
-            return None, None, None
-
-        data = self.task(task)
-
-        if not data or not data.get("data"):
-            logger.error("获取保存任务结果失败")
-            return None, None, None
-
-        save_as_data = data.get("data").get("save_as", {})
-        save_as_top_fids = save_as_data.get("save_as_top_fids", [])
-
-        if not save_as_top_fids:
-            logger.error("保存结果中没有找到文件ID")
-            return None, None, None
-
-        file_id = save_as_top_fids[0]
-
-        # if not file_type:
-        #     dir_file_list = self.get_dir_file(file_id)
-        #     self.del_ad_file(dir_file_list)
-        #     self.add_ad(file_id)
-
-        share_task_id = self.share_task_id(file_id, file_name)
-
-        if not share_task_id:
-            logger.error("创建分享任务失败")
-            return None, None, None
-
-        share_task_result = self.task(share_task_id)
-
-        if not share_task_result or not share_task_result.get("data"):
-            logger.error("获取分享任务结果失败")
-            return None, None, None
-
-        share_id = share_task_result.get("data").get("share_id")
-
-        if not share_id:
-            logger.error("分享结果中没有找到分享ID")
-            return None, None, None
-
-        share_link = self.get_share_link(share_id)
-
-        if not share_link:
-            logger.error("获取分享链接失败")
-            return None, None, None
-
-        return file_id, file_name, share_link
+        """转存单个分享链接并重新分享，返回 (file_id, file_name, share_link)，失败为 (None, None, None)"""
+        return self.store_many([url], to_pdir_fid)[url]
+
+    def store_many(self, urls, to_pdir_fid: str = '0'):
+        """
+        批量转存并重新分享。每个阶段（解析分享、提交保存任务、提交分享任务、取分享链接）对所有链接并发执行，
+        其中提交保存 / 分享任务受 NETDISK_BATCH_RATE_PER_SEC 限速；
+        保存 / 分享任务提交后一起轮询，而不是逐个链接走完整条链路。
+        返回 {url: (file_id, file_name, share_link)}，失败的链接为 (None, None, None)。
+        """
+        urls = list(dict.fromkeys(urls))
+        results = {url: (None, None, None) for url in urls}
+        rate_key = "netdisk:夸克网盘"
+
+        # 1. 解析分享：stoken + 详情
+        def prepare(url):
+            pwd_id = get_id_from_url(url)
+            stoken = self.get_stoken(pwd_id)
+            if not stoken:
+                logger.error(f"获取stoken失败: {pwd_id}")
+                return None
+            detail = self.detail(pwd_id, stoken)
+            if not detail or not all([detail.get("fid"), detail.get("share_fid_token")]):
+                logger.error(f"分享详情缺少必要信息: {pwd_id} {detail}")
+                return None
+            return pwd_id, stoken, detail
+
+        prepared = {url: info for url, info in zip(urls, map_limited(prepare, urls, rate_key, rate=0)) if info}
+
+        # 2. 提交保存任务后统一等待
+        def submit_save(url):
+            pwd_id, stoken, detail = prepared[url]
+            return self.save_task_id(pwd_id, stoken, detail["fid"], detail["share_fid_token"], to_pdir_fid)
+
+        save_tasks = {url: task_id for url, task_id in zip(prepared, map_limited(submit_save, list(prepared), rate_key)) if task_id}
+        save_results = self.wait_tasks(save_tasks.values())
+        saved = {}
+        for url, task_id in save_tasks.items():
+            data = (save_results.get(task_id) or {}).get("data") or {}
+            top_fids = (data.get("save_as") or {}).get("save_as_top_fids") or []
+            if top_fids:
+                saved[url] = top_fids[0]
+            else:
+                logger.error(f"保存任务未返回文件ID: {url}")
+
+        # 3. 提交分享任务后统一等待
+        def submit_share(url):
+            return self.share_task_id(saved[url], prepared[url][2].get("title"))
+
+        share_tasks = {url: task_id for url, task_id in zip(saved, map_limited(submit_share, list(saved), rate_key)) if task_id}
+        share_results = self.wait_tasks(share_tasks.values())
+        share_ids = {}
+        for url, task_id in share_tasks.items():
+            share_id = ((share_results.get(task_id) or {}).get("data") or {}).get("share_id")
+            if share_id:
+                share_ids[url] = share_id
+            else:
+                logger.error(f"分享任务未返回分享ID: {url}")
+
+        # 4. 获取分享链接
+        links = map_limited(lambda url: self.get_share_link(share_ids[url]), list(share_ids), rate_key, rate=0)
+        for url, link in zip(share_ids, links):
+            if link:
+                results[url] = (saved[url], prepared[url][2].get("title"), link)
+            else:
+                logger.error(f"获取分享链接失败: {url}")
+        return results
+
+    def is_share_alive(self, share_url: str) -> bool:
+        """分享是否仍可访问（能取到 stoken 即视为有效）"""
+        pwd_id = get_id_from_url(share_url)
+        try:
+            return bool(pwd_id and self.get_stoken(pwd_id))
+        except Exception as e:
+            logger.warning(f"检查夸克分享有效性失败: {share_url} {e}")
+            return False
 
     def get_stoken(self, pwd_id: str):
         url = f"https://drive-pc.quark.cn/1/clouddrive/share/sharepage/token?pr=ucpro&fr=pc&uc_param_str=&__dt=405&__t={generate_timestamp(13)}"
         payload = {"pwd_id": pwd_id, "passcode": ""}
         headers = self.headers
-        response = requests.post(url, json=payload, headers=headers).json()
+        response = self.session.post(url, json=payload, headers=headers).json()
         if response.get("data"):
             return response["data"]["stoken"]
         else:
@@ -160,7 +189,7 @@ class Quark:
             "_page": 1,
             "_size": "50",
         }
-        response = requests.request("GET", url=url, headers=headers, params=params)
+        response = self.session.request("GET", url=url, headers=headers, params=params)
         response_data = response.json().get("data", {})
         file_list = response_data.get("list", [])
 
@@ -194,25 +223,46 @@ class Quark:
                 "fid_token_list": [share_fid_token],
                 "to_pdir_fid": to_pdir_fid, "pwd_id": pwd_id,
                 "stoken": stoken, "pdir_fid": "0", "scene": "link"}
-        response = requests.request("POST", url, json=data, headers=self.headers, params=params)
+        response = self.session.request("POST", url, json=data, headers=self.headers, params=params)
         task_id = response.json().get('data').get('task_id')
         return task_id
 
-    def task(self, task_id, trice=10):
-        """根据task_id进行任务"""
-        logger.info("根据TASKID执行任务")
-        trys = 0
-        for i in range(trice):
-            url = f"https://drive-pc.quark.cn/1/clouddrive/task?pr=ucpro&fr=pc&uc_param_str=&task_id={task_id}&retry_index={i}&__dt=21192&__t={generate_timestamp(13)}"
-            trys += 1
-            try:
-                response = requests.get(url, headers=self.headers).json()
-                if response and response.get('data') and response.get('data').get('status'):
-                    return response
-            except Exception as e:
-                logger.error(f"执行任务时发生异常: {e}")
-        logger.warning(f"任务执行失败或超时: {task_id}")
-        return None
+    def _query_task(self, task_id, retry_index: int = 0):
+        url = f"https://drive-pc.quark.cn/1/clouddrive/task?pr=ucpro&fr=pc&uc_param_str=&task_id={task_id}&retry_index={retry_index}&__dt=21192&__t={generate_timestamp(13)}"
+        return self.session.get(url, headers=self.headers).json()
+
+    @staticmethod
+    def _task_state(response):
+        """任务完成返回 True，进行中返回 False，接口报错返回 None"""
+        if not response:
+            return False
+        if response.get("code") not in (None, 0):
+            return None
+        data = response.get("data") or {}
+        return data.get("status") == TASK_STATUS_FINISHED
+
+    def wait_tasks(self, task_ids, timeout: float = QUARK_TASK_TIMEOUT):
+        """
+        同时等待多个保存 / 分享任务完成（指数退避 + 抖动，总期限 timeout 秒）。
+        返回 {task_id: 任务结果 JSON}，失败或超时的为 None。
+        """
+        task_ids = [task_id for task_id in dict.fromkeys(task_ids) if task_id]
+        if not task_ids:
+            return {}
+        logger.info(f"等待 {len(task_ids)} 个任务完成")
+        return poll_until_done(
+            task_ids,
+            self._query_task,
+            self._task_state,
+            timeout=timeout,
+            initial_delay=QUARK_TASK_POLL_INITIAL,
+            max_delay=QUARK_TASK_POLL_MAX,
+            first_delay=QUARK_TASK_POLL_FIRST,
+        )
+
+    def task(self, task_id, timeout: float = QUARK_TASK_TIMEOUT):
+        """等待单个任务完成，返回任务结果 JSON；失败或超时返回 None"""
+        return self.wait_tasks([task_id], timeout).get(task_id)
 
     def share_task_id(self, file_id, file_name):
         """创建分享任务ID"""
@@ -220,13 +270,13 @@ class Quark:
         data = {"fid_list": [file_id],
                 "title": file_name,
                 "url_type": 1, "expired_type": 1}
-        response = requests.request("POST", url=url, json=data, headers=self.headers)
+        response = self.session.request("POST", url=url, json=data, headers=self.headers)
         return response.json().get("data").get("task_id")
 
     def get_share_link(self, share_id):
         url = "https://drive-pc.quark.cn/1/clouddrive/share/password?pr=ucpro&fr=pc&uc_param_str="
         data = {"share_id": share_id}
-        response = requests.post(url=url, json=data, headers=self.headers)
+        response = self.session.post(url=url, json=data, headers=self.headers)
         return response.json().get("data").get("share_url")
 
     def get_all_file(self) -> list:
@@ -240,7 +290,7 @@ class Quark:
             "_fetch_sub_dirs": 0,
             "_sort": "file_type:asc,updated_at:desc"
         }
-        response = requests.get(url=url, headers=self.headers, params=params)
+        response = self.session.get(url=url, headers=self.headers, params=params)
         return response.json().get('data').get('list')
 
     def get_dir_file(self, dir_id, page: int = 1, size: int = 100) -> list:
@@ -255,7 +305,7 @@ class Quark:
             "_fetch_sub_dirs": 0,
             "_sort": "file_type:asc,updated_at:desc"
         }
-        response = requests.get(url=url, headers=self.headers, params=params)
+        response = self.session.get(url=url, headers=self.headers, params=params)
         files_list = response.json().get('data').get('list')
         return files_list
 
@@ -268,14 +318,14 @@ class Quark:
             "dir_path": "",
             "dir_init_lock": False
         }
-        response = requests.post(url, json=data, headers=self.headers)
+        response = self.session.post(url, json=data, headers=self.headers)
         return response.json()
 
     def rename_dir(self, dir_id: str, new_name: str):
         logger.info(f"重命名目录: {dir_id} 为 {new_name}")
         url = "https://drive-pc.quark.cn/1/clouddrive/file/rename?pr=ucpro&fr=pc&uc_param_str="
         data = {"fid": dir_id, "file_name": new_name}
-        response = requests.post(url, json=data, headers=self.headers)
+        response = self.session.post(url, json=data, headers=self.headers)
         return response.json()
 
     def move_file(self, file_fid: str, to_pdir_fid: str):
@@ -287,25 +337,25 @@ class Quark:
             "filelist": [file_fid],
             "to_pdir_fid": to_pdir_fid
         }
-        response = requests.post(url, json=data, headers=self.headers)
+        response = self.session.post(url, json=data, headers=self.headers)
         return response.json()
 
     def del_file(self, file_id):
-        logger.info("正在删除文件")
+        """删除文件，file_id 可以是单个 fid 或 fid 列表（一次请求删除多个），返回删除任务 ID，失败返回 False"""
+        filelist = file_id if isinstance(file_id, list) else [file_id]
+        logger.info(f"正在删除 {len(filelist)} 个文件")
         url = "https://drive-pc.quark.cn/1/clouddrive/file/delete?pr=ucpro&fr=pc&uc_param_str="
-        data = {"action_type": 2, "filelist": [file_id], "exclude_fids": []}
-        response = requests.post(url=url, json=data, headers=self.headers)
+        data = {"action_type": 2, "filelist": filelist, "exclude_fids": []}
+        response = self.session.post(url=url, json=data, headers=self.headers)
         if response.status_code == 200:
-            return response.json().get("data").get("task_id")
+            return (response.json().get("data") or {}).get("task_id") or False
         return False
 
     def del_ad_file(self, file_list):
         logger.info("删除可能存在广告的文件")
-        for file in file_list:
-            file_name = file.get("file_name")
-            if ad_check(file_name):
-                task_id = self.del_file(file.get("fid"))
-                self.task(task_id)
+        # 先提交全部删除任务，再一起等待完成
+        task_ids = [self.del_file(file.get("fid")) for file in file_list if ad_check(file.get("file_name"))]
+        self.wait_tasks(task_ids)
 
     def add_ad(self, dir_id):
         logger.info("添加个人自定义广告")
@@ -314,14 +364,14 @@ class Quark:
         detail = self.detail(pwd_id, stoken)
         first_id, share_fid_token = detail.get("fid"), detail.get("share_fid_token")
         task_id = self.save_task_id(pwd_id, stoken, first_id, share_fid_token, dir_id)
-        self.task(task_id, 1)
+        self.task(task_id, timeout=5)
         logger.info("广告移植成功")
 
     def search_file(self, file_name):
         logger.info("正在从网盘搜索文件🔍")
         url = "https://drive-pc.quark.cn/1/clouddrive/file/search?pr=ucpro&fr=pc&uc_param_str=&_page=1&_size=50&_fetch_total=1&_sort=file_type:desc,updated_at:desc&_is_hl=1"
         params = {"q": file_name}
-        response = requests.get(url=url, headers=self.headers, params=params)
+        response = self.session.get(url=url, headers=self.headers, params=params)
         return response.json().get('data').get('list')
 
 
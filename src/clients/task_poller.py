@@ -0,0 +1,67 @@
+import logging
+import random
+import time
+from typing import Any, Callable, Dict, Hashable, Iterable, Optional
+
+logger = logging.getLogger(__name__)
+
+
+def poll_until_done(
+    keys: Iterable[Hashable],
+    fetch: Callable[[Hashable, int], Any],
+    is_done: Callable[[Any], Optional[bool]],
+    timeout: float,
+    initial_delay: float = 0.3,
+    max_delay: float = 3.0,
+    multiplier: float = 2.0,
+    first_delay: float = 0.0,
+) -> Dict[Hashable, Any]:
+    """
+    同时轮询多个异步任务，直到全部结束或超过总期限 timeout（秒）。
+    - fetch(key, attempt) 查询一次任务状态，attempt 从 0 开始；抛异常视为本次查询失败，按退避稍后重试
+    - is_done(result) 返回 True 表示完成、False 表示仍在进行、None 表示已失败（不再轮询）
+    每个任务独立退避：间隔从 initial_delay 起按 multiplier 增长至 max_delay，并取 [间隔/2, 间隔] 的随机值，
+    避免多个任务、多个进程同时打到接口。首次查询在 first_delay 秒后进行。
+    返回 {key: 完成时的 result}，失败或超时的任务对应 None。
+    """
+    now = time.monotonic()
+    deadline = now + timeout
+    results: Dict[Hashable, Any] = {}
+    # key -> [下次查询时间, 当前间隔, 已查询次数]
+    pending = {key: [now + first_delay, initial_delay, 0] for key in keys}
+
+    while pending:
+        next_at = min(state[0] for state in pending.values())
+        if next_at >= deadline:
+            break
+        wait = next_at - time.monotonic()
+        if wait > 0:
+            time.sleep(wait)
+
+        now = time.monotonic()
+        for key in [k for k, state in pending.items() if state[0] <= now]:
+            state = pending[key]
+            try:
+                result = fetch(key, state[2])
+                done = is_done(result)
+            except Exception as e:
+                logger.warning(f"查询任务 {key} 状态失败: {e}")
+                result, done = None, False
+            state[2] += 1
+
+            if done is None:
+                logger.error(f"任务 {key} 执行失败: {result}")
+                results[key] = None
+                del pending[key]
+            elif done:
+                results[key] = result
+                del pending[key]
+            else:
+                delay = state[1]
+                state[0] = time.monotonic() + random.uniform(delay / 2, delay)
+                state[1] = min(delay * multiplier, max_delay)
+
+    for key, state in pending.items():
+        logger.warning(f"任务 {key} 在 {timeout:.0f}s 内未完成（已查询 {state[2]} 次）")
+        results[key] = None
+    return results
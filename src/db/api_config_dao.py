@@ -3,11 +3,34 @@ from typing import Any, Dict, List, Optional, Tuple
 
 from mysql.connector import Error
 
-from src.db.connection import get_db_connection
+from src.db.connection import dao_query, get_db_connection
 
 logger = logging.getLogger(__name__)
 
 
+def _positive_int_or_none(value: Any) -> Optional[int]:
+    """将表单传入的限制值转换为正整数，空值或非法值返回 None（使用全局默认值）"""
+    try:
+        value = int(value)
+    except (TypeError, ValueError):
+        return None
+    return value if value > 0 else None
+
+
+def _float_or_none(value: Any) -> Optional[float]:
+    return float(value) if value is not None else None
+
+
+def _positive_float_or_none(value: Any) -> Optional[float]:
+    """将表单传入的限流速率转换为正数，空值或非法值返回 None（使用全局默认值）"""
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        return None
+    return value if value > 0 else None
+
+
+@dao_query
 def get_all_configs(order_by_created: bool = True) -> List[Dict[str, Any]]:
     """
     从数据库中读取所有 API 配置。
@@ -22,13 +45,17 @@ def get_all_configs(order_by_created: bool = True) -> List[Dict[str, Any]]:
     if order_by_created:
         query = (
             "SELECT id, name, url, method, request, response, status, "
-            "is_enabled, response_time_ms, created_at, updated_at "
-            "FROM api_config ORDER BY created_at DESC"
+            "is_enabled, response_time_ms, max_body_kb, max_items, rate_limit_per_sec, rate_limit_burst, "
+            "success_rate, last_probe_at, auto_disabled, "
+            "avg_results, error_rate, avg_latency_ms, unique_ratio, score, score_samples, "
+            "created_at, updated_at FROM api_config ORDER BY created_at DESC"
         )
     else:
         query = (
             "SELECT id, name, url, method, request, response, status, "
-            "is_enabled, response_time_ms FROM api_config"
+            "is_enabled, response_time_ms, max_body_kb, max_items, rate_limit_per_sec, rate_limit_burst, "
+            "success_rate, auto_disabled, "
+            "avg_results, error_rate, avg_latency_ms, unique_ratio, score, score_samples FROM api_config"
         )
 
     try:
@@ -47,8 +74,21 @@ def get_all_configs(order_by_created: bool = True) -> List[Dict[str, Any]]:
                 "status": bool(row["status"]),
                 "is_enabled": bool(row["is_enabled"]),
                 "response_time_ms": row["response_time_ms"] if row["response_time_ms"] is not None else (0 if order_by_created else 9999),
+                "max_body_kb": row["max_body_kb"],
+                "max_items": row["max_items"],
+                "rate_limit_per_sec": _float_or_none(row["rate_limit_per_sec"]),
+                "rate_limit_burst": row["rate_limit_burst"],
+                "success_rate": _float_or_none(row["success_rate"]),
+                "auto_disabled": bool(row["auto_disabled"]),
+                "avg_results": _float_or_none(row["avg_results"]),
+                "error_rate": _float_or_none(row["error_rate"]),
+                "avg_latency_ms": row["avg_latency_ms"],
+                "unique_ratio": _float_or_none(row["unique_ratio"]),
+                "score": _float_or_none(row["score"]),
+                "score_samples": row["score_samples"] or 0,
             }
             if order_by_created:
+                config["last_probe_at"] = str(row["last_probe_at"]) if row["last_probe_at"] else None
                 config["created_at"] = str(row["created_at"])
                 config["updated_at"] = str(row["updated_at"])
             configs.append(config)
@@ -62,6 +102,7 @@ def get_all_configs(order_by_created: bool = True) -> List[Dict[str, Any]]:
     return configs
 
 
+@dao_query
 def get_config_by_id(api_id: int) -> Optional[Dict[str, Any]]:
     """根据 ID 获取单个 API 配置（用于测试）。"""
     conn = get_db_connection()
@@ -82,6 +123,7 @@ def get_config_by_id(api_id: int) -> Optional[Dict[str, Any]]:
             conn.close()
 
 
+@dao_query
 def get_config_status(api_id: int) -> Optional[Dict[str, bool]]:
     """从数据库中获取单个 API 的 status 和 is_enabled 状态"""
     conn = get_db_connection()
@@ -106,6 +148,7 @@ def get_config_status(api_id: int) -> Optional[Dict[str, bool]]:
             conn.close()
 
 
+@dao_query
 def insert_config(new_config: Dict[str, Any]) -> Tuple[bool, str, Optional[int]]:
     """向数据库中添加一条 API 配置记录"""
     conn = get_db_connection()
@@ -114,7 +157,8 @@ def insert_config(new_config: Dict[str, Any]) -> Tuple[bool, str, Optional[int]]
 
     query = (
         "INSERT INTO api_config (name, url, method, request, response, status, "
-        "is_enabled, response_time_ms) VALUES (%s, %s, %s, %s, %s, %s, %s, %s)"
+        "is_enabled, response_time_ms, max_body_kb, max_items, rate_limit_per_sec, rate_limit_burst) "
+        "VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)"
     )
     params = (
         new_config["name"],
@@ -125,6 +169,10 @@ def insert_config(new_config: Dict[str, Any]) -> Tuple[bool, str, Optional[int]]
         1 if new_config.get("status", True) else 0,
         1 if new_config.get("is_enabled", True) else 0,
         0,  # 默认响应时间为 0
+        _positive_int_or_none(new_config.get("max_body_kb")),
+        _positive_int_or_none(new_config.get("max_items")),
+        _positive_float_or_none(new_config.get("rate_limit_per_sec")),
+        _positive_int_or_none(new_config.get("rate_limit_burst")),
     )
 
     try:
@@ -144,6 +192,7 @@ def insert_config(new_config: Dict[str, Any]) -> Tuple[bool, str, Optional[int]]
             conn.close()
 
 
+@dao_query
 def copy_config(api_id: int) -> Tuple[bool, str, Optional[int]]:
     """在数据库中复制一条 API 配置记录"""
     conn = get_db_connection()
@@ -151,8 +200,8 @@ def copy_config(api_id: int) -> Tuple[bool, str, Optional[int]]:
         return False, "数据库连接失败", None
 
     select_query = (
-        "SELECT name, url, method, request, response, status, is_enabled, response_time_ms "
-        "FROM api_config WHERE id = %s"
+        "SELECT name, url, method, request, response, status, is_enabled, response_time_ms, "
+        "max_body_kb, max_items, rate_limit_per_sec, rate_limit_burst FROM api_config WHERE id = %s"
     )
 
     try:
@@ -167,7 +216,8 @@ def copy_config(api_id: int) -> Tuple[bool, str, Optional[int]]:
         new_name = f"{original_config['name']}_副本"
         insert_query = (
             "INSERT INTO api_config (name, url, method, request, response, status, "
-            "is_enabled, response_time_ms) VALUES (%s, %s, %s, %s, %s, %s, %s, %s)"
+            "is_enabled, response_time_ms, max_body_kb, max_items, rate_limit_per_sec, rate_limit_burst) "
+            "VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)"
         )
         insert_params = (
             new_name,
@@ -178,6 +228,10 @@ def copy_config(api_id: int) -> Tuple[bool, str, Optional[int]]:
             original_config["status"],
             original_config["is_enabled"],
             original_config["response_time_ms"],
+            original_config["max_body_kb"],
+            original_config["max_items"],
+            original_config["rate_limit_per_sec"],
+            original_config["rate_limit_burst"],
         )
 
         cursor.execute(insert_query, insert_params)
@@ -196,6 +250,7 @@ def copy_config(api_id: int) -> Tuple[bool, str, Optional[int]]:
             conn.close()
 
 
+@dao_query
 def update_config(api_id: int, updated_config: Dict[str, Any]) -> Tuple[bool, str]:
     """更新一条 API 配置记录"""
     new_is_enabled = bool(updated_config.get("is_enabled"))
@@ -216,7 +271,8 @@ def update_config(api_id: int, updated_config: Dict[str, Any]) -> Tuple[bool, st
 
     query = """
     UPDATE api_config 
-    SET name = %s, url = %s, method = %s, request = %s, response = %s, status = %s, is_enabled = %s
+    SET name = %s, url = %s, method = %s, request = %s, response = %s, status = %s, is_enabled = %s,
+        max_body_kb = %s, max_items = %s, rate_limit_per_sec = %s, rate_limit_burst = %s
     WHERE id = %s
     """
     params = (
@@ -227,6 +283,10 @@ def update_config(api_id: int, updated_config: Dict[str, Any]) -> Tuple[bool, st
         updated_config.get("response", "[]"),
         1 if updated_config.get("status", True) else 0,
         1 if new_is_enabled else 0,
+        _positive_int_or_none(updated_config.get("max_body_kb")),
+        _positive_int_or_none(updated_config.get("max_items")),
+        _positive_float_or_none(updated_config.get("rate_limit_per_sec")),
+        _positive_int_or_none(updated_config.get("rate_limit_burst")),
         api_id,
     )
 
@@ -249,6 +309,7 @@ def update_config(api_id: int, updated_config: Dict[str, Any]) -> Tuple[bool, st
             conn.close()
 
 
+@dao_query
 def delete_config(api_id: int) -> Tuple[bool, str]:
     """删除一条 API 配置记录"""
     conn = get_db_connection()
@@ -277,6 +338,7 @@ def delete_config(api_id: int) -> Tuple[bool, str]:
             conn.close()
 
 
+@dao_query
 def update_status(api_id: int, new_status: bool, response_time_ms: int = 0) -> bool:
     """更新 API 配置的状态和响应时间 (不修改 is_enabled)"""
     conn = get_db_connection()
@@ -302,6 +364,7 @@ def update_status(api_id: int, new_status: bool, response_time_ms: int = 0) -> b
             conn.close()
 
 
+@dao_query
 def update_enabled_status(
     api_id: int, is_enabled: bool, new_status: Optional[bool] = None, response_time_ms: Optional[int] = None
 ) -> bool:
@@ -343,6 +406,129 @@ def update_enabled_status(
             conn.close()
 
 
+@dao_query
+def batch_update_test_results(results: List[Tuple[int, bool, int]]) -> bool:
+    """
+    批量写回测试结果，单个事务内完成。
+    results: [(api_id, new_status, response_time_ms), ...]
+    测试通过只更新 status 和 response_time_ms；失败同时强制禁用 (is_enabled=0)。
+    """
+    if not results:
+        return True
+
+    conn = get_db_connection()
+    if not conn:
+        return False
+
+    passed = [(1, response_time_ms, api_id) for api_id, new_status, response_time_ms in results if new_status]
+    failed = [(response_time_ms, api_id) for api_id, new_status, response_time_ms in results if not new_status]
+
+    try:
+        cursor = conn.cursor()
+        if passed:
+            cursor.executemany("UPDATE api_config SET status = %s, response_time_ms = %s WHERE id = %s", passed)
+        if failed:
+            # auto_disabled 先于 is_enabled 赋值，取到的是更新前的启用状态；健康检查恢复后会自动重新启用
+            cursor.executemany(
+                "UPDATE api_config SET auto_disabled = IF(is_enabled = 1, 1, auto_disabled), "
+                "is_enabled = 0, status = 0, response_time_ms = %s WHERE id = %s",
+                failed,
+            )
+        conn.commit()
+        logger.info(f"批量更新 API 测试结果: 正常 {len(passed)} 个，异常并禁用 {len(failed)} 个")
+        return True
+    except Error as err:
+        logger.error(f"批量更新 API 测试结果时出错: {err}")
+        conn.rollback()
+        return False
+    finally:
+        if conn.is_connected():
+            cursor.close()
+            conn.close()
+
+
+@dao_query
+def batch_update_health(
+    probes: List[Tuple[int, bool, int, float]], disable_ids: List[int], enable_ids: List[int]
+) -> bool:
+    """
+    健康检查结果批量写回，单个事务内完成。
+    probes: [(api_id, status, ewma_latency_ms, success_rate), ...]
+    disable_ids: 连续失败需要自动禁用的 API（仅对当前启用的生效，并标记 auto_disabled）
+    enable_ids: 已恢复、需要自动重新启用的 API（仅对 auto_disabled 的生效，不覆盖管理员的手动禁用）
+    """
+    if not probes:
+        return True
+
+    conn = get_db_connection()
+    if not conn:
+        return False
+
+    try:
+        cursor = conn.cursor()
+        cursor.executemany(
+            "UPDATE api_config SET status = %s, response_time_ms = %s, success_rate = %s, last_probe_at = NOW() "
+            "WHERE id = %s",
+            [(1 if status else 0, latency_ms, success_rate, api_id) for api_id, status, latency_ms, success_rate in probes],
+        )
+        if disable_ids:
+            cursor.executemany(
+                "UPDATE api_config SET is_enabled = 0, auto_disabled = 1 WHERE id = %s AND is_enabled = 1",
+                [(api_id,) for api_id in disable_ids],
+            )
+        if enable_ids:
+            cursor.executemany(
+                "UPDATE api_config SET is_enabled = 1, auto_disabled = 0 WHERE id = %s AND auto_disabled = 1",
+                [(api_id,) for api_id in enable_ids],
+            )
+        conn.commit()
+        logger.info(
+            f"健康检查写回 {len(probes)} 个 API，自动禁用 {len(disable_ids)} 个，自动恢复 {len(enable_ids)} 个"
+        )
+        return True
+    except Error as err:
+        logger.error(f"批量更新健康检查结果时出错: {err}")
+        conn.rollback()
+        return False
+    finally:
+        if conn.is_connected():
+            cursor.close()
+            conn.close()
+
+
+@dao_query
+def batch_update_scores(rows: List[Tuple[int, float, float, int, Optional[float], Optional[float], int]]) -> bool:
+    """
+    批量写回上游评分统计。
+    rows: [(api_id, avg_results, error_rate, avg_latency_ms, unique_ratio, score, score_samples), ...]
+    """
+    if not rows:
+        return True
+
+    conn = get_db_connection()
+    if not conn:
+        return False
+
+    try:
+        cursor = conn.cursor()
+        cursor.executemany(
+            "UPDATE api_config SET avg_results = %s, error_rate = %s, avg_latency_ms = %s, unique_ratio = %s, "
+            "score = %s, score_samples = %s WHERE id = %s",
+            [row[1:] + (row[0],) for row in rows],
+        )
+        conn.commit()
+        return True
+    except Error as err:
+        logger.error(f"批量更新上游评分时出错: {err}")
+        conn.rollback()
+        return False
+    finally:
+        if conn.is_connected():
+            cursor.close()
+            conn.close()
+
+
+@dao_query
 def set_enabled(api_id: int, is_enabled: bool) -> Tuple[bool, str]:
     """切换单个 API 的启用状态，限制异常状态下启用"""
     is_enabled = bool(is_enabled)
@@ -361,7 +547,8 @@ def set_enabled(api_id: int, is_enabled: bool) -> Tuple[bool, str]:
     if not conn:
         return False, "数据库连接失败"
 
-    query = "UPDATE api_config SET is_enabled = %s WHERE id = %s"
+    # 管理员手动切换后清除 auto_disabled，健康检查不再自动改回
+    query = "UPDATE api_config SET is_enabled = %s, auto_disabled = 0 WHERE id = %s"
     status_int = 1 if is_enabled else 0
 
     try:
@@ -384,13 +571,14 @@ def set_enabled(api_id: int, is_enabled: bool) -> Tuple[bool, str]:
             conn.close()
 
 
+@dao_query
 def enable_all_normal() -> Tuple[bool, str, int]:
     """一键启用所有【状态正常 (status=1)】的 API"""
     conn = get_db_connection()
     if not conn:
         return False, "数据库连接失败", 0
 
-    query = "UPDATE api_config SET is_enabled = 1 WHERE status = 1"
+    query = "UPDATE api_config SET is_enabled = 1, auto_disabled = 0 WHERE status = 1"
 
     try:
         cursor = conn.cursor()
@@ -408,13 +596,14 @@ def enable_all_normal() -> Tuple[bool, str, int]:
             conn.close()
 
 
+@dao_query
 def disable_all() -> Tuple[bool, str, int]:
     """一键禁用所有 API"""
     conn = get_db_connection()
     if not conn:
         return False, "数据库连接失败", 0
 
-    query = "UPDATE api_config SET is_enabled = 0"
+    query = "UPDATE api_config SET is_enabled = 0, auto_disabled = 0"
 
     try:
         cursor = conn.cursor()
@@ -0,0 +1,44 @@
+import logging
+from typing import Any, Dict, Optional
+
+from mysql.connector import Error
+
+from src.db.connection import dao_query, db_cursor
+from utils import json_utils
+
+logger = logging.getLogger(__name__)
+
+
+@dao_query
+def get_checkpoint(name: str) -> Optional[Dict[str, Any]]:
+    """读取流水线进度 {"last_id", "report", "updated_at"}，没有记录返回 None"""
+    try:
+        with db_cursor(dictionary=True) as cursor:
+            if cursor is None:
+                return None
+            cursor.execute("SELECT last_id, report, updated_at FROM pipeline_checkpoints WHERE name = %s", (name,))
+            row = cursor.fetchone()
+    except Error as err:
+        logger.error(f"读取流水线进度失败: {err}")
+        return None
+    if row and row["report"]:
+        row["report"] = json_utils.loads(row["report"])
+    return row
+
+
+@dao_query
+def save_checkpoint(name: str, last_id: int, report: Optional[Dict[str, Any]] = None) -> bool:
+    """保存流水线进度（已处理到的 ID 与吞吐统计）"""
+    sql = (
+        "INSERT INTO pipeline_checkpoints (name, last_id, report) VALUES (%s, %s, %s) "
+        "ON DUPLICATE KEY UPDATE last_id = VALUES(last_id), report = VALUES(report)"
+    )
+    try:
+        with db_cursor() as cursor:
+            if cursor is None:
+                return False
+            cursor.execute(sql, (name, last_id, json_utils.dumps(report) if report is not None else None))
+            return True
+    except Error as err:
+        logger.error(f"保存流水线进度失败: {err}")
+        return False
@@ -1,27 +1,55 @@
 import logging
+import time
 from contextlib import contextmanager
-from typing import Generator, Optional
+from functools import wraps
+from typing import Callable, Generator, Optional
 
 import mysql.connector
 from mysql.connector import MySQLConnection
 
 from configs.app_config import db_config
+from utils.metrics_utils import DAO_QUERY_SECONDS, DB_CONNECTIONS
+from utils.timing_utils import record_span, timed
 
 logger = logging.getLogger(__name__)
 
 
+@timed("db.connect")
 def get_db_connection() -> Optional[MySQLConnection]:
     """
     获取数据库连接的统一入口。
     所有直接使用 mysql.connector.connect 的地方应改为调用此函数。
     """
     try:
-        return mysql.connector.connect(**db_config)
+        conn = mysql.connector.connect(**db_config)
+        DB_CONNECTIONS.labels("ok").inc()
+        return conn
     except mysql.connector.Error as err:
+        DB_CONNECTIONS.labels("error").inc()
         logger.error(f"数据库连接失败: {err}")
         return None
 
 
+def dao_query(func: Callable) -> Callable:
+    """
+    DAO 函数埋点：耗时同时计入请求计时器（Server-Timing）和 /metrics 的 DAO 耗时直方图。
+    """
+    span_name = f"{func.__module__.rsplit('.', 1)[-1]}.{func.__name__}"
+    histogram = DAO_QUERY_SECONDS.labels(func.__name__)
+
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            elapsed = time.perf_counter() - start
+            histogram.observe(elapsed)
+            record_span(span_name, elapsed * 1000)
+
+    return wrapper
+
+
 @contextmanager
 def db_cursor(dictionary: bool = False):
     """
@@ -3,10 +3,11 @@ from typing import Any, Dict, List, Optional, Tuple
 
 from mysql.connector import Error
 
-from src.db.connection import get_db_connection
+from src.db.connection import dao_query, db_cursor, get_db_connection
 
 logger = logging.getLogger(__name__)
 
+@dao_query
 def get_all_cookies() -> List[Dict[str, Any]]:
     """
     从数据库中读取所有云盘Cookie配置。
@@ -16,7 +17,7 @@ def get_all_cookies() -> List[Dict[str, Any]]:
         return []
 
     cookies = []
-    query = "SELECT id, cloud_name, cookie, created_at, updated_at FROM cookie_config ORDER BY created_at DESC"
+    query = "SELECT id, cloud_name, account_name, cookie, created_at, updated_at FROM cookie_config ORDER BY created_at DESC"
 
     try:
         cursor = conn.cursor(dictionary=True)
@@ -27,6 +28,7 @@ def get_all_cookies() -> List[Dict[str, Any]]:
             cookie_config = {
                 "id": row["id"],
                 "cloud_name": row["cloud_name"],
+                "account_name": row["account_name"],
                 "cookie": row["cookie"],
                 "created_at": str(row["created_at"]),
                 "updated_at": str(row["updated_at"])
@@ -41,15 +43,16 @@ def get_all_cookies() -> List[Dict[str, Any]]:
 
     return cookies
 
+@dao_query
 def get_cookie_by_cloud_name(cloud_name: str) -> Optional[str]:
     """
-    根据云盘名称获取对应的Cookie内容。
+    根据云盘名称获取对应的Cookie内容（有多个账号时返回最早添加的启用账号）。
     """
     conn = get_db_connection()
     if not conn:
         return None
 
-    query = "SELECT cookie FROM cookie_config WHERE cloud_name = %s"
+    query = "SELECT cookie FROM cookie_config WHERE cloud_name = %s ORDER BY is_enabled DESC, id LIMIT 1"
 
     try:
         cursor = conn.cursor(dictionary=True)
@@ -64,57 +67,51 @@ def get_cookie_by_cloud_name(cloud_name: str) -> Optional[str]:
             cursor.close()
             conn.close()
 
-def save_cookie(cloud_name: str, cookie: str) -> Tuple[bool, str]:
+@dao_query
+def save_cookie(cloud_name: str, cookie: str, account_name: str = "default", weight: Optional[int] = None,
+                daily_quota: Optional[int] = None) -> Tuple[bool, str]:
     """
-    保存或更新云盘Cookie配置。
-    如果存在相同的cloud_name，则更新；否则插入新记录。
+    保存或更新云盘账号的Cookie配置。
+    如果存在相同的 (cloud_name, account_name)，则更新 Cookie 并重置健康状态；否则插入新记录。
     """
-    conn = get_db_connection()
-    if not conn:
-        return False, "数据库连接失败"
-
-    # 先检查是否已存在
-    existing_cookie = get_cookie_by_cloud_name(cloud_name)
-    
+    query = (
+        "INSERT INTO cookie_config (cloud_name, account_name, cookie, weight, daily_quota) "
+        "VALUES (%s, %s, %s, %s, %s) "
+        "ON DUPLICATE KEY UPDATE cookie = VALUES(cookie), status = 'ok', cooldown_until = NULL, last_error = NULL, "
+        "weight = IF(%s, VALUES(weight), weight), daily_quota = IF(%s, VALUES(daily_quota), daily_quota)"
+    )
+    params = (cloud_name, account_name, cookie, weight or 1, daily_quota, weight is not None, daily_quota is not None)
     try:
-        cursor = conn.cursor()
-        if existing_cookie:
-            # 更新现有记录
-            query = "UPDATE cookie_config SET cookie = %s WHERE cloud_name = %s"
-            params = (cookie, cloud_name)
-            action = "更新"
-        else:
-            # 插入新记录
-            query = "INSERT INTO cookie_config (cloud_name, cookie) VALUES (%s, %s)"
-            params = (cloud_name, cookie)
-            action = "添加"
-        
-        cursor.execute(query, params)
-        conn.commit()
-        logger.info(f"成功{action}云盘'{cloud_name}'的Cookie配置")
+        with db_cursor() as cursor:
+            if cursor is None:
+                return False, "数据库连接失败"
+            cursor.execute(query, params)
+            # ON DUPLICATE KEY UPDATE: 1 = 插入，2 = 更新，0 = 内容未变化
+            action = "添加" if cursor.rowcount == 1 else "更新"
+        logger.info(f"成功{action}云盘'{cloud_name}'账号'{account_name}'的Cookie配置")
         return True, f"云盘Cookie配置{action}成功"
     except Error as err:
-        logger.error(f"{action}云盘Cookie配置时出错: {err}")
-        conn.rollback()
-        return False, f"云盘Cookie配置{action}失败: {err}"
-    finally:
-        if conn.is_connected():
-            cursor.close()
-            conn.close()
+        logger.error(f"保存云盘Cookie配置时出错: {err}")
+        return False, f"云盘Cookie配置保存失败: {err}"
 
-def delete_cookie(cloud_name: str) -> Tuple[bool, str]:
+@dao_query
+def delete_cookie(cloud_name: str, account_name: Optional[str] = None) -> Tuple[bool, str]:
     """
-    根据云盘名称删除Cookie配置。
+    根据云盘名称删除Cookie配置；指定 account_name 时只删除该账号。
     """
     conn = get_db_connection()
     if not conn:
         return False, "数据库连接失败"
 
     query = "DELETE FROM cookie_config WHERE cloud_name = %s"
+    params = (cloud_name,)
+    if account_name is not None:
+        query += " AND account_name = %s"
+        params = (cloud_name, account_name)
 
     try:
         cursor = conn.cursor()
-        cursor.execute(query, (cloud_name,))
+        cursor.execute(query, params)
         conn.commit()
         
         if cursor.rowcount > 0:
@@ -130,4 +127,120 @@ def delete_cookie(cloud_name: str) -> Tuple[bool, str]:
     finally:
         if conn.is_connected():
             cursor.close()
-            conn.close()
\ No newline at end of file
+            conn.close()
+
+# --- 多账号：分配、健康状态与用量 ---
+
+_ACCOUNT_COLUMNS = (
+    "id, cloud_name, account_name, cookie, weight, daily_quota, is_enabled, status, last_error, "
+    "GREATEST(COALESCE(TIMESTAMPDIFF(SECOND, NOW(), cooldown_until), 0), 0) AS cooldown_seconds, "
+    "IF(quota_date = CURDATE(), transfers_today, 0) AS transfers_today, "
+    "total_transfers, total_failures, last_used_at"
+)
+
+
+@dao_query
+def get_accounts(cloud_name: Optional[str] = None) -> List[Dict[str, Any]]:
+    """读取网盘账号（含健康状态、剩余冷却秒数与当日用量），不指定 cloud_name 时返回全部"""
+    sql = f"SELECT {_ACCOUNT_COLUMNS} FROM cookie_config"
+    params: tuple = ()
+    if cloud_name is not None:
+        sql += " WHERE cloud_name = %s"
+        params = (cloud_name,)
+    sql += " ORDER BY cloud_name, id"
+    try:
+        with db_cursor(dictionary=True) as cursor:
+            if cursor is None:
+                return []
+            cursor.execute(sql, params)
+            return cursor.fetchall()
+    except Error as err:
+        logger.error(f"读取网盘账号失败: {err}")
+        return []
+
+
+@dao_query
+def update_account_settings(account_id: int, weight: Optional[int] = None, daily_quota: Optional[int] = None,
+                            is_enabled: Optional[bool] = None, clear_quota: bool = False) -> Tuple[bool, str]:
+    """修改账号的权重、每日额度或启用状态（只更新传入的字段；clear_quota 取消每日额度）"""
+    assignments, params = [], []
+    if weight is not None:
+        assignments.append("weight = %s")
+        params.append(max(1, int(weight)))
+    if clear_quota:
+        assignments.append("daily_quota = NULL")
+    elif daily_quota is not None:
+        assignments.append("daily_quota = %s")
+        params.append(int(daily_quota))
+    if is_enabled is not None:
+        assignments.append("is_enabled = %s")
+        params.append(bool(is_enabled))
+    if not assignments:
+        return False, "没有需要更新的字段"
+    try:
+        with db_cursor() as cursor:
+            if cursor is None:
+                return False, "数据库连接失败"
+            # 设置未变化时 UPDATE 影响行数为 0，先确认账号存在
+            cursor.execute("SELECT id FROM cookie_config WHERE id = %s", (account_id,))
+            if cursor.fetchone() is None:
+                return False, "账号不存在"
+            cursor.execute(f"UPDATE cookie_config SET {', '.join(assignments)} WHERE id = %s", (*params, account_id))
+        return True, "账号设置已更新"
+    except Error as err:
+        logger.error(f"更新网盘账号设置失败: {err}")
+        return False, f"账号设置更新失败: {err}"
+
+
+@dao_query
+def delete_account(account_id: int) -> Tuple[bool, str]:
+    """按 ID 删除网盘账号"""
+    try:
+        with db_cursor() as cursor:
+            if cursor is None:
+                return False, "数据库连接失败"
+            cursor.execute("DELETE FROM cookie_config WHERE id = %s", (account_id,))
+            if cursor.rowcount == 0:
+                return False, "账号不存在"
+        return True, "账号已删除"
+    except Error as err:
+        logger.error(f"删除网盘账号失败: {err}")
+        return False, f"账号删除失败: {err}"
+
+
+@dao_query
+def update_account_health(account_id: int, status: str, cooldown_seconds: float = 0, last_error: str = "") -> bool:
+    """记录账号健康状态；cooldown_seconds > 0 时在此期间暂停分配（各 worker 重新加载账号时生效）"""
+    sql = (
+        "UPDATE cookie_config SET status = %s, "
+        "cooldown_until = IF(%s > 0, NOW() + INTERVAL %s SECOND, NULL), last_error = %s WHERE id = %s"
+    )
+    try:
+        with db_cursor() as cursor:
+            if cursor is None:
+                return False
+            cursor.execute(sql, (status, cooldown_seconds, int(cooldown_seconds), last_error[:255] or None, account_id))
+            return True
+    except Error as err:
+        logger.error(f"更新网盘账号状态失败: {err}")
+        return False
+
+
+@dao_query
+def add_account_usage(account_id: int, successes: int = 0, failures: int = 0) -> bool:
+    """累加账号用量（当日次数跨天自动清零），用于额度判断与吞吐统计"""
+    sql = (
+        "UPDATE cookie_config SET "
+        "transfers_today = IF(quota_date = CURDATE(), transfers_today, 0) + %s, quota_date = CURDATE(), "
+        "total_transfers = total_transfers + %s, total_failures = total_failures + %s, last_used_at = NOW() "
+        "WHERE id = %s"
+    )
+    try:
+        with db_cursor() as cursor:
+            if cursor is None:
+                return False
+            cursor.execute(sql, (successes, successes, failures, account_id))
+            return True
+    except Error as err:
+        logger.error(f"更新网盘账号用量失败: {err}")
+        return False
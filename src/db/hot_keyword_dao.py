@@ -0,0 +1,77 @@
+import logging
+import math
+from typing import List, Sequence, Tuple
+
+from mysql.connector import Error
+
+from src.db.connection import dao_query, db_cursor
+
+logger = logging.getLogger(__name__)
+
+# 截至当前时刻的衰减后次数：hits × 0.5 ^ (距 updated_at 的秒数 / 半衰期秒数)
+_DECAYED_HITS = "hits * POW(0.5, TIMESTAMPDIFF(SECOND, updated_at, NOW()) / %s)"
+
+
+def _decayed_hits_literal(half_life_seconds: float) -> str:
+    """
+    半衰期以数值字面量写入 SQL 的 _DECAYED_HITS。executemany 会把 INSERT 改写为多行插入，
+    ON DUPLICATE KEY UPDATE 子句里不能有 %s 参数（否则报 Not all parameters were used）。
+    """
+    half_life = float(half_life_seconds)
+    if not math.isfinite(half_life) or half_life <= 0:
+        raise ValueError(f"半衰期必须为正数: {half_life_seconds!r}")
+    return _DECAYED_HITS.replace("%s", repr(half_life))
+
+
+@dao_query
+def add_keyword_hits(rows: Sequence[Tuple[str, float]], half_life_seconds: float) -> bool:
+    """
+    累加关键词搜索次数（单个事务批量写入），已有记录先按半衰期衰减再累加。
+    rows: [(keyword, hits_delta), ...]
+    """
+    if not rows:
+        return True
+    try:
+        sql = (
+            "INSERT INTO hot_keywords (keyword, hits, updated_at) VALUES (%s, %s, NOW()) "
+            f"ON DUPLICATE KEY UPDATE hits = {_decayed_hits_literal(half_life_seconds)} + VALUES(hits), "
+            "updated_at = NOW()"
+        )
+        with db_cursor() as cursor:
+            if cursor is None:
+                return False
+            cursor.executemany(sql, [(keyword, hits) for keyword, hits in rows])
+            return True
+    except (Error, ValueError) as err:
+        logger.error(f"写入热门关键词失败: {err}")
+        return False
+
+
+@dao_query
+def get_top_keywords(limit: int, half_life_seconds: float) -> List[Tuple[str, float]]:
+    """按衰减后的搜索次数倒序返回前 limit 个关键词: [(keyword, hits), ...]"""
+    sql = f"SELECT keyword, {_DECAYED_HITS} AS score FROM hot_keywords ORDER BY score DESC LIMIT %s"
+    try:
+        with db_cursor() as cursor:
+            if cursor is None:
+                return []
+            cursor.execute(sql, (half_life_seconds, limit))
+            return [(keyword, float(score)) for keyword, score in cursor.fetchall()]
+    except Error as err:
+        logger.error(f"读取热门关键词失败: {err}")
+        return []
+
+
+@dao_query
+def prune_keywords(min_hits: float, half_life_seconds: float) -> int:
+    """删除衰减后次数低于 min_hits 的关键词，控制表的大小。返回删除条数"""
+    sql = f"DELETE FROM hot_keywords WHERE {_DECAYED_HITS} < %s"
+    try:
+        with db_cursor() as cursor:
+            if cursor is None:
+                return 0
+            cursor.execute(sql, (half_life_seconds, min_hits))
+            return cursor.rowcount
+    except Error as err:
+        logger.error(f"清理热门关键词失败: {err}")
+        return 0
@@ -3,17 +3,19 @@ from typing import Any, Dict, List, Optional, Tuple
 
 from mysql.connector import Error
 
-from src.db.connection import db_cursor, get_db_connection
+from src.db.connection import dao_query, db_cursor, get_db_connection
 
 logger = logging.getLogger(__name__)
 
 
+@dao_query
 def insert_resource(record: Dict[str, Any]) -> Optional[int]:
     """
     插入一条资源记录，返回新记录的 ID。
     兼容 pan_operator 传入的数据字段。
     """
     file_id = record.get("file_id")
+    account_id = record.get("account_id")
     name = record.get("name")
     share_link = record.get("share_link")
     cloud_name = record.get("cloud_name", "")
@@ -21,10 +23,10 @@ def insert_resource(record: Dict[str, Any]) -> Optional[int]:
     remarks = record.get("remarks", "")
 
     sql = """
-    INSERT INTO resources (file_id, name, share_link, cloud_name, type, remarks)
-    VALUES (%s, %s, %s, %s, %s, %s)
+    INSERT INTO resources (file_id, account_id, name, share_link, cloud_name, type, remarks)
+    VALUES (%s, %s, %s, %s, %s, %s, %s)
     """
-    params = (file_id, name, share_link, cloud_name, resource_type, remarks)
+    params = (file_id, account_id, name, share_link, cloud_name, resource_type, remarks)
 
     conn = get_db_connection()
     if not conn:
@@ -46,6 +48,7 @@ def insert_resource(record: Dict[str, Any]) -> Optional[int]:
         conn.close()
 
 
+@dao_query
 def query_file_id_by_share_link(share_link: str) -> Optional[str]:
     """根据分享链接查询 file_id，用于 pan_operator。"""
     sql = "SELECT file_id FROM resources WHERE share_link = %s"
@@ -62,6 +65,22 @@ def query_file_id_by_share_link(share_link: str) -> Optional[str]:
         return None
 
 
+@dao_query
+def get_resource_by_share_link(share_link: str) -> Optional[Dict[str, Any]]:
+    """根据分享链接查询资源的 id、file_id、所属账号 account_id 和巡检结果 is_alive，不存在返回 None。"""
+    sql = "SELECT id, file_id, account_id, is_alive FROM resources WHERE share_link = %s LIMIT 1"
+    try:
+        with db_cursor(dictionary=True) as cursor:
+            if cursor is None:
+                return None
+            cursor.execute(sql, (share_link,))
+            return cursor.fetchone()
+    except Error as err:
+        logger.error(f"根据分享链接查询资源失败: {err}")
+        return None
+
+
+@dao_query
 def delete_by_share_link(share_link: str) -> int:
     """根据分享链接删除资源记录，返回受影响行数。"""
     sql = "DELETE FROM resources WHERE share_link = %s"
@@ -77,6 +96,7 @@ def delete_by_share_link(share_link: str) -> int:
         return rows
 
 
+@dao_query
 def random_read_record() -> Optional[Tuple]:
     """随机读取一条资源记录，返回原始行数据。"""
     sql = "SELECT * FROM resources ORDER BY RAND() LIMIT 1"
@@ -92,9 +112,12 @@ def random_read_record() -> Optional[Tuple]:
         return None
 
 
-def update_share_link(resource_id: int, new_share_link: str, file_id: Optional[str] = None) -> bool:
+@dao_query
+def update_share_link(resource_id: int, new_share_link: str, file_id: Optional[str] = None,
+                      account_id: Optional[int] = None) -> bool:
     """
-    更新资源的分享链接和 is_replaced 状态（供 pan_operator 使用）。
+    更新资源的分享链接和 is_replaced 状态（供 pan_operator 使用），account_id 为转存所用的网盘账号。
+    新链接的有效性检查结果清空，等待巡检重新检查。
     """
     conn = get_db_connection()
     if not conn:
@@ -105,14 +128,15 @@ def update_share_link(resource_id: int, new_share_link: str, file_id: Optional[s
         if file_id:
             sql = """
             UPDATE resources
-            SET share_link = %s, file_id = %s, is_replaced = TRUE
+            SET share_link = %s, file_id = %s, account_id = %s, is_replaced = TRUE,
+                is_alive = NULL, last_checked_at = NULL
             WHERE id = %s
             """
-            params = (new_share_link, file_id, resource_id)
+            params = (new_share_link, file_id, account_id, resource_id)
         else:
             sql = """
             UPDATE resources
-            SET share_link = %s, is_replaced = TRUE
+            SET share_link = %s, is_replaced = TRUE, is_alive = NULL, last_checked_at = NULL
             WHERE id = %s
             """
             params = (new_share_link, resource_id)
@@ -134,6 +158,89 @@ def update_share_link(resource_id: int, new_share_link: str, file_id: Optional[s
         conn.close()
 
 
+@dao_query
+def batch_update_share_links(updates: List[Tuple[int, str, Optional[str], Optional[int]]]) -> int:
+    """
+    批量更新分享链接并标记为已替换（与 update_share_link 相同），updates 为 [(资源 ID, 新链接, file_id, account_id), ...]。
+    整批写入失败（如某条新链接与其他资源冲突）时逐条写入，跳过失败的记录。返回成功更新的条数。
+    """
+    if not updates:
+        return 0
+    sql = (
+        "UPDATE resources SET share_link = %s, file_id = COALESCE(%s, file_id), account_id = %s, is_replaced = TRUE, "
+        "is_alive = NULL, last_checked_at = NULL, reshare_failures = 0, reshare_retry_at = NULL WHERE id = %s"
+    )
+    params = [(link, file_id, account_id, resource_id) for resource_id, link, file_id, account_id in updates]
+    try:
+        with db_cursor() as cursor:
+            if cursor is None:
+                return 0
+            cursor.executemany(sql, params)
+            return len(params)
+    except Error as err:
+        logger.warning(f"批量更新分享链接失败，改为逐条更新: {err}")
+
+    written = 0
+    try:
+        with db_cursor() as cursor:
+            if cursor is None:
+                return 0
+            for row in params:
+                try:
+                    cursor.execute(sql, row)
+                    written += 1
+                except Error as err:
+                    logger.error(f"更新资源ID {row[-1]} 的分享链接失败: {err}")
+    except Error as err:
+        logger.error(f"逐条更新分享链接失败: {err}")
+        return 0
+    return written
+
+
+@dao_query
+def batch_record_reshare_failures(failures: List[Tuple[int, int]], max_delay: int) -> int:
+    """
+    记录重新分享失败，failures 为 [(资源 ID, 退避基数秒), ...]。失败次数加一，
+    下次重试时间推迟 min(基数 * 2^(失败次数-1), max_delay) 秒（不改 updated_at）。返回更新的条数。
+    """
+    if not failures:
+        return 0
+    sql = (
+        "UPDATE resources SET reshare_failures = reshare_failures + 1, "
+        "reshare_retry_at = NOW() + INTERVAL LEAST(%s * POW(2, reshare_failures - 1), %s) SECOND, "
+        "updated_at = updated_at WHERE id = %s"
+    )
+    try:
+        with db_cursor() as cursor:
+            if cursor is None:
+                return 0
+            cursor.executemany(sql, [(base, max_delay, resource_id) for resource_id, base in failures])
+            return len(failures)
+    except Error as err:
+        logger.error(f"写入重新分享失败记录出错: {err}")
+        return 0
+
+
+@dao_query
+def get_unreplaced_resources(after_id: int, limit: int) -> List[Dict[str, Any]]:
+    """按 ID 键集分页读取未替换（is_replaced = FALSE）、未确认失效且不在失败退避期内的资源"""
+    sql = (
+        "SELECT id, name, share_link, cloud_name, type, remarks FROM resources "
+        "WHERE is_replaced = FALSE AND id > %s AND COALESCE(is_alive, TRUE) "
+        "AND (reshare_retry_at IS NULL OR reshare_retry_at <= NOW()) ORDER BY id LIMIT %s"
+    )
+    try:
+        with db_cursor(dictionary=True) as cursor:
+            if cursor is None:
+                return []
+            cursor.execute(sql, (after_id, limit))
+            return cursor.fetchall()
+    except Error as err:
+        logger.error(f"读取未替换资源失败: {err}")
+        return []
+
+
+@dao_query
 def list_resources(
     page: int = 1, page_size: int = 10, search: str = ""
 ) -> Tuple[bool, str, Optional[Dict[str, Any]]]:
@@ -196,6 +303,7 @@ def list_resources(
             conn.close()
 
 
+@dao_query
 def get_resource_by_id(resource_id: int) -> Tuple[bool, str, Optional[Dict[str, Any]]]:
     """根据 ID 获取单个资源详情。"""
     conn = get_db_connection()
@@ -228,6 +336,7 @@ def get_resource_by_id(resource_id: int) -> Tuple[bool, str, Optional[Dict[str,
             conn.close()
 
 
+@dao_query
 def insert_resource_simple(resource_data: Dict[str, Any]) -> Tuple[bool, str, Optional[int]]:
     """
     后台新增资源用的简单插入（不含 file_id），供 hot_resource_service 调用。
@@ -264,6 +373,7 @@ def insert_resource_simple(resource_data: Dict[str, Any]) -> Tuple[bool, str, Op
             conn.close()
 
 
+@dao_query
 def update_resource_basic_info(resource_id: int, resource_data: Dict[str, Any]) -> Tuple[bool, str]:
     """更新资源基础信息（标题、云盘名称、类型、备注和分享链接）。"""
     conn = get_db_connection()
@@ -304,9 +414,10 @@ def update_resource_basic_info(resource_id: int, resource_data: Dict[str, Any])
             conn.close()
 
 
+@dao_query
 def delete_resource_by_id(resource_id: int) -> Tuple[bool, str, Optional[Dict[str, Any]]]:
     """
-    根据 ID 删除资源，同时返回被删除记录的 share_link 和 file_id，
+    根据 ID 删除资源，同时返回被删除记录的 share_link、file_id 和 account_id，
     以便 hot_resource_service / pan_operator 调用 del_share 使用。
     """
     conn = get_db_connection()
@@ -316,7 +427,7 @@ def delete_resource_by_id(resource_id: int) -> Tuple[bool, str, Optional[Dict[st
     try:
         cursor = conn.cursor(dictionary=True)
 
-        check_sql = "SELECT share_link, file_id FROM resources WHERE id = %s"
+        check_sql = "SELECT share_link, file_id, account_id FROM resources WHERE id = %s"
         cursor.execute(check_sql, (resource_id,))
         resource = cursor.fetchone()
         if not resource:
@@ -341,12 +452,62 @@ def delete_resource_by_id(resource_id: int) -> Tuple[bool, str, Optional[Dict[st
             conn.close()
 
 
-def search_resources_by_keyword(keyword: str) -> List[Tuple[str, str, Optional[str]]]:
+@dao_query
+def delete_resources_by_ids(resource_ids: List[int]) -> Tuple[bool, str, List[Dict[str, Any]]]:
+    """
+    在一个事务中删除多条资源，返回实际删除的记录（含 id、share_link、file_id 和 account_id），
+    不存在的 ID 不在返回列表中。
+    """
+    if not resource_ids:
+        return True, "没有需要删除的资源", []
+    placeholders = ", ".join(["%s"] * len(resource_ids))
+    try:
+        with db_cursor(dictionary=True) as cursor:
+            if cursor is None:
+                return False, "数据库连接失败", []
+            cursor.execute(
+                f"SELECT id, share_link, file_id, account_id FROM resources WHERE id IN ({placeholders}) FOR UPDATE",
+                tuple(resource_ids),
+            )
+            resources = cursor.fetchall()
+            if resources:
+                found = [r["id"] for r in resources]
+                cursor.execute(f"DELETE FROM resources WHERE id IN ({', '.join(['%s'] * len(found))})", tuple(found))
+        logger.info(f"批量删除资源 {len(resources)} 条（请求 {len(resource_ids)} 条）")
+        return True, "资源删除成功", resources
+    except Error as err:
+        logger.error(f"批量删除资源时出错: {err}")
+        return False, f"资源删除失败: {err}", []
+
+
+# 巡检确认失效的资源（is_alive = FALSE；未检查的 NULL 视为有效）
+_DEAD = "COALESCE(is_alive, TRUE) = FALSE"
+
+
+def _dead_links_sql(dead_links: str) -> Tuple[str, str]:
+    """
+    失效资源在搜索中的处理：exclude 不返回，downrank 排在最后，其他值不处理。
+    返回 (附加的 WHERE 条件, 附加在排序最前面的 ORDER BY 表达式)，不需要时为空字符串
+    """
+    if dead_links == "exclude":
+        return f"NOT ({_DEAD})", ""
+    if dead_links == "downrank":
+        return "", _DEAD
+    return "", ""
+
+
+@dao_query
+def search_resources_by_keyword(keyword: str, dead_links: str = "exclude") -> List[Tuple[str, str, Optional[str], Optional[str]]]:
     """
     根据关键词搜索资源（用于搜索服务）。
-    返回: [(name, share_link, cloud_name), ...]
+    返回: [(name, share_link, cloud_name, type), ...]
     """
-    sql = "SELECT name, share_link, cloud_name FROM resources WHERE name LIKE %s"
+    dead_where, dead_order = _dead_links_sql(dead_links)
+    sql = "SELECT name, share_link, cloud_name, type FROM resources WHERE name LIKE %s"
+    if dead_where:
+        sql += f" AND {dead_where}"
+    if dead_order:
+        sql += f" ORDER BY {dead_order}"
     conn = get_db_connection()
     if not conn:
         return []
@@ -365,8 +526,10 @@ def search_resources_by_keyword(keyword: str) -> List[Tuple[str, str, Optional[s
             conn.close()
 
 
+@dao_query
 def search_resources_advanced(
-    name: str = "", cloud_name: str = "", resource_type: str = "", limit: int = 100, sort: str = "default"
+    name: str = "", cloud_name: str = "", resource_type: str = "", limit: int = 100, sort: str = "default",
+    dead_links: str = "exclude"
 ) -> Tuple[bool, str, List[Dict[str, Any]]]:
     """
     高级搜索资源（通过名称、云名称或类型）。
@@ -397,6 +560,10 @@ def search_resources_advanced(
             conditions.append("type LIKE %s")
             params.append(f"%{resource_type}%")
 
+        dead_where, dead_order = _dead_links_sql(dead_links)
+        if dead_where:
+            conditions.append(dead_where)
+
         base_query = "SELECT id, name, share_link, cloud_name, type, remarks FROM resources"
         where_clause = " WHERE " + " AND ".join(conditions) if conditions else ""
         
@@ -409,6 +576,8 @@ def search_resources_advanced(
             order_clause = " ORDER BY RAND()"
         else:  # default
             order_clause = " ORDER BY created_at DESC"
+        if dead_order:
+            order_clause = order_clause.replace(" ORDER BY ", f" ORDER BY {dead_order}, ", 1)
             
         limit_clause = " LIMIT %s"
 
@@ -429,3 +598,43 @@ def search_resources_advanced(
             conn.close()
 
 
+@dao_query
+def get_resources_to_check(limit: int, recheck_hours: int) -> List[Dict[str, Any]]:
+    """取需要检查分享链接有效性的资源：从未检查过的优先，其次是最久未检查且超过 recheck_hours 小时的"""
+    sql = (
+        "SELECT id, share_link FROM resources "
+        "WHERE last_checked_at IS NULL OR last_checked_at < NOW() - INTERVAL %s HOUR "
+        "ORDER BY last_checked_at IS NOT NULL, last_checked_at LIMIT %s"
+    )
+    try:
+        with db_cursor(dictionary=True) as cursor:
+            if cursor is None:
+                return []
+            cursor.execute(sql, (recheck_hours, limit))
+            return cursor.fetchall()
+    except Error as err:
+        logger.error(f"读取待检查资源失败: {err}")
+        return []
+
+
+@dao_query
+def batch_update_link_status(results: List[Tuple[int, Optional[bool]]]) -> bool:
+    """
+    批量写回有效性检查结果 [(资源 ID, 是否有效), ...]；是否有效为 None（无法判断）时只记录检查时间。
+    不改变 updated_at（巡检不算资源更新）。
+    """
+    if not results:
+        return True
+    sql = (
+        "UPDATE resources SET is_alive = COALESCE(%s, is_alive), last_checked_at = NOW(), updated_at = updated_at "
+        "WHERE id = %s"
+    )
+    try:
+        with db_cursor() as cursor:
+            if cursor is None:
+                return False
+            cursor.executemany(sql, [(alive, resource_id) for resource_id, alive in results])
+            return True
+    except Error as err:
+        logger.error(f"写回分享链接检查结果失败: {err}")
+        return False
@@ -0,0 +1,52 @@
+import logging
+from typing import List, Sequence, Tuple
+
+from mysql.connector import Error
+
+from src.db.connection import dao_query, db_cursor
+
+logger = logging.getLogger(__name__)
+
+
+@dao_query
+def get_route_stats(features: Sequence[str]) -> List[Tuple[str, int, int, int]]:
+    """
+    读取关键词特征在各上游上的历史命中统计（用于搜索路由）。
+    返回: [(feature, api_id, queries, hits), ...]
+    """
+    if not features:
+        return []
+    placeholders = ", ".join(["%s"] * len(features))
+    sql = f"SELECT feature, api_id, queries, hits FROM upstream_route_stats WHERE feature IN ({placeholders})"
+    try:
+        with db_cursor() as cursor:
+            if cursor is None:
+                return []
+            cursor.execute(sql, tuple(features))
+            return cursor.fetchall()
+    except Error as err:
+        logger.error(f"读取路由统计失败: {err}")
+        return []
+
+
+@dao_query
+def add_route_stats(rows: Sequence[Tuple[str, int, int, int]]) -> bool:
+    """
+    累加路由统计增量（单个事务批量写入）。
+    rows: [(feature, api_id, queries_delta, hits_delta), ...]
+    """
+    if not rows:
+        return True
+    sql = (
+        "INSERT INTO upstream_route_stats (feature, api_id, queries, hits) VALUES (%s, %s, %s, %s) "
+        "ON DUPLICATE KEY UPDATE queries = queries + VALUES(queries), hits = hits + VALUES(hits)"
+    )
+    try:
+        with db_cursor() as cursor:
+            if cursor is None:
+                return False
+            cursor.executemany(sql, list(rows))
+            return True
+    except Error as err:
+        logger.error(f"写入路由统计失败: {err}")
+        return False
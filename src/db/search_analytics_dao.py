@@ -0,0 +1,38 @@
+import logging
+from typing import Sequence, Tuple
+
+from mysql.connector import Error
+
+from src.db.connection import dao_query, db_cursor
+
+logger = logging.getLogger(__name__)
+
+_COLUMNS = (
+    "keyword", "searched_at", "cache_status", "completed", "db_results", "upstream_results",
+    "upstream_calls", "source_counts", "first_result_ms", "latency_ms",
+)
+_ROW_PLACEHOLDERS = "(" + ", ".join(["%s"] * len(_COLUMNS)) + ")"
+
+
+@dao_query
+def insert_search_events(rows: Sequence[Tuple]) -> bool:
+    """
+    以单条多行 INSERT 写入一批搜索分析事件。
+    rows 中每个元组的字段顺序与 _COLUMNS 一致。
+    """
+    if not rows:
+        return True
+    sql = (
+        f"INSERT INTO search_analytics ({', '.join(_COLUMNS)}) VALUES "
+        + ", ".join([_ROW_PLACEHOLDERS] * len(rows))
+    )
+    params = [value for row in rows for value in row]
+    try:
+        with db_cursor() as cursor:
+            if cursor is None:
+                return False
+            cursor.execute(sql, params)
+            return True
+    except Error as err:
+        logger.error(f"写入搜索分析失败 ({len(rows)} 条): {err}")
+        return False
@@ -0,0 +1,111 @@
+import logging
+from typing import Any, Dict, List, Optional
+
+from mysql.connector import Error
+
+from src.db.connection import dao_query, db_cursor
+
+logger = logging.getLogger(__name__)
+
+
+@dao_query
+def get_transfer(source_key: str) -> Optional[Dict[str, Any]]:
+    """
+    读取源分享链接的转存记录，附带 age_seconds（距转存）和 verified_seconds（距上次确认有效）。
+    """
+    sql = (
+        "SELECT source_key, cloud_name, account_id, file_id, file_name, share_link, "
+        "TIMESTAMPDIFF(SECOND, created_at, NOW()) AS age_seconds, "
+        "TIMESTAMPDIFF(SECOND, verified_at, NOW()) AS verified_seconds "
+        "FROM share_transfers WHERE source_key = %s"
+    )
+    try:
+        with db_cursor(dictionary=True) as cursor:
+            if cursor is None:
+                return None
+            cursor.execute(sql, (source_key,))
+            return cursor.fetchone()
+    except Error as err:
+        logger.error(f"读取转存记录失败: {err}")
+        return None
+
+
+@dao_query
+def save_transfer(source_key: str, source_url: str, cloud_name: str, file_id: Optional[str],
+                  file_name: Optional[str], share_link: str, account_id: Optional[int] = None) -> bool:
+    """写入（或覆盖）源分享链接的转存记录"""
+    sql = (
+        "INSERT INTO share_transfers (source_key, source_url, cloud_name, account_id, file_id, file_name, share_link, "
+        "created_at, verified_at) VALUES (%s, %s, %s, %s, %s, %s, %s, NOW(), NOW()) "
+        "ON DUPLICATE KEY UPDATE source_url = VALUES(source_url), cloud_name = VALUES(cloud_name), "
+        "account_id = VALUES(account_id), file_id = VALUES(file_id), file_name = VALUES(file_name), "
+        "share_link = VALUES(share_link), created_at = NOW(), verified_at = NOW()"
+    )
+    try:
+        with db_cursor() as cursor:
+            if cursor is None:
+                return False
+            cursor.execute(sql, (source_key, source_url, cloud_name, account_id, file_id, file_name, share_link))
+            return True
+    except Error as err:
+        logger.error(f"写入转存记录失败: {err}")
+        return False
+
+
+@dao_query
+def touch_transfer(source_key: str) -> bool:
+    """记录一次分享有效性确认"""
+    try:
+        with db_cursor() as cursor:
+            if cursor is None:
+                return False
+            cursor.execute("UPDATE share_transfers SET verified_at = NOW() WHERE source_key = %s", (source_key,))
+            return True
+    except Error as err:
+        logger.error(f"更新转存记录确认时间失败: {err}")
+        return False
+
+
+@dao_query
+def delete_transfer(source_key: str) -> int:
+    """删除源分享链接的转存记录（记录过期或我方分享已失效）"""
+    try:
+        with db_cursor() as cursor:
+            if cursor is None:
+                return 0
+            cursor.execute("DELETE FROM share_transfers WHERE source_key = %s", (source_key,))
+            return cursor.rowcount
+    except Error as err:
+        logger.error(f"删除转存记录失败: {err}")
+        return 0
+
+
+@dao_query
+def delete_transfers_by_share_links(share_links: List[str]) -> int:
+    """批量删除我方分享后，清理指向这些分享的转存记录"""
+    if not share_links:
+        return 0
+    placeholders = ", ".join(["%s"] * len(share_links))
+    try:
+        with db_cursor() as cursor:
+            if cursor is None:
+                return 0
+            cursor.execute(f"DELETE FROM share_transfers WHERE share_link IN ({placeholders})", tuple(share_links))
+            return cursor.rowcount
+    except Error as err:
+        logger.error(f"批量删除转存记录失败: {err}")
+        return 0
+
+
+@dao_query
+def delete_transfers_by_share_link(share_link: str) -> int:
+    """我方分享 / 文件被删除后，清理指向它的转存记录"""
+    try:
+        with db_cursor() as cursor:
+            if cursor is None:
+                return 0
+            cursor.execute("DELETE FROM share_transfers WHERE share_link = %s", (share_link,))
+            return cursor.rowcount
+    except Error as err:
+        logger.error(f"删除转存记录失败: {err}")
+        return 0
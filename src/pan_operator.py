@@ -2,171 +2,415 @@ import logging
 import time
 from src.clients.quark_client import Quark
 from src.clients.baidu_client import Baidu
-from src.db.resources_dao import insert_resource, delete_by_share_link, update_share_link
-from src.db.cookie_config_dao import get_cookie_by_cloud_name
+from src.clients.account_signals import EXPIRED
+from src.clients.client_registry import CLIENTS, NETDISK_CLIENTS
+from src.db.resources_dao import insert_resource, delete_by_share_link, update_share_link, get_resource_by_share_link
+from src.db.share_transfer_dao import delete_transfers_by_share_link, delete_transfers_by_share_links
+from src.services.account_pool import ACCOUNTS, ERROR, OK
+from src.services.transfer_memo import TRANSFER_MEMO
+from configs.app_config import NETDISK_ACCOUNT_FAILOVER, NETDISK_DELETE_BATCH_SIZE
 from utils.netdisk_utils import match_netdisk_link
 
 logger = logging.getLogger(__name__)
 
-# --- 工具函数：Cookie 校验 ---
 
-def get_and_validate_cookie(netdisk_type: str) -> str:
+class NetdiskOperationError(Exception):
+    """网盘操作失败；retryable 为 False 表示重试也不会成功（如 Cookie 未配置）"""
+
+    def __init__(self, message, retryable=True):
+        super().__init__(message)
+        self.retryable = retryable
+
+
+# --- 核心逻辑：按账号执行网盘操作 ---
+
+def _with_account(netdisk_type, client_class, operation, account_id=None):
     """
-    统一获取并校验 Cookie。
-    :param netdisk_type: "夸克网盘" 或 "百度网盘"
-    :return: 有效的 cookie 字符串，无效则返回空字符串
+    从账号池选一个账号执行 operation(account, client) 并返回其结果，operation 失败时抛出异常。
+    失败期间客户端观测到该账号被限流或登录失效时，标记账号状态并换下一个账号重试（最多 NETDISK_ACCOUNT_FAILOVER 个）；
+    指定 account_id 时（删除文件必须用转存它的账号）只使用该账号。
+    客户端实例按 (网盘, 账号, Cookie 版本) 复用，连接与 bdstoken 跨请求保持。
     """
-    cookie = get_cookie_by_cloud_name(netdisk_type)
-    
-    if not cookie:
-        logger.error(f"[{netdisk_type}] 操作失败：数据库中未配置 Cookie。")
-        return ""
-    
-    if len(cookie) < 300:
-        logger.error(f"[{netdisk_type}] 操作失败：Cookie 长度不足({len(cookie)})，可能已失效。")
-        return ""
-        
-    return cookie
+    tried = []
+    for _ in range(max(1, NETDISK_ACCOUNT_FAILOVER)):
+        if account_id is not None:
+            account = ACCOUNTS.get(netdisk_type, account_id)
+        else:
+            account = ACCOUNTS.acquire(netdisk_type, exclude=tried)
+        if account is None:
+            break
+        tried.append(account.id)
+        client = CLIENTS.get(client_class, account.cookie, account.id)
+        started_at = time.time()
+        try:
+            result = operation(account, client)
+        except Exception as e:
+            signal = client.signals.since(started_at)
+            ACCOUNTS.release(account, signal or ERROR, str(e))
+            if signal and account_id is None:
+                reason = "登录失效" if signal == EXPIRED else "被限流"
+                logger.warning(f"[{netdisk_type}] 账号 {account.name} {reason}，换账号重试")
+                continue
+            raise
+        ACCOUNTS.release(account, OK)
+        return result
+
+    if account_id is not None:
+        message = f"{netdisk_type} 账号 {account_id} 不存在、已停用或登录失效"
+    elif tried:
+        message = f"{netdisk_type} 已尝试的 {len(tried)} 个账号均被限流或登录失效"
+    else:
+        message = f"{netdisk_type} 没有可用账号（未配置 Cookie、已失效或都在冷却中）"
+    logger.error(message)
+    raise NetdiskOperationError(message, retryable=bool(tried) or ACCOUNTS.has_cooling(netdisk_type))
+
+
+def _share_alive_checker(netdisk_type, client_class):
+    """返回检查我方分享是否仍有效的函数，调用时才从账号池借一个账号（不计入用量）"""
+    def is_alive(share_link):
+        account = ACCOUNTS.acquire(netdisk_type)
+        if account is None:
+            return False
+        try:
+            return CLIENTS.get(client_class, account.cookie, account.id).is_share_alive(share_link)
+        finally:
+            ACCOUNTS.release(account, OK, count=0)
+    return is_alive
+
+
+def _store(client, share_url, to_pdir_path: str = '/'):
+    """转存并重新分享，返回 (file_id, file_name, 新分享链接)；失败抛出 NetdiskOperationError"""
+    name = type(client).__name__
+    new_file_id, file_name, new_share_url = client.store(share_url, to_pdir_path)
+    if not new_file_id or not new_share_url:
+        logger.error(f"[{name}] 转存或分享接口返回空数据")
+        raise NetdiskOperationError(f"[{name}] 转存或分享失败")
+    logger.info(f"[{name}] 处理成功: {file_name}")
+    return new_file_id, file_name, new_share_url
+
+
+def _delete(client, file_ids):
+    """一次请求删除多个网盘文件（百度为路径列表，夸克为 fid 列表），失败抛出 NetdiskOperationError"""
+    name = type(client).__name__
+    if not client.del_file(list(file_ids)):
+        raise NetdiskOperationError(f"[{name}] 删除文件失败")
+    return True
+
+# 网盘名称 -> (save_to_netdisk 中的开关字段, 客户端类)
+_TRANSFER_CLIENTS = {
+    "夸克网盘": ("quark", Quark),
+    "百度网盘": ("baidu", Baidu),
+}
+
+
+def _transfer_client_class(netdisk_type, save_to_netdisk):
+    """返回需要转存时使用的客户端类；该网盘不支持或未开启转存时返回 None"""
+    flag, client_class = _TRANSFER_CLIENTS.get(netdisk_type, (None, None))
+    return client_class if flag and save_to_netdisk.get(flag, False) else None
 
-# --- 核心逻辑：通用网盘操作处理器 ---
 
-def _handle_netdisk_operation(client_class, client_cookie, share_url, to_pdir_path: str = '/', 
-                              operation: str = 'store', file_id: str = None):
+def _sync_share_record(share_data, netdisk_type, new_file_id, file_name, new_share_url, title, reused=False,
+                       account_id=None):
     """
-    通用网盘操作处理器（转存或删除）。
+    转存成功后同步数据库（记录转存所用的账号，删除文件时使用同一账号）。
+    已有记录（带 id）更新分享链接并返回 None；搜索发现的新资源入库并返回新记录；其余返回新链接信息。
+    复用之前的转存结果（reused）时，分享链接可能已属于另一条资源记录，此时不再重复写入。
     """
-    client = client_class(client_cookie)
-    try:
-        if operation == 'store':
-            # 执行转存流程
-            new_file_id, file_name, new_share_url = client.store(share_url, to_pdir_path)
+    owner = get_resource_by_share_link(new_share_url) if reused else None
+    owner_id = owner["id"] if owner else None
+    if 'id' in share_data:
+        # 场景 A: 已有记录更新链接
+        if owner_id is None:
+            update_share_link(share_data.get('id'), new_share_url, new_file_id, account_id)
+        elif owner_id != share_data.get('id'):
+            logger.info(f"资源 {share_data.get('id')} 的转存结果已被资源 {owner_id} 使用，不再更新: {new_share_url}")
+        return None
+    # 场景 B: 搜索发现新资源，入库并返回新对象
+    if any(key in share_data for key in ['name', 'cloud_name']):
+        new_record = {
+            'file_id': new_file_id,
+            'account_id': account_id,
+            'name': share_data.get('name', file_name or title),
+            'share_link': new_share_url,
+            'cloud_name': netdisk_type,
+            'type': share_data.get('resource_type'),
+            'remarks': share_data.get('remark')
+        }
+        if owner_id is None:
+            insert_resource(new_record)
+        return new_record
+    return {"share_url": new_share_url, "file_id": new_file_id, "account_id": account_id}
 
-            if not new_file_id or not new_share_url:
-                logger.error(f"[{client_class.__name__}] 转存或分享接口返回空数据")
-                return None, None, None
+def _known_dead(share_url):
+    """资源库中的链接已被巡检确认失效（转存必然失败，不再尝试）"""
+    resource = get_resource_by_share_link(share_url)
+    return bool(resource) and resource.get('is_alive') is not None and not resource['is_alive']
+
+# --- 业务接口：创建分享 ---
 
-            logger.info(f"[{client_class.__name__}] 处理成功: {file_name}")
-            time.sleep(0.5)  # 避免频率过快
-            return new_file_id, file_name, new_share_url
+def transfer_share(share_data, sync=True):
+    """
+    转存分享链接并同步数据库（sync=False 时不写库，由调用方批量写回），失败时抛出 NetdiskOperationError（后台任务据此决定是否重试）。
+    返回 {"status": "transferred", "share_url", "file_id", "file_name", "account_id", "record"}；无需转存时 {"status": "skipped"}
+    """
+    share_url = share_data.get('share_url')
+    title = share_data.get('title', f"资源_{int(time.time())}")
 
-        elif operation == 'delete':
-            if not file_id:
-                logger.error(f"[{client_class.__name__}] 删除操作缺失 file_id")
-                return False
+    # 1. 匹配网盘类型，判断是否需要转存
+    netdisk_type = match_netdisk_link(share_url)
+    client_class = _transfer_client_class(netdisk_type, share_data.get('save_to_netdisk', {}))
+    if not client_class:
+        logger.info(f"无需转存操作，跳过。类型: {netdisk_type}")
+        return {"status": "skipped", "netdisk": netdisk_type}
+    if _known_dead(share_url):
+        raise NetdiskOperationError(f"分享链接已失效: {share_url}", retryable=False)
 
-            # 百度删除通常需要路径列表，夸克通常是 ID
-            target = [file_id] if client_class == Baidu else file_id
-            status = client.del_file(target)
-            return status
+    # 2. 执行转存：从账号池选账号（被限流 / 登录失效时换账号），同一源链接优先复用之前的转存结果，
+    #    并发的相同转存合并为一次
+    def do_transfer():
+        def store(account, client):
+            return (*_store(client, share_url), account.id)
+        return _with_account(netdisk_type, client_class, store)
 
-    except Exception as e:
-        logger.exception(f"[{client_class.__name__}] 接口调用异常: {e}")
-        return (None, None, None) if operation == 'store' else False
+    new_file_id, file_name, new_share_url, account_id, reused = TRANSFER_MEMO.transfer(
+        share_url, netdisk_type, _share_alive_checker(netdisk_type, client_class), do_transfer
+    )
+    if not new_share_url:
+        raise NetdiskOperationError(f"{netdisk_type} 转存或分享失败")
+
+    # 3. 数据库同步
+    record = None
+    if sync:
+        record = _sync_share_record(share_data, netdisk_type, new_file_id, file_name, new_share_url, title, reused,
+                                    account_id)
+    return {
+        "status": "transferred",
+        "share_url": new_share_url,
+        "file_id": new_file_id,
+        "file_name": file_name,
+        "account_id": account_id,
+        "reused": reused,
+        "record": record,
+    }
 
-# --- 业务接口：创建分享 ---
 
 def create_share(share_data):
     """
-    创建/转存分享链接
+    创建/转存分享链接（同步执行）。
+    已有记录（带 id）返回 None；否则返回新记录，未转存或失败时原样返回 share_data。
     """
     try:
-        share_url = share_data.get('share_url')
-        title = share_data.get('title', f"资源_{int(time.time())}")
-        save_to_netdisk = share_data.get('save_to_netdisk', {})
-        has_id = 'id' in share_data
-        share_id = share_data.get('id')
+        result = transfer_share(share_data)
+        if result["status"] == "transferred":
+            return result["record"]
+    except NetdiskOperationError as e:
+        logger.error(f"create_share 失败: {e}")
+    except Exception as e:
+        logger.exception(f"create_share 运行异常: {e}")
+    return share_data if 'id' not in share_data else None
+
+# --- 业务接口：批量创建分享 ---
+
+def _store_many_with_failover(netdisk_type, client_class, share_urls):
+    """
+    用一个账号批量转存；该账号期间被限流或登录失效时，未成功的链接换下一个账号再转存。
+    返回 {分享链接: (file_id, file_name, 新分享链接, 账号 ID)}，只包含成功的链接。
+    """
+    stored = {}
+    pending = list(share_urls)
+    tried = []
+    while pending and len(tried) < max(1, NETDISK_ACCOUNT_FAILOVER):
+        account = ACCOUNTS.acquire(netdisk_type, exclude=tried)
+        if account is None:
+            logger.error(f"[{netdisk_type}] 没有可用账号，{len(pending)} 条链接未转存")
+            break
+        tried.append(account.id)
+        client = CLIENTS.get(client_class, account.cookie, account.id)
+        started_at = time.time()
+        try:
+            results = client.store_many(pending)
+        except Exception as e:
+            logger.exception(f"[{client_class.__name__}] 批量转存异常: {e}")
+            results = {}
+        succeeded = {url: (*result, account.id) for url, result in results.items() if result[2]}
+        stored.update(succeeded)
+        pending = [url for url in pending if url not in succeeded]
 
-        # 1. 匹配网盘类型
+        signal = client.signals.since(started_at)
+        if signal:
+            ACCOUNTS.release(account, signal, f"批量转存 {len(pending)} 条失败", count=max(1, len(pending)))
+            logger.warning(f"[{netdisk_type}] 账号 {account.name} {signal}，剩余 {len(pending)} 条换账号重试")
+            continue
+        ACCOUNTS.release(account, OK if succeeded else ERROR, count=max(1, len(succeeded)))
+        break
+    return stored
+
+
+def create_share_batch(items, save_to_netdisk=None):
+    """
+    批量创建/转存分享链接：按网盘分组，每组用同一个客户端批量转存（保存、分享任务并发提交、统一轮询）。
+    每项的字段与 create_share 相同，未单独指定 save_to_netdisk 的使用批量参数中的值。
+    返回 {原分享链接: {"status": "transferred" / "skipped" / "failed", ...}}
+    """
+    results = {}
+    groups = {}
+    for item in items:
+        share_url = item.get('share_url')
         netdisk_type = match_netdisk_link(share_url)
-        config_map = {
-            "夸克网盘": {"class": Quark, "enabled": save_to_netdisk.get('quark', False)},
-            "百度网盘": {"class": Baidu, "enabled": save_to_netdisk.get('baidu', False)}
-        }
-        
-        conf = config_map.get(netdisk_type)
-
-        # 2. 判断是否需要转存
-        if not conf or not conf["enabled"]:
-            logger.info(f"无需转存操作，跳过。类型: {netdisk_type}")
-            return share_data if not has_id else None
-
-        # 3. 获取并校验 Cookie
-        client_cookie = get_and_validate_cookie(netdisk_type)
-        if not client_cookie:
-            return share_data if not has_id else None
-
-        # 4. 执行转存
-        new_file_id, file_name, new_share_url = _handle_netdisk_operation(
-            client_class=conf["class"],
-            client_cookie=client_cookie,
-            share_url=share_url,
-            operation='store'
-        )
-
-        if not new_share_url:
-            return share_data if not has_id else None
-
-        # 5. 数据库同步
-        if has_id:
-            # 场景 A: 已有记录更新链接
-            update_share_link(share_id, new_share_url, new_file_id)
-            return None
-        else:
-            # 场景 B: 搜索发现新资源，入库并返回新对象
-            if any(key in share_data for key in ['name', 'cloud_name']):
-                new_record = {
-                    'file_id': new_file_id,
-                    'name': share_data.get('name', file_name or title),
-                    'share_link': new_share_url,
-                    'cloud_name': netdisk_type,
-                    'type': share_data.get('resource_type'),
-                    'remarks': share_data.get('remark')
-                }
-                insert_resource(new_record)
-                return new_record
-            return {"share_url": new_share_url, "file_id": new_file_id}
+        client_class = _transfer_client_class(netdisk_type, item.get('save_to_netdisk') or save_to_netdisk or {})
+        if not client_class:
+            results[share_url] = {"status": "skipped", "message": f"无需转存 ({netdisk_type})"}
+            continue
+        if _known_dead(share_url):
+            results[share_url] = {"status": "failed", "message": "分享链接已失效"}
+            continue
+        groups.setdefault(netdisk_type, (client_class, []))[1].append(item)
 
-    except Exception as e:
-        logger.exception(f"create_share 运行异常: {e}")
-        return share_data if 'id' not in share_data else None
+    for netdisk_type, (client_class, group) in groups.items():
+        # 已转存过且分享仍有效的链接直接复用，其余批量转存
+        is_alive = _share_alive_checker(netdisk_type, client_class)
+        reused = {}
+        for item in group:
+            memo = TRANSFER_MEMO.lookup(item['share_url'], is_alive)
+            if memo:
+                reused[item['share_url']] = memo[:4]
+        pending = [item['share_url'] for item in group if item['share_url'] not in reused]
+        stored = _store_many_with_failover(netdisk_type, client_class, pending) if pending else {}
+        for share_url, result in stored.items():
+            TRANSFER_MEMO.record(share_url, netdisk_type, result)
+
+        for item in group:
+            share_url = item['share_url']
+            new_file_id, file_name, new_share_url, account_id = (
+                reused.get(share_url) or stored.get(share_url) or (None, None, None, None))
+            if not new_share_url:
+                results[share_url] = {"status": "failed", "message": "转存或分享失败"}
+                continue
+            try:
+                title = item.get('title', f"资源_{int(time.time())}")
+                record = _sync_share_record(item, netdisk_type, new_file_id, file_name, new_share_url, title,
+                                            share_url in reused, account_id)
+            except Exception as e:
+                logger.exception(f"批量转存同步数据库异常 ({share_url}): {e}")
+                record = None
+            results[share_url] = {
+                "status": "transferred",
+                "share_url": new_share_url,
+                "file_id": new_file_id,
+                "file_name": file_name,
+                "account_id": account_id,
+                "reused": share_url in reused,
+                "record": record,
+            }
+
+    logger.info(
+        f"批量转存完成: 共 {len(results)} 条，成功 "
+        f"{sum(r['status'] == 'transferred' for r in results.values())} 条"
+    )
+    return results
 
 # --- 业务接口：删除分享 ---
 
-def del_share(share_data):
+def _owner_account_id(netdisk_type, account_id):
     """
-    删除分享及其对应的网盘文件
+    删除文件所用的账号：记录了所属账号时用该账号，否则用该网盘原来的账号（多账号之前的文件都在它名下）。
+    绝不交给账号池分配：别的账号里没有这个文件，删除接口却可能返回成功。
     """
-    try:
-        share_url = share_data.get('share_url')
-        file_id = share_data.get('file_id')
+    if account_id is not None:
+        return account_id
+    account_id = ACCOUNTS.original_account_id(netdisk_type)
+    if account_id is None:
+        raise NetdiskOperationError(f"{netdisk_type} 没有配置账号，无法确定文件所属账号", retryable=False)
+    return account_id
 
-        if not share_url:
-            return False
 
-        # 1. 获取 Cookie
-        netdisk_type = match_netdisk_link(share_url)
-        client_cookie = get_and_validate_cookie(netdisk_type)
-        if not client_cookie:
-            return False
+def delete_share_file(share_data):
+    """
+    删除分享对应的网盘文件并清理数据库记录，失败时抛出 NetdiskOperationError。
+    """
+    share_url = share_data.get('share_url')
+    file_id = share_data.get('file_id')
+    if not share_url:
+        raise NetdiskOperationError("缺少 share_url", retryable=False)
+    if not file_id:
+        raise NetdiskOperationError("删除操作缺失 file_id", retryable=False)
+
+    # 1. 文件只能由转存它的账号删除；旧记录没有账号信息时使用该网盘原来的账号
+    netdisk_type = match_netdisk_link(share_url)
+    client_class = NETDISK_CLIENTS.get(netdisk_type)
+    if client_class is None:
+        raise NetdiskOperationError(f"不支持删除 {netdisk_type} 的文件", retryable=False)
+    account_id = share_data.get('account_id')
+    if account_id is None:
+        account_id = (get_resource_by_share_link(share_url) or {}).get('account_id')
+    account_id = _owner_account_id(netdisk_type, account_id)
+
+    # 2. 执行物理删除
+    _with_account(netdisk_type, client_class, lambda account, client: _delete(client, [file_id]), account_id)
+
+    # 3. 逻辑删除（数据库记录清理），指向该分享的转存记录一并失效
+    delete_by_share_link(share_url)
+    delete_transfers_by_share_link(share_url)
+    logger.info(f"成功清理 {netdisk_type} 资源及其数据库记录")
+    return {"status": "deleted", "netdisk": netdisk_type}
 
-        # 2. 执行物理删除
-        client_class = Baidu if netdisk_type == "百度网盘" else Quark
-        status = _handle_netdisk_operation(
-            client_class=client_class,
-            client_cookie=client_cookie,
-            share_url=share_url,
-            operation='delete',
-            file_id=file_id
-        )
-
-        # 3. 逻辑删除（数据库记录清理）
-        if status:
-            delete_by_share_link(share_url)
-            logger.info(f"成功清理 {netdisk_type} 资源及其数据库记录")
-            return True
-        
-        return False
 
+def del_share(share_data):
+    """
+    删除分享及其对应的网盘文件（同步执行），返回是否成功
+    """
+    try:
+        delete_share_file(share_data)
+        return True
+    except NetdiskOperationError as e:
+        logger.error(f"del_share 失败: {e}")
     except Exception as e:
         logger.exception(f"del_share 运行异常: {e}")
-        return False
\ No newline at end of file
+    return False
+
+# --- 业务接口：批量删除分享 ---
+
+def delete_share_files(items):
+    """
+    批量删除分享对应的网盘文件：按 (网盘, 所属账号) 分组，每组每 NETDISK_DELETE_BATCH_SIZE 个文件调用一次删除接口。
+    资源记录由调用方删除，这里只清理指向这些分享的转存记录。
+    每项为 {"share_url", "file_id", "account_id"}，
+    返回 {分享链接: {"status": "deleted" / "skipped" / "failed", "message", "retryable"}}
+    """
+    results = {}
+    groups = {}
+    for item in items:
+        share_url = item.get('share_url')
+        netdisk_type = match_netdisk_link(share_url or '')
+        client_class = NETDISK_CLIENTS.get(netdisk_type)
+        if client_class is None:
+            results[share_url] = {"status": "skipped", "message": f"不支持删除 {netdisk_type} 的文件"}
+        elif not item.get('file_id'):
+            results[share_url] = {"status": "failed", "message": "删除操作缺失 file_id", "retryable": False}
+        else:
+            try:
+                account_id = _owner_account_id(netdisk_type, item.get('account_id'))
+            except NetdiskOperationError as e:
+                results[share_url] = {"status": "failed", "message": str(e), "retryable": e.retryable}
+                continue
+            groups.setdefault((netdisk_type, account_id), (client_class, []))[1].append(item)
+
+    for (netdisk_type, account_id), (client_class, group) in groups.items():
+        for start in range(0, len(group), NETDISK_DELETE_BATCH_SIZE):
+            chunk = group[start:start + NETDISK_DELETE_BATCH_SIZE]
+            file_ids = [item['file_id'] for item in chunk]
+            try:
+                _with_account(netdisk_type, client_class, lambda account, client: _delete(client, file_ids), account_id)
+                outcome = {"status": "deleted"}
+            except NetdiskOperationError as e:
+                outcome = {"status": "failed", "message": str(e), "retryable": e.retryable}
+            except Exception as e:
+                logger.exception(f"[{netdisk_type}] 批量删除文件异常: {e}")
+                outcome = {"status": "failed", "message": str(e), "retryable": True}
+            for item in chunk:
+                results[item['share_url']] = dict(outcome)
+
+    deleted = [url for url, result in results.items() if result["status"] == "deleted"]
+    delete_transfers_by_share_links(deleted)
+    logger.info(f"批量删除网盘文件完成: 共 {len(results)} 条，成功 {len(deleted)} 条")
+    return results
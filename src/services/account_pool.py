@@ -0,0 +1,188 @@
+import logging
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional
+
+from configs.app_config import (
+    NETDISK_ACCOUNT_COOLDOWN,
+    NETDISK_ACCOUNT_REFRESH_SECONDS,
+    NETDISK_ACCOUNT_STRATEGY,
+)
+from src.clients.account_signals import EXPIRED, RATE_LIMITED
+from src.db.cookie_config_dao import add_account_usage, get_accounts, update_account_health
+from utils.metrics_utils import NETDISK_ACCOUNT_IN_FLIGHT, NETDISK_ACCOUNT_OPS
+
+logger = logging.getLogger(__name__)
+
+# 长度不足的 Cookie 视为无效（未登录的 Cookie 通常很短）
+MIN_COOKIE_LENGTH = 300
+
+OK, ERROR = "ok", "error"
+
+
+class NetdiskAccount:
+    """一个网盘账号：配置与健康状态来自 cookie_config，in_flight 等为本进程的运行时状态"""
+
+    __slots__ = ("id", "cloud_name", "name", "cookie", "weight", "daily_quota", "is_enabled", "status",
+                 "cooldown_until", "transfers_today", "in_flight", "current_weight")
+
+    def __init__(self, row: Dict[str, Any]) -> None:
+        self.id = row["id"]
+        self.in_flight = 0
+        self.current_weight = 0
+        self.update(row)
+
+    def update(self, row: Dict[str, Any]) -> None:
+        self.cloud_name = row["cloud_name"]
+        self.name = row.get("account_name") or "default"
+        self.cookie = row.get("cookie") or ""
+        self.weight = max(1, int(row.get("weight") or 1))
+        self.daily_quota = row.get("daily_quota")
+        self.is_enabled = bool(row.get("is_enabled", True))
+        self.status = row.get("status") or OK
+        cooldown_seconds = float(row.get("cooldown_seconds") or 0)
+        self.cooldown_until = time.monotonic() + cooldown_seconds if cooldown_seconds > 0 else 0.0
+        self.transfers_today = int(row.get("transfers_today") or 0)
+
+    def healthy(self) -> bool:
+        """启用、Cookie 有效且未登录失效（可能在冷却中）"""
+        return self.is_enabled and self.status != EXPIRED and len(self.cookie) >= MIN_COOKIE_LENGTH
+
+    def usable(self, now: float) -> bool:
+        """可以分配：健康且不在冷却中"""
+        return self.healthy() and now >= self.cooldown_until
+
+    def has_quota(self) -> bool:
+        return self.daily_quota is None or self.transfers_today < self.daily_quota
+
+
+class AccountPool:
+    """
+    网盘多账号分配：每次操作选一个账号，账号被限流时冷却 NETDISK_ACCOUNT_COOLDOWN 秒、登录失效时停用，
+    状态写回 cookie_config，其他 worker 每 NETDISK_ACCOUNT_REFRESH_SECONDS 秒重新加载后生效。
+    分配策略（NETDISK_ACCOUNT_STRATEGY）:
+    - least_loaded: 本进程进行中的操作数 / 权重最小者，相同时当日用量 / 权重小者优先；
+    - round_robin: 平滑加权轮询。
+    设置了每日额度的账号用满后不再分配。
+    """
+
+    def __init__(self, strategy: str = NETDISK_ACCOUNT_STRATEGY, refresh_seconds: float = NETDISK_ACCOUNT_REFRESH_SECONDS,
+                 cooldown: float = NETDISK_ACCOUNT_COOLDOWN) -> None:
+        self.strategy = strategy
+        self.refresh_seconds = refresh_seconds
+        self.cooldown = cooldown
+        self._accounts: Dict[str, Dict[int, NetdiskAccount]] = {}
+        self._loaded_at: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def _load(self, cloud_name: str) -> List[NetdiskAccount]:
+        """在锁内调用：按需从数据库刷新账号，保留进行中的操作数等运行时状态"""
+        now = time.monotonic()
+        if now - self._loaded_at.get(cloud_name, -self.refresh_seconds) >= self.refresh_seconds:
+            rows = get_accounts(cloud_name)
+            known = self._accounts.get(cloud_name, {})
+            accounts = {}
+            for row in rows:
+                account = known.get(row["id"])
+                if account is None:
+                    account = NetdiskAccount(row)
+                else:
+                    account.update(row)
+                accounts[account.id] = account
+            # 数据库读取失败时沿用上次的账号
+            if accounts or not known:
+                self._accounts[cloud_name] = accounts
+            self._loaded_at[cloud_name] = now
+        return list(self._accounts.get(cloud_name, {}).values())
+
+    def invalidate(self, cloud_name: Optional[str] = None) -> None:
+        """账号配置变更后调用，下次分配时重新加载"""
+        with self._lock:
+            if cloud_name is None:
+                self._loaded_at.clear()
+            else:
+                self._loaded_at.pop(cloud_name, None)
+
+    def acquire(self, cloud_name: str, exclude: Iterable[int] = ()) -> Optional[NetdiskAccount]:
+        """选一个可用账号并计入进行中，用完必须调用 release()；没有可用账号返回 None"""
+        excluded = set(exclude)
+        now = time.monotonic()
+        with self._lock:
+            candidates = [a for a in self._load(cloud_name) if a.id not in excluded and a.usable(now) and a.has_quota()]
+            if not candidates:
+                return None
+            if self.strategy == "round_robin":
+                total = sum(a.weight for a in candidates)
+                for account in candidates:
+                    account.current_weight += account.weight
+                chosen = max(candidates, key=lambda a: a.current_weight)
+                chosen.current_weight -= total
+            else:
+                chosen = min(candidates, key=lambda a: (a.in_flight / a.weight, a.transfers_today / a.weight, a.id))
+            chosen.in_flight += 1
+        NETDISK_ACCOUNT_IN_FLIGHT.labels(cloud_name, chosen.name).inc()
+        return chosen
+
+    def get(self, cloud_name: str, account_id: int) -> Optional[NetdiskAccount]:
+        """
+        取指定账号（删除文件必须用转存它的账号），计入进行中，用完调用 release()。
+        冷却中和额度用满的账号仍可用于删除；账号不存在、已停用或失效时返回 None。
+        """
+        with self._lock:
+            account = next((a for a in self._load(cloud_name) if a.id == account_id), None)
+            if account is None or not account.healthy():
+                return None
+            account.in_flight += 1
+        NETDISK_ACCOUNT_IN_FLIGHT.labels(cloud_name, account.name).inc()
+        return account
+
+    def original_account_id(self, cloud_name: str) -> Optional[int]:
+        """
+        该网盘最早的账号（ID 最小，即支持多账号之前唯一的那个账号）。
+        没有记录所属账号的旧文件只可能在这个账号里，删除时用它而不是随机分配。
+        """
+        with self._lock:
+            ids = [a.id for a in self._load(cloud_name)]
+        return min(ids) if ids else None
+
+    def has_cooling(self, cloud_name: str) -> bool:
+        """是否有账号只是暂时在冷却（稍后重试可能成功）"""
+        now = time.monotonic()
+        with self._lock:
+            return any(a.healthy() and now < a.cooldown_until for a in self._load(cloud_name))
+
+    def release(self, account: NetdiskAccount, outcome: str = OK, error: str = "", count: int = 1) -> None:
+        """
+        归还账号并记录结果: ok 成功 / error 普通失败（不影响账号状态）/ rate_limited 冷却 / expired 停用。
+        count 为本次操作处理的链接数（批量转存时大于 1），计入当日用量；只读操作（如检查分享有效性）传 0。
+        """
+        with self._lock:
+            account.in_flight -= 1
+            recovered = outcome == OK and account.status != OK
+            if outcome == OK:
+                account.transfers_today += count
+                account.status = OK
+            elif outcome == RATE_LIMITED:
+                account.cooldown_until = time.monotonic() + self.cooldown
+                account.status = RATE_LIMITED
+            elif outcome == EXPIRED:
+                account.status = EXPIRED
+        NETDISK_ACCOUNT_IN_FLIGHT.labels(account.cloud_name, account.name).dec()
+        NETDISK_ACCOUNT_OPS.labels(account.cloud_name, account.name, outcome).inc(count)
+
+        if outcome == OK:
+            if count:
+                add_account_usage(account.id, successes=count)
+            if recovered:
+                update_account_health(account.id, OK)
+            return
+        add_account_usage(account.id, failures=count)
+        if outcome == RATE_LIMITED:
+            logger.warning(f"[{account.cloud_name}] 账号 {account.name} 被限流，暂停分配 {self.cooldown:.0f} 秒: {error}")
+            update_account_health(account.id, RATE_LIMITED, self.cooldown, error or "被限流")
+        elif outcome == EXPIRED:
+            logger.error(f"[{account.cloud_name}] 账号 {account.name} 登录已失效，停止分配，请更新 Cookie: {error}")
+            update_account_health(account.id, EXPIRED, 0, error or "登录失效")
+
+
+ACCOUNTS = AccountPool()
@@ -1,12 +1,15 @@
 import json
 import time
 import logging
+import threading
 import concurrent.futures
 
 import jmespath
 import requests
 
+from configs.app_config import API_TEST_CONCURRENCY, API_TEST_TIMEOUT
 from src.db.api_config_dao import (
+    batch_update_test_results,
     get_all_configs,
     get_config_by_id,
     get_config_status,
@@ -20,6 +23,8 @@ from src.db.api_config_dao import (
     enable_all_normal,
     disable_all,
 )
+from src.services.search_cache import invalidate_configs
+from utils import json_utils
 
 logger = logging.getLogger(__name__)
 
@@ -37,6 +42,7 @@ def get_api_status_from_db(api_id):
 def update_api_status_in_db(api_id, new_status, response_time_ms=0):
     """更新 API 配置的状态和响应时间 (不修改 is_enabled)"""
     update_status(api_id, new_status, response_time_ms)
+    invalidate_configs()
 
 
 def update_api_enabled_status_in_db(api_id, is_enabled, new_status=None, response_time_ms=None):
@@ -45,6 +51,7 @@ def update_api_enabled_status_in_db(api_id, is_enabled, new_status=None, respons
     用于测试失败后，强制禁用 API。
     """
     update_enabled_status(api_id, is_enabled, new_status, response_time_ms)
+    invalidate_configs()
 
 
 def extract_from_json(json_data, rule):
@@ -52,7 +59,7 @@ def extract_from_json(json_data, rule):
     if json_data is None:
         return None
     try:
-        data = json.loads(json_data)
+        data = json_utils.loads(json_data)
         result = jmespath.search(rule, data)
         return result
     except Exception:
@@ -61,37 +68,51 @@ def extract_from_json(json_data, rule):
 
 def add_api_config_to_db(new_config):
     """向数据库中添加一条 API 配置记录"""
-    return insert_config(new_config)
+    result = insert_config(new_config)
+    invalidate_configs()
+    return result
 
 
 def copy_api_config_in_db(api_id):
     """在数据库中复制一条 API 配置记录"""
-    return copy_config(api_id)
+    result = copy_config(api_id)
+    invalidate_configs()
+    return result
 
 
 def update_api_config_in_db(api_id, updated_config):
     """更新一条 API 配置记录"""
-    return update_config(api_id, updated_config)
+    result = update_config(api_id, updated_config)
+    invalidate_configs()
+    return result
 
 
 def delete_api_config_in_db(api_id):
     """删除一条 API 配置记录"""
-    return delete_config(api_id)
+    result = delete_config(api_id)
+    invalidate_configs()
+    return result
 
 
 def set_api_enabled_in_db(api_id, is_enabled):
     """切换单个 API 的启用状态，限制异常状态下启用"""
-    return set_enabled(api_id, is_enabled)
+    result = set_enabled(api_id, is_enabled)
+    invalidate_configs()
+    return result
 
 
 def enable_all_apis_in_db():
     """一键启用所有【状态正常 (status=1)】的 API"""
-    return enable_all_normal()
+    result = enable_all_normal()
+    invalidate_configs()
+    return result
 
 
 def disable_all_apis_in_db():
     """一键禁用所有 API"""
-    return disable_all()
+    result = disable_all()
+    invalidate_configs()
+    return result
 
 
 def update_config_with_keyword(config, placeholder, keyword):
@@ -110,6 +131,20 @@ def update_config_with_keyword(config, placeholder, keyword):
     return new_config
 
 
+def _send_test_request(http, url, method, request_body, timeout):
+    """发送测试请求；http 为 requests 模块或 Session。不支持的方法返回 None"""
+    if method == "get":
+        try:
+            request_params = json.loads(request_body)
+            return http.get(url, params=request_params, verify=False, timeout=timeout)
+        except json.JSONDecodeError:
+            return http.get(url, verify=False, timeout=timeout)
+    if method == "post":
+        headers = {"Content-Type": "application/json"}
+        return http.post(url, data=request_body, headers=headers, verify=False, timeout=timeout)
+    return None
+
+
 def test_single_api(api_id, api_config=None, update_status=False):
     """测试单个 API 并更新数据库状态、响应时间和is_enabled"""
     if api_config is None:
@@ -137,22 +172,13 @@ def test_single_api(api_id, api_config=None, update_status=False):
         request_body = api_config.get("request", "{}")
         response_rule = api_config.get("response", "{}")
 
-        # 执行请求 (代码逻辑与之前保持一致)
-        if method == "get":
-            try:
-                request_params = json.loads(request_body)
-                response = requests.get(url, params=request_params, verify=False, timeout=5)
-            except json.JSONDecodeError:
-                response = requests.get(url, verify=False, timeout=5)
-        elif method == "post":
-            headers = {"Content-Type": "application/json"}
-            response = requests.post(url, data=request_body, headers=headers, verify=False, timeout=5)
-        else:
+        response = _send_test_request(requests, url, method, request_body, timeout=5)
+        if response is None:
             logger.warning(f"API {url} (ID:{api_id}) 不支持的 HTTP 方法: {method}，更新状态为不可用")
             # **核心修改：测试失败，强制禁止**
             if api_id != "未知ID" and api_id.isdigit():
                 update_api_enabled_status_in_db(api_id, is_enabled=False, new_status=False, response_time_ms=0)
-            return url, False, response.status_code if "response" in locals() else None, False, 0
+            return url, False, None, False, 0
 
         # 计算响应时间（毫秒）
         end_time = time.time()
@@ -197,17 +223,91 @@ def test_single_api(api_id, api_config=None, update_status=False):
         return url, new_status, None, False, response_time_ms
 
 
-def test_all_apis_and_update_status():
-    """测试所有API配置并更新其状态"""
+def probe_api(http, config, timeout, keyword="凡人修仙传"):
+    """
+    用关键词实际请求一次 API 并校验响应规则，不写数据库。
+    返回 {"id", "name", "url", "status", "status_code", "rule_matched", "error", "response_time_ms"}
+    """
+    config = update_config_with_keyword(config, "[[keyword]]", keyword)
+    result = {"id": config.get("id"), "name": config.get("name"), "url": config.get("url"),
+              "status": False, "status_code": None, "rule_matched": False, "error": None}
+    start_time = time.time()
+    try:
+        response = _send_test_request(
+            http, config["url"], config["method"].lower(), config.get("request", "{}"), timeout
+        )
+        if response is None:
+            result["error"] = f"不支持的 HTTP 方法: {config['method']}"
+        else:
+            result["status_code"] = response.status_code
+            result["rule_matched"] = bool(extract_from_json(response.text, config.get("response", "{}")))
+            result["status"] = 200 <= response.status_code < 300 and result["rule_matched"]
+    except Exception as e:
+        result["error"] = str(e)
+    result["response_time_ms"] = int((time.time() - start_time) * 1000)
+    return result
+
+
+def iter_test_all_apis(concurrency=API_TEST_CONCURRENCY, timeout=API_TEST_TIMEOUT):
+    """
+    并发测试所有 API 配置，每完成一个就产出一个结果事件：
+        {"type": "start", "total": N}
+        {"type": "result", "done": i, "total": N, "id": ..., "name": ..., "status": ..., ...}
+        {"type": "end", "total": N, "passed": ..., "failed": ..., "saved": ...}
+    每个工作线程复用一个 Session（连接保持）；测试结果在结束时（包括客户端中途断开时）
+    以单个事务批量写回，失败的 API 自动禁用。
+    """
     api_configs = read_api_configs_from_db()
+    total = len(api_configs)
+    yield {"type": "start", "total": total}
+
+    local = threading.local()
+    sessions = []
+    sessions_lock = threading.Lock()
+
+    def get_session():
+        session = getattr(local, "session", None)
+        if session is None:
+            session = local.session = requests.Session()
+            with sessions_lock:
+                sessions.append(session)
+        return session
+
+    def run(config):
+        return probe_api(get_session(), config, timeout)
+
+    status_rows = []
+    passed = 0
+    executor = concurrent.futures.ThreadPoolExecutor(max_workers=max(1, concurrency))
+    try:
+        futures = [executor.submit(run, config) for config in api_configs]
+        for done, future in enumerate(concurrent.futures.as_completed(futures), 1):
+            result = future.result()
+            passed += result["status"]
+            status_rows.append((result["id"], result["status"], result["response_time_ms"]))
+            logger.info(
+                "API %s (ID:%s) 测试完毕，状态码: %s，耗时: %dms，是否有效: %s",
+                result["url"], result["id"], result["status_code"], result["response_time_ms"], result["status"],
+            )
+            yield {"type": "result", "done": done, "total": total, **result}
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+        saved = batch_update_test_results(status_rows)
+        invalidate_configs()
+        for session in sessions:
+            session.close()
 
-    with concurrent.futures.ThreadPoolExecutor(max_workers=5) as executor:
-        # 提交所有 API 配置进行测试
-        futures = [executor.submit(test_single_api, config) for config in api_configs]
-        for _ in concurrent.futures.as_completed(futures):
-            pass
+    yield {"type": "end", "total": total, "passed": passed, "failed": total - passed, "saved": saved}
 
-    logger.info("所有 API 测试并更新状态完毕 (失败的 API 已自动禁止)")
-    return True, "所有 API 测试并更新状态成功 (异常的已自动禁止)"
 
+def test_all_apis_and_update_status():
+    """测试所有API配置并更新其状态"""
+    end_event = {}
+    for event in iter_test_all_apis():
+        end_event = event
 
+    if not end_event.get("saved"):
+        return False, "API 测试完成，但写回测试结果失败，请查看日志"
+
+    logger.info("所有 API 测试并更新状态完毕 (失败的 API 已自动禁止)")
+    return True, f"所有 API 测试并更新状态成功：正常 {end_event['passed']} 个，异常 {end_event['failed']} 个 (异常的已自动禁止)"
@@ -0,0 +1,155 @@
+import concurrent.futures
+import logging
+import random
+import threading
+from typing import Any, Dict, Optional
+
+import requests
+
+from configs.app_config import (
+    API_TEST_TIMEOUT,
+    HEALTH_CHECK_CONCURRENCY,
+    HEALTH_CHECK_ENABLED,
+    HEALTH_CHECK_INTERVAL,
+    HEALTH_CHECK_JITTER,
+    HEALTH_CHECK_KEYWORD,
+    HEALTH_DISABLE_AFTER_FAILURES,
+    HEALTH_EWMA_ALPHA,
+    HEALTH_ENABLE_AFTER_SUCCESSES,
+    HEALTH_LOCK_FILE,
+)
+from src.db.api_config_dao import batch_update_health, get_all_configs
+from src.services.api_config_service import probe_api
+from src.services.search_cache import invalidate_configs
+from utils.lock_utils import LeaderLock
+
+logger = logging.getLogger(__name__)
+
+
+class UpstreamHealth:
+    """单个 API 的健康状态：EWMA 耗时、EWMA 成功率以及连续成功/失败次数"""
+
+    __slots__ = ("latency_ms", "success_rate", "consecutive_failures", "consecutive_successes")
+
+    def __init__(self, latency_ms: Optional[float] = None, success_rate: Optional[float] = None) -> None:
+        self.latency_ms = latency_ms
+        self.success_rate = success_rate
+        self.consecutive_failures = 0
+        self.consecutive_successes = 0
+
+    def observe(self, ok: bool, latency_ms: float, alpha: float = HEALTH_EWMA_ALPHA) -> None:
+        sample = 1.0 if ok else 0.0
+        if self.latency_ms is None:
+            self.latency_ms = latency_ms
+        else:
+            self.latency_ms += alpha * (latency_ms - self.latency_ms)
+        if self.success_rate is None:
+            self.success_rate = sample
+        else:
+            self.success_rate += alpha * (sample - self.success_rate)
+
+        if ok:
+            self.consecutive_successes += 1
+            self.consecutive_failures = 0
+        else:
+            self.consecutive_failures += 1
+            self.consecutive_successes = 0
+
+
+_health: Dict[int, UpstreamHealth] = {}
+_run_lock = threading.Lock()
+_session_local = threading.local()
+_leader_lock = LeaderLock(HEALTH_LOCK_FILE, "健康检查")
+_scheduler = None
+
+
+def _get_session() -> requests.Session:
+    """探测线程各自复用一个 Session，跨轮次保持连接"""
+    session = getattr(_session_local, "session", None)
+    if session is None:
+        session = _session_local.session = requests.Session()
+    return session
+
+
+def _health_for(config: Dict[str, Any]) -> UpstreamHealth:
+    health = _health.get(config["id"])
+    if health is None:
+        # 用数据库中的历史值作为 EWMA 初值，进程重启或接管后不会从零开始
+        health = _health[config["id"]] = UpstreamHealth(
+            float(config["response_time_ms"]) if config.get("response_time_ms") else None,
+            config.get("success_rate"),
+        )
+    return health
+
+
+def _probe(config: Dict[str, Any]) -> Dict[str, Any]:
+    return probe_api(_get_session(), config, API_TEST_TIMEOUT, HEALTH_CHECK_KEYWORD)
+
+
+def run_health_check(force: bool = False) -> Dict[str, int]:
+    """
+    执行一轮健康检查并批量写回数据库。
+    只有持有锁的进程会真正执行（force=True 时跳过锁检查，用于手动触发）。
+    返回 {"probed": ..., "disabled": ..., "enabled": ...}
+    """
+    summary = {"probed": 0, "disabled": 0, "enabled": 0}
+    if not force and not _leader_lock.acquire():
+        return summary
+    if not _run_lock.acquire(blocking=False):
+        logger.warning("上一轮健康检查尚未结束，跳过本轮")
+        return summary
+
+    try:
+        configs = get_all_configs(order_by_created=False)
+        random.shuffle(configs)  # 打散探测顺序，避免每轮都在同一时刻请求同一个上游
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers=max(1, HEALTH_CHECK_CONCURRENCY)) as executor:
+            futures = {executor.submit(_probe, config): config for config in configs}
+            probes, disable_ids, enable_ids = [], [], []
+            for future in concurrent.futures.as_completed(futures):
+                config = futures[future]
+                result = future.result()
+                health = _health_for(config)
+                health.observe(result["status"], result["response_time_ms"])
+
+                probes.append((config["id"], result["status"], int(health.latency_ms), round(health.success_rate, 4)))
+                if config["is_enabled"] and health.consecutive_failures >= HEALTH_DISABLE_AFTER_FAILURES:
+                    disable_ids.append(config["id"])
+                elif (not config["is_enabled"] and config.get("auto_disabled")
+                      and health.consecutive_successes >= HEALTH_ENABLE_AFTER_SUCCESSES):
+                    enable_ids.append(config["id"])
+
+        if batch_update_health(probes, disable_ids, enable_ids):
+            if disable_ids or enable_ids:
+                invalidate_configs()
+            summary = {"probed": len(probes), "disabled": len(disable_ids), "enabled": len(enable_ids)}
+        logger.info(f"健康检查完成: {summary}")
+        return summary
+    finally:
+        _run_lock.release()
+
+
+def start_health_scheduler():
+    """
+    启动后台健康检查（每个 worker 都会注册任务，但只有持有锁的进程执行）。
+    使用 gunicorn --preload 时请在 post_fork 钩子中调用，线程不会跨 fork 保留。
+    """
+    global _scheduler
+    if not HEALTH_CHECK_ENABLED or _scheduler is not None:
+        return None
+
+    from apscheduler.schedulers.background import BackgroundScheduler
+
+    _scheduler = BackgroundScheduler(daemon=True)
+    _scheduler.add_job(
+        run_health_check,
+        "interval",
+        seconds=HEALTH_CHECK_INTERVAL,
+        jitter=HEALTH_CHECK_JITTER,
+        id="upstream_health_check",
+        max_instances=1,
+        coalesce=True,
+    )
+    _scheduler.start()
+    logger.info(f"后台健康检查已启动，间隔 {HEALTH_CHECK_INTERVAL}s ± {HEALTH_CHECK_JITTER}s")
+    return _scheduler
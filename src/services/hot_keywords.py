@@ -0,0 +1,108 @@
+import heapq
+import logging
+import threading
+import time
+from typing import Dict, List, Tuple
+
+from configs.app_config import HOT_KEYWORD_CAPACITY, HOT_KEYWORD_FLUSH_SECONDS, HOT_KEYWORD_HALF_LIFE_HOURS
+
+logger = logging.getLogger(__name__)
+
+MAX_KEYWORD_LENGTH = 100
+HALF_LIFE_SECONDS = HOT_KEYWORD_HALF_LIFE_HOURS * 3600
+
+
+def normalize_keyword(keyword: str) -> str:
+    return " ".join(str(keyword).split())
+
+
+class SpaceSaving:
+    """
+    Space-Saving 频繁项统计：最多跟踪 capacity 个键，内存有界。
+    新键在表满时顶替当前计数最小的键，并继承其计数（记入 error），
+    因此 count 是高估值，count - error 是保证下界；真实频次超过 N / capacity 的键一定在表中。
+    最小值用惰性删除的小顶堆维护，单次更新均摊 O(log capacity)。
+    """
+
+    def __init__(self, capacity: int) -> None:
+        self.capacity = max(1, capacity)
+        self.counts: Dict[str, List[int]] = {}   # key -> [count, error]
+        self._heap: List[Tuple[int, str]] = []
+        self.total = 0
+
+    def add(self, key: str, amount: int = 1) -> None:
+        self.total += amount
+        entry = self.counts.get(key)
+        if entry is None:
+            if len(self.counts) < self.capacity:
+                entry = self.counts[key] = [0, 0]
+            else:
+                min_count, min_key = self._pop_min()
+                del self.counts[min_key]
+                entry = self.counts[key] = [min_count, min_count]
+        entry[0] += amount
+        heapq.heappush(self._heap, (entry[0], key))
+        if len(self._heap) > 4 * self.capacity:
+            self._rebuild_heap()
+
+    def _pop_min(self) -> Tuple[int, str]:
+        while True:
+            count, key = heapq.heappop(self._heap)
+            entry = self.counts.get(key)
+            if entry is not None and entry[0] == count:
+                return count, key
+
+    def _rebuild_heap(self) -> None:
+        self._heap = [(entry[0], key) for key, entry in self.counts.items()]
+        heapq.heapify(self._heap)
+
+    def top(self, n: int) -> List[Tuple[str, int, int]]:
+        """按估计次数倒序返回前 n 项: [(key, count, error), ...]"""
+        items = heapq.nlargest(n, self.counts.items(), key=lambda item: item[1][0])
+        return [(key, count, error) for key, (count, error) in items]
+
+    def clear(self) -> None:
+        self.counts.clear()
+        self._heap.clear()
+        self.total = 0
+
+
+class HotKeywordTracker:
+    """
+    记录各 worker 的关键词搜索次数，每 flush_seconds 把这段时间的增量批量累加到数据库，
+    数据库中的次数按半衰期衰减，多个 worker 的统计在库中合并。
+    """
+
+    def __init__(self, capacity: int = HOT_KEYWORD_CAPACITY, flush_seconds: int = HOT_KEYWORD_FLUSH_SECONDS) -> None:
+        self.flush_seconds = flush_seconds
+        self._summary = SpaceSaving(capacity)
+        self._lock = threading.Lock()
+        self._last_flush = time.monotonic()
+
+    def record(self, keyword: str) -> None:
+        keyword = normalize_keyword(keyword)
+        if not keyword or len(keyword) > MAX_KEYWORD_LENGTH:
+            return
+        with self._lock:
+            self._summary.add(keyword)
+
+    def top(self, n: int) -> List[Tuple[str, int, int]]:
+        """本 worker 尚未写回的增量中的前 n 项"""
+        with self._lock:
+            return self._summary.top(n)
+
+    def maybe_flush(self, force: bool = False) -> None:
+        now = time.monotonic()
+        with self._lock:
+            if not self._summary.counts or (not force and now - self._last_flush < self.flush_seconds):
+                return
+            # 写回保证下界 count - error，避免表满时被顶替进来的长尾关键词继承计数后虚高
+            rows = [(key, count - error) for key, (count, error) in self._summary.counts.items() if count > error]
+            self._summary.clear()
+            self._last_flush = now
+
+        from src.db.hot_keyword_dao import add_keyword_hits
+        add_keyword_hits(rows, HALF_LIFE_SECONDS)
+
+
+HOT_KEYWORDS = HotKeywordTracker()
@@ -6,8 +6,10 @@ from src.db.resources_dao import (
     insert_resource_simple,
     update_resource_basic_info,
     delete_resource_by_id,
+    delete_resources_by_ids,
 )
-from src.pan_operator import create_share, del_share
+from src.pan_operator import delete_share_files
+from src.services.netdisk_jobs import submit_create_share, submit_delete_share
 
 logger = logging.getLogger(__name__)
 
@@ -25,7 +27,8 @@ def get_resource_detail(resource_id: int):
 def add_resource_and_share(resource_data: dict):
     """
     添加新资源。
-    所有资源直接保存到数据库，然后调用 create_share 方法处理网盘替换。
+    资源直接保存到数据库，网盘替换（create_share）提交为后台任务。
+    返回 (success, message, {"id": 新资源 ID, "job_id": 任务 ID})
     """
     if not resource_data.get("name") or not resource_data.get("share_link"):
         return False, "标题和分享链接为必填项", None
@@ -37,7 +40,7 @@ def add_resource_and_share(resource_data: dict):
 
     logger.info(f"成功直接添加资源到数据库，标题: {resource_data['name']}")
 
-    # 调用 create_share 处理网盘替换
+    # 提交后台任务处理网盘替换
     share_data = {
         "id": new_id,
         "share_url": resource_data["share_link"],
@@ -48,12 +51,13 @@ def add_resource_and_share(resource_data: dict):
         "save_to_netdisk": resource_data.get("save_to_netdisk", {}),
     }
 
+    job_id = None
     try:
-        create_share(share_data)
+        job_id = submit_create_share(share_data)["id"]
     except Exception as share_err:
-        logger.error(f"调用 create_share 处理资源分享链接时出错: {share_err}")
+        logger.error(f"提交资源转存任务时出错: {share_err}")
 
-    return True, "资源添加成功", new_id
+    return True, "资源添加成功", {"id": new_id, "job_id": job_id}
 
 
 def update_resource_info(resource_id: int, resource_data: dict):
@@ -67,24 +71,74 @@ def update_resource_info(resource_id: int, resource_data: dict):
 def delete_resource_and_share(resource_id: int):
     """
     删除资源。
-    直接删除数据库记录并将 share_url 传递给 del_share 函数。
+    直接删除数据库记录，网盘文件删除（del_share）提交为后台任务。
+    返回 (success, message, 任务 ID)
     """
     # 使用 DAO 删除资源，同时获取被删除记录的 share_link 和 file_id
     success, message, resource = delete_resource_by_id(resource_id)
     if not success:
-        return False, message
+        return False, message, None
 
-    # 调用 del_share 处理网盘删除
+    # 提交后台任务处理网盘删除
+    job_id = None
     try:
         share_data = {
             "share_url": resource["share_link"],
             "file_id": resource["file_id"],
+            "account_id": resource.get("account_id"),
         }
-        del_share(share_data)
-        logger.info(f"调用del_share处理资源分享链接: {resource['share_link']}")
+        job_id = submit_delete_share(share_data)["id"]
+        logger.info(f"提交删除任务处理资源分享链接: {resource['share_link']}")
     except Exception as share_err:
-        logger.error(f"调用del_share处理资源分享链接时出错: {share_err}")
+        logger.error(f"提交资源删除任务时出错: {share_err}")
 
-    return True, "资源删除成功"
+    return True, "资源删除成功", job_id
 
 
+def delete_resources_and_shares(resource_ids):
+    """
+    批量删除资源。
+    数据库记录在一个事务中删除；网盘文件按网盘和所属账号分组批量删除，可重试的失败项再提交为后台删除任务。
+    返回 (success, message, {"deleted", "not_found", "netdisk_failed", "results": [每个 ID 的结果]})
+    """
+    resource_ids = list(dict.fromkeys(resource_ids))
+    success, message, resources = delete_resources_by_ids(resource_ids)
+    if not success:
+        return False, message, None
+
+    netdisk_results = delete_share_files([
+        {"share_url": r["share_link"], "file_id": r["file_id"], "account_id": r.get("account_id")}
+        for r in resources
+    ])
+
+    by_id = {r["id"]: r for r in resources}
+    results = []
+    for resource_id in resource_ids:
+        resource = by_id.get(resource_id)
+        if resource is None:
+            results.append({"id": resource_id, "status": "not_found"})
+            continue
+        outcome = netdisk_results.get(resource["share_link"], {"status": "skipped"})
+        item = {"id": resource_id, "status": "deleted", "netdisk": outcome["status"]}
+        if outcome.get("message"):
+            item["message"] = outcome["message"]
+        if outcome["status"] == "failed" and outcome.get("retryable"):
+            try:
+                item["job_id"] = submit_delete_share({
+                    "share_url": resource["share_link"],
+                    "file_id": resource["file_id"],
+                    "account_id": resource.get("account_id"),
+                })["id"]
+            except Exception as share_err:
+                logger.error(f"提交资源删除任务时出错: {share_err}")
+        results.append(item)
+
+    data = {
+        "deleted": len(resources),
+        "not_found": len(resource_ids) - len(resources),
+        "netdisk_failed": sum(item.get("netdisk") == "failed" for item in results),
+        "results": results,
+    }
+    logger.info(f"批量删除资源: 删除 {data['deleted']} 条，不存在 {data['not_found']} 条，"
+                f"网盘文件删除失败 {data['netdisk_failed']} 条")
+    return True, "资源删除成功", data
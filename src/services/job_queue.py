@@ -0,0 +1,419 @@
+import atexit
+import hashlib
+import json
+import logging
+import os
+import random
+import secrets
+import sqlite3
+import threading
+import time
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from configs.app_config import (
+    JOB_CONCURRENCY_BAIDU,
+    JOB_CONCURRENCY_DEFAULT,
+    JOB_CONCURRENCY_QUARK,
+    JOB_IDEMPOTENCY_TTL,
+    JOB_LEASE_SECONDS,
+    JOB_MAX_ATTEMPTS,
+    JOB_POLL_SECONDS,
+    JOB_RETENTION_HOURS,
+    JOB_RETRY_BASE,
+    JOB_RETRY_MAX,
+    JOB_SQLITE_PATH,
+    JOB_WORKERS,
+)
+from utils import json_utils
+from utils.metrics_utils import JOB_SECONDS, JOBS
+
+logger = logging.getLogger(__name__)
+
+QUEUED, RUNNING, SUCCEEDED, FAILED = "queued", "running", "succeeded", "failed"
+FINISHED_STATUSES = (SUCCEEDED, FAILED)
+
+NETDISK_CONCURRENCY = {
+    "夸克网盘": JOB_CONCURRENCY_QUARK,
+    "百度网盘": JOB_CONCURRENCY_BAIDU,
+}
+
+_COLUMNS = ("id", "kind", "netdisk", "status", "progress", "attempts", "max_attempts",
+            "result", "error", "created_at", "updated_at", "run_at")
+
+
+class JobError(Exception):
+    """任务处理失败；retryable 为 False 时不再重试（如 Cookie 未配置、参数错误）"""
+
+    def __init__(self, message: str, retryable: bool = True) -> None:
+        super().__init__(message)
+        self.retryable = retryable
+
+
+class JobHandler:
+    __slots__ = ("fn", "netdisk_of")
+
+    def __init__(self, fn: Callable[[Dict[str, Any], Callable[[str], None]], Any],
+                 netdisk_of: Callable[[Dict[str, Any]], str]) -> None:
+        self.fn = fn
+        self.netdisk_of = netdisk_of
+
+
+class JobStore:
+    """
+    任务表。path 为文件时同机各 worker 共享（状态查询可落到任意 worker，重启后未完成的任务继续执行），
+    为空时使用本进程内存数据库。单连接 + 锁，任务量很小，不需要连接池。
+    """
+
+    def __init__(self, path: str = JOB_SQLITE_PATH) -> None:
+        if path:
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path or ":memory:", timeout=5, isolation_level=None, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock:
+            if path:
+                self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                "id TEXT PRIMARY KEY, kind TEXT NOT NULL, idempotency_key TEXT, netdisk TEXT NOT NULL, "
+                "payload TEXT NOT NULL, status TEXT NOT NULL, progress TEXT, attempts INTEGER NOT NULL DEFAULT 0, "
+                "max_attempts INTEGER NOT NULL, result TEXT, error TEXT, created_at REAL NOT NULL, "
+                "updated_at REAL NOT NULL, run_at REAL NOT NULL, lease_until REAL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_idempotency ON jobs (idempotency_key)")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_status_run_at ON jobs (status, run_at)")
+
+    def _execute(self, sql: str, params=()) -> sqlite3.Cursor:
+        with self._lock:
+            return self._conn.execute(sql, params)
+
+    def insert_unique(self, job: Dict[str, Any], idempotency_ttl: float) -> Dict[str, Any]:
+        """
+        写入新任务；同一幂等键已有排队 / 执行中的任务、或 idempotency_ttl 秒内成功的任务时返回已有任务。
+        返回值带 created 字段表示是否新建。
+        """
+        now = job["created_at"]
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute(
+                    f"SELECT {', '.join(_COLUMNS)} FROM jobs WHERE idempotency_key = ? "
+                    "AND (status IN (?, ?) OR (status = ? AND updated_at > ?)) ORDER BY created_at DESC LIMIT 1",
+                    (job["idempotency_key"], QUEUED, RUNNING, SUCCEEDED, now - idempotency_ttl),
+                ).fetchone()
+                if row is None:
+                    self._conn.execute(
+                        "INSERT INTO jobs (id, kind, idempotency_key, netdisk, payload, status, progress, attempts, "
+                        "max_attempts, created_at, updated_at, run_at) VALUES (?, ?, ?, ?, ?, ?, ?, 0, ?, ?, ?, ?)",
+                        (job["id"], job["kind"], job["idempotency_key"], job["netdisk"],
+                         json_utils.dumps(job["payload"]), QUEUED, "排队中", job["max_attempts"], now, now, now),
+                    )
+                self._conn.execute("COMMIT")
+            except sqlite3.Error:
+                self._conn.execute("ROLLBACK")
+                raise
+        if row is None:
+            return {**self.get(job["id"]), "created": True}
+        return {**_row_to_job(row), "created": False}
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        row = self._execute(f"SELECT {', '.join(_COLUMNS)} FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return _row_to_job(row) if row else None
+
+    def due(self, now: float, limit: int = 50) -> List[tuple]:
+        """可执行的任务：到点的排队任务，以及租约过期（执行它的进程已退出）的执行中任务"""
+        return self._execute(
+            "SELECT id, kind, netdisk FROM jobs WHERE (status = ? AND run_at <= ?) OR (status = ? AND lease_until < ?) "
+            "ORDER BY run_at LIMIT ?",
+            (QUEUED, now, RUNNING, now, limit),
+        ).fetchall()
+
+    def next_run_at(self) -> Optional[float]:
+        row = self._execute("SELECT MIN(run_at) FROM jobs WHERE status = ?", (QUEUED,)).fetchone()
+        return row[0] if row else None
+
+    def claim(self, job_id: str, now: float, lease: float) -> Optional[Dict[str, Any]]:
+        """抢占任务（多个 worker 进程之间以 UPDATE 的行数判断是否抢到），返回任务与负载"""
+        claimed = self._execute(
+            "UPDATE jobs SET status = ?, attempts = attempts + 1, progress = ?, lease_until = ?, updated_at = ? "
+            "WHERE id = ? AND ((status = ? AND run_at <= ?) OR (status = ? AND lease_until < ?))",
+            (RUNNING, "执行中", now + lease, now, job_id, QUEUED, now, RUNNING, now),
+        ).rowcount == 1
+        if not claimed:
+            return None
+        row = self._execute("SELECT attempts, max_attempts, payload FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return {"attempts": row[0], "max_attempts": row[1], "payload": json_utils.loads(row[2])}
+
+    def update(self, job_id: str, **fields: Any) -> None:
+        fields["updated_at"] = time.time()
+        if fields.get("result") is not None:
+            fields["result"] = json_utils.dumps(fields["result"])
+        assignments = ", ".join(f"{key} = ?" for key in fields)
+        self._execute(f"UPDATE jobs SET {assignments} WHERE id = ?", (*fields.values(), job_id))
+
+    def update_owned(self, job_id: str, attempts: int, **fields: Any) -> bool:
+        """
+        与 update 相同，但只在任务仍属于本次抢占时写入：状态为执行中且 attempts 未变
+        （租约过期后被其他进程重新抢占会使 attempts 加一）。返回是否写入。
+        """
+        fields["updated_at"] = time.time()
+        if fields.get("result") is not None:
+            fields["result"] = json_utils.dumps(fields["result"])
+        assignments = ", ".join(f"{key} = ?" for key in fields)
+        return self._execute(
+            f"UPDATE jobs SET {assignments} WHERE id = ? AND status = ? AND attempts = ?",
+            (*fields.values(), job_id, RUNNING, attempts),
+        ).rowcount == 1
+
+    def purge(self, before: float) -> int:
+        return self._execute(
+            "DELETE FROM jobs WHERE status IN (?, ?) AND updated_at < ?", (SUCCEEDED, FAILED, before)
+        ).rowcount
+
+
+def _row_to_job(row: tuple) -> Dict[str, Any]:
+    job = dict(zip(_COLUMNS, row))
+    job.pop("run_at")
+    if job["result"] is not None:
+        job["result"] = json_utils.loads(job["result"])
+    return job
+
+
+def idempotency_key(kind: str, payload: Dict[str, Any]) -> str:
+    """默认幂等键：任务类型 + 负载内容摘要，重复提交同一操作会合并到同一个任务"""
+    canonical = json.dumps(payload, sort_keys=True, ensure_ascii=False, separators=(",", ":"), default=str)
+    digest = hashlib.sha1(canonical.encode("utf-8")).hexdigest()
+    return f"{kind}:{digest}"
+
+
+class JobQueue:
+    """
+    后台任务队列：submit() 写入任务表后立即返回，工作线程按网盘并发上限抢占执行。
+    处理函数抛出 JobError(retryable=True) 或其他异常时按指数退避（带抖动）重试，最多 max_attempts 次。
+    其他 worker 进程提交的任务、以及进程重启前未完成的任务由轮询（JOB_POLL_SECONDS）接手。
+    """
+
+    def __init__(self, store: Optional[JobStore] = None, workers: int = JOB_WORKERS,
+                 netdisk_concurrency: Optional[Dict[str, int]] = None) -> None:
+        self._store = store
+        self.workers = max(1, workers)
+        self.netdisk_concurrency = NETDISK_CONCURRENCY if netdisk_concurrency is None else netdisk_concurrency
+        self._handlers: Dict[str, JobHandler] = {}
+        self._running: Dict[str, int] = {}
+        self._cond = threading.Condition()
+        self._threads: List[threading.Thread] = []
+        self._stopping = False
+        self._last_purge = 0.0
+
+    @property
+    def store(self) -> JobStore:
+        if self._store is None:
+            with self._cond:
+                if self._store is None:
+                    self._store = JobStore()
+        return self._store
+
+    def register(self, kind: str, fn: Callable[[Dict[str, Any], Callable[[str], None]], Any],
+                 netdisk_of: Callable[[Dict[str, Any]], str]) -> None:
+        """注册任务类型：fn(payload, progress) 返回可 JSON 序列化的结果；netdisk_of(payload) 决定并发分组"""
+        self._handlers[kind] = JobHandler(fn, netdisk_of)
+
+    def submit(self, kind: str, payload: Dict[str, Any], key: Optional[str] = None,
+               max_attempts: int = JOB_MAX_ATTEMPTS) -> Dict[str, Any]:
+        """提交任务并返回任务状态（created 为 False 表示命中幂等键，返回的是已有任务）"""
+        handler = self._handlers[kind]
+        job = {
+            "id": secrets.token_hex(16),
+            "kind": kind,
+            "idempotency_key": f"{kind}:{key}" if key else idempotency_key(kind, payload),
+            "netdisk": handler.netdisk_of(payload) or "",
+            "payload": payload,
+            "max_attempts": max(1, max_attempts),
+            "created_at": time.time(),
+        }
+        result = self.store.insert_unique(job, JOB_IDEMPOTENCY_TTL)
+        if result["created"]:
+            JOBS.labels(kind, "submitted").inc()
+            logger.info(f"提交后台任务 {kind} {result['id']} ({job['netdisk'] or '-'})")
+        else:
+            JOBS.labels(kind, "deduplicated").inc()
+            logger.info(f"任务幂等键重复，复用任务 {result['id']} ({result['status']})")
+        self._ensure_started()
+        with self._cond:
+            self._cond.notify()
+        return result
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        return self.store.get(job_id)
+
+    def watch(self, job_id: str, interval: float = 0.5, timeout: float = 600.0) -> Iterator[Optional[Dict[str, Any]]]:
+        """
+        跟踪任务进度：状态 / 进度 / 尝试次数变化时产出任务，任务结束后停止。
+        读的是共享任务表，任务在其他 worker 进程执行时同样适用；无变化时每 15 秒产出 None 作为心跳。
+        """
+        deadline = time.monotonic() + timeout
+        last_state = None
+        last_yield = time.monotonic()
+        while time.monotonic() < deadline:
+            job = self.store.get(job_id)
+            if job is None:
+                return
+            state = (job["status"], job["progress"], job["attempts"])
+            if state != last_state:
+                last_state = state
+                last_yield = time.monotonic()
+                yield job
+                if job["status"] in FINISHED_STATUSES:
+                    return
+            elif time.monotonic() - last_yield >= 15:
+                last_yield = time.monotonic()
+                yield None
+            time.sleep(interval)
+
+    def _ensure_started(self) -> None:
+        if self._threads:
+            return
+        with self._cond:
+            if self._threads:
+                return
+            for i in range(self.workers):
+                thread = threading.Thread(target=self._work, name=f"job-worker-{i}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+        atexit.register(self.stop)
+
+    def start(self) -> None:
+        """启动工作线程，接手之前未完成的任务"""
+        self._ensure_started()
+
+    def stop(self) -> None:
+        with self._cond:
+            self._stopping = True
+            self._cond.notify_all()
+
+    def _has_capacity(self, netdisk: str) -> bool:
+        limit = self.netdisk_concurrency.get(netdisk, JOB_CONCURRENCY_DEFAULT)
+        return self._running.get(netdisk, 0) < limit
+
+    def _next_job(self):
+        """在 _cond 锁内调用：抢占一个所在网盘还有并发余量的任务"""
+        now = time.time()
+        for job_id, kind, netdisk in self.store.due(now):
+            if kind not in self._handlers or not self._has_capacity(netdisk):
+                continue
+            claimed = self.store.claim(job_id, now, JOB_LEASE_SECONDS)
+            if claimed:
+                self._running[netdisk] = self._running.get(netdisk, 0) + 1
+                return job_id, kind, netdisk, claimed
+        return None
+
+    def _wait_seconds(self) -> float:
+        next_run_at = self.store.next_run_at()
+        if next_run_at is None:
+            return JOB_POLL_SECONDS
+        return min(JOB_POLL_SECONDS, max(0.01, next_run_at - time.time()))
+
+    def _work(self) -> None:
+        while True:
+            with self._cond:
+                job = None
+                while not self._stopping:
+                    try:
+                        job = self._next_job()
+                    except sqlite3.Error as e:
+                        logger.error(f"读取任务表失败: {e}")
+                    if job:
+                        break
+                    self._cond.wait(self._wait_seconds())
+                if self._stopping:
+                    return
+            job_id, kind, netdisk, claimed = job
+            try:
+                self._run(job_id, kind, claimed)
+            except Exception as e:
+                # 不能让工作线程退出；结果没写进任务表时租约到期后任务会被重新执行
+                logger.exception(f"执行后台任务 {kind} {job_id} 时出错: {e}")
+            finally:
+                with self._cond:
+                    self._running[netdisk] -= 1
+                    self._cond.notify_all()
+                self._maybe_purge()
+
+    def _heartbeat(self, job_id: str, attempts: int, stop: threading.Event) -> None:
+        """任务执行期间每隔租约的 1/3 续约一次，执行较久的任务不会被其他进程当作已退出而重复执行"""
+        interval = max(1.0, JOB_LEASE_SECONDS / 3)
+        while not stop.wait(interval):
+            try:
+                if not self.store.update_owned(job_id, attempts, lease_until=time.time() + JOB_LEASE_SECONDS):
+                    logger.warning(f"后台任务 {job_id} 已被其他进程接手，停止续约")
+                    return
+            except sqlite3.Error as e:
+                logger.error(f"后台任务 {job_id} 续约失败: {e}")
+
+    def _run(self, job_id: str, kind: str, claimed: Dict[str, Any]) -> None:
+        attempts, max_attempts = claimed["attempts"], claimed["max_attempts"]
+
+        def progress(message: str) -> None:
+            try:
+                self.store.update_owned(job_id, attempts, progress=message)
+            except sqlite3.Error as e:
+                logger.warning(f"更新后台任务 {job_id} 进度失败: {e}")
+
+        def finish(**fields: Any) -> bool:
+            # 续约失败（如进程长时间卡住）后任务可能已由其他进程重新执行，此时丢弃本次结果
+            try:
+                if self.store.update_owned(job_id, attempts, lease_until=None, **fields):
+                    return True
+            except sqlite3.Error as e:
+                # 如多个 worker 共用任务表时锁等待超时；不写结果，租约到期后任务重新执行
+                logger.error(f"写入后台任务 {kind} {job_id} 的结果失败，租约到期后重新执行: {e}")
+                return False
+            JOBS.labels(kind, "lost").inc()
+            logger.warning(f"后台任务 {kind} {job_id} 的租约已失效（已由其他进程接手），丢弃第 {attempts} 次执行的结果")
+            return False
+
+        stop = threading.Event()
+        threading.Thread(target=self._heartbeat, args=(job_id, attempts, stop),
+                         name=f"job-heartbeat-{job_id[:8]}", daemon=True).start()
+        started = time.perf_counter()
+        try:
+            result = self._handlers[kind].fn(claimed["payload"], progress)
+        except Exception as e:
+            retryable = getattr(e, "retryable", True)
+            if not isinstance(e, JobError):
+                logger.exception(f"后台任务 {kind} {job_id} 异常: {e}")
+            if retryable and attempts < max_attempts:
+                # 指数退避 + 等量抖动
+                delay = min(JOB_RETRY_MAX, JOB_RETRY_BASE * 2 ** (attempts - 1))
+                delay = delay / 2 + random.uniform(0, delay / 2)
+                if finish(status=QUEUED, run_at=time.time() + delay, error=str(e),
+                          progress=f"第 {attempts} 次失败，{delay:.1f} 秒后重试"):
+                    JOBS.labels(kind, "retried").inc()
+                    logger.warning(f"后台任务 {kind} {job_id} 第 {attempts} 次失败，{delay:.1f}s 后重试: {e}")
+            elif finish(status=FAILED, error=str(e), progress="失败"):
+                JOBS.labels(kind, "failed").inc()
+                logger.error(f"后台任务 {kind} {job_id} 失败（已尝试 {attempts} 次）: {e}")
+            return
+        finally:
+            stop.set()
+            JOB_SECONDS.labels(kind).observe(time.perf_counter() - started)
+
+        if finish(status=SUCCEEDED, result=result, error=None, progress="完成"):
+            JOBS.labels(kind, "succeeded").inc()
+            logger.info(f"后台任务 {kind} {job_id} 完成")
+
+    def _maybe_purge(self) -> None:
+        now = time.time()
+        if now - self._last_purge < 3600:
+            return
+        self._last_purge = now
+        try:
+            removed = self.store.purge(now - JOB_RETENTION_HOURS * 3600)
+            if removed:
+                logger.info(f"清理过期任务记录 {removed} 条")
+        except sqlite3.Error as e:
+            logger.error(f"清理任务记录失败: {e}")
+
+
+JOB_QUEUE = JobQueue()
@@ -0,0 +1,217 @@
+import logging
+import math
+import os
+import random
+import re
+import threading
+import time
+from collections import defaultdict
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from utils import json_utils
+
+from configs.app_config import (
+    ROUTING_EXPLORE_RATE,
+    ROUTING_FLUSH_SECONDS,
+    ROUTING_LOG_FILE,
+    ROUTING_MIN_EVIDENCE,
+    ROUTING_MIN_FIRST_WAVE,
+    ROUTING_MIN_HIT_PROB,
+)
+
+logger = logging.getLogger(__name__)
+
+GLOBAL_FEATURE = "*"
+MAX_GRAM_FEATURES = 16
+_log_lock = threading.Lock()
+_SEPARATORS = re.compile(r"[\s,、|;+\-/*#._:：，。!！?？()（）\[\]【】《》\"']+")
+
+
+def keyword_features(keyword: str, types: Iterable[str] = ()) -> List[str]:
+    """
+    提取关键词特征：字符二元组 g:xx（单字关键词用单字），以及匹配到的数据库资源类型 t:xxx。
+    全局特征 * 不在其中，由路由器单独作为先验使用。
+    """
+    text = _SEPARATORS.sub("", str(keyword).lower())
+    if len(text) == 1:
+        grams = [text]
+    else:
+        grams = list(dict.fromkeys(text[i:i + 2] for i in range(len(text) - 1)))
+    features = [f"g:{gram}" for gram in grams[:MAX_GRAM_FEATURES]]
+    features.extend(f"t:{t}"[:64] for t in sorted({t for t in types if t}))
+    return features
+
+
+def _logit(p: float) -> float:
+    p = min(max(p, 1e-6), 1 - 1e-6)
+    return math.log(p / (1 - p))
+
+
+class MemoryRouteStore:
+    """进程内路由统计，供离线评估使用"""
+
+    def __init__(self) -> None:
+        self._counts: Dict[Tuple[str, int], List[int]] = defaultdict(lambda: [0, 0])
+
+    def get(self, features: Sequence[str]) -> List[Tuple[str, int, int, int]]:
+        wanted = set(features)
+        return [(f, api_id, q, h) for (f, api_id), (q, h) in self._counts.items() if f in wanted]
+
+    def add(self, rows: Iterable[Tuple[str, int, int, int]]) -> None:
+        for feature, api_id, queries, hits in rows:
+            entry = self._counts[(feature, api_id)]
+            entry[0] += queries
+            entry[1] += hits
+
+    def maybe_flush(self, force: bool = False) -> None:
+        pass
+
+
+class DbRouteStore:
+    """数据库路由统计：读取时合并尚未写回的增量，增量按 ROUTING_FLUSH_SECONDS 批量累加写回"""
+
+    def __init__(self, flush_seconds: int = ROUTING_FLUSH_SECONDS) -> None:
+        self.flush_seconds = flush_seconds
+        self._pending: Dict[Tuple[str, int], List[int]] = defaultdict(lambda: [0, 0])
+        self._lock = threading.Lock()
+        self._last_flush = time.monotonic()
+
+    def get(self, features: Sequence[str]) -> List[Tuple[str, int, int, int]]:
+        from src.db.route_stats_dao import get_route_stats
+
+        merged: Dict[Tuple[str, int], List[int]] = {
+            (f, api_id): [q, h] for f, api_id, q, h in get_route_stats(list(features))
+        }
+        wanted = set(features)
+        with self._lock:
+            for (f, api_id), (q, h) in self._pending.items():
+                if f in wanted:
+                    entry = merged.setdefault((f, api_id), [0, 0])
+                    entry[0] += q
+                    entry[1] += h
+        return [(f, api_id, q, h) for (f, api_id), (q, h) in merged.items()]
+
+    def add(self, rows: Iterable[Tuple[str, int, int, int]]) -> None:
+        with self._lock:
+            for feature, api_id, queries, hits in rows:
+                entry = self._pending[(feature, api_id)]
+                entry[0] += queries
+                entry[1] += hits
+
+    def maybe_flush(self, force: bool = False) -> None:
+        now = time.monotonic()
+        with self._lock:
+            if not self._pending or (not force and now - self._last_flush < self.flush_seconds):
+                return
+            rows = [(f, api_id, q, h) for (f, api_id), (q, h) in self._pending.items()]
+            self._pending.clear()
+            self._last_flush = now
+
+        from src.db.route_stats_dao import add_route_stats
+        add_route_stats(rows)
+
+
+class KeywordRouter:
+    """
+    根据关键词特征的历史命中率，把上游分为首批和后备两组。
+    对每个上游：以全局命中率为先验 p0，各特征的命中率按 (命中 + m × p0) / (请求 + m) 平滑后
+    在对数几率空间相对先验累加。所有特征的请求次数都少于 min_evidence 的上游视为未知，放入首批以便继续学习。
+    """
+
+    def __init__(self, store, min_hit_prob: float = ROUTING_MIN_HIT_PROB, min_first_wave: int = ROUTING_MIN_FIRST_WAVE,
+                 min_evidence: float = ROUTING_MIN_EVIDENCE, explore_rate: float = ROUTING_EXPLORE_RATE,
+                 prior_strength: float = 2.0) -> None:
+        self.store = store
+        self.min_hit_prob = min_hit_prob
+        self.min_first_wave = min_first_wave
+        self.min_evidence = min_evidence
+        self.explore_rate = explore_rate
+        self.prior_strength = prior_strength
+
+    def predict(self, api_ids: Sequence[int], features: Sequence[str]) -> Dict[int, Optional[float]]:
+        """返回每个上游的预测命中率，样本不足时为 None"""
+        per_feature: Dict[int, List[Tuple[int, int]]] = defaultdict(list)
+        prior: Dict[int, Tuple[int, int]] = {}
+        for feature, api_id, q, h in self.store.get(list(features) + [GLOBAL_FEATURE]):
+            if feature == GLOBAL_FEATURE:
+                prior[api_id] = (q, h)
+            elif q > 0:
+                per_feature[api_id].append((q, h))
+
+        m = self.prior_strength
+        predictions: Dict[int, Optional[float]] = {}
+        for api_id in api_ids:
+            counts = per_feature.get(api_id, [])
+            if not counts or max(q for q, _ in counts) < self.min_evidence:
+                predictions[api_id] = None
+                continue
+            prior_q, prior_h = prior.get(api_id, (0, 0))
+            p0 = (prior_h + 1) / (prior_q + 2)
+            # 朴素贝叶斯式合并：每个特征贡献其平滑命中率相对先验的对数几率偏移，
+            # "第二季"之类与上游无关的通用特征命中率接近先验，几乎不影响结果
+            logit = _logit(p0)
+            for q, h in counts:
+                logit += _logit((h + m * p0) / (q + m)) - _logit(p0)
+            predictions[api_id] = 1 / (1 + math.exp(-max(min(logit, 30), -30)))
+        return predictions
+
+    def route(self, configs: List[Dict[str, Any]], features: Sequence[str]) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+        """返回 (首批, 后备)，两组都保持传入的顺序"""
+        if not features or len(configs) <= self.min_first_wave:
+            return configs, []
+
+        predictions = self.predict([c["id"] for c in configs], features)
+        first_ids = {
+            c["id"] for c in configs
+            if predictions[c["id"]] is None or predictions[c["id"]] >= self.min_hit_prob
+        }
+        if len(first_ids) < self.min_first_wave:
+            ranked = sorted(
+                (c for c in configs if c["id"] not in first_ids),
+                key=lambda c: predictions[c["id"]] or 0.0, reverse=True,
+            )
+            first_ids.update(c["id"] for c in ranked[:self.min_first_wave - len(first_ids)])
+        for c in configs:
+            if c["id"] not in first_ids and random.random() < self.explore_rate:
+                first_ids.add(c["id"])
+
+        first = [c for c in configs if c["id"] in first_ids]
+        rest = [c for c in configs if c["id"] not in first_ids]
+        return first, rest
+
+    def record(self, features: Sequence[str], outcomes: Dict[int, int]) -> None:
+        """记录本次实际请求过的上游是否产出保留结果；outcomes: {api_id: 保留条数}"""
+        rows = [
+            (feature, api_id, 1, 1 if kept > 0 else 0)
+            for api_id, kept in outcomes.items() if api_id is not None
+            for feature in list(features) + [GLOBAL_FEATURE]
+        ]
+        self.store.add(rows)
+
+    def maybe_flush(self) -> None:
+        self.store.maybe_flush()
+
+
+ROUTER = KeywordRouter(DbRouteStore())
+
+
+def log_search_outcome(keyword: str, types: Iterable[str], db_count: int, outcomes: Dict[int, int], full: bool) -> None:
+    """
+    把一次搜索中各上游的保留条数追加到 ROUTING_LOG_FILE（JSONL），供 benchmarks/eval_routing.py 离线评估。
+    full 表示本次请求了全部启用的上游，只有这类记录能作为评估的真实值。
+    """
+    if not ROUTING_LOG_FILE:
+        return
+    record = {
+        "ts": int(time.time()), "keyword": keyword, "types": sorted({t for t in types if t}),
+        "db_count": db_count, "outcomes": {str(k): v for k, v in outcomes.items()}, "full": full,
+    }
+    try:
+        with _log_lock:
+            directory = os.path.dirname(ROUTING_LOG_FILE)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with open(ROUTING_LOG_FILE, "ab") as f:
+                f.write(json_utils.dumps_bytes(record) + b"\n")
+    except OSError as e:
+        logger.error(f"写入路由日志失败: {e}")
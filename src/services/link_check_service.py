@@ -0,0 +1,194 @@
+import concurrent.futures
+import logging
+import re
+import threading
+from typing import Dict, Optional
+from urllib.parse import urlparse
+
+import requests
+
+from configs.app_config import (
+    LINK_CHECK_BAIDU_BASE,
+    LINK_CHECK_BATCH,
+    LINK_CHECK_CONCURRENCY,
+    LINK_CHECK_ENABLED,
+    LINK_CHECK_INTERVAL,
+    LINK_CHECK_LOCK_FILE,
+    LINK_CHECK_QUARK_API,
+    LINK_CHECK_RATE_PER_HOST,
+    LINK_CHECK_RECHECK_HOURS,
+    LINK_CHECK_TIMEOUT,
+    user_agents,
+)
+from src.db.resources_dao import batch_update_link_status, get_resources_to_check
+from utils.lock_utils import LeaderLock
+from utils.metrics_utils import LINK_CHECKS
+from utils.netdisk_utils import match_netdisk_link
+from utils.rate_limit_utils import RATE_LIMITER
+
+logger = logging.getLogger(__name__)
+
+ALIVE, DEAD, UNKNOWN = "alive", "dead", "unknown"
+
+# 夸克 sharepage/token 返回这些错误码表示分享不存在、已取消、已过期或违规
+_QUARK_DEAD_CODES = {41004, 41006, 41008, 41010, 41011, 41012, 41013}
+# 百度分享页出现这些内容表示分享已失效
+_BAIDU_DEAD_MARKERS = ("分享的文件已经被取消", "你来晚了", "链接不存在", "分享已过期", "涉及侵权", "已被删除")
+_BAIDU_ALIVE_MARKERS = ("locals.mset", "yunData", '"fs_id"', "share/init")
+
+_run_lock = threading.Lock()
+_session_local = threading.local()
+_leader_lock = LeaderLock(LINK_CHECK_LOCK_FILE, "链接巡检")
+_scheduler = None
+
+
+def _get_session() -> requests.Session:
+    """探测线程各自复用一个不带登录态的 Session"""
+    session = getattr(_session_local, "session", None)
+    if session is None:
+        session = _session_local.session = requests.Session()
+        session.headers["User-Agent"] = user_agents[0]
+    return session
+
+
+def _extract_pwd(share_url: str) -> str:
+    match = re.search(r'pwd=(\w+)', share_url)
+    return match.group(1) if match else ""
+
+
+def probe_quark(session: requests.Session, share_url: str, api: str = LINK_CHECK_QUARK_API) -> str:
+    """调用分享页 token 接口（转存流程的第一步）判断夸克分享是否有效"""
+    match = re.search(r'/s/(\w+)', share_url)
+    if not match:
+        return DEAD
+    response = session.post(
+        f"{api.rstrip('/')}/1/clouddrive/share/sharepage/token",
+        params={"pr": "ucpro", "fr": "pc"},
+        json={"pwd_id": match.group(1), "passcode": _extract_pwd(share_url)},
+        timeout=LINK_CHECK_TIMEOUT,
+    )
+    if response.status_code == 429 or response.status_code >= 500:
+        return UNKNOWN
+    try:
+        js = response.json()
+    except ValueError:
+        return UNKNOWN
+    if (js.get("data") or {}).get("stoken"):
+        return ALIVE
+    return DEAD if js.get("code") in _QUARK_DEAD_CODES else UNKNOWN
+
+
+def probe_baidu(session: requests.Session, share_url: str, base: str = LINK_CHECK_BAIDU_BASE) -> str:
+    """
+    不带登录态请求百度分享页判断是否有效：
+    有提取码的分享会跳转到 /share/init 验证页（有效），失效的分享跳转到错误页或页面包含失效提示。
+    """
+    match = re.search(r'/s/1([\w-]+)', share_url) or re.search(r'surl=([\w-]+)', share_url)
+    if not match:
+        return DEAD
+    response = session.get(f"{base.rstrip('/')}/s/1{match.group(1)}", timeout=LINK_CHECK_TIMEOUT,
+                           allow_redirects=False)
+    if response.status_code in (301, 302, 303, 307):
+        location = response.headers.get("Location", "")
+        if "share/init" in location:
+            return ALIVE
+        return DEAD if "error" in location else UNKNOWN
+    if response.status_code == 404:
+        return DEAD
+    if response.status_code != 200:
+        return UNKNOWN
+    # 未声明编码时 requests 按 ISO-8859-1 解码，会匹配不到中文提示
+    html = response.content.decode("utf-8", "replace")
+    if any(marker in html for marker in _BAIDU_DEAD_MARKERS):
+        return DEAD
+    return ALIVE if any(marker in html for marker in _BAIDU_ALIVE_MARKERS) else UNKNOWN
+
+
+# 网盘 -> (探测函数, 探测主机的基础地址)
+_PROBES = {
+    "夸克网盘": (probe_quark, LINK_CHECK_QUARK_API),
+    "百度网盘": (probe_baidu, LINK_CHECK_BAIDU_BASE),
+}
+
+
+def check_link(share_url: str) -> Optional[str]:
+    """
+    检查一个分享链接，返回 alive / dead / unknown；不支持的网盘返回 unknown。
+    同一探测主机按 LINK_CHECK_RATE_PER_HOST 限速，等不到额度时返回 None（本轮跳过，不记录检查时间）。
+    """
+    netdisk = match_netdisk_link(share_url or "")
+    probe = _PROBES.get(netdisk)
+    if probe is None:
+        LINK_CHECKS.labels(netdisk, UNKNOWN).inc()
+        return UNKNOWN
+    fn, base = probe
+    rate_key = f"linkcheck:{urlparse(base).netloc}"
+    if LINK_CHECK_RATE_PER_HOST > 0 and not RATE_LIMITER.acquire(
+            rate_key, LINK_CHECK_RATE_PER_HOST, max(1, int(LINK_CHECK_RATE_PER_HOST)), LINK_CHECK_TIMEOUT):
+        LINK_CHECKS.labels(netdisk, "throttled").inc()
+        return None
+    try:
+        result = fn(_get_session(), share_url, base)
+    except requests.RequestException as e:
+        logger.warning(f"检查分享链接失败: {share_url} {e}")
+        result = UNKNOWN
+    LINK_CHECKS.labels(netdisk, result).inc()
+    return result
+
+
+def run_link_check(force: bool = False, limit: int = LINK_CHECK_BATCH) -> Dict[str, int]:
+    """
+    巡检一轮：取最久未检查的 limit 条资源并发探测，结果批量写回 is_alive / last_checked_at。
+    只有持有锁的进程会真正执行（force=True 时跳过锁检查，用于手动触发）。
+    返回 {"checked": ..., "alive": ..., "dead": ..., "unknown": ...}
+    """
+    summary = {"checked": 0, ALIVE: 0, DEAD: 0, UNKNOWN: 0}
+    if not force and not _leader_lock.acquire():
+        return summary
+    if not _run_lock.acquire(blocking=False):
+        logger.warning("上一轮链接巡检尚未结束，跳过本轮")
+        return summary
+
+    try:
+        resources = get_resources_to_check(limit, LINK_CHECK_RECHECK_HOURS)
+        updates = []
+        with concurrent.futures.ThreadPoolExecutor(max_workers=max(1, LINK_CHECK_CONCURRENCY)) as executor:
+            futures = {executor.submit(check_link, r["share_link"]): r for r in resources}
+            for future in concurrent.futures.as_completed(futures):
+                result = future.result()
+                if result is None:
+                    continue
+                summary["checked"] += 1
+                summary[result] += 1
+                updates.append((futures[future]["id"], None if result == UNKNOWN else result == ALIVE))
+
+        batch_update_link_status(updates)
+        logger.info(f"链接巡检完成: {summary}")
+        return summary
+    finally:
+        _run_lock.release()
+
+
+def start_link_check_scheduler():
+    """
+    启动分享链接巡检（每个 worker 都会注册任务，但只有持有锁的进程执行）。
+    使用 gunicorn --preload 时请在 post_fork 钩子中调用，线程不会跨 fork 保留。
+    """
+    global _scheduler
+    if not LINK_CHECK_ENABLED or _scheduler is not None:
+        return None
+
+    from apscheduler.schedulers.background import BackgroundScheduler
+
+    _scheduler = BackgroundScheduler(daemon=True)
+    _scheduler.add_job(
+        run_link_check,
+        "interval",
+        seconds=LINK_CHECK_INTERVAL,
+        id="share_link_check",
+        max_instances=1,
+        coalesce=True,
+    )
+    _scheduler.start()
+    logger.info(f"分享链接巡检已启动，间隔 {LINK_CHECK_INTERVAL}s，每轮 {LINK_CHECK_BATCH} 条")
+    return _scheduler
@@ -0,0 +1,47 @@
+import logging
+from typing import Any, Callable, Dict, Optional
+
+from src.pan_operator import NetdiskOperationError, delete_share_file, transfer_share
+from src.services.job_queue import JOB_QUEUE, JobError
+from utils.netdisk_utils import match_netdisk_link
+
+logger = logging.getLogger(__name__)
+
+# 网盘操作的后台任务类型：转存 / 删除分享在任务线程中执行，接口只负责提交
+
+CREATE_SHARE = "create_share"
+DELETE_SHARE = "delete_share"
+
+
+def _netdisk_of(payload: Dict[str, Any]) -> str:
+    return match_netdisk_link(payload.get("share_url") or "")
+
+
+def _run_create_share(payload: Dict[str, Any], progress: Callable[[str], None]) -> Dict[str, Any]:
+    progress("转存中")
+    try:
+        return transfer_share(payload)
+    except NetdiskOperationError as e:
+        raise JobError(str(e), retryable=e.retryable) from e
+
+
+def _run_delete_share(payload: Dict[str, Any], progress: Callable[[str], None]) -> Dict[str, Any]:
+    progress("删除网盘文件中")
+    try:
+        return delete_share_file(payload)
+    except NetdiskOperationError as e:
+        raise JobError(str(e), retryable=e.retryable) from e
+
+
+JOB_QUEUE.register(CREATE_SHARE, _run_create_share, _netdisk_of)
+JOB_QUEUE.register(DELETE_SHARE, _run_delete_share, _netdisk_of)
+
+
+def submit_create_share(share_data: Dict[str, Any], key: Optional[str] = None) -> Dict[str, Any]:
+    """提交转存任务，返回任务状态；key 为调用方提供的幂等键（默认按内容去重）"""
+    return JOB_QUEUE.submit(CREATE_SHARE, share_data, key)
+
+
+def submit_delete_share(share_data: Dict[str, Any], key: Optional[str] = None) -> Dict[str, Any]:
+    """提交删除分享任务，返回任务状态"""
+    return JOB_QUEUE.submit(DELETE_SHARE, share_data, key)
@@ -0,0 +1,127 @@
+import logging
+import threading
+import time
+from datetime import datetime
+from typing import Dict, Optional, Tuple
+
+from configs.app_config import (
+    PREWARM_BUDGET_SHARE,
+    PREWARM_ENABLED,
+    PREWARM_HOURS,
+    PREWARM_INTERVAL,
+    PREWARM_LOCK_FILE,
+    PREWARM_TOP_N,
+    SEARCH_CACHE_TTL,
+)
+from src.db.hot_keyword_dao import get_top_keywords, prune_keywords
+from src.services.hot_keywords import HALF_LIFE_SECONDS, HOT_KEYWORDS
+from src.services.search_cache import acquire_refresh_lease, peek_cached_age, release_refresh_lease
+from src.services.search_service import generate_search_stream_events, upstream_budget
+from utils.lock_utils import LeaderLock
+
+logger = logging.getLogger(__name__)
+
+# 缓存剩余新鲜期不足一半的关键词才重新预热
+REFRESH_AFTER_AGE = SEARCH_CACHE_TTL * 0.5
+# 衰减后搜索次数低于该值的关键词会从统计表中清理
+PRUNE_BELOW_HITS = 0.5
+
+_run_lock = threading.Lock()
+_leader_lock = LeaderLock(PREWARM_LOCK_FILE, "缓存预热")
+_scheduler = None
+
+
+def parse_hours(spec: str) -> Optional[Tuple[int, int]]:
+    """解析 "3-7" 形式的小时区间（含起点不含终点，可跨零点如 "22-6"）；格式错误返回 None"""
+    try:
+        start, end = (int(part) for part in spec.split("-", 1))
+    except ValueError:
+        return None
+    if not (0 <= start <= 23 and 0 <= end <= 24):
+        return None
+    return start, end
+
+
+def in_prewarm_window(now: Optional[datetime] = None, spec: str = PREWARM_HOURS) -> bool:
+    hours = parse_hours(spec)
+    if hours is None:
+        return False
+    start, end = hours
+    hour = (now or datetime.now()).hour
+    if start <= end:
+        return start <= hour < end
+    return hour >= start or hour < end
+
+
+def run_prewarm(force: bool = False) -> Dict[str, int]:
+    """
+    预热一轮：取衰减后搜索次数最高的 PREWARM_TOP_N 个关键词，缓存缺失或即将过期的逐个重新搜索并写入缓存。
+    只在低峰时段、且由持有锁的进程执行（force=True 时跳过这两项检查，用于手动触发）。
+    返回 {"candidates": ..., "warmed": ..., "skipped": ...}
+    """
+    summary = {"candidates": 0, "warmed": 0, "skipped": 0}
+    if not force and (not in_prewarm_window() or not _leader_lock.acquire()):
+        return summary
+    if not _run_lock.acquire(blocking=False):
+        return summary
+
+    try:
+        HOT_KEYWORDS.maybe_flush(force=True)
+        keywords = get_top_keywords(PREWARM_TOP_N, HALF_LIFE_SECONDS)
+        summary["candidates"] = len(keywords)
+
+        for keyword, hits in keywords:
+            if not force and not in_prewarm_window():
+                logger.info("已离开预热时段，本轮预热提前结束")
+                break
+            age = peek_cached_age(keyword)
+            if age is not None and age < REFRESH_AFTER_AGE:
+                summary["skipped"] += 1
+                continue
+            # 与用户请求触发的过期刷新共用租约，同一关键词不会被重复请求
+            if not acquire_refresh_lease(keyword):
+                summary["skipped"] += 1
+                continue
+            try:
+                start = time.perf_counter()
+                with upstream_budget(PREWARM_BUDGET_SHARE):
+                    for _ in generate_search_stream_events(keyword, refresh=True):
+                        pass
+                summary["warmed"] += 1
+                logger.info("预热关键词 '%s' (热度 %.1f) 完成，耗时 %.1fs", keyword, hits, time.perf_counter() - start)
+            finally:
+                release_refresh_lease(keyword)
+
+        pruned = prune_keywords(PRUNE_BELOW_HITS, HALF_LIFE_SECONDS)
+        logger.info(f"缓存预热完成: {summary}，清理低热度关键词 {pruned} 个")
+        return summary
+    finally:
+        _run_lock.release()
+
+
+def start_prewarm_scheduler():
+    """
+    启动缓存预热任务（每个 worker 都会注册任务，但只有持有锁的进程在低峰时段执行）。
+    使用 gunicorn --preload 时请在 post_fork 钩子中调用，线程不会跨 fork 保留。
+    """
+    global _scheduler
+    if not PREWARM_ENABLED or _scheduler is not None:
+        return None
+    if parse_hours(PREWARM_HOURS) is None:
+        logger.error(f"PREWARM_HOURS 格式错误: {PREWARM_HOURS!r}，缓存预热未启动")
+        return None
+
+    from apscheduler.schedulers.background import BackgroundScheduler
+
+    _scheduler = BackgroundScheduler(daemon=True)
+    _scheduler.add_job(
+        run_prewarm,
+        "interval",
+        seconds=PREWARM_INTERVAL,
+        id="search_cache_prewarm",
+        max_instances=1,
+        coalesce=True,
+    )
+    _scheduler.start()
+    logger.info(f"缓存预热任务已启动，时段 {PREWARM_HOURS} 点，检查间隔 {PREWARM_INTERVAL}s")
+    return _scheduler
@@ -0,0 +1,235 @@
+import collections
+import concurrent.futures
+import logging
+import threading
+import time
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from configs.app_config import (
+    RESHARE_CONCURRENCY,
+    RESHARE_ENABLED,
+    RESHARE_INTERVAL,
+    RESHARE_LOCK_FILE,
+    RESHARE_MAX_ROWS,
+    RESHARE_PAGE_SIZE,
+    RESHARE_RATE_PER_SEC,
+    RESHARE_RETRY_BASE,
+    RESHARE_RETRY_MAX,
+)
+from src.clients.client_registry import NETDISK_CLIENTS
+from src.db.checkpoint_dao import get_checkpoint, save_checkpoint
+from src.db.resources_dao import (
+    batch_record_reshare_failures,
+    batch_update_share_links,
+    get_resource_by_share_link,
+    get_unreplaced_resources,
+)
+from src.pan_operator import NetdiskOperationError, transfer_share
+from utils.lock_utils import LeaderLock
+from utils.metrics_utils import RESHARE_ROWS
+from utils.netdisk_utils import match_netdisk_link
+from utils.rate_limit_utils import RATE_LIMITER
+
+logger = logging.getLogger(__name__)
+
+CHECKPOINT_NAME = "reshare"
+# 重新分享时所有支持转存的网盘都转存
+_SAVE_TO_NETDISK = {"quark": True, "baidu": True}
+# 等待网盘限流额度的最长时间（秒），超过则本轮跳过该资源
+_RATE_MAX_WAIT = 60.0
+
+REPLACED, FAILED, SKIPPED, DUPLICATE, THROTTLED = "replaced", "failed", "skipped", "duplicate", "throttled"
+
+_run_lock = threading.Lock()
+_leader_lock = LeaderLock(RESHARE_LOCK_FILE, "重新分享")
+_scheduler = None
+
+
+def _stream_unreplaced(after_id: int) -> Iterator[Dict[str, Any]]:
+    """按 ID 键集分页逐条产出未替换的资源"""
+    while True:
+        page = get_unreplaced_resources(after_id, RESHARE_PAGE_SIZE)
+        if not page:
+            return
+        yield from page
+        after_id = page[-1]["id"]
+
+
+def _reshare_one(resource: Dict[str, Any]) -> Tuple[str, Optional[Dict[str, Any]]]:
+    """
+    转存一条资源（不写库），返回 (结果, 附加信息)：成功时为 transfer_share 的返回值，
+    失败时为 {"retryable": 是否值得按退避重试}。
+    """
+    netdisk = match_netdisk_link(resource["share_link"])
+    if netdisk in NETDISK_CLIENTS and RESHARE_RATE_PER_SEC > 0 and not RATE_LIMITER.acquire(
+            f"reshare:{netdisk}", RESHARE_RATE_PER_SEC, max(1, int(RESHARE_RATE_PER_SEC)), _RATE_MAX_WAIT):
+        return THROTTLED, None
+    share_data = {
+        "id": resource["id"],
+        "share_url": resource["share_link"],
+        "title": resource["name"],
+        "save_to_netdisk": _SAVE_TO_NETDISK,
+    }
+    try:
+        result = transfer_share(share_data, sync=False)
+    except NetdiskOperationError as e:
+        logger.warning(f"重新分享资源 {resource['id']} 失败: {e}")
+        return FAILED, {"retryable": e.retryable}
+    except Exception as e:
+        logger.exception(f"重新分享资源 {resource['id']} 异常: {e}")
+        return FAILED, {"retryable": True}
+    return (REPLACED, result) if result["status"] == "transferred" else (SKIPPED, None)
+
+
+def _flush(replaced: List[Tuple[Dict[str, Any], Dict[str, Any]]], failed: List[Tuple[int, int]]) -> Tuple[int, int]:
+    """
+    批量写回新分享链接与失败记录，返回 (写入条数, 因链接已被其他资源使用而跳过的条数)。
+    复用转存结果时新链接可能已属于另一条资源（同一源链接重复收录），这类资源保持未替换。
+    """
+    batch_record_reshare_failures(failed, RESHARE_RETRY_MAX)
+    updates, links, duplicates = [], set(), 0
+    for resource, result in replaced:
+        link = result["share_url"]
+        owner = get_resource_by_share_link(link) if result["reused"] else None
+        if link in links or (owner and owner["id"] != resource["id"]):
+            duplicates += 1
+            RESHARE_ROWS.labels(match_netdisk_link(link), DUPLICATE).inc()
+            continue
+        links.add(link)
+        updates.append((resource["id"], link, result["file_id"], result["account_id"]))
+    return batch_update_share_links(updates), duplicates
+
+
+def run_reshare(max_rows: int = RESHARE_MAX_ROWS) -> Dict[str, Any]:
+    """
+    从上次的进度开始，重新分享最多 max_rows 条未替换的资源。
+    资源按 ID 顺序流式读取、由有界线程池转存；每处理完 RESHARE_PAGE_SIZE 条就批量写回新链接和失败记录，
+    并把进度推进到「之前的资源都已处理完」的最大 ID。失败的资源按退避时间跳过，读完全部资源后进度归零。
+    只有持有锁的进程会执行（手动触发也一样，避免两个进程同时转存同一批资源）。返回本次运行的吞吐统计。
+    """
+    report: Dict[str, Any] = {"processed": 0, REPLACED: 0, FAILED: 0, SKIPPED: 0, DUPLICATE: 0, THROTTLED: 0}
+    if not _leader_lock.acquire():
+        return report
+    if not _run_lock.acquire(blocking=False):
+        logger.warning("上一轮重新分享尚未结束，跳过本轮")
+        return report
+
+    try:
+        checkpoint = get_checkpoint(CHECKPOINT_NAME)
+        start_id = watermark = checkpoint["last_id"] if checkpoint else 0
+        started = time.monotonic()
+        report.update(started_at=time.strftime("%Y-%m-%d %H:%M:%S"), start_id=start_id)
+
+        def save(finished: bool) -> None:
+            elapsed = time.monotonic() - started
+            report.update(last_id=watermark, finished=finished, seconds=round(elapsed, 1),
+                          rows_per_sec=round(report["processed"] / elapsed, 2) if elapsed > 0 else 0.0)
+            save_checkpoint(CHECKPOINT_NAME, 0 if finished else watermark, report)
+
+        rows = _stream_unreplaced(start_id)
+        order = collections.deque()      # 已提交资源的 ID（按 ID 递增）
+        done_ids = set()
+        buffer: List[Tuple[Dict[str, Any], Dict[str, Any]]] = []
+        failed: List[Tuple[int, int]] = []    # (资源 ID, 退避基数秒)
+        unsaved = 0                           # 上次保存进度后处理完的条数
+        outstanding: Dict[concurrent.futures.Future, Dict[str, Any]] = {}
+        submitted, exhausted = 0, False
+        window = max(1, RESHARE_CONCURRENCY) * 2
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers=max(1, RESHARE_CONCURRENCY)) as executor:
+            while True:
+                while not exhausted and len(outstanding) < window and submitted < max_rows:
+                    resource = next(rows, None)
+                    if resource is None:
+                        exhausted = True
+                        break
+                    outstanding[executor.submit(_reshare_one, resource)] = resource
+                    order.append(resource["id"])
+                    submitted += 1
+                if not outstanding:
+                    break
+
+                done, _ = concurrent.futures.wait(outstanding, return_when=concurrent.futures.FIRST_COMPLETED)
+                for future in done:
+                    resource = outstanding.pop(future)
+                    outcome, result = future.result()
+                    report["processed"] += 1
+                    unsaved += 1
+                    done_ids.add(resource["id"])
+                    if outcome == REPLACED:
+                        buffer.append((resource, result))
+                    else:
+                        report[outcome] += 1
+                    if outcome == FAILED:
+                        failed.append((resource["id"], RESHARE_RETRY_BASE if result["retryable"] else RESHARE_RETRY_MAX))
+                    RESHARE_ROWS.labels(match_netdisk_link(resource["share_link"]), outcome).inc()
+                while order and order[0] in done_ids:
+                    watermark = order.popleft()
+                    done_ids.discard(watermark)
+
+                if unsaved >= RESHARE_PAGE_SIZE:
+                    written, duplicates = _flush(buffer, failed)
+                    report[REPLACED] += written
+                    report[DUPLICATE] += duplicates
+                    buffer, failed, unsaved = [], [], 0
+                    save(finished=False)
+                    logger.info(f"重新分享进度: 已处理 {report['processed']} 条，替换 {report[REPLACED]} 条，"
+                                f"{report['rows_per_sec']} 条/秒，进度 ID {watermark}")
+
+        written, duplicates = _flush(buffer, failed)
+        report[REPLACED] += written
+        report[DUPLICATE] += duplicates
+        save(finished=exhausted)
+        logger.info(f"重新分享完成: {report}")
+        return report
+    finally:
+        _run_lock.release()
+
+
+def start_reshare_async(max_rows: int = RESHARE_MAX_ROWS) -> bool:
+    """
+    在后台线程中立即运行一轮（管理接口手动触发）。
+    已有一轮在运行、或锁被其他进程持有（由该进程负责重新分享）时返回 False。
+    """
+    if _run_lock.locked() or not _leader_lock.acquire():
+        return False
+    threading.Thread(target=run_reshare, kwargs={"max_rows": max_rows},
+                     name="reshare", daemon=True).start()
+    return True
+
+
+def get_reshare_status() -> Dict[str, Any]:
+    """当前是否在运行，以及保存的进度和最近一次运行的吞吐统计"""
+    checkpoint = get_checkpoint(CHECKPOINT_NAME) or {}
+    updated_at = checkpoint.get("updated_at")
+    return {
+        "running": _run_lock.locked(),
+        "last_id": checkpoint.get("last_id", 0),
+        "report": checkpoint.get("report"),
+        "updated_at": updated_at.strftime("%Y-%m-%d %H:%M:%S") if updated_at else None,
+    }
+
+
+def start_reshare_scheduler():
+    """
+    启动定时重新分享（每个 worker 都会注册任务，但只有持有锁的进程执行）。
+    使用 gunicorn --preload 时请在 post_fork 钩子中调用，线程不会跨 fork 保留。
+    """
+    global _scheduler
+    if not RESHARE_ENABLED or _scheduler is not None:
+        return None
+
+    from apscheduler.schedulers.background import BackgroundScheduler
+
+    _scheduler = BackgroundScheduler(daemon=True)
+    _scheduler.add_job(
+        run_reshare,
+        "interval",
+        seconds=RESHARE_INTERVAL,
+        id="resource_reshare",
+        max_instances=1,
+        coalesce=True,
+    )
+    _scheduler.start()
+    logger.info(f"定时重新分享已启动，间隔 {RESHARE_INTERVAL}s，每次最多 {RESHARE_MAX_ROWS} 条")
+    return _scheduler
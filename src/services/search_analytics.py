@@ -0,0 +1,125 @@
+import atexit
+import logging
+import threading
+from collections import deque
+from datetime import datetime
+from typing import Any, Callable, Dict, Optional, Sequence, Tuple
+
+from configs.app_config import (
+    ANALYTICS_BATCH_ROWS,
+    ANALYTICS_BUFFER_SIZE,
+    ANALYTICS_ENABLED,
+    ANALYTICS_FLUSH_SECONDS,
+)
+from utils import json_utils
+from utils.metrics_utils import ANALYTICS_BUFFERED, ANALYTICS_EVENTS
+
+logger = logging.getLogger(__name__)
+
+
+class BufferedWriter:
+    """
+    有界缓冲 + 后台批量写入。
+    record() 只在锁内做一次追加，从不等待 I/O；缓冲区满时丢弃新事件并计数（背压）。
+    后台线程每 flush_seconds 秒、或缓冲区攒够 batch_rows 条时被唤醒，按批调用 sink 写入，
+    sink 返回 False 的批次直接丢弃并计数，不重试，避免数据库故障时积压。
+    """
+
+    def __init__(self, sink: Callable[[Sequence[Tuple]], bool], capacity: int = ANALYTICS_BUFFER_SIZE,
+                 batch_rows: int = ANALYTICS_BATCH_ROWS, flush_seconds: float = ANALYTICS_FLUSH_SECONDS) -> None:
+        self.sink = sink
+        self.capacity = capacity
+        self.batch_rows = max(1, batch_rows)
+        self.flush_seconds = flush_seconds
+        self._buffer: deque = deque()
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def record(self, row: Tuple) -> bool:
+        with self._lock:
+            if len(self._buffer) >= self.capacity:
+                size = -1
+            else:
+                self._buffer.append(row)
+                size = len(self._buffer)
+        if size < 0:
+            ANALYTICS_EVENTS.labels("dropped_full").inc()
+            return False
+
+        ANALYTICS_BUFFERED.set(size)
+        if size >= self.batch_rows:
+            self._wakeup.set()
+        if self._thread is None:
+            self._start()
+        return True
+
+    def _start(self) -> None:
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._run, name="analytics-writer", daemon=True)
+        self._thread.start()
+        atexit.register(self.flush)
+
+    def _run(self) -> None:
+        while True:
+            self._wakeup.wait(self.flush_seconds)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error(f"搜索分析批量写入异常: {e}")
+
+    def flush(self) -> int:
+        """把缓冲区中的事件按批写出，返回写入成功的条数"""
+        written = 0
+        with self._flush_lock:
+            while True:
+                with self._lock:
+                    count = min(self.batch_rows, len(self._buffer))
+                    batch = [self._buffer.popleft() for _ in range(count)]
+                    remaining = len(self._buffer)
+                ANALYTICS_BUFFERED.set(remaining)
+                if not batch:
+                    break
+                if self.sink(batch):
+                    written += len(batch)
+                    ANALYTICS_EVENTS.labels("written").inc(len(batch))
+                else:
+                    ANALYTICS_EVENTS.labels("dropped_error").inc(len(batch))
+                if count < self.batch_rows:
+                    break
+        return written
+
+
+def _insert_rows(rows: Sequence[Tuple]) -> bool:
+    from src.db.search_analytics_dao import insert_search_events
+    return insert_search_events(rows)
+
+
+ANALYTICS = BufferedWriter(_insert_rows)
+
+
+def record_search(keyword: str, started_at: float, stats: Dict[str, Any], latency_ms: float, completed: bool) -> None:
+    """
+    记录一次搜索（由 generate_search_stream_events 在流结束或客户端断开时调用）。
+    stats: {"cache": ..., "db_results": ..., "upstream_results": ..., "sources": {api 名称: 条数}, "first_result_ms": ...}
+    """
+    if not ANALYTICS_ENABLED:
+        return
+    sources = stats.get("sources") or {}
+    first_result_ms = stats.get("first_result_ms")
+    ANALYTICS.record((
+        keyword[:191],
+        datetime.fromtimestamp(started_at),
+        stats.get("cache", "miss"),
+        completed,
+        stats.get("db_results", 0),
+        stats.get("upstream_results", 0),
+        len(sources),
+        json_utils.dumps(sources) if sources else None,
+        int(first_result_ms) if first_result_ms is not None else None,
+        int(latency_ms),
+    ))
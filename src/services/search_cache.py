@@ -0,0 +1,200 @@
+import logging
+import struct
+import time
+import zlib
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+from configs.app_config import (
+    CONFIG_CACHE_TTL,
+    SEARCH_CACHE_REFRESH_LEASE,
+    SEARCH_CACHE_STALE_SECONDS,
+    SEARCH_CACHE_TTL,
+)
+from src.services.search_result import SearchResult
+from utils import json_utils
+from utils.cache_utils import CACHE
+from utils.metrics_utils import CACHE_REQUESTS, record_cache_access
+
+logger = logging.getLogger(__name__)
+
+# 二进制格式：头部 <版本, 标志位, 写入时间>，正文为字符串表 + 每条结果 4 个字符串下标（varint）。
+# 下标 0 表示 None（如未识别的 netdisk_name），字符串表从 1 开始编号。
+# source / netdisk_name 大量重复，只存一次；正文超过阈值时整体 zlib 压缩。
+_FORMAT_VERSION = 2
+_FLAG_ZLIB = 1
+_HEADER = struct.Struct("<BBd")
+_COMPRESS_THRESHOLD = 512
+
+_RESULTS_PREFIX = "search:v1:"
+_REFRESH_PREFIX = "refresh:v1:"
+_CONFIGS_KEY = "api_configs:v1"
+
+
+def _write_varint(out: bytearray, value: int) -> None:
+    while value >= 0x80:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def _read_varint(data: memoryview, pos: int) -> Tuple[int, int]:
+    value = shift = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        value |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return value, pos
+        shift += 7
+
+
+def encode_results(results: List[SearchResult], created_at: Optional[float] = None) -> bytes:
+    """把结果列表编码为紧凑的二进制串"""
+    table: Dict[str, int] = {}
+    indexes: List[int] = []
+    for result in results:
+        for field in result:
+            if field is None:
+                indexes.append(0)
+                continue
+            index = table.get(field)
+            if index is None:
+                index = table[field] = len(table) + 1
+            indexes.append(index)
+
+    body = bytearray()
+    _write_varint(body, len(table))
+    for text in table:
+        encoded = text.encode("utf-8")
+        _write_varint(body, len(encoded))
+        body += encoded
+    _write_varint(body, len(results))
+    for index in indexes:
+        _write_varint(body, index)
+
+    flags = 0
+    payload = bytes(body)
+    if len(payload) > _COMPRESS_THRESHOLD:
+        payload = zlib.compress(payload, 6)
+        flags |= _FLAG_ZLIB
+    return _HEADER.pack(_FORMAT_VERSION, flags, created_at if created_at is not None else time.time()) + payload
+
+
+def decode_results(data: bytes) -> Tuple[List[SearchResult], float]:
+    """解码 encode_results 的输出，返回 (结果列表, 写入时间)；格式不符时抛出 ValueError"""
+    try:
+        version, flags, created_at = _HEADER.unpack_from(data)
+        if version != _FORMAT_VERSION:
+            raise ValueError(f"不支持的缓存格式版本: {version}")
+        payload = data[_HEADER.size:]
+        if flags & _FLAG_ZLIB:
+            payload = zlib.decompress(payload)
+
+        view = memoryview(payload)
+        count, pos = _read_varint(view, 0)
+        table = []
+        for _ in range(count):
+            length, pos = _read_varint(view, pos)
+            table.append(str(view[pos:pos + length], "utf-8"))
+            pos += length
+        total, pos = _read_varint(view, pos)
+        results = []
+        for _ in range(total):
+            fields = []
+            for _ in range(4):
+                index, pos = _read_varint(view, pos)
+                fields.append(table[index - 1] if index else None)
+            results.append(SearchResult(*fields))
+        return results, created_at
+    except (struct.error, zlib.error, IndexError, UnicodeDecodeError) as e:
+        raise ValueError(f"缓存数据损坏: {e}") from e
+
+
+class CachedResults(NamedTuple):
+    results: List[SearchResult]
+    age: float       # 距写入的秒数
+    fresh: bool      # 是否仍在新鲜期内；False 表示可先推送、但需要刷新
+
+
+def _results_key(keyword: str) -> str:
+    return _RESULTS_PREFIX + " ".join(keyword.split()).lower()
+
+
+def get_cached_results(keyword: str) -> Optional[CachedResults]:
+    """
+    读取关键词的上游搜索结果缓存。
+    新鲜期内返回 fresh=True；过了新鲜期但未超过 SEARCH_CACHE_STALE_SECONDS 的返回 fresh=False；
+    其余情况（未命中、硬过期、数据损坏）返回 None。
+    """
+    key = _results_key(keyword)
+    data = CACHE.get(key)
+    if data is not None:
+        try:
+            results, created_at = decode_results(data)
+            age = max(0.0, time.time() - created_at)
+            if age < SEARCH_CACHE_TTL:
+                record_cache_access("search_results", True)
+                return CachedResults(results, age, True)
+            if age < SEARCH_CACHE_TTL + SEARCH_CACHE_STALE_SECONDS:
+                CACHE_REQUESTS.labels("search_results", "stale").inc()
+                return CachedResults(results, age, False)
+        except ValueError as e:
+            logger.warning(f"丢弃无法解码的搜索缓存 '{keyword}': {e}")
+            CACHE.delete(key)
+    record_cache_access("search_results", False)
+    return None
+
+
+def peek_cached_age(keyword: str) -> Optional[float]:
+    """返回缓存结果的存在时长（秒），不存在或已硬过期返回 None；不计入命中率指标"""
+    data = CACHE.get(_results_key(keyword))
+    if data is None:
+        return None
+    try:
+        age = max(0.0, time.time() - _HEADER.unpack_from(data)[2])
+    except struct.error:
+        return None
+    return age if age < SEARCH_CACHE_TTL + SEARCH_CACHE_STALE_SECONDS else None
+
+
+def store_results(keyword: str, results: List[SearchResult]) -> None:
+    """
+    缓存关键词的上游搜索结果（不含内部数据库结果，那部分每次实时查询）。
+    后端过期时间 = 新鲜期 + 可推送旧结果的窗口，新鲜与否按写入时间判断。
+    """
+    if SEARCH_CACHE_TTL > 0:
+        CACHE.set(_results_key(keyword), encode_results(results), SEARCH_CACHE_TTL + SEARCH_CACHE_STALE_SECONDS)
+
+
+def acquire_refresh_lease(keyword: str) -> bool:
+    """为过期关键词争取刷新权，同一时间只有一个请求（跨 worker）重新请求上游；缓存后端出错时放行"""
+    return CACHE.add(_REFRESH_PREFIX + _results_key(keyword), b"1", SEARCH_CACHE_REFRESH_LEASE) is not False
+
+
+def release_refresh_lease(keyword: str) -> None:
+    CACHE.delete(_REFRESH_PREFIX + _results_key(keyword))
+
+
+def get_cached_configs() -> Optional[List[Dict[str, Any]]]:
+    """读取 API 配置快照；未命中返回 None"""
+    data = CACHE.get(_CONFIGS_KEY)
+    if data is not None:
+        try:
+            configs = json_utils.loads(zlib.decompress(data))
+            record_cache_access("api_configs", True)
+            return configs
+        except (ValueError, zlib.error) as e:
+            logger.warning(f"丢弃无法解码的 API 配置快照: {e}")
+    record_cache_access("api_configs", False)
+    return None
+
+
+def store_configs(configs: List[Dict[str, Any]], ttl: float = CONFIG_CACHE_TTL) -> None:
+    """缓存 API 配置快照；空列表（通常是数据库不可用）不缓存"""
+    if configs and ttl > 0:
+        CACHE.set(_CONFIGS_KEY, zlib.compress(json_utils.dumps_bytes(configs), 6), ttl)
+
+
+def invalidate_configs() -> None:
+    """API 配置被修改后调用，使所有 worker 下次搜索时重新读库"""
+    CACHE.delete(_CONFIGS_KEY)
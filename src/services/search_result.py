@@ -0,0 +1,14 @@
+from typing import NamedTuple
+
+
+class SearchResult(NamedTuple):
+    """
+    单条搜索结果。
+    基于 tuple，内存占用小，JSON 序列化后仍为 [source, title, url, netdisk_name]，
+    与前端约定的数组格式保持一致。
+    """
+
+    source: str
+    title: str
+    url: str
+    netdisk_name: str
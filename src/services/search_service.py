@@ -1,53 +1,141 @@
+import codecs
+import collections
 import concurrent.futures
 import json
 import logging
 import random
 import re
 import time
+from contextlib import contextmanager
+from contextvars import ContextVar
 
 import jmespath
 import requests
 
-from configs.app_config import user_agents
+from configs.app_config import (
+    PREWARM_ASSUMED_RATE,
+    PREWARM_MAX_WAIT,
+    RATE_LIMIT_DEFAULT_BURST,
+    RATE_LIMIT_DEFAULT_PER_SEC,
+    RATE_LIMIT_MAX_WAIT,
+    RATE_LIMIT_ON_DENY,
+    ROUTING_ENABLED,
+    ROUTING_MIN_RESULTS,
+    SEARCH_DEAD_LINKS,
+    SEARCH_MAX_WORKERS,
+    UPSTREAM_LOW_SCORE_SLOTS,
+    UPSTREAM_MAX_BODY_KB,
+    UPSTREAM_MAX_DECOMPRESS_RATIO,
+    UPSTREAM_MAX_ITEMS,
+    UPSTREAM_STREAM_FETCH,
+    user_agents,
+)
 from src.db.resources_dao import search_resources_by_keyword, search_resources_advanced
+from src.services.keyword_router import ROUTER, keyword_features, log_search_outcome
+from src.services.search_analytics import record_search
+from src.services.search_cache import (
+    acquire_refresh_lease,
+    get_cached_configs,
+    get_cached_results,
+    release_refresh_lease,
+    store_configs,
+    store_results,
+)
+from src.services.search_result import SearchResult
+from src.services.upstream_score import SCOREBOARD
+from utils import json_utils
+from utils.json_stream_utils import compile_rule
+from utils.log_utils import TitleSample
+from utils.metrics_utils import UPSTREAM_ERRORS, UPSTREAM_RATE_LIMITED, UPSTREAM_REQUEST_SECONDS, UPSTREAM_RESULTS
 from utils.netdisk_utils import match_netdisk_link
+from utils.rate_limit_utils import RATE_LIMITER
+from utils.timing_utils import span, start_timer, timed
+from utils.trace_utils import start_trace, submit_in_context, trace_span
 
 logger = logging.getLogger(__name__)
 
+# 后台任务（如缓存预热）发起搜索时设置：每个上游最多使用其限流额度的这一比例
+_budget_share: ContextVar = ContextVar("upstream_budget_share", default=None)
 
+
+@timed("read_configs")
 def read_all_api_configs_from_db():
-    """从数据库读取所有 API 配置（用于搜索服务，不排序）"""
-    from src.db.api_config_dao import get_all_configs
-    return get_all_configs(order_by_created=False)
+    """从数据库读取所有 API 配置（用于搜索服务，不排序）；优先使用各 worker 共享的配置快照"""
+    configs = get_cached_configs()
+    if configs is None:
+        from src.db.api_config_dao import get_all_configs
+        configs = get_all_configs(order_by_created=False)
+        store_configs(configs)
+    return configs
 
 
 read_api_configs = read_all_api_configs_from_db
 
 
-def fetch_data(url, method, request_data, timeout=10):
-    """根据配置发起 HTTP 请求并返回响应内容。"""
+class ResponseTooLargeError(Exception):
+    """上游响应体超过大小上限，或解压比异常（疑似压缩炸弹）"""
+
+
+def _send_request(url, method, request_data, timeout, stream=False):
+    """按配置发起 HTTP 请求，返回 Response；状态码异常时抛出 RequestException。"""
     headers = {
         "User-Agent": random.choice(user_agents),
         "Content-Type": "application/json",
     }
 
     try:
-        data_obj = json.loads(request_data) if request_data else None
+        data_obj = json_utils.loads(request_data) if request_data else None
     except json.JSONDecodeError:
         data_obj = {}
 
-    response = None
+    if method.upper() == "GET":
+        response = requests.get(url, headers=headers, params=data_obj, timeout=timeout, stream=stream)
+    elif method.upper() == "POST":
+        response = requests.post(url, headers=headers, json=data_obj, timeout=timeout, stream=stream)
+    else:
+        raise requests.exceptions.RequestException(f"不支持的 HTTP 方法: {method}")
 
     try:
-        if method.upper() == "GET":
-            response = requests.get(url, headers=headers, params=data_obj, timeout=timeout)
-        elif method.upper() == "POST":
-            response = requests.post(url, headers=headers, json=data_obj, timeout=timeout)
-        else:
-            raise requests.exceptions.RequestException(f"不支持的 HTTP 方法: {method}")
-
         response.raise_for_status()
-        return response.json()
+    except requests.exceptions.RequestException:
+        response.close()
+        raise
+    return response
+
+
+def _iter_response_body(response, max_bytes, chunk_size=16 * 1024, check_length=True):
+    """
+    按块读取解压后的响应体，超过大小上限或解压比异常时抛出 ResponseTooLargeError。
+    check_length=True 时根据 Content-Length 提前拒绝；流式解析时可关闭，以便保留上限内已提取的结果。
+    """
+    content_length = response.headers.get("Content-Length", "")
+    if check_length and content_length.isdigit() and int(content_length) > max_bytes:
+        raise ResponseTooLargeError(f"Content-Length {content_length} 超过上限 {max_bytes} 字节")
+
+    received = 0
+    for chunk in response.iter_content(chunk_size=chunk_size):
+        received += len(chunk)
+        if received > max_bytes:
+            raise ResponseTooLargeError(f"响应体超过上限 {max_bytes} 字节")
+
+        # raw.tell() 为已从网络读取的（压缩）字节数
+        wire_bytes = response.raw.tell() if hasattr(response.raw, "tell") else 0
+        if wire_bytes and received > chunk_size and received > wire_bytes * UPSTREAM_MAX_DECOMPRESS_RATIO:
+            raise ResponseTooLargeError(f"解压比异常: {wire_bytes} 字节解压为 {received} 字节")
+
+        yield chunk
+
+
+@timed()
+def fetch_data(url, method, request_data, timeout=10, max_bytes=None):
+    """根据配置发起 HTTP 请求并返回解析后的 JSON，响应体大小受 max_bytes 限制。"""
+    max_bytes = max_bytes or UPSTREAM_MAX_BODY_KB * 1024
+
+    try:
+        with _send_request(url, method, request_data, timeout, stream=True) as response:
+            body = b"".join(_iter_response_body(response, max_bytes))
+        with span("json_parse"):
+            return json_utils.loads(body)
 
     except requests.exceptions.RequestException as e:
         logger.error(f"API 请求失败 ({url}): {e}")
@@ -55,8 +143,17 @@ def fetch_data(url, method, request_data, timeout=10):
     except json.JSONDecodeError:
         logger.error(f"API 响应不是有效的 JSON ({url})")
         return None
+    except ResponseTooLargeError as e:
+        logger.warning(f"API 响应被丢弃 ({url}): {e}")
+        return None
+
+
+def _to_pairs(results):
+    """确保结果是 [ [title, url], [title, url], ... ] 格式"""
+    return [[str(item[0]), str(item[1])] for item in results if len(item) >= 2]
 
 
+@timed()
 def extract_from_json(json_data, jmespath_query):
     """使用 JMESPath 表达式从 JSON 数据中提取结果。"""
     if not json_data or not jmespath_query:
@@ -66,8 +163,7 @@ def extract_from_json(json_data, jmespath_query):
         results = jmespath.search(jmespath_query, json_data)
 
         if results and isinstance(results, list):
-            # 确保结果是 [ [title, url], [title, url], ... ] 格式
-            return [[str(item[0]), str(item[1])] for item in results if len(item) >= 2]
+            return _to_pairs(results)
 
     except Exception as e:
         logger.error(f"JMESPath 提取失败 (Query: {jmespath_query}): {e}")
@@ -76,6 +172,48 @@ def extract_from_json(json_data, jmespath_query):
     return []
 
 
+@timed()
+def fetch_and_extract(url, method, request_data, jmespath_query, timeout=10, max_bytes=None, max_items=None):
+    """
+    请求上游并提取 [title, url] 列表。
+    规则形如 data[*].[name, url] 时边下载边解析，提取满 max_items 条或数组结束即停止读取；
+    其他规则退回 fetch_data + extract_from_json。请求失败返回 None。
+    """
+    max_bytes = max_bytes or UPSTREAM_MAX_BODY_KB * 1024
+    max_items = max_items or UPSTREAM_MAX_ITEMS
+
+    streamer = compile_rule(jmespath_query, max_items) if UPSTREAM_STREAM_FETCH else None
+    if streamer is None:
+        response_data = fetch_data(url, method, request_data, timeout=timeout, max_bytes=max_bytes)
+        if not response_data:
+            return None
+        return extract_from_json(response_data, jmespath_query)[:max_items]
+
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    try:
+        with _send_request(url, method, request_data, timeout, stream=True) as response:
+            for chunk in _iter_response_body(response, max_bytes, check_length=False):
+                with span("stream_parse"):
+                    streamer.feed(decoder.decode(chunk))
+                if streamer.done:
+                    break
+
+    except requests.exceptions.RequestException as e:
+        logger.error(f"API 请求失败 ({url}): {e}")
+        return None
+    except json.JSONDecodeError:
+        logger.error(f"API 响应不是有效的 JSON ({url})")
+        return None
+    except ResponseTooLargeError as e:
+        logger.warning(f"API 响应读取中止 ({url}): {e}，保留已提取的 {len(streamer.items)} 条")
+
+    try:
+        return _to_pairs(streamer.items)
+    except Exception as e:
+        logger.error(f"JMESPath 提取失败 (Query: {jmespath_query}): {e}")
+        return []
+
+
 def replace_keyword_in_config(configs, placeholder, keyword):
     """用实际关键词替换 API 配置中的占位符（如 '[[keyword]]'）。"""
     updated_configs = []
@@ -97,6 +235,7 @@ def replace_keyword_in_config(configs, placeholder, keyword):
     return updated_configs
 
 
+@timed()
 def filter_output(extracted_data, keyword):
     """根据关键词过滤结果，实现模糊匹配。"""
     separator_pattern = r"[,、|;+\-/	\n*#\s]"
@@ -117,11 +256,12 @@ def filter_output(extracted_data, keyword):
     return filtered_list
 
 
+@timed()
 def clean_and_extract_data(data):
     """
     清洗并提取数据，并新增网盘信息。
     输入格式: [[source, title, url], ...]
-    输出格式: [[source, title, url, netdisk_name], ...]
+    输出格式: [SearchResult(source, title, url, netdisk_name), ...]
     """
 
     def extract_url(url):
@@ -150,99 +290,293 @@ def clean_and_extract_data(data):
         url = extract_url(d_lst[2])
         netdisk_name = match_netdisk_link(url)
 
-        cleaned_data.append([source, title, url, netdisk_name])
+        cleaned_data.append(SearchResult(source, title, url, netdisk_name))
 
     return cleaned_data
 
 
-def process_config(config, keyword):
+@contextmanager
+def upstream_budget(share):
     """
-    处理单个 API 配置，获取、筛选数据，并返回包含网盘名称的结果。
+    在此上下文中发起的搜索，每个上游只能使用其限流额度的 share 比例（未配置限流的按 PREWARM_ASSUMED_RATE 计），
+    额度不足时最多等待 PREWARM_MAX_WAIT 秒，仍不足则跳过该上游。用于缓存预热等后台任务。
     """
+    token = _budget_share.set(share)
+    try:
+        yield
+    finally:
+        _budget_share.reset(token)
+
+
+def _acquire_background_budget(config, rate, share):
     config_name = config.get("name", "未知 API")
-    final_results = []
+    budget_rate = (rate if rate and rate > 0 else PREWARM_ASSUMED_RATE) * share
+    key = f"background:api:{config.get('id') or config_name}"
+    if RATE_LIMITER.acquire(key, budget_rate, 1, PREWARM_MAX_WAIT):
+        return True
+    UPSTREAM_RATE_LIMITED.labels(config_name, "background_skipped").inc()
+    return False
 
-    try:
-        response_data = fetch_data(config["url"], config["method"], config["request"], timeout=10)
 
-        if response_data:
-            extracted_data = extract_from_json(response_data, config["response"])
+def _acquire_upstream_slot(config):
+    """
+    按 API 的限流配置取令牌；未配置且没有全局默认速率时直接放行。
+    RATE_LIMIT_ON_DENY=wait 时最多排队 RATE_LIMIT_MAX_WAIT 秒，skip 时不等待。
+    后台任务（upstream_budget）还需先取得其专用的额度，并同样计入上游的总限流。
+    """
+    rate = config.get("rate_limit_per_sec") or RATE_LIMIT_DEFAULT_PER_SEC
+    share = _budget_share.get()
+    if share is not None and not _acquire_background_budget(config, rate, share):
+        return False
+    if not rate or rate <= 0:
+        return True
+
+    config_name = config.get("name", "未知 API")
+    burst = config.get("rate_limit_burst") or RATE_LIMIT_DEFAULT_BURST
+    max_wait = RATE_LIMIT_MAX_WAIT if RATE_LIMIT_ON_DENY == "wait" or share is not None else 0.0
+    key = f"api:{config.get('id') or config_name}"
 
-            if extracted_data and isinstance(extracted_data, list):
-                filtered_data = filter_output(extracted_data, keyword)
+    with trace_span("rate_limit") as limit_span:
+        start = time.perf_counter()
+        acquired = RATE_LIMITER.acquire(key, rate, burst, max_wait)
+        waited_ms = (time.perf_counter() - start) * 1000
+        limit_span.set(acquired=acquired)
 
-                if filtered_data:
-                    filtered_data_with_keyword = [["other", item[0], item[1]] for item in filtered_data]
-                    final_results = clean_and_extract_data(filtered_data_with_keyword)
+    if not acquired:
+        UPSTREAM_RATE_LIMITED.labels(config_name, "skipped").inc()
+        logger.info("API '%s' 触发限流 (%.2f 次/秒)，本次搜索跳过。", config_name, rate, extra={"sample_key": config_name})
+    elif waited_ms >= 1:
+        UPSTREAM_RATE_LIMITED.labels(config_name, "waited").inc()
+    return acquired
 
-            num_results = len(final_results)
-            log_message = f"API '{config_name}' ({config['url']}) 搜索到 {num_results} 条资源。"
-            if num_results > 0:
-                sample_results = [res[1] for res in final_results[:2]]
-                log_message += f" 示例 (Title): {sample_results}"
 
-            logger.info(log_message)
+def process_config(config, keyword):
+    """
+    处理单个 API 配置，获取、筛选数据，并返回包含网盘名称的结果。
+    被限流跳过时返回 None（不计入错误、评分和路由统计）。
+    """
+    config_name = config.get("name", "未知 API")
+    final_results = []
+
+    if not _acquire_upstream_slot(config):
+        return None
+
+    start = time.perf_counter()
+    try:
+        max_body_kb = config.get("max_body_kb")
+        with trace_span("upstream", api=config_name) as upstream_span:
+            with span(f"upstream.{config_name}"), trace_span("fetch"):
+                extracted_data = fetch_and_extract(
+                    config["url"],
+                    config["method"],
+                    config["request"],
+                    config["response"],
+                    timeout=10,
+                    max_bytes=max_body_kb * 1024 if max_body_kb else None,
+                    max_items=config.get("max_items"),
+                )
+            elapsed = time.perf_counter() - start
+            UPSTREAM_REQUEST_SECONDS.labels(config_name).observe(elapsed)
+
+            if extracted_data is None:
+                UPSTREAM_ERRORS.labels(config_name).inc()
+                upstream_span.set(error="fetch_failed")
+            elif extracted_data:
+                with trace_span("filter"):
+                    filtered_data = filter_output(extracted_data, keyword)
+
+                    if filtered_data:
+                        filtered_data_with_keyword = [["other", item[0], item[1]] for item in filtered_data]
+                        final_results = clean_and_extract_data(filtered_data_with_keyword)
+            upstream_span.set(extracted=len(extracted_data or ()), results=len(final_results))
+        SCOREBOARD.observe(config, len(final_results), extracted_data is None, elapsed * 1000)
+
+        if extracted_data is not None:
+            num_results = len(final_results)
+            # 延迟格式化 + sample_key：被级别、采样或限流过滤掉时不会拼接字符串，也不会取标题示例
+            logger.info(
+                "API '%s' (%s) 搜索到 %d 条资源。 示例 (Title): %s",
+                config_name, config["url"], num_results, TitleSample(final_results),
+                extra={"sample_key": config_name},
+            )
+            UPSTREAM_RESULTS.labels(config_name).observe(num_results)
 
     except Exception as e:
+        UPSTREAM_ERRORS.labels(config_name).inc()
+        SCOREBOARD.observe(config, 0, True, (time.perf_counter() - start) * 1000)
         logger.error(f"处理配置 '{config_name}' ({config['url']}) 时发生异常: {e}")
         return []
 
     return final_results
 
 
-def search_in_database(keyword):
+@timed()
+def search_in_database(keyword, with_types=False):
     """
     从内部数据库搜索，并新增网盘信息。
-    返回格式: [[source, title, url, netdisk_name], ...]
+    返回格式: [SearchResult(source, title, url, netdisk_name), ...]
+    with_types=True 时返回 (结果列表, 命中资源的 type 集合)，供上游路由使用
     """
+    types = set()
     try:
         # 使用 DAO 搜索资源
-        results = search_resources_by_keyword(keyword)
+        results = search_resources_by_keyword(keyword, SEARCH_DEAD_LINKS)
 
         final_results = []
-        for name, link, cloud_name in results:
+        for name, link, cloud_name, resource_type in results:
             netdisk_name = cloud_name if cloud_name else match_netdisk_link(link)
-            final_results.append(["hot", name, link, netdisk_name])
+            final_results.append(SearchResult("hot", name, link, netdisk_name))
+            if resource_type:
+                types.add(resource_type)
 
-        num_results = len(final_results)
-        log_message = f"内部数据库搜索到 {num_results} 条资源。"
-        if num_results > 0:
-            sample_results = [res[1] for res in final_results[:2]]
-            log_message += f" 示例 (Title): {sample_results}"
+        logger.info(
+            "内部数据库搜索到 %d 条资源。 示例 (Title): %s",
+            len(final_results), TitleSample(final_results),
+            extra={"sample_key": "database"},
+        )
 
-        logger.info(log_message)
-
-        return final_results
+        return (final_results, types) if with_types else final_results
 
     except Exception as err:
         logger.error(f"数据库错误: {err}")
-        return []
+        return ([], types) if with_types else []
 
 
-def generate_search_stream_events(keyword):
+def _end_event(timer, stale=False):
+    end_event = {"type": "end"}
+    if stale:
+        end_event["stale"] = True
+    timing = timer.summary()
+    if timing:
+        end_event["timing"] = timing
+    return json_utils.dumps(end_event)
+
+
+def generate_search_stream_events(keyword, refresh=False):
     """
     生成搜索结果的 SSE 事件流 (生成字符串, 不直接返回 Response)
+    refresh=True 时忽略已有缓存，重新请求上游并写回缓存（用于缓存预热）
     """
 
     def _event_generator():
-        db_results = search_in_database(keyword)
+        timer = start_timer()
+        trace = start_trace("search", keyword=keyword)
+        started_at = time.time()
+        start = time.perf_counter()
+        stats = {"cache": "refresh" if refresh else "miss", "sources": {}, "first_result_ms": None}
+        completed = False
+        try:
+            for event_type, payload in _events(timer, trace, stats):
+                if stats["first_result_ms"] is None and event_type != "end":
+                    stats["first_result_ms"] = (time.perf_counter() - start) * 1000
+                yield payload
+            completed = True
+        finally:
+            trace.finish()
+            record_search(keyword, started_at, stats, (time.perf_counter() - start) * 1000, completed)
+
+    def _events(timer, trace, stats):
+        # 产出 (事件类型, 序列化后的事件)，事件类型供统计首个结果时间使用
+        # 生成器在 yield 期间会把上下文交还给调用方，因此只在非 yield 的代码段内激活计时器和链路
+        with timer.activate(), trace.activate(), trace_span("db_search") as db_span:
+            db_results, db_types = search_in_database(keyword, with_types=True)
+            db_span.set(results=len(db_results))
+        stats["db_results"] = len(db_results)
         if db_results:
-            yield json.dumps({"type": "initial", "results": db_results})
-
-        urls_config = read_all_api_configs_from_db()
+            yield "initial", json_utils.dumps({"type": "initial", "results": db_results})
+
+        # 上游结果缓存：新鲜的直接推送并结束；过了新鲜期的先推送（标记 stale），再重新请求上游只推送新增结果
+        with timer.activate(), trace.activate(), trace_span("cache_lookup") as cache_span:
+            cached = None if refresh else get_cached_results(keyword)
+            refreshing = cached is not None and not cached.fresh and acquire_refresh_lease(keyword)
+            cache_span.set(
+                hit=cached is not None,
+                fresh=cached.fresh if cached else None,
+                age_s=round(cached.age, 1) if cached else None,
+                refreshing=refreshing,
+            )
+        pushed_links = {res.url for res in db_results}
+        db_link_count = len(pushed_links)
+        try:
+            if cached is not None:
+                stats["cache"] = "fresh" if cached.fresh else "stale"
+                cached_results = [res for res in cached.results if res.url not in pushed_links]
+                pushed_links.update(res.url for res in cached_results)
+                if cached_results:
+                    event = {"type": "update", "results": cached_results}
+                    if not cached.fresh:
+                        event["stale"] = True
+                    yield "update", json_utils.dumps(event)
+                logger.info(
+                    "关键词 '%s' 命中搜索缓存 (%d 条，%.0f 秒前%s)。",
+                    keyword, len(cached_results), cached.age,
+                    "" if cached.fresh else "，已过期" + ("，刷新中" if refreshing else ""),
+                )
+                if not refreshing:
+                    yield "end", _end_event(timer, stale=not cached.fresh)
+                    return
+
+            yield from _fan_out(timer, trace, stats, db_results, db_types, pushed_links)
+        finally:
+            stats["upstream_results"] = len(pushed_links) - db_link_count
+            # 客户端中途断开时同样释放刷新租约，让下一个请求接手
+            if refreshing:
+                release_refresh_lease(keyword)
+
+    def _fan_out(timer, trace, stats, db_results, db_types, pushed_links):
+        with timer.activate(), trace.activate(), trace_span("read_configs"):
+            urls_config = read_all_api_configs_from_db()
         enabled_configs = [c for c in urls_config if c.get("status", False) and c.get("is_enabled", False)]
 
-        enabled_configs.sort(key=lambda x: x.get("response_time_ms", 9999))
-
-        enabled_urls = [c["url"] for c in enabled_configs]
-        logger.info(f"本次搜索启用的 API 数量: {len(enabled_urls)} 个。")
-        logger.info(f"启用的 API URL 列表: {enabled_urls}")
-
-        urls_config_search = replace_keyword_in_config(enabled_configs, "[[keyword]]", keyword)
-
-        with concurrent.futures.ThreadPoolExecutor(max_workers=5) as executor:
-            futures = [executor.submit(process_config, config, keyword) for config in urls_config_search]
-            pending_futures = set(futures)
+        # 按上游评分排序（高产出的先提交、先占用并发槽位），并跳过长期低产出的上游；
+        # 低分上游最多同时占用 UPSTREAM_LOW_SCORE_SLOTS 个槽位，超出的等其他低分上游完成后再提交
+        planned_configs = SCOREBOARD.plan(enabled_configs)
+        low_ids = SCOREBOARD.low_scoring(planned_configs)
+
+        # 按关键词路由：先请求历史上对相似关键词有产出的上游，结果不足时再请求其余上游
+        features = keyword_features(keyword, db_types) if ROUTING_ENABLED else []
+        with timer.activate(), trace.activate(), trace_span("route") as route_span:
+            first_wave, second_wave = ROUTER.route(planned_configs, features)
+            route_span.set(first_wave=len(first_wave), second_wave=len(second_wave))
+
+        logger.info(
+            "本次搜索启用的 API 数量: %d 个，首批请求 %d 个。", len(enabled_configs), len(first_wave)
+        )
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("启用的 API URL 列表: %s", [c["url"] for c in enabled_configs])
+
+        # seen_links 为本轮上游已返回的链接，用于统计每个上游去重后的独有结果占比；
+        # pushed_links 还包含刚推送的缓存结果，后台刷新时只推送新增的部分
+        seen_links = {res.url for res in db_results}
+        outcomes = {}
+        upstream_results = []
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers=SEARCH_MAX_WORKERS) as executor:
+            futures = {}
+            deferred = collections.deque()   # 等待低分槽位的上游
+            low_running = 0
+
+            def submit(configs):
+                with timer.activate(), trace.activate():
+                    submitted = {submit_in_context(executor, process_config, config, keyword): config
+                                 for config in configs}
+                futures.update(submitted)
+                return set(submitted)
+
+            def submit_wave(wave):
+                nonlocal low_running
+                ready = []
+                for config in replace_keyword_in_config(wave, "[[keyword]]", keyword):
+                    if config.get("id") not in low_ids:
+                        ready.append(config)
+                    elif low_running < UPSTREAM_LOW_SCORE_SLOTS:
+                        low_running += 1
+                        ready.append(config)
+                    else:
+                        deferred.append(config)
+                return submit(ready)
+
+            pending_futures = submit_wave(first_wave)
 
             while pending_futures:
                 done, pending_futures = concurrent.futures.wait(
@@ -250,17 +584,56 @@ def generate_search_stream_events(keyword):
                 )
 
                 for future in done:
+                    config = futures[future]
+                    if config.get("id") in low_ids:
+                        low_running -= 1
                     try:
                         results = future.result()
+                        if results is None:
+                            continue  # 被限流跳过，不作为路由反馈
+                        outcomes[config.get("id")] = len(results)
+                        stats["sources"][config.get("name", "未知 API")] = len(results)
                         if results:
-                            yield json.dumps({"type": "update", "results": results})
+                            unique = {res.url for res in results} - seen_links
+                            seen_links.update(unique)
+                            SCOREBOARD.observe_unique(config, len(unique), len(results))
+                            upstream_results.extend(results)
+                            new_results = [res for res in results if res.url not in pushed_links]
+                            if new_results:
+                                pushed_links.update(res.url for res in new_results)
+                                yield "update", json_utils.dumps({"type": "update", "results": new_results})
                     except Exception as e:
+                        outcomes[config.get("id")] = 0
+                        stats["sources"][config.get("name", "未知 API")] = 0
                         logger.error(f"SSE 收集结果时发生异常: {e}")
 
+                while deferred and low_running < UPSTREAM_LOW_SCORE_SLOTS:
+                    low_running += 1
+                    pending_futures |= submit([deferred.popleft()])
+
+                if not pending_futures and second_wave and len(seen_links) < ROUTING_MIN_RESULTS:
+                    logger.info("首批上游结果不足 (%d 条)，继续请求其余 %d 个 API。", len(seen_links), len(second_wave))
+                    pending_futures = submit_wave(second_wave)
+                    second_wave = []
+
                 time.sleep(0.01)
 
-        logger.info(f"关键词 '{keyword}' 所有流式搜索完成。")
-        yield json.dumps({"type": "end"})
+        logger.info("关键词 '%s' 所有流式搜索完成。", keyword)
+        yield "end", _end_event(timer)
+
+        # end 事件已发出，再写缓存、记录路由反馈并按需批量写回统计，不占用用户等待时间
+        # 只缓存完整跑完的搜索（客户端中途断开时生成器不会执行到这里），空结果不缓存
+        if upstream_results:
+            with timer.activate(), trace.activate(), trace_span("cache_store"):
+                store_results(keyword, upstream_results)
+        if features:
+            ROUTER.record(features, outcomes)
+            ROUTER.maybe_flush()
+        log_search_outcome(
+            keyword, db_types, len(db_results), outcomes,
+            full=len(outcomes) == len(enabled_configs),
+        )
+        SCOREBOARD.maybe_flush()
 
     return _event_generator()
 
@@ -271,7 +644,8 @@ def search_resources(name="", cloud_name="", resource_type="", limit=100, sort="
     返回: (success: bool, message: str, results: list)
     """
     try:
-        return search_resources_advanced(name=name, cloud_name=cloud_name, resource_type=resource_type, limit=limit, sort=sort)
+        return search_resources_advanced(name=name, cloud_name=cloud_name, resource_type=resource_type, limit=limit, sort=sort,
+                                         dead_links=SEARCH_DEAD_LINKS)
     except Exception as e:
         logger.error(f"API错误: {e}")
         return False, f"API错误: {e}", []
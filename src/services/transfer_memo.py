@@ -0,0 +1,166 @@
+import logging
+import threading
+import time
+from typing import Callable, Dict, NamedTuple, Optional, Tuple
+
+from configs.app_config import (
+    TRANSFER_MEMO_ENABLED,
+    TRANSFER_MEMO_TTL,
+    TRANSFER_MEMO_VERIFY_AFTER,
+    TRANSFER_MEMO_WAIT,
+)
+from src.db.share_transfer_dao import delete_transfer, get_transfer, save_transfer, touch_transfer
+from utils.cache_utils import CACHE
+from utils.metrics_utils import CACHE_REQUESTS
+from utils.netdisk_utils import canonical_share_key
+
+logger = logging.getLogger(__name__)
+
+# (file_id, file_name, 新分享链接, 转存所用的账号 ID)
+StoreResult = Tuple[Optional[str], Optional[str], Optional[str], Optional[int]]
+
+
+class TransferOutcome(NamedTuple):
+    file_id: Optional[str]
+    file_name: Optional[str]
+    share_url: Optional[str]
+    account_id: Optional[int]
+    reused: bool
+
+
+class _Flight:
+    __slots__ = ("done", "result")
+
+    def __init__(self) -> None:
+        self.done = threading.Event()
+        self.result: Optional[TransferOutcome] = None
+
+
+def _count(result: str) -> None:
+    CACHE_REQUESTS.labels("transfer_memo", result).inc()
+
+
+def _from_memo(memo: Dict) -> TransferOutcome:
+    return TransferOutcome(memo["file_id"], memo["file_name"], memo["share_link"], memo["account_id"], reused=True)
+
+
+class TransferMemo:
+    """
+    按源分享链接（规范化键）复用之前的转存结果，避免同一链接反复转存出多份副本、生成多个分享。
+    - 记录在 TRANSFER_MEMO_TTL 内有效；距上次确认超过 TRANSFER_MEMO_VERIFY_AFTER 时先探测我方分享是否仍可访问；
+    - 同一进程内同一链接的并发转存合并为一次，其余调用等待并共享结果；
+    - 跨进程通过缓存租约互斥，未抢到租约的一方等待对方写入记录（最多 TRANSFER_MEMO_WAIT 秒）。
+    """
+
+    def __init__(self, enabled: bool = TRANSFER_MEMO_ENABLED, ttl: float = TRANSFER_MEMO_TTL,
+                 verify_after: float = TRANSFER_MEMO_VERIFY_AFTER, wait: float = TRANSFER_MEMO_WAIT) -> None:
+        self.enabled = enabled
+        self.ttl = ttl
+        self.verify_after = verify_after
+        self.wait = wait
+        self._inflight: Dict[str, _Flight] = {}
+        self._lock = threading.Lock()
+
+    def transfer(self, share_url: str, cloud_name: str, is_alive: Callable[[str], bool],
+                 do_transfer: Callable[[], StoreResult]) -> TransferOutcome:
+        """
+        返回 share_url 的转存结果：有有效记录时直接复用，否则调用 do_transfer() 转存并记录。
+        is_alive(我方分享链接) 用于确认记录中的分享仍然有效。
+        """
+        source_key = canonical_share_key(share_url) if self.enabled else ""
+        if not source_key:
+            return TransferOutcome(*do_transfer(), reused=False)
+
+        with self._lock:
+            flight = self._inflight.get(source_key)
+            leader = flight is None
+            if leader:
+                flight = self._inflight[source_key] = _Flight()
+
+        if not leader:
+            _count("coalesced")
+            flight.done.wait()
+            result = flight.result
+            return result._replace(reused=True) if result and result.share_url else result
+
+        try:
+            flight.result = self._transfer(source_key, share_url, cloud_name, is_alive, do_transfer)
+            return flight.result
+        finally:
+            with self._lock:
+                self._inflight.pop(source_key, None)
+            if flight.result is None:
+                flight.result = TransferOutcome(None, None, None, None, reused=False)
+            flight.done.set()
+
+    def lookup(self, share_url: str, is_alive: Callable[[str], bool]) -> Optional[TransferOutcome]:
+        """只查记录不转存（批量转存先用它过滤已转存过的链接），无有效记录返回 None"""
+        source_key = canonical_share_key(share_url) if self.enabled else ""
+        memo = self._lookup(source_key, is_alive) if source_key else None
+        _count("hit" if memo else "miss")
+        return memo
+
+    def record(self, share_url: str, cloud_name: str, result: StoreResult) -> None:
+        """记录一次成功的转存结果"""
+        source_key = canonical_share_key(share_url) if self.enabled else ""
+        file_id, file_name, new_share_url, account_id = result
+        if source_key and new_share_url:
+            save_transfer(source_key, share_url, cloud_name, file_id, file_name, new_share_url, account_id)
+
+    def _lookup(self, source_key: str, is_alive: Callable[[str], bool]) -> Optional[TransferOutcome]:
+        memo = get_transfer(source_key)
+        if not memo:
+            return None
+        if memo["age_seconds"] is None or memo["age_seconds"] > self.ttl:
+            logger.info(f"转存记录已过期，重新转存: {source_key}")
+            delete_transfer(source_key)
+            _count("expired")
+            return None
+        if memo["verified_seconds"] is None or memo["verified_seconds"] > self.verify_after:
+            if not is_alive(memo["share_link"]):
+                logger.info(f"转存记录中的分享已失效，重新转存: {source_key} -> {memo['share_link']}")
+                delete_transfer(source_key)
+                _count("dead")
+                return None
+            touch_transfer(source_key)
+        return _from_memo(memo)
+
+    def _transfer(self, source_key: str, share_url: str, cloud_name: str, is_alive: Callable[[str], bool],
+                  do_transfer: Callable[[], StoreResult]) -> TransferOutcome:
+        memo = self._lookup(source_key, is_alive)
+        if memo:
+            _count("hit")
+            logger.info(f"复用之前的转存结果: {share_url} -> {memo.share_url}")
+            return memo
+
+        lease_key = f"transfer:{source_key}"
+        deadline = time.monotonic() + self.wait
+        leased = CACHE.add(lease_key, b"1", self.wait)
+        while leased is False and time.monotonic() < deadline:
+            # 其他进程正在转存同一链接，等待其写入记录。持有者先写记录再释放租约，
+            # 所以先看租约再查记录：租约已释放却没有记录说明对方转存失败，重新争取租约自行转存
+            time.sleep(1)
+            lease_gone = CACHE.get(lease_key) is None
+            memo = get_transfer(source_key)
+            if memo:
+                _count("coalesced")
+                return _from_memo(memo)
+            if lease_gone:
+                leased = CACHE.add(lease_key, b"1", self.wait)
+        if leased is None:
+            logger.warning(f"缓存后端不可用，无法合并并发转存，直接转存: {share_url}")
+        elif not leased:
+            logger.warning(f"等待其他进程转存超时，自行转存: {share_url}")
+
+        _count("miss")
+        try:
+            result = do_transfer()
+            self.record(share_url, cloud_name, result)
+            return TransferOutcome(*result, reused=False)
+        finally:
+            # 转存失败时同样释放租约，等待中的进程随即接手
+            if leased:
+                CACHE.delete(lease_key)
+
+
+TRANSFER_MEMO = TransferMemo()
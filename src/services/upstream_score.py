@@ -0,0 +1,172 @@
+import logging
+import random
+import statistics
+import threading
+import time
+from typing import Any, Dict, List, Optional, Set
+
+from configs.app_config import (
+    UPSTREAM_LOW_SCORE_RATIO,
+    UPSTREAM_LOW_SCORE_SLOTS,
+    UPSTREAM_SCORE_ALPHA,
+    UPSTREAM_SCORE_FLUSH_SECONDS,
+    UPSTREAM_SKIP_BELOW_SCORE,
+    UPSTREAM_SKIP_EXPLORE_RATE,
+    UPSTREAM_SKIP_MIN_SAMPLES,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class UpstreamStats:
+    """
+    单个上游在实际搜索中的表现（EWMA）：
+    avg_results 每次保留的结果条数，error_rate 失败率，avg_latency_ms 耗时，
+    unique_ratio 结果中此前未出现过的链接占比（与数据库及更早返回的上游相比）。
+    """
+
+    __slots__ = ("avg_results", "error_rate", "avg_latency_ms", "unique_ratio", "samples")
+
+    def __init__(self, avg_results=None, error_rate=None, avg_latency_ms=None, unique_ratio=None, samples=0) -> None:
+        self.avg_results = avg_results
+        self.error_rate = error_rate
+        self.avg_latency_ms = avg_latency_ms
+        self.unique_ratio = unique_ratio
+        self.samples = samples or 0
+
+    @staticmethod
+    def _ewma(current: Optional[float], sample: float, alpha: float) -> float:
+        return sample if current is None else current + alpha * (sample - current)
+
+    def observe(self, kept: int, error: bool, latency_ms: float, alpha: float) -> None:
+        self.avg_results = self._ewma(self.avg_results, kept, alpha)
+        self.error_rate = self._ewma(self.error_rate, 1.0 if error else 0.0, alpha)
+        self.avg_latency_ms = self._ewma(self.avg_latency_ms, latency_ms, alpha)
+        self.samples += 1
+
+    def observe_unique(self, unique: int, total: int, alpha: float) -> None:
+        if total > 0:
+            self.unique_ratio = self._ewma(self.unique_ratio, unique / total, alpha)
+
+    @property
+    def score(self) -> Optional[float]:
+        """每秒带来的独有有效结果数：保留条数 × 独有占比 × 成功率 ÷ 耗时(秒，至少 0.1)"""
+        if self.samples == 0:
+            return None
+        unique_ratio = 1.0 if self.unique_ratio is None else self.unique_ratio
+        latency_s = max((self.avg_latency_ms or 0) / 1000, 0.1)
+        return round(self.avg_results * unique_ratio * (1 - self.error_rate) / latency_s, 3)
+
+
+class UpstreamScoreboard:
+    """进程内的上游评分表，线程安全；定期批量写回 api_config（多 worker 时以最后写入为准）"""
+
+    def __init__(self, alpha: float = UPSTREAM_SCORE_ALPHA) -> None:
+        self.alpha = alpha
+        self._stats: Dict[int, UpstreamStats] = {}
+        self._dirty: set = set()
+        self._lock = threading.Lock()
+        self._last_flush = time.monotonic()
+
+    def _get(self, config: Dict[str, Any]) -> UpstreamStats:
+        stats = self._stats.get(config["id"])
+        if stats is None:
+            # 用数据库中持久化的统计作为初值，重启后无需重新积累
+            stats = self._stats[config["id"]] = UpstreamStats(
+                config.get("avg_results"), config.get("error_rate"), config.get("avg_latency_ms"),
+                config.get("unique_ratio"), config.get("score_samples"),
+            )
+        return stats
+
+    def observe(self, config: Dict[str, Any], kept: int, error: bool, latency_ms: float) -> None:
+        if config.get("id") is None:
+            return
+        with self._lock:
+            self._get(config).observe(kept, error, latency_ms, self.alpha)
+            self._dirty.add(config["id"])
+
+    def observe_unique(self, config: Dict[str, Any], unique: int, total: int) -> None:
+        if config.get("id") is None:
+            return
+        with self._lock:
+            self._get(config).observe_unique(unique, total, self.alpha)
+            self._dirty.add(config["id"])
+
+    def score(self, config: Dict[str, Any]) -> Optional[float]:
+        if config.get("id") is None:
+            return None
+        with self._lock:
+            return self._get(config).score
+
+    def plan(self, configs: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        按评分从高到低排序（决定提交顺序，高分上游先占用并发槽位）。
+        尚无样本的上游按已知评分的中位数参与排序；同分时按健康检查耗时排序。
+        开启 UPSTREAM_SKIP_BELOW_SCORE 后，样本充足且评分过低的上游被跳过，但保留少量探索请求。
+        """
+        scores = {id(config): self.score(config) for config in configs}
+        known = [score for score in scores.values() if score is not None]
+        default_score = statistics.median(known) if known else 0.0
+
+        planned = []
+        for config in configs:
+            score = scores[id(config)]
+            if (
+                UPSTREAM_SKIP_BELOW_SCORE > 0
+                and score is not None
+                and score < UPSTREAM_SKIP_BELOW_SCORE
+                and self._samples(config) >= UPSTREAM_SKIP_MIN_SAMPLES
+                and random.random() >= UPSTREAM_SKIP_EXPLORE_RATE
+            ):
+                logger.debug("跳过低评分上游 %s (score=%s)", config.get("name"), score)
+                continue
+            planned.append(config)
+
+        planned.sort(key=lambda c: (
+            -(scores[id(c)] if scores[id(c)] is not None else default_score),
+            c.get("response_time_ms", 9999),
+        ))
+        return planned
+
+    def low_scoring(self, configs: List[Dict[str, Any]]) -> Set[int]:
+        """
+        评分明显低于同批上游（低于已知评分中位数的 UPSTREAM_LOW_SCORE_RATIO 倍）且样本充足的上游 ID。
+        单次搜索中这些上游最多同时占用 UPSTREAM_LOW_SCORE_SLOTS 个并发槽位，其余槽位留给高分上游。
+        """
+        if UPSTREAM_LOW_SCORE_RATIO <= 0 or UPSTREAM_LOW_SCORE_SLOTS <= 0:
+            return set()
+        scored = [(config, self.score(config)) for config in configs]
+        known = [score for _, score in scored if score is not None]
+        if len(known) < 2:
+            return set()
+        threshold = statistics.median(known) * UPSTREAM_LOW_SCORE_RATIO
+        return {
+            config["id"] for config, score in scored
+            if score is not None and score < threshold and self._samples(config) >= UPSTREAM_SKIP_MIN_SAMPLES
+        }
+
+    def _samples(self, config: Dict[str, Any]) -> int:
+        with self._lock:
+            return self._get(config).samples
+
+    def maybe_flush(self, force: bool = False) -> None:
+        """距上次写回超过 UPSTREAM_SCORE_FLUSH_SECONDS 时批量写回有变化的上游"""
+        now = time.monotonic()
+        with self._lock:
+            if not self._dirty or (not force and now - self._last_flush < UPSTREAM_SCORE_FLUSH_SECONDS):
+                return
+            rows = []
+            for api_id in self._dirty:
+                stats = self._stats[api_id]
+                rows.append((
+                    api_id, round(stats.avg_results, 3), round(stats.error_rate, 4), int(stats.avg_latency_ms),
+                    None if stats.unique_ratio is None else round(stats.unique_ratio, 4), stats.score, stats.samples,
+                ))
+            self._dirty.clear()
+            self._last_flush = now
+
+        from src.db.api_config_dao import batch_update_scores
+        batch_update_scores(rows)
+
+
+SCOREBOARD = UpstreamScoreboard()
@@ -57,6 +57,10 @@
                 request: request,
                 response: responseMapping,
                 is_enabled: document.getElementById(`${prefix}IsEnabled`).value === 'true',
+                max_body_kb: document.getElementById(`${prefix}MaxBodyKb`).value || null,
+                max_items: document.getElementById(`${prefix}MaxItems`).value || null,
+                rate_limit_per_sec: document.getElementById(`${prefix}RateLimitPerSec`).value || null,
+                rate_limit_burst: document.getElementById(`${prefix}RateLimitBurst`).value || null,
                 id: isNewApi ? 0 : document.getElementById('editApiId').value,
                 status: null,
                 response_time_ms: null
@@ -131,6 +135,12 @@
                 const statusClass = api.status === true ? 'status-available' : 'status-unavailable';
                 const statusText = api.status === true ? '正常' : '异常';
                 const timeDisplay = api.response_time_ms !== null && api.response_time_ms > 0 ? `${api.response_time_ms}` : '--';
+                const scoreDisplay = api.score !== null && api.score !== undefined ? api.score.toFixed(2) : '--';
+                const scoreTitle = api.score_samples > 0
+                    ? `样本 ${api.score_samples} 次 | 平均保留 ${api.avg_results.toFixed(1)} 条 | 失败率 ${(api.error_rate * 100).toFixed(0)}% | `
+                      + `搜索耗时 ${api.avg_latency_ms}ms | 独有链接 ${api.unique_ratio !== null ? (api.unique_ratio * 100).toFixed(0) + '%' : '--'}`
+                      + (api.success_rate !== null ? ` | 健康检查成功率 ${(api.success_rate * 100).toFixed(0)}%` : '')
+                    : '暂无搜索样本';
 
                 let toggleBtnClass;
                 let toggleBtnText;
@@ -169,6 +179,7 @@
                     <td style="max-width: 400px; overflow: hidden; text-overflow: ellipsis; white-space: normal; word-wrap: break-word;">${api.url}</td>
                     <td>${api.method.toUpperCase()}</td>
                     <td>${timeDisplay}</td>
+                    <td title="${scoreTitle}">${scoreDisplay}</td>
                     <td>${requestDisplay}</td>
                     <td>${responseDisplay}</td>
                     <td class="action-buttons d-flex justify-content-center align-items-center">
@@ -371,6 +382,10 @@
             document.getElementById('editApiRequest').value = api.request;
             document.getElementById('editApiResponse').value = api.response;
             document.getElementById('editApiIsEnabled').value = api.is_enabled ? 'true' : 'false';
+            document.getElementById('editApiMaxBodyKb').value = api.max_body_kb || '';
+            document.getElementById('editApiMaxItems').value = api.max_items || '';
+            document.getElementById('editApiRateLimitPerSec').value = api.rate_limit_per_sec || '';
+            document.getElementById('editApiRateLimitBurst').value = api.rate_limit_burst || '';
 
             new bootstrap.Modal(document.getElementById('editApiModal')).show();
         }
@@ -494,28 +509,49 @@
         async function testAllApis() {
             const testAllButton = document.getElementById('testAllButton');
             if (await showConfirm('该操作可能会耗时较久，您确定要测试所有 API 吗？（包括已禁止的）')) {
+                const originalHtml = testAllButton.innerHTML;
                 testAllButton.disabled = true;
 
-                try {
-                    const response = await fetch('/api/test-all');
-                    if (!response.ok) {
-                        const errorText = await response.text();
-                        try {
-                            const errorJson = JSON.parse(errorText);
-                            throw new Error(errorJson.message || `HTTP error! status: ${response.status}`);
-                        } catch {
-                            throw new Error(`HTTP error! status: ${response.status}`);
+                // 通过 SSE 逐个接收测试结果，实时刷新表格中的状态和耗时
+                const eventSource = new EventSource('/api/test-all/stream');
+                const finish = () => {
+                    eventSource.close();
+                    testAllButton.disabled = false;
+                    testAllButton.innerHTML = originalHtml;
+                };
+
+                eventSource.onmessage = (event) => {
+                    const data = JSON.parse(event.data);
+                    if (data.type === 'start') {
+                        testAllButton.innerHTML = `<i class="fas fa-spinner fa-spin"></i> 测试中 0/${data.total}`;
+                    } else if (data.type === 'result') {
+                        testAllButton.innerHTML = `<i class="fas fa-spinner fa-spin"></i> 测试中 ${data.done}/${data.total}`;
+                        const api = apiConfigs.find(item => item.id === data.id);
+                        if (api) {
+                            api.status = data.status;
+                            api.response_time_ms = data.response_time_ms;
+                            if (!data.status) {
+                                api.is_enabled = false;
+                            }
+                            renderTable();
+                        }
+                    } else if (data.type === 'end') {
+                        finish();
+                        if (data.saved) {
+                            showToast(`测试完成：正常 ${data.passed} 个，异常 ${data.failed} 个 (异常的已自动禁止)`, 'info');
+                        } else {
+                            showToast('测试完成，但写回测试结果失败，请查看日志', 'danger');
                         }
+                        loadApiConfigs();
                     }
-                    const data = await response.json();
-                    showToast(data.message, 'info');
+                };
+
+                eventSource.onerror = () => {
+                    console.error('一键测试所有 API 时连接中断');
+                    showToast('一键测试所有 API 失败: 连接中断', 'danger');
+                    finish();
                     loadApiConfigs();
-                } catch (error) {
-                    console.error('一键测试所有 API 时出错:', error);
-                    showToast(`一键测试所有 API 失败: ${error.message}`, 'danger');
-                } finally {
-                    testAllButton.disabled = false;
-                }
+                };
             }
         }
 
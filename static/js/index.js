@@ -192,6 +192,9 @@ function performSearch() {
                 eventSource.close();
                 finalizeSearch();
             } else if (data.results && data.results.length > 0) {
+                if (data.stale) {
+                    statusBar.innerHTML = '<span class="spinner-border spinner-border-sm me-2" role="status"></span> 已显示缓存结果，正在刷新最新资源...';
+                }
                 const currentLength = allResults.length;
                 allResults.push(...data.results);
                 allResults = filterUnique2ndDomainFront(allResults);
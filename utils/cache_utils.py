@@ -0,0 +1,273 @@
+import logging
+import os
+import socket
+import sqlite3
+import threading
+import time
+from typing import Optional
+from urllib.parse import urlparse
+
+from configs.app_config import CACHE_BACKEND, CACHE_MAX_MB, CACHE_REDIS_URL, CACHE_SQLITE_PATH
+
+logger = logging.getLogger(__name__)
+
+
+class CacheBackend:
+    """
+    字节级键值缓存接口。所有实现都"失败即未命中"：后端异常只记录日志，不影响调用方。
+    """
+
+    name = "none"
+
+    def get(self, key: str) -> Optional[bytes]:
+        return None
+
+    def set(self, key: str, value: bytes, ttl: float) -> None:
+        pass
+
+    def delete(self, key: str) -> None:
+        pass
+
+    def add(self, key: str, value: bytes, ttl: float) -> Optional[bool]:
+        """
+        仅当键不存在（或已过期）时写入，用作跨 worker 的短期租约。
+        返回 True 写入成功，False 键已存在（租约被他人持有），None 缓存后端出错（调用方应放行）。
+        """
+        return True
+
+
+class SqliteCache(CacheBackend):
+    """
+    本地 SQLite 文件缓存，同一台机器上的所有 worker 共享；读取走 mmap。
+    超过 max_bytes 时按最近访问时间淘汰（LRU），过期条目在淘汰时顺带清理。
+    """
+
+    name = "sqlite"
+    _EVICT_EVERY = 50          # 每写入多少次检查一次总大小
+    _TOUCH_INTERVAL = 30.0     # 访问时间的更新粒度（秒），避免每次读取都写库
+
+    def __init__(self, path: str = CACHE_SQLITE_PATH, max_bytes: int = CACHE_MAX_MB * 1024 * 1024) -> None:
+        self.path = path
+        self.max_bytes = max_bytes
+        self._local = threading.local()
+        self._writes = 0
+        self._writes_lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = self._connection()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS cache ("
+            "key TEXT PRIMARY KEY, value BLOB NOT NULL, size INTEGER NOT NULL, "
+            "expires_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_cache_accessed ON cache (accessed_at)")
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(f"PRAGMA mmap_size={max(self.max_bytes * 2, 64 * 1024 * 1024)}")
+        return conn
+
+    def get(self, key: str) -> Optional[bytes]:
+        try:
+            conn = self._connection()
+            now = time.time()
+            row = conn.execute(
+                "SELECT value, accessed_at FROM cache WHERE key = ? AND expires_at > ?", (key, now)
+            ).fetchone()
+            if row is None:
+                return None
+            if now - row[1] > self._TOUCH_INTERVAL:
+                conn.execute("UPDATE cache SET accessed_at = ? WHERE key = ?", (now, key))
+            return bytes(row[0])
+        except sqlite3.Error as e:
+            logger.error(f"读取缓存失败: {e}")
+            return None
+
+    def set(self, key: str, value: bytes, ttl: float) -> None:
+        now = time.time()
+        try:
+            self._connection().execute(
+                "INSERT INTO cache (key, value, size, expires_at, accessed_at) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET value = excluded.value, size = excluded.size, "
+                "expires_at = excluded.expires_at, accessed_at = excluded.accessed_at",
+                (key, sqlite3.Binary(value), len(value) + len(key), now + ttl, now),
+            )
+        except sqlite3.Error as e:
+            logger.error(f"写入缓存失败: {e}")
+            return
+
+        with self._writes_lock:
+            self._writes += 1
+            check = self._writes % self._EVICT_EVERY == 0
+        if check:
+            self.evict()
+
+    def delete(self, key: str) -> None:
+        try:
+            self._connection().execute("DELETE FROM cache WHERE key = ?", (key,))
+        except sqlite3.Error as e:
+            logger.error(f"删除缓存失败: {e}")
+
+    def add(self, key: str, value: bytes, ttl: float) -> Optional[bool]:
+        conn = self._connection()
+        now = time.time()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.execute("DELETE FROM cache WHERE key = ? AND expires_at <= ?", (key, now))
+                added = conn.execute(
+                    "INSERT OR IGNORE INTO cache (key, value, size, expires_at, accessed_at) VALUES (?, ?, ?, ?, ?)",
+                    (key, sqlite3.Binary(value), len(value) + len(key), now + ttl, now),
+                ).rowcount == 1
+                conn.execute("COMMIT")
+                return added
+            except sqlite3.Error:
+                conn.execute("ROLLBACK")
+                raise
+        except sqlite3.Error as e:
+            logger.error(f"写入缓存租约失败: {e}")
+            return None
+
+    def evict(self) -> int:
+        """清理过期条目；总大小超过上限时按 LRU 淘汰到上限的 90%。返回删除条数"""
+        conn = self._connection()
+        try:
+            removed = conn.execute("DELETE FROM cache WHERE expires_at <= ?", (time.time(),)).rowcount
+            total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM cache").fetchone()[0]
+            target = self.max_bytes * 0.9
+            while total > self.max_bytes:
+                rows = conn.execute("SELECT key, size FROM cache ORDER BY accessed_at LIMIT 200").fetchall()
+                if not rows:
+                    break
+                victims = []
+                for key, size in rows:
+                    victims.append((key,))
+                    total -= size
+                    if total <= target:
+                        break
+                conn.executemany("DELETE FROM cache WHERE key = ?", victims)
+                removed += len(victims)
+            return removed
+        except sqlite3.Error as e:
+            logger.error(f"缓存淘汰失败: {e}")
+            return 0
+
+
+class RedisCache(CacheBackend):
+    """
+    基于 RESP 协议的最小 Redis 客户端（GET / SET PX / DEL），兼容 Redis、KeyDB、Valkey 等。
+    每个线程一条连接，出错时断开重连；容量淘汰交给服务端的 maxmemory-policy（建议 allkeys-lru）。
+    """
+
+    name = "redis"
+
+    def __init__(self, url: str = CACHE_REDIS_URL, timeout: float = 0.5) -> None:
+        parsed = urlparse(url)
+        self.host = parsed.hostname or "127.0.0.1"
+        self.port = parsed.port or 6379
+        self.password = parsed.password
+        self.db = int(parsed.path.lstrip("/") or 0)
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def _connect(self):
+        sock = socket.create_connection((self.host, self.port), timeout=self.timeout)
+        conn = (sock, sock.makefile("rb"))
+        if self.password:
+            self._call(conn, b"AUTH", self.password.encode())
+        if self.db:
+            self._call(conn, b"SELECT", str(self.db).encode())
+        return conn
+
+    @staticmethod
+    def _call(conn, *args: bytes):
+        sock, reader = conn
+        parts = [b"*%d\r\n" % len(args)]
+        for arg in args:
+            parts.append(b"$%d\r\n%s\r\n" % (len(arg), arg))
+        sock.sendall(b"".join(parts))
+
+        line = reader.readline()
+        if not line:
+            raise ConnectionError("连接已关闭")
+        prefix, payload = line[:1], line[1:-2]
+        if prefix == b"$":
+            length = int(payload)
+            if length < 0:
+                return None
+            data = reader.read(length + 2)
+            return data[:-2]
+        if prefix in (b"+", b":"):
+            return payload
+        if prefix == b"-":
+            raise RuntimeError(payload.decode(errors="replace"))
+        raise RuntimeError(f"不支持的响应类型: {line!r}")
+
+    def _execute(self, *args: bytes):
+        conn = getattr(self._local, "conn", None)
+        for attempt in (1, 2):
+            try:
+                if conn is None:
+                    conn = self._local.conn = self._connect()
+                return self._call(conn, *args)
+            except (OSError, ConnectionError) as e:
+                self._close()
+                conn = None
+                if attempt == 2:
+                    raise e
+
+    def _close(self) -> None:
+        conn = getattr(self._local, "conn", None)
+        self._local.conn = None
+        if conn is not None:
+            try:
+                conn[1].close()
+                conn[0].close()
+            except OSError:
+                pass
+
+    def get(self, key: str) -> Optional[bytes]:
+        try:
+            return self._execute(b"GET", key.encode())
+        except Exception as e:
+            logger.error(f"读取 Redis 缓存失败: {e}")
+            return None
+
+    def set(self, key: str, value: bytes, ttl: float) -> None:
+        try:
+            self._execute(b"SET", key.encode(), value, b"PX", str(max(1, int(ttl * 1000))).encode())
+        except Exception as e:
+            logger.error(f"写入 Redis 缓存失败: {e}")
+
+    def delete(self, key: str) -> None:
+        try:
+            self._execute(b"DEL", key.encode())
+        except Exception as e:
+            logger.error(f"删除 Redis 缓存失败: {e}")
+
+    def add(self, key: str, value: bytes, ttl: float) -> Optional[bool]:
+        try:
+            reply = self._execute(b"SET", key.encode(), value, b"NX", b"PX", str(max(1, int(ttl * 1000))).encode())
+            return reply is not None
+        except Exception as e:
+            logger.error(f"写入 Redis 缓存租约失败: {e}")
+            return None
+
+
+def create_cache(backend: str = CACHE_BACKEND) -> CacheBackend:
+    if backend == "sqlite":
+        try:
+            return SqliteCache()
+        except sqlite3.Error as e:
+            logger.error(f"初始化 SQLite 缓存失败，缓存已关闭: {e}")
+    elif backend == "redis":
+        return RedisCache()
+    return CacheBackend()
+
+
+CACHE = create_cache()
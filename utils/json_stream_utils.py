@@ -0,0 +1,192 @@
+import re
+from typing import Any, List, Optional
+
+import jmespath
+
+from utils import json_utils
+
+# 可流式解析的规则：<key.key...>[*]<剩余表达式>，如 data[*].[name, url]、data.list[*].[a, b]、[*].[name, url]
+_STREAMABLE_RULE = re.compile(r"^\s*((?:[A-Za-z_]\w*)(?:\.[A-Za-z_]\w*)*)?\[\*\]((?:\.[^|]*)?)\s*$")
+# 完整的 JSON 字符串 / 未闭合字符串的起始引号 / 括号
+_SCAN_TOKEN = re.compile(r'"(?:[^"\\]|\\.)*"|"|[\[\]{}]')
+_STRING = re.compile(r'"(?:[^"\\]|\\.)*"')
+_WHITESPACE = " \t\r\n"
+_SCALAR_END = re.compile(r"[,\]}\s]")
+
+
+class JsonArrayStreamer:
+    """
+    增量解析 JSON 中某个路径下的数组，逐个元素应用 JMESPath 子表达式。
+    只支持 compile_rule 能识别的简单规则；达到 max_items 后 done 置为 True，调用方应停止读取。
+    """
+
+    def __init__(self, path_keys: List[str], item_expr, max_items: Optional[int] = None) -> None:
+        self.path_keys = path_keys
+        self.item_expr = item_expr
+        self.max_items = max_items
+        self.items: List[Any] = []
+        self.done = False
+
+        self._buf = ""
+        self._pos = 0
+        self._matched = 0            # 已经进入的路径层数
+        self._in_array = False
+        self._started = False        # 是否已越过根节点的 { 或 [
+        self._skip_scan = None       # 跳过大值时的续扫进度 (扫描位置, 深度)
+
+    def feed(self, text: str) -> None:
+        """送入一段已解码的文本"""
+        if self.done:
+            return
+        self._buf += text
+        while not self.done and self._step():
+            pass
+        # 丢弃已消费的部分，控制内存占用
+        if self._pos:
+            self._buf = self._buf[self._pos:]
+            if self._skip_scan is not None:
+                scan_pos, depth = self._skip_scan
+                self._skip_scan = (scan_pos - self._pos, depth)
+            self._pos = 0
+
+    def _skip_ws(self) -> None:
+        buf, pos = self._buf, self._pos
+        while pos < len(buf) and buf[pos] in _WHITESPACE:
+            pos += 1
+        self._pos = pos
+
+    def _step(self) -> bool:
+        """推进一步，返回 False 表示需要更多数据"""
+        self._skip_ws()
+        if self._pos >= len(self._buf):
+            return False
+
+        if not self._started:
+            expected = "{" if self.path_keys else "["
+            if self._buf[self._pos] != expected:
+                # 根节点类型与规则不符，按 JMESPath 语义结果为空
+                self.done = True
+                return False
+            self._pos += 1
+            self._started = True
+            self._in_array = not self.path_keys
+            return True
+
+        if self._in_array:
+            return self._step_array()
+        return self._step_object()
+
+    def _step_object(self) -> bool:
+        ch = self._buf[self._pos]
+        if ch == ",":
+            self._pos += 1
+            return True
+        if ch == "}":
+            # 当前对象中没有目标键
+            self.done = True
+            return False
+
+        key_match = _STRING.match(self._buf, self._pos)
+        if not key_match:
+            return False
+        colon = key_match.end()
+        while colon < len(self._buf) and self._buf[colon] in _WHITESPACE:
+            colon += 1
+        if colon >= len(self._buf):
+            return False
+        value_start = colon + 1
+        while value_start < len(self._buf) and self._buf[value_start] in _WHITESPACE:
+            value_start += 1
+        if value_start >= len(self._buf):
+            return False
+
+        key = json_utils.loads(key_match.group(0))
+        if key == self.path_keys[self._matched]:
+            opener = self._buf[value_start]
+            is_last = self._matched == len(self.path_keys) - 1
+            if (is_last and opener != "[") or (not is_last and opener != "{"):
+                self.done = True
+                return False
+            self._pos = value_start + 1
+            self._matched += 1
+            self._in_array = is_last
+            return True
+
+        end = self._value_end(value_start)
+        if end is None:
+            return False
+        self._pos = end
+        return True
+
+    def _step_array(self) -> bool:
+        ch = self._buf[self._pos]
+        if ch == ",":
+            self._pos += 1
+            return True
+        if ch == "]":
+            self.done = True
+            return False
+
+        end = self._value_end(self._pos)
+        if end is None:
+            return False
+        element = json_utils.loads(self._buf[self._pos:end])
+        self._pos = end
+
+        value = self.item_expr.search(element)
+        if value is not None:
+            self.items.append(value)
+            if self.max_items and len(self.items) >= self.max_items:
+                self.done = True
+        return True
+
+    def _value_end(self, start: int) -> Optional[int]:
+        """返回从 start 开始的完整 JSON 值的结束位置，数据不完整时返回 None"""
+        buf = self._buf
+        opener = buf[start]
+
+        if opener == '"':
+            match = _STRING.match(buf, start)
+            return match.end() if match else None
+
+        if opener not in "[{":
+            match = _SCALAR_END.search(buf, start)
+            return match.start() if match else None
+
+        scan_pos, depth = self._skip_scan if self._skip_scan is not None else (start, 0)
+        for token in _SCAN_TOKEN.finditer(buf, scan_pos):
+            text = token.group(0)
+            if text == '"':
+                # 字符串尚未接收完整，下次从这里继续
+                self._skip_scan = (token.start(), depth)
+                return None
+            if text in "[{":
+                depth += 1
+            elif text in "]}":
+                depth -= 1
+                if depth == 0:
+                    self._skip_scan = None
+                    return token.end()
+        self._skip_scan = (len(buf), depth)
+        return None
+
+
+def compile_rule(rule: str, max_items: Optional[int] = None) -> Optional[JsonArrayStreamer]:
+    """
+    将 JMESPath 规则转换为流式解析器。
+    规则形如 data[*].[name, url] 时返回 JsonArrayStreamer，否则返回 None（调用方应退回整体解析）。
+    """
+    if not rule:
+        return None
+    match = _STREAMABLE_RULE.match(rule)
+    if not match:
+        return None
+
+    path, rest = match.group(1), match.group(2)
+    try:
+        item_expr = jmespath.compile("@" + rest) if rest else jmespath.compile("@")
+    except jmespath.exceptions.JMESPathError:
+        return None
+
+    path_keys = path.split(".") if path else []
+    return JsonArrayStreamer(path_keys, item_expr, max_items)
@@ -0,0 +1,90 @@
+import json
+import logging
+from typing import Any, Union
+
+from flask.json.provider import DefaultJSONProvider
+
+from configs.app_config import JSON_CODEC
+
+try:
+    import orjson
+except ImportError:  # orjson 为可选依赖，未安装时退回标准库 json
+    orjson = None
+
+logger = logging.getLogger(__name__)
+
+# JSON_CODEC: "auto"（默认，有 orjson 则用）、"orjson"、"json"
+if JSON_CODEC == "orjson" and orjson is None:
+    logger.warning("JSON_CODEC=orjson 但未安装 orjson，退回标准库 json")
+USE_ORJSON = orjson is not None and JSON_CODEC != "json"
+
+
+def _default(obj: Any) -> Any:
+    """orjson 不直接支持 tuple 子类（如 SearchResult），统一转为普通 tuple"""
+    if isinstance(obj, tuple):
+        return tuple(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def get_backend() -> str:
+    """返回当前使用的 JSON 编解码后端名称"""
+    return "orjson" if USE_ORJSON else "json"
+
+
+def dumps_bytes(obj: Any) -> bytes:
+    """序列化为紧凑的 UTF-8 字节串（SSE 事件、缓存等热路径使用）"""
+    if USE_ORJSON:
+        return orjson.dumps(obj, default=_default)
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def dumps(obj: Any) -> str:
+    """序列化为紧凑的 JSON 字符串"""
+    if USE_ORJSON:
+        return orjson.dumps(obj, default=_default).decode("utf-8")
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":"))
+
+
+def loads(data: Union[str, bytes, bytearray]) -> Any:
+    """
+    反序列化 JSON。
+    两种后端解析失败时均抛出 json.JSONDecodeError（orjson.JSONDecodeError 是其子类）。
+    """
+    if USE_ORJSON:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """
+    Flask JSON Provider：jsonify / request.get_json 走同一个编解码器。
+    日期、Decimal 等类型仍交给 Flask 默认的 default 处理，保证输出格式不变。
+    """
+
+    def dumps(self, obj: Any, **kwargs: Any) -> str:
+        if not USE_ORJSON:
+            return super().dumps(obj, **kwargs)
+
+        option = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+        if kwargs.get("sort_keys", self.sort_keys):
+            option |= orjson.OPT_SORT_KEYS
+        if kwargs.get("indent"):
+            option |= orjson.OPT_INDENT_2
+
+        default = kwargs.get("default", self.default)
+
+        def _provider_default(o: Any) -> Any:
+            if isinstance(o, tuple):
+                return tuple(o)
+            return default(o)
+
+        try:
+            return orjson.dumps(obj, default=_provider_default, option=option).decode("utf-8")
+        except orjson.JSONEncodeError:
+            # 超出 64 位的整数等 orjson 不支持的情况，退回标准库
+            return super().dumps(obj, **kwargs)
+
+    def loads(self, s: Union[str, bytes], **kwargs: Any) -> Any:
+        if not USE_ORJSON or kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
@@ -0,0 +1,42 @@
+import logging
+import os
+from typing import Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows 下没有 fcntl，只能按单进程部署
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+
+class LeaderLock:
+    """
+    多个 gunicorn worker 共用一个锁文件，拿到排他锁（flock）的进程负责执行后台任务。
+    锁随进程存活一直持有；该进程退出后，其他 worker 在下一次 acquire 时自动接管。
+    """
+
+    def __init__(self, path: str, task_name: str) -> None:
+        self.path = path
+        self.task_name = task_name
+        self._fd: Optional[int] = None
+
+    def acquire(self) -> bool:
+        if self._fd is not None or fcntl is None:
+            return True
+        try:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        except OSError as e:
+            logger.error(f"打开{self.task_name}锁文件失败: {e}")
+            return False
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            os.close(fd)
+            return False
+        os.ftruncate(fd, 0)
+        os.write(fd, str(os.getpid()).encode())
+        self._fd = fd
+        logger.info(f"进程 {os.getpid()} 获得{self.task_name}锁，负责执行后台{self.task_name}")
+        return True
@@ -0,0 +1,61 @@
+import logging
+import random
+import threading
+import time
+from typing import Dict, Sequence
+
+from utils.metrics_utils import LOG_RECORDS_SUPPRESSED
+
+
+class TitleSample:
+    """
+    日志参数：结果列表前 count 条的标题，只在日志真正输出（格式化）时才拼接，
+    被级别、采样或限流过滤掉的记录不产生任何开销。
+    """
+
+    __slots__ = ("results", "count")
+
+    def __init__(self, results: Sequence, count: int = 2) -> None:
+        self.results = results
+        self.count = count
+
+    def __str__(self) -> str:
+        return str([res.title for res in self.results[:self.count]])
+
+
+class SampledLogFilter(logging.Filter):
+    """
+    对带有 sample_key 的 INFO 及以下日志做采样和限流：
+        logger.info("API '%s' 搜索到 %d 条资源", name, n, extra={"sample_key": name})
+    sample_rate 为保留概率；max_per_minute 为每个 key 每分钟最多输出条数（0 表示不限）。
+    WARNING 及以上、以及没有 sample_key 的日志总是放行。
+    """
+
+    def __init__(self, sample_rate: float = 1.0, max_per_minute: int = 0) -> None:
+        super().__init__()
+        self.sample_rate = sample_rate
+        self.max_per_minute = max_per_minute
+        self._windows: Dict[str, list] = {}  # key -> [窗口起始分钟, 已输出条数]
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        key = getattr(record, "sample_key", None)
+        if key is None or record.levelno > logging.INFO:
+            return True
+
+        if self.sample_rate < 1.0 and random.random() >= self.sample_rate:
+            LOG_RECORDS_SUPPRESSED.labels("sampled").inc()
+            return False
+
+        if self.max_per_minute > 0:
+            minute = int(time.monotonic() // 60)
+            with self._lock:
+                window = self._windows.get(key)
+                if window is None or window[0] != minute:
+                    window = self._windows[key] = [minute, 0]
+                window[1] += 1
+                allowed = window[1] <= self.max_per_minute
+            if not allowed:
+                LOG_RECORDS_SUPPRESSED.labels("rate_limited").inc()
+                return False
+        return True
@@ -0,0 +1,240 @@
+import abc
+import bisect
+import math
+import threading
+from typing import Dict, List, Sequence, Tuple
+
+# 进程内指标，/metrics 以 Prometheus 文本格式输出。
+# 每个标签组合一个子对象、一把锁，写入只在该锁内做几次加法；gunicorn 多进程时各进程分别统计。
+
+DEFAULT_LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+RESULT_COUNT_BUCKETS = (0, 1, 5, 10, 20, 50, 100, 200, 500)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Metric(abc.ABC):
+    metric_type = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], object] = {}
+        self._children_lock = threading.Lock()
+        if not self.labelnames:
+            self._default = self._new_child()
+
+    @abc.abstractmethod
+    def _new_child(self):
+        """创建一个标签组合对应的子指标对象"""
+
+    def labels(self, *values: str, **kwargs: str):
+        """按标签取子指标，相同标签组合复用同一个对象（可在模块级缓存以省去查找）"""
+        if kwargs:
+            values = tuple(kwargs[name] for name in self.labelnames)
+        key = tuple(str(v) for v in values)
+        child = self._children.get(key)
+        if child is None:
+            with self._children_lock:
+                child = self._children.get(key)
+                if child is None:
+                    child = self._new_child()
+                    self._children[key] = child
+        return child
+
+    def _items(self) -> List[Tuple[Tuple[str, ...], object]]:
+        if not self.labelnames:
+            return [((), self._default)]
+        with self._children_lock:
+            return list(self._children.items())
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.metric_type}"]
+        for values, child in self._items():
+            lines.extend(self._render_child(values, child))
+        return lines
+
+    def _render_child(self, values, child) -> List[str]:
+        return [f"{self.name}{_format_labels(self.labelnames, values)} {_format_value(child.get())}"]
+
+
+class _ValueChild:
+    __slots__ = ("_value", "_lock")
+
+    def __init__(self) -> None:
+        self._value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1) -> None:
+        with self._lock:
+            self._value += amount
+
+    def dec(self, amount: float = 1) -> None:
+        with self._lock:
+            self._value -= amount
+
+    def set(self, value: float) -> None:
+        self._value = value
+
+    def get(self) -> float:
+        return self._value
+
+
+class Counter(_Metric):
+    metric_type = "counter"
+
+    def _new_child(self):
+        return _ValueChild()
+
+    def inc(self, amount: float = 1) -> None:
+        self._default.inc(amount)
+
+
+class Gauge(_Metric):
+    metric_type = "gauge"
+
+    def _new_child(self):
+        return _ValueChild()
+
+    def inc(self, amount: float = 1) -> None:
+        self._default.inc(amount)
+
+    def dec(self, amount: float = 1) -> None:
+        self._default.dec(amount)
+
+    def set(self, value: float) -> None:
+        self._default.set(value)
+
+
+class _HistogramChild:
+    __slots__ = ("_upper_bounds", "_counts", "_sum", "_lock")
+
+    def __init__(self, upper_bounds: Tuple[float, ...]) -> None:
+        self._upper_bounds = upper_bounds
+        self._counts = [0] * (len(upper_bounds) + 1)
+        self._sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        index = bisect.bisect_left(self._upper_bounds, value)
+        with self._lock:
+            self._counts[index] += 1
+            self._sum += value
+
+    def snapshot(self) -> Tuple[List[int], float]:
+        with self._lock:
+            return list(self._counts), self._sum
+
+
+class Histogram(_Metric):
+    metric_type = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_LATENCY_BUCKETS) -> None:
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames)
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+
+    def observe(self, value: float) -> None:
+        self._default.observe(value)
+
+    def _render_child(self, values, child) -> List[str]:
+        counts, total = child.snapshot()
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets + (math.inf,), counts):
+            cumulative += count
+            le = f'le="{_format_value(bound)}"'
+            lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, values, le)} {cumulative}")
+        labels = _format_labels(self.labelnames, values)
+        lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+        lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class Registry:
+    def __init__(self) -> None:
+        self._metrics: List[_Metric] = []
+
+    def register(self, metric: _Metric) -> _Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+
+def render_metrics() -> str:
+    """以 Prometheus 文本格式输出全部指标"""
+    return REGISTRY.render()
+
+
+# --- 应用指标 ---
+
+HTTP_REQUEST_SECONDS = REGISTRY.register(Histogram(
+    "search_http_request_duration_seconds", "HTTP 请求耗时（按路由）", ("route", "method", "status")))
+UPSTREAM_REQUEST_SECONDS = REGISTRY.register(Histogram(
+    "search_upstream_request_duration_seconds", "上游搜索 API 请求耗时（按 api_config 名称）", ("api",)))
+UPSTREAM_ERRORS = REGISTRY.register(Counter(
+    "search_upstream_errors_total", "上游搜索 API 请求失败次数", ("api",)))
+UPSTREAM_RATE_LIMITED = REGISTRY.register(Counter(
+    "search_upstream_rate_limited_total", "上游请求被限流的次数（waited 排队后放行 / skipped 跳过 / background_skipped 后台任务额度不足）", ("api", "outcome")))
+UPSTREAM_RESULTS = REGISTRY.register(Histogram(
+    "search_upstream_results", "上游搜索 API 单次保留的结果条数", ("api",), buckets=RESULT_COUNT_BUCKETS))
+DAO_QUERY_SECONDS = REGISTRY.register(Histogram(
+    "search_dao_query_duration_seconds", "DAO 函数耗时（含取连接）", ("function",)))
+DB_CONNECTIONS = REGISTRY.register(Counter(
+    "search_db_connections_total", "数据库连接建立次数", ("result",)))
+CACHE_REQUESTS = REGISTRY.register(Counter(
+    "search_cache_requests_total", "缓存访问次数，命中率 = hit / (hit + miss)", ("cache", "result")))
+ACTIVE_SSE_STREAMS = REGISTRY.register(Gauge(
+    "search_active_sse_streams", "当前活跃的 SSE 搜索流数量"))
+ANALYTICS_EVENTS = REGISTRY.register(Counter(
+    "search_analytics_events_total", "搜索分析事件（written 已写库 / dropped_full 缓冲区满丢弃 / dropped_error 写库失败丢弃）", ("result",)))
+ANALYTICS_BUFFERED = REGISTRY.register(Gauge(
+    "search_analytics_buffered", "缓冲区中等待写库的搜索分析事件数"))
+JOBS = REGISTRY.register(Counter(
+    "search_jobs_total", "后台任务（submitted 提交 / deduplicated 幂等键重复 / retried 重试 / succeeded 成功 / failed 失败 / lost 租约失效丢弃结果）", ("kind", "result")))
+JOB_SECONDS = REGISTRY.register(Histogram(
+    "search_job_duration_seconds", "后台任务单次执行耗时", ("kind",)))
+NETDISK_ACCOUNT_OPS = REGISTRY.register(Counter(
+    "search_netdisk_account_operations_total", "各网盘账号处理的操作数（ok / error / rate_limited / expired）", ("cloud", "account", "result")))
+NETDISK_ACCOUNT_IN_FLIGHT = REGISTRY.register(Gauge(
+    "search_netdisk_account_in_flight", "各网盘账号进行中的操作数", ("cloud", "account")))
+LINK_CHECKS = REGISTRY.register(Counter(
+    "search_link_checks_total", "分享链接有效性检查（alive 有效 / dead 失效 / unknown 无法判断 / throttled 限流跳过）", ("netdisk", "result")))
+RESHARE_ROWS = REGISTRY.register(Counter(
+    "search_reshare_rows_total", "后台重新分享处理的资源（replaced 已替换 / failed 失败 / skipped 无需转存 / duplicate 链接已被其他资源使用 / throttled 限流跳过）", ("netdisk", "result")))
+LOG_RECORDS_SUPPRESSED = REGISTRY.register(Counter(
+    "search_log_records_suppressed_total", "被采样或限流丢弃的日志条数", ("reason",)))
+
+
+def record_cache_access(cache: str, hit: bool) -> None:
+    """记录一次缓存访问，供各缓存实现调用"""
+    CACHE_REQUESTS.labels(cache, "hit" if hit else "miss").inc()
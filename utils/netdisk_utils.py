@@ -31,3 +31,18 @@ def match_netdisk_link(link: str) -> str:
         if re.search(pattern, link_lower, re.IGNORECASE):
             return name
     return "其他"
+
+
+def canonical_share_key(link: str) -> str:
+    """
+    分享链接的规范化键（"网盘:分享 ID"），同一分享的不同写法（带或不带提取码、http/https、旧版 surl 参数）得到相同的键。
+    目前只识别支持转存的夸克、百度网盘，其他链接返回空字符串。
+    """
+    netdisk = match_netdisk_link(link)
+    if netdisk == "夸克网盘":
+        match = re.search(r'/s/(\w+)', link)
+        return f"quark:{match.group(1)}" if match else ""
+    if netdisk == "百度网盘":
+        match = re.search(r'/s/1([\w-]+)', link) or re.search(r'surl=([\w-]+)', link)
+        return f"baidu:{match.group(1)}" if match else ""
+    return ""
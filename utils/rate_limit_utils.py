@@ -0,0 +1,138 @@
+import abc
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict
+
+from configs.app_config import RATE_LIMIT_BACKEND, RATE_LIMIT_SQLITE_PATH
+
+logger = logging.getLogger(__name__)
+
+
+class TokenBucket:
+    """线程安全的令牌桶：容量 burst，每秒补充 rate 个令牌"""
+
+    __slots__ = ("rate", "burst", "tokens", "updated", "_lock")
+
+    def __init__(self, rate: float, burst: int) -> None:
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def try_acquire(self) -> float:
+        """取一个令牌；成功返回 0，否则返回预计还需等待的秒数（不扣令牌）"""
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return 0.0
+            return (1 - self.tokens) / self.rate
+
+
+class RateLimiter(abc.ABC):
+    """按 key（如 api:<id>）限流；子类实现 try_acquire"""
+
+    @abc.abstractmethod
+    def try_acquire(self, key: str, rate: float, burst: int) -> float:
+        """取一个令牌；成功返回 0，否则返回预计还需等待的秒数"""
+
+    def acquire(self, key: str, rate: float, burst: int, max_wait: float = 0.0) -> bool:
+        """
+        取得一个令牌则返回 True。令牌不足时在 max_wait 秒内排队等待，
+        预计等待会超过截止时间则立即返回 False（max_wait=0 即不等待）。
+        """
+        deadline = time.monotonic() + max_wait
+        while True:
+            wait = self.try_acquire(key, rate, max(1, burst))
+            if wait <= 0:
+                return True
+            if time.monotonic() + wait > deadline:
+                return False
+            time.sleep(wait)
+
+
+class LocalRateLimiter(RateLimiter):
+    """进程内令牌桶，所有线程共享；多 worker 时每个进程各自一份额度"""
+
+    def __init__(self) -> None:
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._lock = threading.Lock()
+
+    def try_acquire(self, key: str, rate: float, burst: int) -> float:
+        bucket = self._buckets.get(key)
+        if bucket is None or bucket.rate != rate or bucket.burst != burst:
+            with self._lock:
+                bucket = self._buckets.get(key)
+                if bucket is None or bucket.rate != rate or bucket.burst != burst:
+                    bucket = self._buckets[key] = TokenBucket(rate, burst)
+        return bucket.try_acquire()
+
+
+class SqliteRateLimiter(RateLimiter):
+    """
+    以本地 SQLite 文件保存令牌桶状态，同一台机器上的所有 worker 进程共享一份额度。
+    每次取令牌是一个 BEGIN IMMEDIATE 短事务；SQLite 出错时放行，避免限流故障影响搜索。
+    """
+
+    def __init__(self, path: str = RATE_LIMIT_SQLITE_PATH) -> None:
+        self.path = path
+        self._local = threading.local()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = self._connection()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS buckets (key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated_at REAL NOT NULL)"
+        )
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+        return conn
+
+    def try_acquire(self, key: str, rate: float, burst: int) -> float:
+        conn = self._connection()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = conn.execute("SELECT tokens, updated_at FROM buckets WHERE key = ?", (key,)).fetchone()
+                now = time.time()
+                tokens = float(burst) if row is None else min(burst, row[0] + max(0.0, now - row[1]) * rate)
+                if tokens >= 1:
+                    tokens -= 1
+                    wait = 0.0
+                else:
+                    wait = (1 - tokens) / rate
+                conn.execute(
+                    "INSERT INTO buckets (key, tokens, updated_at) VALUES (?, ?, ?) "
+                    "ON CONFLICT(key) DO UPDATE SET tokens = excluded.tokens, updated_at = excluded.updated_at",
+                    (key, tokens, now),
+                )
+                conn.execute("COMMIT")
+                return wait
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        except sqlite3.Error as e:
+            logger.error(f"限流状态读写失败，本次放行: {e}")
+            return 0.0
+
+
+def create_rate_limiter(backend: str = RATE_LIMIT_BACKEND) -> RateLimiter:
+    if backend == "sqlite":
+        try:
+            return SqliteRateLimiter()
+        except sqlite3.Error as e:
+            logger.error(f"初始化 SQLite 限流后端失败，改用进程内限流: {e}")
+    return LocalRateLimiter()
+
+
+RATE_LIMITER = create_rate_limiter()
@@ -0,0 +1,155 @@
+import re
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from contextvars import ContextVar
+from functools import wraps
+from typing import Any, Callable, Dict, Optional
+from urllib.parse import quote
+
+from configs.app_config import TIMING_ENABLED
+
+# 当前线程/上下文正在收集耗时的计时器；未激活时为 None，埋点只做一次 ContextVar 读取
+_current_timer: ContextVar[Optional["RequestTimer"]] = ContextVar("request_timer", default=None)
+
+_NULL_SPAN = nullcontext()
+_TOKEN_INVALID = re.compile(r"[^!#$%&'*+\-.^_`|~0-9A-Za-z]")
+
+
+class RequestTimer:
+    """
+    单次请求的耗时汇总：按 span 名称累计总耗时和调用次数，线程安全。
+    通过 activate() / run() 在当前线程或线程池任务中激活。
+    """
+
+    __slots__ = ("_spans", "_lock", "_started")
+
+    def __init__(self) -> None:
+        self._spans: Dict[str, list] = {}
+        self._lock = threading.Lock()
+        self._started = time.perf_counter()
+
+    def add(self, name: str, duration_ms: float) -> None:
+        with self._lock:
+            entry = self._spans.get(name)
+            if entry is None:
+                self._spans[name] = [duration_ms, 1]
+            else:
+                entry[0] += duration_ms
+                entry[1] += 1
+
+    @contextmanager
+    def activate(self):
+        token = _current_timer.set(self)
+        try:
+            yield self
+        finally:
+            _current_timer.reset(token)
+
+    def run(self, fn: Callable, *args: Any, **kwargs: Any) -> Any:
+        """在激活本计时器的上下文中执行 fn（用于 executor.submit）"""
+        with self.activate():
+            return fn(*args, **kwargs)
+
+    def summary(self) -> Dict[str, Any]:
+        """返回 {"total_ms": ..., "spans": {name: {"ms": ..., "count": ...}}}"""
+        with self._lock:
+            spans = {name: {"ms": round(ms, 1), "count": count} for name, (ms, count) in self._spans.items()}
+        return {"total_ms": round((time.perf_counter() - self._started) * 1000, 1), "spans": spans}
+
+    def server_timing(self) -> str:
+        """生成 Server-Timing 响应头；非 token 字符的名称放入 desc（URL 编码，保证为 ASCII）"""
+        with self._lock:
+            items = list(self._spans.items())
+
+        metrics = []
+        for index, (name, (ms, count)) in enumerate(items):
+            token = _TOKEN_INVALID.sub("_", name)
+            if token != name:
+                metrics.append(f'{token}-{index};dur={ms:.1f};desc="{quote(name)} x{count}"')
+            else:
+                metrics.append(f'{token};dur={ms:.1f};desc="x{count}"')
+        metrics.append(f"total;dur={(time.perf_counter() - self._started) * 1000:.1f}")
+        return ", ".join(metrics)
+
+
+class _NullTimer:
+    """计时关闭时使用的空实现，接口与 RequestTimer 一致"""
+
+    __slots__ = ()
+
+    def add(self, name: str, duration_ms: float) -> None:
+        pass
+
+    def activate(self):
+        return _NULL_SPAN
+
+    def run(self, fn: Callable, *args: Any, **kwargs: Any) -> Any:
+        return fn(*args, **kwargs)
+
+    def summary(self) -> None:
+        return None
+
+    def server_timing(self) -> str:
+        return ""
+
+
+NULL_TIMER = _NullTimer()
+
+
+def start_timer():
+    """创建请求计时器；TIMING_ENABLED 关闭时返回空实现"""
+    return RequestTimer() if TIMING_ENABLED else NULL_TIMER
+
+
+class _Span:
+    __slots__ = ("timer", "name", "start")
+
+    def __init__(self, timer: RequestTimer, name: str) -> None:
+        self.timer = timer
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.timer.add(self.name, (time.perf_counter() - self.start) * 1000)
+        return False
+
+
+def record_span(name: str, duration_ms: float) -> None:
+    """把已测得的耗时计入当前计时器（调用方自行计时的场景）"""
+    timer = _current_timer.get()
+    if timer is not None:
+        timer.add(name, duration_ms)
+
+
+def span(name: str):
+    """记录一段代码的耗时；当前上下文没有激活的计时器时返回空上下文"""
+    timer = _current_timer.get()
+    if timer is None:
+        return _NULL_SPAN
+    return _Span(timer, name)
+
+
+def timed(name: Optional[str] = None):
+    """函数耗时埋点装饰器，默认以 <模块名>.<函数名> 命名"""
+
+    def decorator(func: Callable) -> Callable:
+        span_name = name or f"{func.__module__.rsplit('.', 1)[-1]}.{func.__name__}"
+
+        @wraps(func)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            timer = _current_timer.get()
+            if timer is None:
+                return func(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                timer.add(span_name, (time.perf_counter() - start) * 1000)
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,240 @@
+import contextvars
+import logging
+import os
+import random
+import secrets
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager, nullcontext
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional
+
+from configs.app_config import (
+    TRACE_ENABLED,
+    TRACE_EXPORT_FILE,
+    TRACE_EXPORT_MAX_MB,
+    TRACE_SAMPLE_RATE,
+    TRACE_SLOW_SECONDS,
+)
+from utils import json_utils
+
+logger = logging.getLogger(__name__)
+
+# 当前上下文的 (trace, span_id)；线程池任务通过 submit_in_context 继承
+_current: ContextVar[Optional[tuple]] = ContextVar("trace_context", default=None)
+
+_NULL_CONTEXT = nullcontext()
+_export_lock = threading.Lock()
+_recent_traces: deque = deque(maxlen=200)
+
+
+def _new_id(nbytes: int) -> str:
+    return secrets.token_hex(nbytes)
+
+
+class Span:
+    __slots__ = ("trace", "span_id", "parent_id", "name", "attrs", "start", "duration_ms", "thread")
+
+    def __init__(self, trace: "Trace", name: str, parent_id: Optional[str], attrs: Dict[str, Any]) -> None:
+        self.trace = trace
+        self.span_id = _new_id(8)
+        self.parent_id = parent_id
+        self.name = name
+        self.attrs = attrs
+        self.start = time.time()
+        self.duration_ms: Optional[float] = None
+        self.thread = threading.current_thread().name
+
+    def set(self, **attrs: Any) -> None:
+        self.attrs.update(attrs)
+
+    def finish(self) -> None:
+        self.duration_ms = round((time.time() - self.start) * 1000, 1)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "offset_ms": round((self.start - self.trace.root.start) * 1000, 1),
+            "duration_ms": self.duration_ms,
+            "thread": self.thread,
+            "attrs": self.attrs,
+        }
+
+
+class Trace:
+    """
+    一次请求（如一次 SSE 搜索）的链路。
+    span 列表线程安全；结束时按采样规则决定是否导出。
+    """
+
+    def __init__(self, name: str, attrs: Dict[str, Any]) -> None:
+        self.trace_id = _new_id(16)
+        self.head_sampled = random.random() < TRACE_SAMPLE_RATE
+        self._lock = threading.Lock()
+        self.root = Span(self, name, None, attrs)
+        self.spans: List[Span] = [self.root]
+
+    def add_span(self, name: str, parent_id: Optional[str], attrs: Dict[str, Any]) -> Span:
+        span = Span(self, name, parent_id, attrs)
+        with self._lock:
+            self.spans.append(span)
+        return span
+
+    @contextmanager
+    def activate(self):
+        """在当前上下文中激活本链路（根 span 为父节点）"""
+        token = _current.set((self, self.root.span_id))
+        try:
+            yield self
+        finally:
+            _current.reset(token)
+
+    def finish(self) -> None:
+        self.root.finish()
+        slow = self.root.duration_ms >= TRACE_SLOW_SECONDS * 1000
+        if self.head_sampled or slow:
+            record = self.to_dict()
+            record["sampled_by"] = "head" if self.head_sampled else "tail"
+            _recent_traces.append(record)
+            _export(record)
+
+    def to_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            spans = [span.to_dict() for span in self.spans]
+        return {
+            "trace_id": self.trace_id,
+            "name": self.root.name,
+            "start": self.root.start,
+            "duration_ms": self.root.duration_ms,
+            "attrs": self.root.attrs,
+            "spans": spans,
+        }
+
+
+class _NullTrace:
+    """追踪关闭时使用的空实现"""
+
+    trace_id = None
+
+    def activate(self):
+        return _NULL_CONTEXT
+
+    def finish(self) -> None:
+        pass
+
+
+NULL_TRACE = _NullTrace()
+
+
+def start_trace(name: str, **attrs: Any):
+    """创建一条链路；TRACE_ENABLED 关闭时返回空实现。调用方负责 finish()"""
+    return Trace(name, attrs) if TRACE_ENABLED else NULL_TRACE
+
+
+class _SpanContext:
+    __slots__ = ("name", "attrs", "span", "token")
+
+    def __init__(self, name: str, attrs: Dict[str, Any]) -> None:
+        self.name = name
+        self.attrs = attrs
+
+    def __enter__(self) -> Span:
+        trace, parent_id = _current.get()
+        self.span = trace.add_span(self.name, parent_id, self.attrs)
+        self.token = _current.set((trace, self.span.span_id))
+        return self.span
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc is not None:
+            self.span.set(error=str(exc))
+        self.span.finish()
+        _current.reset(self.token)
+        return False
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def set(self, **attrs: Any) -> None:
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+def trace_span(name: str, **attrs: Any):
+    """在当前链路下创建子 span；没有激活的链路时返回空实现"""
+    if _current.get() is None:
+        return _NULL_SPAN
+    return _SpanContext(name, attrs)
+
+
+def current_trace_id() -> Optional[str]:
+    current = _current.get()
+    return current[0].trace_id if current else None
+
+
+def submit_in_context(executor, fn, *args, **kwargs):
+    """向线程池提交任务，并携带当前上下文（链路、请求计时器等 ContextVar）"""
+    return executor.submit(contextvars.copy_context().run, fn, *args, **kwargs)
+
+
+class TraceIdLogFilter(logging.Filter):
+    """为日志记录注入 trace_id，便于把线程池中的日志关联到触发它的请求"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.trace_id = current_trace_id() or "-"
+        return True
+
+
+def _export(record: Dict[str, Any]) -> None:
+    """追加写入 JSONL 文件，超过大小上限时轮转为 .1"""
+    line = json_utils.dumps_bytes(record) + b"\n"
+    try:
+        with _export_lock:
+            directory = os.path.dirname(TRACE_EXPORT_FILE)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            if os.path.exists(TRACE_EXPORT_FILE) and os.path.getsize(TRACE_EXPORT_FILE) > TRACE_EXPORT_MAX_MB * 1024 * 1024:
+                os.replace(TRACE_EXPORT_FILE, TRACE_EXPORT_FILE + ".1")
+            with open(TRACE_EXPORT_FILE, "ab") as f:
+                f.write(line)
+    except OSError as e:
+        logger.error(f"写入链路文件失败: {e}")
+
+
+def load_slowest_traces(limit: int = 50, tail_bytes: int = 4 * 1024 * 1024) -> List[Dict[str, Any]]:
+    """
+    读取导出文件末尾的链路（涵盖所有 worker 进程），按耗时倒序返回前 limit 条。
+    文件不可读时退回本进程内存中的最近链路。
+    """
+    traces: List[Dict[str, Any]] = []
+    try:
+        with open(TRACE_EXPORT_FILE, "rb") as f:
+            f.seek(0, os.SEEK_END)
+            size = f.tell()
+            f.seek(max(0, size - tail_bytes))
+            data = f.read()
+        lines = data.split(b"\n")
+        if size > tail_bytes:
+            lines = lines[1:]  # 第一行可能不完整
+        for line in lines:
+            if line.strip():
+                try:
+                    traces.append(json_utils.loads(line))
+                except ValueError:
+                    continue
+    except OSError:
+        traces = list(_recent_traces)
+
+    traces.sort(key=lambda t: t.get("duration_ms") or 0, reverse=True)
+    return traces[:limit]